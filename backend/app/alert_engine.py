@@ -8,8 +8,9 @@ in ANY language and provide accurate severity assessment and recommendations.
 import re
 import os
 import json
+import asyncio
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple, Any
 from pydantic import BaseModel
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -17,6 +18,239 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Micro-batching window for Gemini triage requests (0 disables batching)
+ALERT_BATCH_WINDOW_MS = int(os.getenv("ALERT_BATCH_WINDOW_MS", "150"))
+ALERT_BATCH_MAX_SIZE = int(os.getenv("ALERT_BATCH_MAX_SIZE", "16"))
+# A triage request taking longer than this is abandoned: a timed-out batch
+# falls back to one request per utterance, a timed-out single request to
+# pattern matching
+ALERT_TRIAGE_TIMEOUT_SECONDS = float(os.getenv("ALERT_TRIAGE_TIMEOUT_SECONDS", "8"))
+
+
+TRIAGE_GUIDELINES = """IMPORTANT MEDICAL TRIAGE GUIDELINES:
+- ANY injury (fracture, broken bone, severe cut, head injury) = severity 4-5
+- ANY severe pain (unbearable, worst ever, 8+/10) = severity 4-5
+- Life-threatening (chest pain, can't breathe, stroke, severe bleeding) = severity 5
+- Urgent care needed (fractures, deep cuts, high fever, severe pain) = severity 4
+- Concerning symptoms (persistent pain, infection signs, moderate injury) = severity 3
+- Mild symptoms (minor aches, cold, mild discomfort) = severity 1-2"""
+
+TRIAGE_RESULT_FIELDS = """    "is_critical": boolean (true if severity >= 3, requires medical attention),
+    "symptom_type": string (category: "injury", "chest_pain", "breathing_difficulty", "neurological", "mental_health", "pain", "infection", "bleeding", "other"),
+    "severity_score": integer (1-5 scale:
+        5 = Life-threatening emergency (call 911 immediately)
+        4 = Urgent care needed (ER or urgent care within hours)
+        3 = Medical attention needed (see doctor within 24-48 hours)
+        2 = Mild concern (monitor, see doctor if worsens)
+        1 = Minor issue (self-care, monitor)
+    ),
+    "analysis": string (brief medical analysis explaining the concern),
+    "recommendations": string (specific action: "Call 911 immediately", "Go to ER now", "Visit urgent care today", "Schedule doctor appointment", "Monitor symptoms"),
+    "emergency_keywords": array of strings (key symptoms found)"""
+
+TRIAGE_EXAMPLES = """EXAMPLES:
+- "bone fracture" → severity 4 (urgent care needed)
+- "broken arm" → severity 4 (urgent care needed)
+- "severe headache" → severity 4 (urgent evaluation)
+- "chest pain" → severity 5 (call 911)
+- "can't breathe" → severity 5 (call 911)
+- "mild headache" → severity 2 (monitor)"""
+
+SINGLE_TRIAGE_PROMPT = """You are a medical triage AI assistant. Analyze the following patient symptom description and provide a JSON response.
+
+Patient says: "{text}"
+
+{guidelines}
+
+Respond with ONLY a valid JSON object (no markdown, no extra text):
+{{
+{result_fields}
+}}
+
+""" + TRIAGE_EXAMPLES + """
+
+Respond with ONLY the JSON object, nothing else."""
+
+BATCH_TRIAGE_PROMPT = """You are a medical triage AI assistant. Analyze EACH of the following patient symptom descriptions independently. They come from different consultations and must not influence each other.
+
+Patient statements:
+{items}
+
+{guidelines}
+
+Respond with ONLY a valid JSON array (no markdown, no extra text) containing exactly one object per statement, in any order:
+[
+  {{
+    "id": integer (the number of the statement being analyzed),
+{result_fields}
+  }}
+]
+
+""" + TRIAGE_EXAMPLES + """
+
+Respond with ONLY the JSON array, nothing else."""
+
+
+def _strip_code_fences(response_text: str) -> str:
+    """Remove markdown code fences that Gemini sometimes wraps JSON in."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text.replace("```json", "").replace("```", "").strip()
+    elif response_text.startswith("```"):
+        response_text = response_text.replace("```", "").strip()
+    return response_text
+
+
+class TriageBatcher:
+    """
+    Micro-batching scheduler for Gemini triage requests.
+    
+    Utterances submitted from all consultations within a short window are
+    sent to Gemini as a single multi-item prompt. The JSON array response is
+    fanned back out to each waiting caller, so one API request serves many
+    utterances.
+    """
+    
+    def __init__(
+        self,
+        model: Any,
+        window_ms: int = ALERT_BATCH_WINDOW_MS,
+        max_batch_size: int = ALERT_BATCH_MAX_SIZE,
+        timeout_seconds: float = ALERT_TRIAGE_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            model: Gemini model exposing generate_content_async
+            window_ms: How long to collect utterances before flushing
+            max_batch_size: Flush immediately once this many are pending
+            timeout_seconds: Give up on a batch request after this long
+        """
+        self.model = model
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout_seconds = timeout_seconds
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+        
+        # Counters for monitoring quota usage
+        self.requests_sent = 0
+        self.items_processed = 0
+        self.timeouts = 0
+    
+    async def submit(self, text: str) -> Dict:
+        """
+        Queue an utterance for the next batch and wait for its triage result.
+        
+        Args:
+            text: Patient's symptom description
+        
+        Returns:
+            Parsed triage result dictionary for this utterance
+        
+        Raises:
+            ValueError: If the batch response is missing or malformed
+            asyncio.TimeoutError: If the batch request took longer than
+                timeout_seconds
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, delay=0)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop, delay=self.window_seconds)
+        
+        return await future
+    
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, delay: float):
+        """Arrange for the pending batch to be sent after `delay` seconds."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_later(delay, self._start_flush, loop)
+    
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        """Timer callback: launch a flush task and keep a reference to it."""
+        self._flush_handle = None
+        task = loop.create_task(self._flush())
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+    
+    async def _flush(self):
+        """Send up to one batch of pending utterances and resolve their futures."""
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if not batch:
+            return
+        
+        # Anything that arrived beyond the size cap goes out right behind us
+        if self._pending and self._flush_handle is None:
+            self._schedule_flush(asyncio.get_running_loop(), delay=0)
+        
+        try:
+            results = await asyncio.wait_for(
+                self._request_batch([text for text, _ in batch]), self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(asyncio.TimeoutError(
+                        f"Batch triage request took longer than {self.timeout_seconds}s"
+                    ))
+            return
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for index, (_, future) in enumerate(batch, start=1):
+            if future.done():
+                continue
+            if index in results:
+                future.set_result(results[index])
+            else:
+                future.set_exception(ValueError(f"No triage result for item {index}"))
+    
+    async def _request_batch(self, texts: List[str]) -> Dict[int, Dict]:
+        """
+        Call Gemini once for a batch of utterances.
+        
+        Returns:
+            Mapping of 1-based item number to its triage result
+        """
+        items = "\n".join(
+            f"{index}. {json.dumps(text, ensure_ascii=False)}"
+            for index, text in enumerate(texts, start=1)
+        )
+        prompt = BATCH_TRIAGE_PROMPT.format(
+            items=items,
+            guidelines=TRIAGE_GUIDELINES,
+            result_fields=TRIAGE_RESULT_FIELDS
+        )
+        
+        self.requests_sent += 1
+        self.items_processed += len(texts)
+        response = await self.model.generate_content_async(prompt)
+        
+        parsed = json.loads(_strip_code_fences(response.text))
+        if isinstance(parsed, dict):
+            parsed = parsed.get("results", [parsed])
+        if not isinstance(parsed, list):
+            raise ValueError("Batch triage response is not a JSON array")
+        
+        results = {}
+        for item in parsed:
+            try:
+                results[int(item["id"])] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+        return results
+
 
 class Alert(BaseModel):
     """Medical alert with AI-analyzed symptom details."""
@@ -49,6 +283,7 @@ class AlertEngine:
     def __init__(self):
         """Initialize the Alert Engine with Gemini AI."""
         self.alert_cache: Dict[tuple, datetime] = {}
+        self.batcher: Optional[TriageBatcher] = None
         
         # Initialize Gemini AI
         api_key = os.getenv("GEMINI_API_KEY")
@@ -62,6 +297,8 @@ class AlertEngine:
                 # Use Gemini 2.5 Flash for faster, more reliable responses
                 self.model = genai.GenerativeModel('models/gemini-2.5-flash')
                 self.ai_enabled = True
+                if ALERT_BATCH_WINDOW_MS > 0:
+                    self.batcher = TriageBatcher(self.model)
                 print("[AlertEngine] ✅ Gemini 1.5 Flash enabled successfully!")
             except Exception as e:
                 print(f"[AlertEngine] ❌ Error initializing Gemini: {e}")
@@ -103,7 +340,9 @@ class AlertEngine:
             return None
         
         # Use AI analysis if available
-        if self.ai_enabled:
+        if self.ai_enabled and self.batcher:
+            return await self._batched_ai_analysis(text, consultation_id)
+        elif self.ai_enabled:
             return await self._ai_analysis(text, consultation_id)
         else:
             return await self._fallback_analysis(text, consultation_id)
@@ -113,88 +352,22 @@ class AlertEngine:
         
         try:
             # Create a detailed prompt for Gemini
-            prompt = f"""You are a medical triage AI assistant. Analyze the following patient symptom description and provide a JSON response.
-
-Patient says: "{text}"
-
-IMPORTANT MEDICAL TRIAGE GUIDELINES:
-- ANY injury (fracture, broken bone, severe cut, head injury) = severity 4-5
-- ANY severe pain (unbearable, worst ever, 8+/10) = severity 4-5
-- Life-threatening (chest pain, can't breathe, stroke, severe bleeding) = severity 5
-- Urgent care needed (fractures, deep cuts, high fever, severe pain) = severity 4
-- Concerning symptoms (persistent pain, infection signs, moderate injury) = severity 3
-- Mild symptoms (minor aches, cold, mild discomfort) = severity 1-2
-
-Respond with ONLY a valid JSON object (no markdown, no extra text):
-{{
-    "is_critical": boolean (true if severity >= 3, requires medical attention),
-    "symptom_type": string (category: "injury", "chest_pain", "breathing_difficulty", "neurological", "mental_health", "pain", "infection", "bleeding", "other"),
-    "severity_score": integer (1-5 scale:
-        5 = Life-threatening emergency (call 911 immediately)
-        4 = Urgent care needed (ER or urgent care within hours)
-        3 = Medical attention needed (see doctor within 24-48 hours)
-        2 = Mild concern (monitor, see doctor if worsens)
-        1 = Minor issue (self-care, monitor)
-    ),
-    "analysis": string (brief medical analysis explaining the concern),
-    "recommendations": string (specific action: "Call 911 immediately", "Go to ER now", "Visit urgent care today", "Schedule doctor appointment", "Monitor symptoms"),
-    "emergency_keywords": array of strings (key symptoms found)
-}}
-
-EXAMPLES:
-- "bone fracture" → severity 4 (urgent care needed)
-- "broken arm" → severity 4 (urgent care needed)
-- "severe headache" → severity 4 (urgent evaluation)
-- "chest pain" → severity 5 (call 911)
-- "can't breathe" → severity 5 (call 911)
-- "mild headache" → severity 2 (monitor)
-
-Respond with ONLY the JSON object, nothing else."""
+            prompt = SINGLE_TRIAGE_PROMPT.format(
+                text=text,
+                guidelines=TRIAGE_GUIDELINES,
+                result_fields=TRIAGE_RESULT_FIELDS
+            )
 
             # Call Gemini AI
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Clean up response (remove markdown if present)
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            elif response_text.startswith("```"):
-                response_text = response_text.replace("```", "").strip()
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt), ALERT_TRIAGE_TIMEOUT_SECONDS
+            )
+            response_text = _strip_code_fences(response.text)
             
             # Parse AI response
             ai_result = json.loads(response_text)
             
-            # Check if critical
-            if not ai_result.get("is_critical", False):
-                return None
-            
-            severity = ai_result.get("severity_score", 3)
-            
-            # Only create alert if severity >= 3
-            if severity < 3:
-                return None
-            
-            # Check deduplication cache
-            symptom_type = ai_result.get("symptom_type", "unknown")
-            cache_key = (consultation_id, symptom_type)
-            current_time = datetime.now()
-            
-            if cache_key in self.alert_cache:
-                last_alert_time = self.alert_cache[cache_key]
-                if current_time - last_alert_time < timedelta(minutes=5):
-                    return None
-            
-            self.alert_cache[cache_key] = current_time
-            
-            # Create alert with AI insights
-            return Alert(
-                symptom_text=text[:200],  # Limit length
-                symptom_type=symptom_type,
-                severity_score=severity,
-                timestamp=current_time,
-                ai_analysis=ai_result.get("analysis", ""),
-                recommendations=ai_result.get("recommendations", "")
-            )
+            return self._alert_from_result(text, consultation_id, ai_result)
             
         except json.JSONDecodeError as e:
             print(f"JSON parsing error: {e}")
@@ -206,6 +379,58 @@ Respond with ONLY the JSON object, nothing else."""
             # Fall back to pattern matching
             return await self._fallback_analysis(text, consultation_id)
     
+    async def _batched_ai_analysis(self, text: str, consultation_id: str) -> Optional[Alert]:
+        """Analyze symptoms through the shared micro-batching scheduler."""
+        try:
+            ai_result = await self.batcher.submit(text)
+            return self._alert_from_result(text, consultation_id, ai_result)
+        except asyncio.TimeoutError as e:
+            print(f"Batched AI analysis timed out ({e}), analyzing on its own")
+            return await self._ai_analysis(text, consultation_id)
+        except Exception as e:
+            print(f"Batched AI analysis error: {e}")
+            # Fall back to pattern matching
+            return await self._fallback_analysis(text, consultation_id)
+    
+    def _alert_from_result(
+        self,
+        text: str,
+        consultation_id: str,
+        ai_result: Dict
+    ) -> Optional[Alert]:
+        """Turn a parsed Gemini triage result into an Alert (or None)."""
+        # Check if critical
+        if not ai_result.get("is_critical", False):
+            return None
+        
+        severity = ai_result.get("severity_score", 3)
+        
+        # Only create alert if severity >= 3
+        if severity < 3:
+            return None
+        
+        # Check deduplication cache
+        symptom_type = ai_result.get("symptom_type", "unknown")
+        cache_key = (consultation_id, symptom_type)
+        current_time = datetime.now()
+        
+        if cache_key in self.alert_cache:
+            last_alert_time = self.alert_cache[cache_key]
+            if current_time - last_alert_time < timedelta(minutes=5):
+                return None
+        
+        self.alert_cache[cache_key] = current_time
+        
+        # Create alert with AI insights
+        return Alert(
+            symptom_text=text[:200],  # Limit length
+            symptom_type=symptom_type,
+            severity_score=severity,
+            timestamp=current_time,
+            ai_analysis=ai_result.get("analysis", ""),
+            recommendations=ai_result.get("recommendations", "")
+        )
+    
     async def _fallback_analysis(self, text: str, consultation_id: str) -> Optional[Alert]:
         """Fallback pattern matching when AI is unavailable."""
         
@@ -3,9 +3,11 @@ Appointment management API endpoints
 """
 
 import os
+import json
 from datetime import datetime, date as DateType, time as TimeType, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from supabase import create_client, Client
 import logging
 
@@ -24,7 +26,8 @@ from app.appointment_models import (
     AppointmentStatus,
     TimeSlot
 )
-from app.summarizer import generate_notes_with_empathy
+from app.soap_service import get_soap_service, ConsultationNotFound
+from app.job_queue import get_job_queue, JOB_QUEUED
 from app.models import SoapGenerationResponse
 
 logger = logging.getLogger(__name__)
@@ -464,6 +467,7 @@ async def mark_slot_as_available(
 @router.post("/consultations/{consultation_id}/generate_soap", response_model=SoapGenerationResponse)
 async def generate_soap_notes(
     consultation_id: str,
+    background: bool = Query(False, description="Queue the generation and return a job id"),
     db: Client = Depends(get_supabase)
 ):
     """
@@ -475,93 +479,121 @@ async def generate_soap_notes(
     3. Analyzes for stigmatizing language (Compassion Reflex)
     4. Saves the SOAP notes and suggestions to the database
     
+    Generation goes through the shared SOAP job service, so repeated
+    requests for the same consultation join the run already in progress
+    and an unchanged transcript is not sent to the model again.
+    
+    With background=true the request returns 202 and a job id right away;
+    the result is available from GET /api/jobs/{job_id} or /ws/jobs/{job_id}.
+    
     Args:
         consultation_id: ID of the consultation
+        background: Run as a background job
         
     Returns:
         SoapGenerationResponse with generated SOAP notes and suggestions
     """
+    if background:
+        job_id = await get_job_queue().submit("soap", {"consultation_id": consultation_id})
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "job_id": job_id,
+            "status": JOB_QUEUED,
+            "consultation_id": consultation_id
+        })
+    
     try:
-        logger.info(f"Generating SOAP notes for consultation: {consultation_id}")
-        
-        # Step 1: Fetch consultation and transcript
-        # Try to fetch all possible transcript field names
-        consultation_result = db.table("consultations").select("*").eq("id", consultation_id).execute()
-        
-        if not consultation_result.data:
-            raise HTTPException(status_code=404, detail="Consultation not found")
-        
-        consultation = consultation_result.data[0]
-        
-        # Log available columns for debugging
-        available_columns = list(consultation.keys())
-        logger.info(f"Available columns in consultation: {available_columns}")
-        
-        # Try different possible column names for transcript
-        transcript = (
-            consultation.get("transcript") or 
-            consultation.get("full_transcript") or
-            consultation.get("transcript_text") or
-            None
-        )
-        
-        if not transcript or not transcript.strip():
-            # Check if consultation exists but has no transcript column
-            if "transcript" not in available_columns and "full_transcript" not in available_columns:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Transcript column not found in database. Available columns: {available_columns}. Please run migration 003_add_transcript_column.sql to add the transcript column."
-                )
-            
-            raise HTTPException(
-                status_code=400,
-                detail="Consultation transcript is empty. Cannot generate SOAP notes without a transcript. Please ensure the consultation has a transcript (from captions/audio processing) before generating SOAP notes."
-            )
-        
-        logger.info(f"Found transcript with {len(transcript)} characters")
+        result = await get_soap_service().generate(db, consultation_id)
+    except Exception as e:
+        raise _soap_http_error(e)
+    
+    logger.info(
+        f"SOAP notes ready for consultation {consultation_id} "
+        f"({len(result['stigma_suggestions'])} suggestions, cached={result['cached']})"
+    )
+    return SoapGenerationResponse(
+        raw_soap_note=result["soap_note"],
+        de_stigma_suggestions=result["stigma_suggestions"],
+        consultation_id=consultation_id
+    )
+
+
+@router.post("/consultations/{consultation_id}/generate_soap/stream")
+async def stream_soap_notes(
+    consultation_id: str,
+    db: Client = Depends(get_supabase)
+):
+    """
+    Generate SOAP notes as a Server-Sent Events stream
+    
+    Sends a `section` event for each SOAP section the moment Gemini has
+    finished it (assessment and plan first), then `suggestions` with the
+    Compassion Reflex results and `complete` with the full note, which is
+    saved to the database exactly like generate_soap. Failures before the
+    first event are normal HTTP errors with a JSON detail; later ones arrive
+    as an `error` event with the same detail field.
+    
+    This is a POST because it generates and saves the note; clients read
+    the stream from the fetch response body (EventSource only sends GETs
+    and hides the error detail).
+    
+    Args:
+        consultation_id: ID of the consultation
         
-        # Step 2: Generate SOAP notes with empathy suggestions
+    Returns:
+        text/event-stream response
+    """
+    events = get_soap_service().stream(db, consultation_id)
+    try:
+        first_event = await events.__anext__()
+    except Exception as e:
+        raise _soap_http_error(e)
+    
+    async def event_stream():
+        yield _sse_message(first_event)
         try:
-            raw_soap_note, de_stigma_suggestions = await generate_notes_with_empathy(transcript)
-            logger.info(f"Generated SOAP note with {len(de_stigma_suggestions)} suggestions")
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+            async for event in events:
+                yield _sse_message(event)
         except Exception as e:
-            logger.error(f"Error generating SOAP notes: {e}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate SOAP notes: {str(e)}"
-            )
-        
-        # Step 3: Save SOAP notes to database
-        # Database schema uses 'soap_notes' and 'stigma_suggestions'
-        # Frontend expects 'raw_soap_note' and 'de_stigma_suggestions'
-        # We'll save to both for compatibility (database columns will be added if needed)
-        update_data = {
-            "soap_notes": raw_soap_note,
-            "raw_soap_note": raw_soap_note,  # For frontend compatibility
-            "stigma_suggestions": de_stigma_suggestions,
-            "de_stigma_suggestions": de_stigma_suggestions  # For frontend compatibility
-        }
-        
-        update_result = db.table("consultations").update(update_data).eq(
-            "id", consultation_id
-        ).execute()
-        
-        if not update_result.data:
-            raise HTTPException(status_code=500, detail="Failed to save SOAP notes to database")
-        
-        logger.info(f"Successfully saved SOAP notes for consultation: {consultation_id}")
-        
-        # Step 4: Return response
-        return SoapGenerationResponse(
-            raw_soap_note=raw_soap_note,
-            de_stigma_suggestions=de_stigma_suggestions,
-            consultation_id=consultation_id
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error generating SOAP notes: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+            logger.error(f"Error streaming SOAP notes: {e}")
+            yield _sse_message({"type": "error", "detail": f"Failed to generate SOAP notes: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse_message(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _soap_http_error(error: Exception) -> HTTPException:
+    """Map SoapJobService errors to HTTP errors"""
+    if isinstance(error, HTTPException):
+        return error
+    if isinstance(error, ConsultationNotFound):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, ValueError):
+        # A missing transcript column is a schema problem, not a bad request
+        status_code = 500 if "column not found" in str(error) else 400
+        return HTTPException(status_code=status_code, detail=str(error))
+    
+    logger.error(f"Error generating SOAP notes: {error}")
+    return HTTPException(status_code=500, detail=f"Failed to generate SOAP notes: {str(error)}")
+
+
+async def run_soap_job(payload: dict, report_progress) -> dict:
+    """Background job handler for generate_soap?background=true"""
+    consultation_id = payload["consultation_id"]
+    report_progress(0.1, "Generating SOAP notes")
+    result = await get_soap_service().generate(get_supabase(), consultation_id)
+    return {
+        "consultation_id": consultation_id,
+        "raw_soap_note": result["soap_note"],
+        "de_stigma_suggestions": result["stigma_suggestions"]
+    }
+
+
+get_job_queue().register("soap", run_soap_job, concurrency=4)
@@ -0,0 +1,165 @@
+"""
+Content-Addressed Result Cache
+
+Stores results derived from an uploaded file (extracted text, OCR output,
+AI analysis) under the SHA-256 of the file bytes, so the same PDF or photo
+uploaded again skips straight to the database insert instead of paying for
+extraction and another Gemini call. Entries are small JSON files on disk
+and survive restarts; the least recently written entries are dropped once
+the cache holds more than max_entries files.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory holding cached results
+CONTENT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", "data/content_cache")
+# Entries kept before the oldest are removed
+CONTENT_CACHE_MAX_ENTRIES = int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "5000"))
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """
+    JSON results keyed by content hash.
+
+    Each entry is a dict of named results (e.g. "extracted_text",
+    "analysis"); update() merges new results into the entry. Methods do
+    blocking file I/O and are meant to be called from a worker thread.
+    """
+
+    def __init__(self, directory: str = CONTENT_CACHE_DIR, max_entries: int = CONTENT_CACHE_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = sum(1 for _ in self.directory.glob("*/*.json"))
+
+        # Hit/miss counts per result name, and upstream calls avoided
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.saved_calls: Dict[str, int] = {}
+
+    def _path(self, content_hash: str) -> Path:
+        return self.directory / content_hash[:2] / f"{content_hash}.json"
+
+    def get(self, content_hash: str) -> Dict[str, Any]:
+        """
+        Get everything cached for a content hash.
+
+        Returns:
+            Cached results by name (empty if nothing is cached)
+        """
+        try:
+            with open(self._path(content_hash), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {content_hash[:12]}: {e}")
+            return {}
+
+    def lookup(self, content_hash: str, name: str, saves: Optional[str] = None) -> Optional[Any]:
+        """
+        Get one cached result and count the hit or miss.
+
+        Args:
+            content_hash: SHA-256 of the file
+            name: Result name, e.g. "analysis"
+            saves: Upstream call avoided on a hit, for the stats (e.g. "gemini")
+
+        Returns:
+            The cached result, or None
+        """
+        value = self.get(content_hash).get(name)
+        with self._lock:
+            if value is None:
+                self.misses[name] = self.misses.get(name, 0) + 1
+            else:
+                self.hits[name] = self.hits.get(name, 0) + 1
+        if value is not None and saves:
+            self.record_saved(saves)
+        return value
+
+    def record_saved(self, call: str):
+        """Count an upstream call made unnecessary by a cached result."""
+        with self._lock:
+            self.saved_calls[call] = self.saved_calls.get(call, 0) + 1
+
+    def update(self, content_hash: str, **results):
+        """Merge results into the entry for a content hash."""
+        path = self._path(content_hash)
+        with self._lock:
+            entry = self.get(content_hash)
+            is_new = not entry
+            entry.update(results)
+
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+            if is_new:
+                self._entries += 1
+                if self._entries > self.max_entries:
+                    self._evict()
+
+    def _evict(self):
+        """Remove the oldest tenth of the entries."""
+        files = sorted(self.directory.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(1, len(files) // 10)]:
+            path.unlink(missing_ok=True)
+        self._entries = sum(1 for _ in self.directory.glob("*/*.json"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate per result and upstream calls saved."""
+        with self._lock:
+            names = set(self.hits) | set(self.misses)
+            results = {}
+            for name in sorted(names):
+                hits, misses = self.hits.get(name, 0), self.misses.get(name, 0)
+                results[name] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+                }
+            return {
+                "entries": self._entries,
+                "results": results,
+                "saved_calls": dict(self.saved_calls)
+            }
+
+
+# Global cache instance
+_content_cache: Optional[ContentCache] = None
+
+
+def get_content_cache() -> ContentCache:
+    """
+    Get or create the global ContentCache instance.
+
+    Returns:
+        ContentCache singleton instance
+    """
+    global _content_cache
+    if _content_cache is None:
+        _content_cache = ContentCache()
+    return _content_cache
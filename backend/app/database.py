@@ -8,9 +8,12 @@ including emotion logging, statistics retrieval, and consultation management.
 from typing import List, Dict, Optional
 from datetime import datetime
 import os
+import asyncio
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from .emotion_stats import EmotionStatsCache, empty_summary
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -31,6 +34,13 @@ class DatabaseClient:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
         
         self.client: Client = create_client(supabase_url, supabase_key)
+        
+        # Per-user emotion summaries, seeded on first request and then
+        # updated in memory by log_emotion
+        self.emotion_stats = EmotionStatsCache(
+            self._fetch_emotion_stats,
+            self._fetch_last_emotion
+        )
     
     async def log_emotion(
         self,
@@ -62,12 +72,16 @@ class DatabaseClient:
             if consultation_id:
                 data["consultation_id"] = consultation_id
             
-            result = self.client.table("emotion_logs").insert(data).execute()
-            return result.data[0] if result.data else {}
+            result = await asyncio.to_thread(self.client.table("emotion_logs").insert(data).execute)
+            row = result.data[0] if result.data else {}
         
         except Exception as e:
             print(f"Error logging emotion: {e}")
             return {}
+        
+        if row:
+            await self.emotion_stats.record(row)
+        return row
     
     async def get_emotion_stats(self, user_id: str) -> List[Dict]:
         """
@@ -80,17 +94,32 @@ class DatabaseClient:
             List of emotion statistics
         """
         try:
-            result = self.client.from_("emotion_stats")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .execute()
-            
-            return result.data if result.data else []
+            return await self._fetch_emotion_stats(user_id)
         
         except Exception as e:
             print(f"Error fetching emotion stats: {e}")
             return []
     
+    async def _fetch_emotion_stats(self, user_id: str) -> List[Dict]:
+        """Read a user's rows from the emotion_stats view (errors propagate)."""
+        query = self.client.from_("emotion_stats")\
+            .select("*")\
+            .eq("user_id", user_id)
+        result = await asyncio.to_thread(query.execute)
+        
+        return result.data if result.data else []
+    
+    async def _fetch_last_emotion(self, user_id: str) -> Optional[Dict]:
+        """Read a user's most recent emotion log (errors propagate)."""
+        query = self.client.table("emotion_logs")\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .order("created_at", desc=True)\
+            .limit(1)
+        result = await asyncio.to_thread(query.execute)
+        
+        return result.data[0] if result.data else None
+    
     async def get_recent_emotions(
         self,
         user_id: str,
@@ -150,6 +179,9 @@ class DatabaseClient:
         """
         Get a summary of emotion detections for dashboard display.
         
+        Served from the in-memory aggregate; the database is only read the
+        first time a user's summary is requested.
+        
         Args:
             user_id: ID of the user
         
@@ -157,41 +189,11 @@ class DatabaseClient:
             Dictionary with emotion summary statistics
         """
         try:
-            # Get stats from view
-            stats = await self.get_emotion_stats(user_id)
-            
-            # Calculate totals
-            total_detections = sum(stat.get("detection_count", 0) for stat in stats)
-            
-            # Create distribution
-            distribution = {}
-            for stat in stats:
-                emotion_type = stat.get("emotion_type")
-                count = stat.get("detection_count", 0)
-                if total_detections > 0:
-                    distribution[emotion_type] = round((count / total_detections) * 100, 1)
-                else:
-                    distribution[emotion_type] = 0
-            
-            # Get most recent emotion
-            recent = await self.get_recent_emotions(user_id, limit=1)
-            last_emotion = recent[0] if recent else None
-            
-            return {
-                "total_detections": total_detections,
-                "distribution": distribution,
-                "last_emotion": last_emotion,
-                "stats": stats
-            }
+            return await self.emotion_stats.get_summary(user_id)
         
         except Exception as e:
             print(f"Error getting emotion summary: {e}")
-            return {
-                "total_detections": 0,
-                "distribution": {},
-                "last_emotion": None,
-                "stats": []
-            }
+            return empty_summary()
     
     async def check_emotion_consent(self, user_id: str) -> bool:
         """
@@ -234,6 +236,7 @@ class DatabaseClient:
                 .eq("user_id", user_id)\
                 .execute()
             
+            await self.emotion_stats.invalidate(user_id)
             return True
         
         except Exception as e:
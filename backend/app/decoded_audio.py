@@ -0,0 +1,69 @@
+"""
+Decoded Audio Frames
+
+A single decoded representation of one incoming audio chunk (LINEAR16 PCM,
+16 kHz mono) that every audio stage shares. The chunk is decoded once by
+STTPipeline.decode_audio and the same object is handed to speech-to-text,
+emotion analysis and any later stage, so no stage re-runs FFmpeg or
+librosa.load on the original container bytes.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class DecodedAudio:
+    """
+    One chunk of decoded 16-bit mono PCM audio.
+
+    The raw PCM bytes are exposed as-is for APIs that want LINEAR16
+    (Google Cloud STT), and as zero-copy NumPy views for signal processing.
+    """
+
+    __slots__ = ("pcm", "sample_rate", "source_format", "_samples")
+
+    def __init__(self, pcm: bytes, sample_rate: int = 16000, source_format: str = "pcm"):
+        """
+        Wrap decoded PCM audio.
+
+        Args:
+            pcm: Signed 16-bit little-endian mono samples
+            sample_rate: Sample rate of the PCM data in Hz
+            source_format: Container/codec the chunk was decoded from
+        """
+        # A trailing odd byte cannot form a sample
+        self.pcm = pcm[:len(pcm) - (len(pcm) % 2)]
+        self.sample_rate = sample_rate
+        self.source_format = source_format
+        self._samples: Optional[np.ndarray] = None
+
+    @property
+    def pcm_view(self) -> memoryview:
+        """Zero-copy view of the PCM bytes."""
+        return memoryview(self.pcm)
+
+    @property
+    def int16(self) -> np.ndarray:
+        """Zero-copy, read-only int16 view of the samples."""
+        return np.frombuffer(self.pcm, dtype=np.int16)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Samples as float32 in [-1, 1], converted on first use and cached."""
+        if self._samples is None:
+            self._samples = self.int16.astype(np.float32) / 32768.0
+        return self._samples
+
+    @property
+    def duration_seconds(self) -> float:
+        return len(self.pcm) / 2 / self.sample_rate
+
+    def __len__(self) -> int:
+        return len(self.pcm) // 2
+
+    def __repr__(self) -> str:
+        return (
+            f"DecodedAudio({self.duration_seconds:.2f}s @ {self.sample_rate} Hz, "
+            f"from {self.source_format})"
+        )
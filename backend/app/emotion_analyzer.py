@@ -6,13 +6,21 @@ It analyzes acoustic features like pitch, energy, and speech rate to classify em
 and provide confidence scores for real-time emotional state tracking.
 """
 
+import os
+import asyncio
 import numpy as np
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 import librosa
 import io
 
+from .decoded_audio import DecodedAudio
+from .emotion_classifier import EmotionClassifier, feature_vector, load_default_classifier
+
+# Worker processes for emotion analysis (0 = analyze inline on the event loop)
+EMOTION_ANALYZER_WORKERS = int(os.getenv("EMOTION_ANALYZER_WORKERS", "2"))
+
 
 # Emotion categories with color coding and descriptions for UI
 EMOTION_CATEGORIES = {
@@ -43,6 +51,17 @@ EMOTION_CATEGORIES = {
 }
 
 
+# Number of MFCC coefficients extracted per frame
+N_MFCC = 13
+
+# Column layout of the per-frame feature matrix produced by _frame_features
+FRAME_FEATURES = [
+    "pitch", "voiced", "rms", "zcr",
+    "spectral_centroid", "spectral_rolloff", "spectral_bandwidth"
+] + [f"mfcc_{i}" for i in range(N_MFCC)]
+FRAME_FEATURE_INDEX = {name: index for index, name in enumerate(FRAME_FEATURES)}
+
+
 class EmotionResult(BaseModel):
     """
     Pydantic model representing an emotion analysis result.
@@ -73,22 +92,43 @@ class EmotionAnalyzer:
     using a lightweight feature-based approach for real-time performance.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        classifier: Optional[EmotionClassifier] = None
+    ):
         """
         Initialize the Emotion Analyzer.
         
         Loads the emotion classification model and initializes the feature extractor.
-        For MVP/hackathon, uses a simple rule-based classifier based on audio features.
+        Without a trained model (EMOTION_MODEL_PATH) a simple rule-based
+        classifier based on audio features is used.
+        
+        Args:
+            workers: Size of the process pool used by analyze_audio. Defaults to
+                EMOTION_ANALYZER_WORKERS; 0 analyzes inline in the calling process.
+            classifier: Trained classifier to use instead of the rules. Defaults
+                to the model at EMOTION_MODEL_PATH, loaded on first use.
         """
         self.emotion_categories = EMOTION_CATEGORIES
         
         # Feature extraction parameters
         self.sample_rate = 16000
-        self.n_mfcc = 13
+        self.n_mfcc = N_MFCC
+        self._init_spectral_pipeline()
         
-        # Simple thresholds for rule-based classification (MVP approach)
-        # In production, this would be replaced with a trained ML model
+        # Simple thresholds for rule-based classification (MVP approach),
+        # used whenever no trained model is configured
         self._init_simple_classifier()
+        self.classifier = classifier if classifier is not None else load_default_classifier()
+        
+        # Optional process pool so librosa work stays off the event loop;
+        # its processes are only started by the first chunk
+        self.worker_pool = None
+        workers = EMOTION_ANALYZER_WORKERS if workers is None else workers
+        if workers > 0:
+            from .emotion_pool import EmotionWorkerPool
+            self.worker_pool = EmotionWorkerPool(workers=workers)
     
     def _init_simple_classifier(self):
         """
@@ -108,6 +148,194 @@ class EmotionAnalyzer:
             "speech_rate_low": 2.0
         }
 
+    def _init_spectral_pipeline(self):
+        """
+        Precompute everything the shared STFT pipeline needs per chunk.
+        
+        The FFT bin frequencies, mel filterbank and pitch search band depend
+        only on the sample rate and frame size, so they are built once here
+        instead of on every call.
+        """
+        self.n_fft = 2048
+        self.hop_length = 512
+        self.pitch_fmin = 50
+        self.pitch_fmax = 400
+        self.rolloff_percent = 0.85
+        
+        self.fft_freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=self.n_fft)
+        self.mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=self.n_fft)
+        
+        # Interior FFT bins inside [fmin, fmax) - neighbours are needed for peak picking
+        band = np.nonzero(
+            (self.fft_freqs >= self.pitch_fmin) & (self.fft_freqs < self.pitch_fmax)
+        )[0]
+        self.pitch_bins = (max(int(band[0]), 1), min(int(band[-1]) + 1, len(self.fft_freqs) - 1))
+    
+    def _compute_spectrogram(self, audio: np.ndarray) -> np.ndarray:
+        """Compute the single magnitude STFT shared by all spectral features."""
+        return np.abs(librosa.stft(audio, n_fft=self.n_fft, hop_length=self.hop_length))
+    
+    def _track_pitch(self, S: np.ndarray) -> np.ndarray:
+        """
+        Vectorized equivalent of librosa.piptrack + per-frame argmax.
+        
+        Peak picking and parabolic interpolation are only evaluated inside the
+        pitch search band, and the strongest peak of every frame is selected
+        with a single argmax instead of a Python loop over frames.
+        
+        Args:
+            S: Magnitude spectrogram (freq bins x frames)
+        
+        Returns:
+            Per-frame pitch in Hz (0 where no valid pitch was found)
+        """
+        lo, hi = self.pitch_bins
+        center, below, above = S[lo:hi], S[lo - 1:hi - 1], S[lo + 1:hi + 1]
+        
+        # Parabolic interpolation of the peak position around each bin
+        curvature = above + below - 2 * center
+        slope = 0.5 * (above - below)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(np.abs(slope) < np.abs(curvature), -slope / curvature, 0.0)
+        
+        # Local maxima of the spectrum after thresholding at 10% of the frame peak
+        ref = 0.1 * S.max(axis=0)
+        thresholded = S * (S > ref)
+        t_center = thresholded[lo:hi]
+        peaks = (t_center > thresholded[lo - 1:hi - 1]) & (t_center >= thresholded[lo + 1:hi + 1])
+        
+        magnitudes = np.where(peaks, center + 0.5 * slope * shift, 0.0)
+        
+        frames = np.arange(S.shape[1])
+        best = magnitudes.argmax(axis=0)
+        pitches = np.where(
+            peaks[best, frames],
+            (lo + best + shift[best, frames]) * self.sample_rate / self.n_fft,
+            0.0
+        )
+        return pitches
+    
+    def _frame_means(self, values: np.ndarray) -> np.ndarray:
+        """Mean of `values` over each centered analysis frame, via a cumulative sum."""
+        counts = np.concatenate(([0], np.cumsum(values, dtype=np.float64)))
+        starts = np.arange(0, len(values) - self.n_fft + 1, self.hop_length)
+        return (counts[starts + self.n_fft] - counts[starts]) / self.n_fft
+    
+    def _rms(self, audio: np.ndarray) -> np.ndarray:
+        """Per-frame RMS energy, framed like librosa.feature.rms (zero padded)."""
+        padded = np.pad(audio, self.n_fft // 2, mode='constant')
+        return np.sqrt(self._frame_means(padded.astype(np.float64) ** 2))
+    
+    def _zero_crossing_rate(self, audio: np.ndarray) -> np.ndarray:
+        """Per-frame zero-crossing rate, framed like librosa (edge padded)."""
+        padded = np.pad(audio, self.n_fft // 2, mode='edge')
+        crossings = np.concatenate(([0], np.abs(np.diff(np.signbit(padded).astype(np.int8)))))
+        return self._frame_means(crossings)
+    
+    def _frame_features(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Compute per-frame acoustic features from one shared STFT.
+        
+        Args:
+            audio: Audio signal as numpy array
+        
+        Returns:
+            Array of shape (frames, len(FRAME_FEATURES)); column order
+            follows FRAME_FEATURES
+        """
+        S = self._compute_spectrogram(audio)
+        power = S ** 2
+        
+        pitch = self._track_pitch(S)
+        voiced = (pitch > 0).astype(np.float64)
+        
+        rms = self._rms(audio)
+        zcr = self._zero_crossing_rate(audio)
+        
+        mel = librosa.power_to_db(self.mel_basis @ power)
+        mfccs = librosa.feature.mfcc(S=mel, n_mfcc=self.n_mfcc)
+        
+        # Spectral shape from the normalized magnitude spectrum
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spectrum = np.nan_to_num(S / S.sum(axis=0, keepdims=True))
+        freqs = self.fft_freqs[:, np.newaxis]
+        centroid = (freqs * spectrum).sum(axis=0)
+        cumulative = np.cumsum(S, axis=0)
+        rolloff = self.fft_freqs[
+            (cumulative >= self.rolloff_percent * cumulative[-1]).argmax(axis=0)
+        ]
+        bandwidth = np.sqrt((spectrum * (freqs - centroid) ** 2).sum(axis=0))
+        
+        return np.column_stack([
+            pitch, voiced, rms, zcr, centroid, rolloff, bandwidth, mfccs.T
+        ]).astype(np.float64)
+    
+    def _features_from_moments(
+        self,
+        count: int,
+        sums: np.ndarray,
+        squares: np.ndarray,
+        energy_max: float
+    ) -> dict:
+        """
+        Build the feature dictionary from per-frame sums and sums of squares.
+        
+        Keeping features as moments lets callers aggregate frames from many
+        chunks (see StreamingEmotionTracker) without storing the raw audio.
+        Pitch statistics only count voiced frames.
+        
+        Args:
+            count: Number of frames aggregated
+            sums: Column sums of the frame feature matrix
+            squares: Column sums of the squared frame feature matrix
+            energy_max: Largest per-frame RMS energy
+        
+        Returns:
+            Dictionary of (unnormalized) features
+        """
+        col = FRAME_FEATURE_INDEX
+        mean = sums / count
+        variance = np.maximum(squares / count - mean ** 2, 0)
+        std = np.sqrt(variance)
+        
+        features = {}
+        
+        # 1. Pitch (F0) over voiced frames only
+        voiced_frames = sums[col['voiced']]
+        if voiced_frames > 0:
+            pitch_mean = sums[col['pitch']] / voiced_frames
+            pitch_variance = max(squares[col['pitch']] / voiced_frames - pitch_mean ** 2, 0.0)
+            features['pitch_mean'] = pitch_mean
+            features['pitch_std'] = np.sqrt(pitch_variance)
+            features['pitch_variance'] = pitch_variance
+        else:
+            features['pitch_mean'] = 0
+            features['pitch_std'] = 0
+            features['pitch_variance'] = 0
+        
+        # 2. Energy (RMS)
+        features['energy_mean'] = mean[col['rms']]
+        features['energy_std'] = std[col['rms']]
+        features['energy_max'] = energy_max
+        
+        # 3. Speech rate - zero-crossing rate as a proxy
+        features['speech_rate'] = mean[col['zcr']] * self.sample_rate / 2
+        
+        # 4. MFCC statistics
+        mfcc_columns = slice(col['mfcc_0'], col['mfcc_0'] + self.n_mfcc)
+        features['mfcc_mean'] = mean[mfcc_columns]
+        features['mfcc_std'] = std[mfcc_columns]
+        
+        # 5. Spectral features
+        features['spectral_centroid_mean'] = mean[col['spectral_centroid']]
+        features['spectral_centroid_std'] = std[col['spectral_centroid']]
+        features['spectral_rolloff_mean'] = mean[col['spectral_rolloff']]
+        
+        # 6. Spectral bandwidth
+        features['spectral_bandwidth_mean'] = mean[col['spectral_bandwidth']]
+        
+        return features
+    
     def _extract_features(self, audio: np.ndarray) -> dict:
         """
         Extract acoustic features from audio signal.
@@ -119,83 +347,24 @@ class EmotionAnalyzer:
         - MFCCs: Mel-frequency cepstral coefficients
         - Spectral features: Spectral centroid, rolloff, etc.
         
+        All spectral features are derived from one shared magnitude STFT
+        rather than letting each librosa feature recompute its own.
+        
         Args:
             audio: Audio signal as numpy array
         
         Returns:
             Dictionary containing extracted features
         """
-        features = {}
-        
         try:
-            # 1. Extract Pitch (F0) using librosa
-            pitches, magnitudes = librosa.piptrack(
-                y=audio,
-                sr=self.sample_rate,
-                fmin=50,
-                fmax=400
+            frames = self._frame_features(audio)
+            features = self._features_from_moments(
+                len(frames),
+                frames.sum(axis=0),
+                (frames ** 2).sum(axis=0),
+                frames[:, FRAME_FEATURE_INDEX['rms']].max()
             )
             
-            # Get pitch values where magnitude is highest
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:  # Only consider valid pitch values
-                    pitch_values.append(pitch)
-            
-            if len(pitch_values) > 0:
-                features['pitch_mean'] = np.mean(pitch_values)
-                features['pitch_std'] = np.std(pitch_values)
-                features['pitch_variance'] = np.var(pitch_values)
-            else:
-                features['pitch_mean'] = 0
-                features['pitch_std'] = 0
-                features['pitch_variance'] = 0
-            
-            # 2. Extract Energy (RMS)
-            rms = librosa.feature.rms(y=audio)[0]
-            features['energy_mean'] = np.mean(rms)
-            features['energy_std'] = np.std(rms)
-            features['energy_max'] = np.max(rms)
-            
-            # 3. Estimate Speech Rate
-            # Use zero-crossing rate as a proxy for speech rate
-            zcr = librosa.feature.zero_crossing_rate(audio)[0]
-            features['speech_rate'] = np.mean(zcr) * self.sample_rate / 2
-            
-            # 4. Extract MFCCs (Mel-frequency cepstral coefficients)
-            mfccs = librosa.feature.mfcc(
-                y=audio,
-                sr=self.sample_rate,
-                n_mfcc=self.n_mfcc
-            )
-            
-            # Statistical features from MFCCs
-            features['mfcc_mean'] = np.mean(mfccs, axis=1)
-            features['mfcc_std'] = np.std(mfccs, axis=1)
-            
-            # 5. Extract Spectral Features
-            spectral_centroids = librosa.feature.spectral_centroid(
-                y=audio,
-                sr=self.sample_rate
-            )[0]
-            features['spectral_centroid_mean'] = np.mean(spectral_centroids)
-            features['spectral_centroid_std'] = np.std(spectral_centroids)
-            
-            spectral_rolloff = librosa.feature.spectral_rolloff(
-                y=audio,
-                sr=self.sample_rate
-            )[0]
-            features['spectral_rolloff_mean'] = np.mean(spectral_rolloff)
-            
-            # 6. Spectral Bandwidth
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(
-                y=audio,
-                sr=self.sample_rate
-            )[0]
-            features['spectral_bandwidth_mean'] = np.mean(spectral_bandwidth)
-            
             # Normalize features for consistent scale
             features = self._normalize_features(features)
             
@@ -258,7 +427,7 @@ class EmotionAnalyzer:
 
     async def analyze_audio(
         self,
-        audio_chunk: bytes,
+        audio_chunk: Union[bytes, DecodedAudio],
         sample_rate: int = 16000
     ) -> EmotionResult:
         """
@@ -266,9 +435,65 @@ class EmotionAnalyzer:
         
         Converts audio bytes to numpy array, extracts features, and runs
         emotion classification to determine the patient's emotional state.
+        When a worker pool is configured the work runs in another process.
         
         Args:
-            audio_chunk: Raw audio data as bytes
+            audio_chunk: Raw audio data as bytes, or audio already decoded by
+                STTPipeline.decode_audio (used as-is, without decoding again)
+            sample_rate: Sample rate of the audio (default: 16000 Hz)
+        
+        Returns:
+            EmotionResult with emotion_type and confidence_score
+        """
+        if self.worker_pool is not None:
+            return await self.worker_pool.analyze_audio(audio_chunk, sample_rate)
+        return self.classify_chunk(audio_chunk, sample_rate)
+    
+    async def frame_features(
+        self,
+        audio_chunk: Union[bytes, DecodedAudio],
+        sample_rate: int = 16000
+    ) -> np.ndarray:
+        """
+        Per-frame features of a chunk, computed off the event loop.
+        
+        Runs in the worker pool when one is configured, otherwise in the
+        default thread executor.
+        
+        Args:
+            audio_chunk: Raw audio bytes, or audio already decoded by
+                STTPipeline.decode_audio
+            sample_rate: Sample rate of the audio (default: 16000 Hz)
+        
+        Returns:
+            Array of shape (frames, len(FRAME_FEATURES))
+        """
+        if self.worker_pool is not None:
+            return await self.worker_pool.frame_features(audio_chunk, sample_rate)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.chunk_frame_features, audio_chunk, sample_rate)
+    
+    def chunk_frame_features(
+        self,
+        audio_chunk: Union[bytes, DecodedAudio],
+        sample_rate: int = 16000
+    ) -> np.ndarray:
+        """Synchronously decode (unless already decoded) and featurize a chunk."""
+        audio = self._bytes_to_audio(audio_chunk, sample_rate)
+        if len(audio) == 0:
+            return np.zeros((0, len(FRAME_FEATURES)))
+        return self._frame_features(audio)
+    
+    def classify_chunk(
+        self,
+        audio_chunk: Union[bytes, DecodedAudio],
+        sample_rate: int = 16000
+    ) -> EmotionResult:
+        """
+        Synchronously decode, featurize and classify one audio chunk.
+        
+        Args:
+            audio_chunk: Raw audio data as bytes, or an already decoded chunk
             sample_rate: Sample rate of the audio (default: 16000 Hz)
         
         Returns:
@@ -308,17 +533,27 @@ class EmotionAnalyzer:
                 timestamp=datetime.now()
             )
     
-    def _bytes_to_audio(self, audio_bytes: bytes, sample_rate: int) -> np.ndarray:
+    def _bytes_to_audio(self, audio_bytes: Union[bytes, DecodedAudio], sample_rate: int) -> np.ndarray:
         """
         Convert audio bytes to numpy array.
         
         Args:
-            audio_bytes: Raw audio data as bytes
+            audio_bytes: Raw audio data as bytes, or a DecodedAudio whose
+                samples are returned directly
             sample_rate: Sample rate of the audio
         
         Returns:
             Audio signal as numpy array
         """
+        if isinstance(audio_bytes, DecodedAudio):
+            if audio_bytes.sample_rate == sample_rate:
+                return audio_bytes.samples
+            return librosa.resample(
+                audio_bytes.samples,
+                orig_sr=audio_bytes.sample_rate,
+                target_sr=sample_rate
+            )
+        
         try:
             # Try to load using librosa (handles various formats)
             audio, sr = librosa.load(
@@ -338,8 +573,56 @@ class EmotionAnalyzer:
         """
         Classify emotion based on extracted features.
         
-        Uses a simple rule-based classifier for MVP. In production, this would
-        be replaced with a trained ML model (sklearn, neural network, etc.)
+        Uses the trained classifier when one is configured and falls back to
+        the rule-based classifier if it is missing or fails.
+        
+        Args:
+            features: Dictionary of extracted audio features
+        
+        Returns:
+            Tuple of (emotion_type, confidence_score)
+        """
+        if self.classifier is not None:
+            try:
+                return self.classifier.classify(features)
+            except Exception as e:
+                print(f"Emotion model error, using rule-based classifier: {e}")
+                self.classifier = None
+        
+        return self._classify_with_rules(features)
+    
+    def classify_features_batch(self, features_list: List[dict]) -> List[tuple[str, float]]:
+        """
+        Classify many feature dictionaries at once.
+        
+        With a trained model this is a single vectorized forward pass.
+        
+        Args:
+            features_list: Feature dictionaries from _extract_features
+        
+        Returns:
+            List of (emotion_type, confidence_score) tuples
+        """
+        if not features_list:
+            return []
+        
+        if self.classifier is not None:
+            try:
+                X = np.stack([feature_vector(features) for features in features_list])
+                labels, confidences = self.classifier.predict_batch(X)
+                return [
+                    (label, round(float(confidence), 2))
+                    for label, confidence in zip(labels, confidences)
+                ]
+            except Exception as e:
+                print(f"Emotion model error, using rule-based classifier: {e}")
+                self.classifier = None
+        
+        return [self._classify_with_rules(features) for features in features_list]
+    
+    def _classify_with_rules(self, features: dict) -> tuple[str, float]:
+        """
+        Rule-based classification over pitch, energy and speech rate.
         
         Args:
             features: Dictionary of extracted audio features
@@ -391,6 +674,12 @@ class EmotionAnalyzer:
         # Default to neutral with moderate confidence
         return ("neutral", 0.65)
     
+    def shutdown(self):
+        """Stop the worker pool, if one is running."""
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+            self.worker_pool = None
+    
     def get_emotion_info(self, emotion_type: str) -> dict:
         """
         Get color and description for an emotion type.
@@ -0,0 +1,204 @@
+"""
+Trained Emotion Classifier
+
+A small NumPy model (multinomial logistic regression, or a one-hidden-layer
+MLP) that classifies emotions from the full feature set EmotionAnalyzer
+extracts, including the MFCC and spectral statistics the rule-based
+classifier ignores. Inference is vectorized over batches of feature vectors.
+
+The model is a single .npz file produced by train_emotion_model.py and is
+only read from disk on the first prediction, so importing and constructing
+the analyzer stays fast.
+"""
+
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Path to a trained .npz model; empty keeps the rule-based classifier
+EMOTION_MODEL_PATH = os.getenv("EMOTION_MODEL_PATH", "")
+
+# Number of MFCC coefficients summarized in the feature vector
+_N_MFCC = 13
+
+# Layout of the feature vector built from EmotionAnalyzer's feature dict
+CLASSIFIER_FEATURES = [
+    "pitch_mean", "pitch_std",
+    "energy_mean", "energy_std", "energy_max",
+    "speech_rate",
+    "spectral_centroid_mean", "spectral_centroid_std",
+    "spectral_rolloff_mean", "spectral_bandwidth_mean"
+] + [f"mfcc_mean_{i}" for i in range(_N_MFCC)] + [f"mfcc_std_{i}" for i in range(_N_MFCC)]
+
+_SCALAR_FEATURES = CLASSIFIER_FEATURES[:10]
+
+
+def feature_vector(features: dict) -> np.ndarray:
+    """
+    Flatten an EmotionAnalyzer feature dictionary into a classifier input row.
+
+    Args:
+        features: Normalized features from EmotionAnalyzer._extract_features
+
+    Returns:
+        1-D float64 array laid out as CLASSIFIER_FEATURES
+    """
+    row = np.empty(len(CLASSIFIER_FEATURES))
+    row[:len(_SCALAR_FEATURES)] = [float(features.get(name, 0.0)) for name in _SCALAR_FEATURES]
+    offset = len(_SCALAR_FEATURES)
+    row[offset:offset + _N_MFCC] = np.asarray(features.get("mfcc_mean", np.zeros(_N_MFCC)))[:_N_MFCC]
+    row[offset + _N_MFCC:] = np.asarray(features.get("mfcc_std", np.zeros(_N_MFCC)))[:_N_MFCC]
+    return row
+
+
+class EmotionClassifier(ABC):
+    """
+    Interface for pluggable emotion classifiers.
+
+    Subclasses implement predict_proba over a batch of feature vectors;
+    single-chunk and batch labelling are built on top of it.
+    """
+
+    labels: List[str] = []
+
+    @abstractmethod
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities for a batch of feature vectors.
+
+        Args:
+            X: Array of shape (n_samples, len(CLASSIFIER_FEATURES))
+
+        Returns:
+            Array of shape (n_samples, len(self.labels))
+        """
+
+    def predict_batch(self, X: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Label a batch of feature vectors.
+
+        Returns:
+            Tuple of (emotion labels, confidence of each label)
+        """
+        proba = self.predict_proba(np.atleast_2d(X))
+        best = proba.argmax(axis=1)
+        labels = np.asarray(self.labels)
+        return labels[best].tolist(), proba[np.arange(len(best)), best]
+
+    def classify(self, features: dict) -> Tuple[str, float]:
+        """Classify one feature dictionary as (emotion_type, confidence_score)."""
+        labels, confidences = self.predict_batch(feature_vector(features)[None, :])
+        return labels[0], round(float(confidences[0]), 2)
+
+
+class NumpyEmotionClassifier(EmotionClassifier):
+    """
+    Logistic regression or one-hidden-layer MLP stored as a NumPy .npz.
+
+    The archive holds labels, feature_names, the standardization mean/scale
+    and weights W1/b1; an MLP additionally stores W2/b2 and uses ReLU on the
+    hidden layer.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Location of the .npz model (read lazily on first use)
+        """
+        self.path = path
+        self._params: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        """Read the model from disk once."""
+        if self._params is None:
+            with self._lock:
+                if self._params is None:
+                    with np.load(self.path, allow_pickle=False) as archive:
+                        params = {name: archive[name] for name in archive.files}
+
+                    feature_names = params["feature_names"].tolist()
+                    if feature_names != CLASSIFIER_FEATURES:
+                        raise ValueError(
+                            f"Model {self.path} was trained on a different feature layout"
+                        )
+
+                    self.labels = params["labels"].tolist()
+                    self._params = params
+                    logger.info(
+                        f"Loaded emotion model {self.path} "
+                        f"({'MLP' if 'W2' in params else 'logistic regression'}, "
+                        f"{len(self.labels)} classes)"
+                    )
+        return self._params
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._params is not None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        params = self._load()
+        return forward(params, np.asarray(X, dtype=np.float64))
+
+
+def forward(params: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """
+    Run the model on a batch of raw feature vectors.
+
+    Args:
+        params: Model arrays (see NumpyEmotionClassifier)
+        X: Array of shape (n_samples, n_features)
+
+    Returns:
+        Softmax probabilities of shape (n_samples, n_classes)
+    """
+    hidden = (X - params["mean"]) / params["scale"]
+    logits = hidden @ params["W1"] + params["b1"]
+    if "W2" in params:
+        logits = np.maximum(logits, 0.0) @ params["W2"] + params["b2"]
+    return softmax(logits)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def save_model(path: str, labels: Sequence[str], params: Dict[str, np.ndarray]):
+    """
+    Write a trained model to a compressed .npz file.
+
+    Args:
+        path: Output file
+        labels: Class names, in the order of the output columns
+        params: mean, scale, W1, b1 and optionally W2, b2
+    """
+    np.savez_compressed(
+        path,
+        labels=np.asarray(labels),
+        feature_names=np.asarray(CLASSIFIER_FEATURES),
+        **{name: np.asarray(value, dtype=np.float32) for name, value in params.items()}
+    )
+
+
+def load_default_classifier() -> Optional[EmotionClassifier]:
+    """
+    Build the classifier configured by EMOTION_MODEL_PATH.
+
+    Returns:
+        A lazily loaded NumpyEmotionClassifier, or None when no model is
+        configured or the file does not exist
+    """
+    if not EMOTION_MODEL_PATH:
+        return None
+    if not os.path.exists(EMOTION_MODEL_PATH):
+        logger.warning(f"Emotion model not found at {EMOTION_MODEL_PATH}, using rule-based classifier")
+        return None
+    return NumpyEmotionClassifier(EMOTION_MODEL_PATH)
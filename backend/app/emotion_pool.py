@@ -0,0 +1,242 @@
+"""
+Process Pool Execution for Emotion Analysis
+
+Runs EmotionAnalyzer's librosa work in pre-warmed worker processes so a
+long analysis never blocks the event loop that serves consultation sockets.
+Audio chunks are handed to workers through shared memory rather than being
+pickled through the executor pipe, and workers read them in place without
+copying them out. The number of chunks in flight is bounded so a slow pool
+applies back-pressure instead of queueing forever. The processes are only
+started when the first chunk arrives, so importing the app starts none.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple, Dict, Union, Callable, Any
+
+import numpy as np
+
+from .decoded_audio import DecodedAudio
+
+logger = logging.getLogger(__name__)
+
+# Per-process analyzer, created once by the worker initializer
+_worker_analyzer = None
+
+
+def _init_worker():
+    """Import librosa and build the analyzer once per worker process."""
+    global _worker_analyzer
+    from .emotion_analyzer import EmotionAnalyzer
+
+    _worker_analyzer = EmotionAnalyzer(workers=0)
+    # Trigger numba compilation and librosa caches before real traffic arrives
+    _worker_analyzer._extract_features(np.zeros(_worker_analyzer.sample_rate, dtype=np.float32))
+
+
+def _ping() -> int:
+    """No-op task used to force worker start-up."""
+    return os.getpid()
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    """Attach to a parent-owned block without letting this process track it."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attaching registers the block with the resource
+        # tracker, which would otherwise unlink it when this worker exits
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _with_shared(name: str, size: int, sample_rate: int, is_pcm: bool, work: Callable[[Any], Any]):
+    """
+    Run work on a chunk read in place from shared memory.
+
+    When is_pcm is set the block holds already decoded 16-bit PCM; it is
+    wrapped as DecodedAudio over an np.frombuffer view of the block, so the
+    samples are never copied into a bytes object. Container bytes are passed
+    as a memoryview for the decoder. The views must be gone before the block
+    is closed, so they never leave this function.
+    """
+    shm = _attach_shared_memory(name)
+    try:
+        if is_pcm:
+            audio_chunk = DecodedAudio(np.frombuffer(shm.buf, dtype=np.uint8, count=size), sample_rate)
+        else:
+            audio_chunk = shm.buf[:size]
+        try:
+            return work(audio_chunk)
+        finally:
+            if not is_pcm:
+                audio_chunk.release()
+            del audio_chunk
+    finally:
+        shm.close()
+
+
+def _analyze_shared(name: str, size: int, sample_rate: int, is_pcm: bool = False):
+    """
+    Worker entry point: analyze a chunk in shared memory.
+
+    Returns:
+        Tuple of (EmotionResult, CPU seconds spent in this worker)
+    """
+    cpu_start = time.process_time()
+    result = _with_shared(
+        name, size, sample_rate, is_pcm,
+        lambda audio_chunk: _worker_analyzer.classify_chunk(audio_chunk, sample_rate)
+    )
+    return result, time.process_time() - cpu_start
+
+
+def _frame_features_shared(name: str, size: int, sample_rate: int, is_pcm: bool = False):
+    """
+    Worker entry point: per-frame features of a chunk, for the streaming
+    tracker (which keeps its window in the parent process).
+
+    Returns:
+        Tuple of (frames x FRAME_FEATURES array, CPU seconds spent in this worker)
+    """
+    cpu_start = time.process_time()
+    frames = _with_shared(
+        name, size, sample_rate, is_pcm,
+        lambda audio_chunk: _worker_analyzer.chunk_frame_features(audio_chunk, sample_rate)
+    )
+    return frames, time.process_time() - cpu_start
+
+
+class EmotionWorkerPool:
+    """
+    Bounded process pool for emotion analysis.
+
+    The processes are started on first use; each worker then imports
+    librosa and warms up its analyzer once. Callers await analyze_audio() or
+    frame_features(); at most max_pending chunks are in flight at any time
+    and further callers wait for a free slot.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Args:
+            workers: Number of worker processes (default: CPU count)
+            max_pending: Maximum chunks queued or running (default: 2 per worker)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Throughput tracking
+        self.pending = 0
+        self.chunks_processed = 0
+        self.worker_cpu_seconds = 0.0
+        self._started_at = time.perf_counter()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Worker processes, started on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker
+            )
+            self._started_at = time.perf_counter()
+            self.warm_up()
+            logger.info(f"Emotion worker pool started: {self.workers} workers, max {self.max_pending} pending")
+        return self._executor
+
+    def warm_up(self):
+        """Start every worker now so librosa is imported before the next chunks."""
+        for _ in range(self.workers):
+            self.executor.submit(_ping)
+
+    async def analyze_audio(self, audio_chunk: Union[bytes, DecodedAudio], sample_rate: int = 16000):
+        """
+        Analyze an audio chunk in a worker process.
+
+        Args:
+            audio_chunk: Raw audio data as bytes, or an already decoded chunk
+                whose PCM is shared with the worker as-is
+            sample_rate: Sample rate of the audio
+
+        Returns:
+            EmotionResult computed by the worker
+        """
+        return await self._run(_analyze_shared, audio_chunk, sample_rate)
+
+    async def frame_features(self, audio_chunk: Union[bytes, DecodedAudio], sample_rate: int = 16000):
+        """
+        Decode (unless already decoded) and featurize a chunk in a worker process.
+
+        Returns:
+            Array of per-frame features (see EmotionAnalyzer.chunk_frame_features)
+        """
+        return await self._run(_frame_features_shared, audio_chunk, sample_rate)
+
+    async def _run(self, task, audio_chunk: Union[bytes, DecodedAudio], sample_rate: int):
+        """Hand a chunk to a worker through shared memory and await task's result."""
+        is_pcm = isinstance(audio_chunk, DecodedAudio)
+        if is_pcm:
+            sample_rate = audio_chunk.sample_rate
+            audio_chunk = audio_chunk.pcm_view
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        async with self._slots:
+            self.pending += 1
+            shm = SharedMemory(create=True, size=max(len(audio_chunk), 1))
+            try:
+                shm.buf[:len(audio_chunk)] = audio_chunk
+                loop = asyncio.get_running_loop()
+                result, cpu_seconds = await loop.run_in_executor(
+                    self.executor,
+                    task,
+                    shm.name,
+                    len(audio_chunk),
+                    sample_rate,
+                    is_pcm
+                )
+            finally:
+                self.pending -= 1
+                shm.close()
+                shm.unlink()
+
+        self.chunks_processed += 1
+        self.worker_cpu_seconds += cpu_seconds
+        return result
+
+    def get_stats(self) -> Dict:
+        """
+        Report pool throughput.
+
+        Returns:
+            Dictionary with queue depth, chunks processed and chunks per
+            second, both overall and per core of worker CPU time
+        """
+        elapsed = time.perf_counter() - self._started_at
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "chunks_processed": self.chunks_processed,
+            "chunks_per_second": round(self.chunks_processed / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second_per_core": (
+                round(self.chunks_processed / self.worker_cpu_seconds, 2)
+                if self.worker_cpu_seconds else 0.0
+            )
+        }
+
+    def shutdown(self):
+        """Stop the worker processes, if they were started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
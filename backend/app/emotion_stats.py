@@ -0,0 +1,250 @@
+"""
+In-Memory Emotion Statistics
+
+Keeps a per-user aggregate of emotion detections (count, confidence sum,
+first/last detection per emotion type, plus the latest detection) so the
+dashboard summary is served from memory instead of querying the
+emotion_stats view and the latest log on every request.
+
+A user's aggregate is seeded lazily from the database the first time their
+stats are requested, then updated incrementally as emotions are logged.
+Listeners are notified with the new summary whenever it changes.
+"""
+
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Maximum users kept in memory; the least recently used aggregate is dropped
+EMOTION_STATS_MAX_USERS = int(os.getenv("EMOTION_STATS_MAX_USERS", "10000"))
+
+StatsListener = Callable[[str, Dict], Awaitable[None]]
+
+
+def empty_summary() -> Dict:
+    """Summary returned when a user has no detections (or stats are unavailable)."""
+    return {
+        "total_detections": 0,
+        "distribution": {},
+        "last_emotion": None,
+        "stats": []
+    }
+
+
+class UserEmotionAggregate:
+    """Running emotion statistics for one user."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.by_type: Dict[str, Dict] = {}
+        self.total = 0
+        self.last_emotion: Optional[Dict] = None
+        self._summary: Optional[Dict] = None
+
+    def seed(self, stats: List[Dict], last_emotion: Optional[Dict]):
+        """Load rows from the emotion_stats view and the latest log entry."""
+        for stat in stats:
+            count = stat.get("detection_count", 0) or 0
+            self.by_type[stat["emotion_type"]] = {
+                "detection_count": count,
+                "confidence_sum": (stat.get("avg_confidence") or 0) * count,
+                "first_detected": stat.get("first_detected"),
+                "last_detected": stat.get("last_detected")
+            }
+            self.total += count
+        self.last_emotion = last_emotion
+        self._summary = None
+
+    @property
+    def latest_detection(self) -> Optional[str]:
+        timestamps = [entry["last_detected"] for entry in self.by_type.values() if entry["last_detected"]]
+        return max(timestamps) if timestamps else None
+
+    def add(self, log: Dict):
+        """Fold one emotion_logs row into the aggregate."""
+        emotion_type = log["emotion_type"]
+        created_at = log.get("created_at")
+        entry = self.by_type.get(emotion_type)
+        if entry is None:
+            entry = self.by_type[emotion_type] = {
+                "detection_count": 0,
+                "confidence_sum": 0.0,
+                "first_detected": created_at,
+                "last_detected": created_at
+            }
+
+        entry["detection_count"] += 1
+        entry["confidence_sum"] += log.get("confidence_score", 0) or 0
+        entry["last_detected"] = created_at
+        self.total += 1
+        self.last_emotion = log
+        self._summary = None
+
+    def summary(self) -> Dict:
+        """Summary in the shape of DatabaseClient.get_emotion_summary, cached until the next change."""
+        if self._summary is None:
+            stats = []
+            distribution = {}
+            for emotion_type, entry in self.by_type.items():
+                count = entry["detection_count"]
+                stats.append({
+                    "user_id": self.user_id,
+                    "emotion_type": emotion_type,
+                    "detection_count": count,
+                    "avg_confidence": entry["confidence_sum"] / count if count else 0,
+                    "last_detected": entry["last_detected"],
+                    "first_detected": entry["first_detected"]
+                })
+                distribution[emotion_type] = round((count / self.total) * 100, 1) if self.total else 0
+
+            self._summary = {
+                "total_detections": self.total,
+                "distribution": distribution,
+                "last_emotion": self.last_emotion,
+                "stats": stats
+            }
+        return self._summary
+
+
+class EmotionStatsCache:
+    """
+    Per-user emotion aggregates with lazy database seeding.
+
+    Loading is done through two callables so the cache does not depend on
+    the Supabase client directly:
+    - load_stats(user_id) -> rows of the emotion_stats view
+    - load_last(user_id) -> the most recent emotion log, or None
+    """
+
+    def __init__(
+        self,
+        load_stats: Callable[[str], Awaitable[List[Dict]]],
+        load_last: Callable[[str], Awaitable[Optional[Dict]]],
+        max_users: int = EMOTION_STATS_MAX_USERS
+    ):
+        self.load_stats = load_stats
+        self.load_last = load_last
+        self.max_users = max_users
+        self.users: "OrderedDict[str, UserEmotionAggregate]" = OrderedDict()
+        self.listeners: List[StatsListener] = []
+
+        # Seeds in progress, and rows logged while they were running
+        self._seeding: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[str, List[Dict]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def add_listener(self, listener: StatsListener):
+        """Register an async callback receiving (user_id, summary) on every change."""
+        self.listeners.append(listener)
+
+    async def get_summary(self, user_id: str) -> Dict:
+        """
+        Get a user's emotion summary, seeding it from the database if needed.
+
+        Args:
+            user_id: ID of the user
+
+        Returns:
+            Dictionary with total_detections, distribution, last_emotion and stats
+        """
+        aggregate = self.users.get(user_id)
+        if aggregate is not None:
+            self.users.move_to_end(user_id)
+            self.hits += 1
+            return aggregate.summary()
+
+        self.misses += 1
+        return (await self._seed(user_id)).summary()
+
+    async def _seed(self, user_id: str) -> UserEmotionAggregate:
+        """Load one user's aggregate; concurrent callers share the same load."""
+        if user_id in self._seeding:
+            return await asyncio.shield(self._seeding[user_id])
+
+        future = asyncio.get_running_loop().create_future()
+        self._seeding[user_id] = future
+        self._pending[user_id] = []
+        try:
+            stats, last_emotion = await asyncio.gather(
+                self.load_stats(user_id),
+                self.load_last(user_id)
+            )
+            aggregate = UserEmotionAggregate(user_id)
+            aggregate.seed(stats, last_emotion)
+
+            # Rows logged during the load may or may not be in the result
+            seeded_until = aggregate.latest_detection
+            for log in self._pending[user_id]:
+                if seeded_until is None or (log.get("created_at") or "") > seeded_until:
+                    aggregate.add(log)
+
+            self._store(aggregate)
+            future.set_result(aggregate)
+            return aggregate
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be awaiting this future
+            future.exception()
+            raise
+        finally:
+            del self._seeding[user_id]
+            del self._pending[user_id]
+
+    def _store(self, aggregate: UserEmotionAggregate):
+        self.users[aggregate.user_id] = aggregate
+        self.users.move_to_end(aggregate.user_id)
+        while len(self.users) > self.max_users:
+            self.users.popitem(last=False)
+
+    async def record(self, log: Dict):
+        """
+        Fold a newly inserted emotion log into its user's aggregate.
+
+        Users that have never been seeded are left alone: their first
+        stats request reads the row from the database.
+
+        Args:
+            log: The inserted emotion_logs row
+        """
+        user_id = log.get("user_id")
+        if not user_id or not log.get("emotion_type"):
+            return
+
+        if user_id in self._pending:
+            self._pending[user_id].append(log)
+            return
+
+        aggregate = self.users.get(user_id)
+        if aggregate is None:
+            return
+
+        aggregate.add(log)
+        await self._notify(user_id, aggregate.summary())
+
+    async def invalidate(self, user_id: str):
+        """Forget a user's aggregate, e.g. after their emotion data is deleted."""
+        if self.users.pop(user_id, None) is not None:
+            await self._notify(user_id, empty_summary())
+
+    async def _notify(self, user_id: str, summary: Dict):
+        for listener in self.listeners:
+            try:
+                await listener(user_id, summary)
+            except Exception as e:
+                logger.warning(f"Emotion stats listener failed for {user_id}: {e}")
+
+    def get_stats(self) -> Dict:
+        """Cache size and hit rate."""
+        requests = self.hits + self.misses
+        return {
+            "users_cached": len(self.users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0
+        }
@@ -0,0 +1,205 @@
+"""
+Streaming Emotion Tracking
+
+Keeps a rolling emotional state per speaker instead of classifying every
+audio chunk in isolation. Each new chunk only has its own frames featurized;
+those frames are pushed into a fixed-size sliding window whose running sums
+and sums of squares give the window mean and variance in O(new frames).
+Classification runs on the window aggregate, and a small hysteresis means
+callers are only told about an emotion when the smoothed state changes.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .decoded_audio import DecodedAudio
+from .emotion_analyzer import EmotionAnalyzer, EmotionResult, FRAME_FEATURES, FRAME_FEATURE_INDEX
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingEmotionTracker:
+    """
+    Sliding-window emotion state for a single speaker.
+
+    Chunks shorter than the analyzer's 0.5 s minimum still contribute their
+    frames; a state is reported once the window holds enough audio.
+    """
+
+    def __init__(
+        self,
+        analyzer: EmotionAnalyzer,
+        window_seconds: float = 6.0,
+        min_seconds: float = 0.5,
+        confirm_updates: int = 2
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            analyzer: EmotionAnalyzer providing feature extraction and classification
+            window_seconds: Length of audio the rolling statistics cover
+            min_seconds: Audio needed in the window before classifying
+            confirm_updates: Consecutive classifications required to change state
+        """
+        self.analyzer = analyzer
+        frames_per_second = analyzer.sample_rate / analyzer.hop_length
+        self.capacity = max(1, int(window_seconds * frames_per_second))
+        self.min_frames = max(1, int(min_seconds * frames_per_second))
+        self.confirm_updates = max(1, confirm_updates)
+
+        # Ring buffer of frame features plus running moments over its contents
+        self._frames = np.zeros((self.capacity, len(FRAME_FEATURES)))
+        self._head = 0
+        self._size = 0
+        self._sums = np.zeros(len(FRAME_FEATURES))
+        self._squares = np.zeros(len(FRAME_FEATURES))
+
+        self.state: Optional[EmotionResult] = None
+        self._candidate: Optional[str] = None
+        self._candidate_count = 0
+
+    def _push_frames(self, frames: np.ndarray):
+        """Add frames to the window, evicting the oldest ones past capacity."""
+        if len(frames) >= self.capacity:
+            self._frames[:] = frames[-self.capacity:]
+            self._head = 0
+            self._size = self.capacity
+            self._recompute_moments()
+            return
+
+        positions = (self._head + np.arange(len(frames))) % self.capacity
+
+        # Rows overwritten beyond the free space are the oldest frames
+        free = self.capacity - self._size
+        if len(frames) > free:
+            evicted = self._frames[positions[free:]]
+            self._sums -= evicted.sum(axis=0)
+            self._squares -= (evicted ** 2).sum(axis=0)
+
+        self._frames[positions] = frames
+        self._sums += frames.sum(axis=0)
+        self._squares += (frames ** 2).sum(axis=0)
+
+        wrapped = self._head + len(frames) >= self.capacity
+        self._head = (self._head + len(frames)) % self.capacity
+        self._size = min(self._size + len(frames), self.capacity)
+
+        # Refresh the running sums once per lap to stop floating-point drift
+        if wrapped:
+            self._recompute_moments()
+
+    def _recompute_moments(self):
+        window = self._frames[:self._size] if self._size < self.capacity else self._frames
+        self._sums = window.sum(axis=0)
+        self._squares = (window ** 2).sum(axis=0)
+
+    def _classify_window(self) -> Tuple[str, float]:
+        """Classify the current window aggregate."""
+        window = self._frames[:self._size] if self._size < self.capacity else self._frames
+        features = self.analyzer._features_from_moments(
+            self._size,
+            self._sums,
+            self._squares,
+            window[:, FRAME_FEATURE_INDEX['rms']].max()
+        )
+        features = self.analyzer._normalize_features(features)
+        return self.analyzer._classify_emotion(features)
+
+    def update(self, audio: np.ndarray) -> Optional[EmotionResult]:
+        """
+        Fold a new chunk of audio into the window.
+
+        Args:
+            audio: Newly received audio samples at the analyzer's sample rate
+
+        Returns:
+            The new EmotionResult if the smoothed state changed, otherwise None
+        """
+        if len(audio) == 0:
+            return None
+        return self.add_frames(self.analyzer._frame_features(audio))
+
+    async def update_async(
+        self,
+        audio_chunk: Union[bytes, DecodedAudio],
+        sample_rate: int = 16000
+    ) -> Optional[EmotionResult]:
+        """
+        Fold a chunk into the window with the decoding and featurization done
+        off the event loop (worker pool or thread); only the window update
+        and the classification of its aggregate run in the caller.
+        """
+        frames = await self.analyzer.frame_features(audio_chunk, sample_rate)
+        return self.add_frames(frames)
+
+    def add_frames(self, frames: np.ndarray) -> Optional[EmotionResult]:
+        """
+        Push already computed frame features into the window and classify it.
+
+        Returns:
+            The new EmotionResult if the smoothed state changed, otherwise None
+        """
+        if len(frames) == 0:
+            return None
+
+        self._push_frames(frames)
+        if self._size < self.min_frames:
+            return None
+
+        emotion_type, confidence_score = self._classify_window()
+
+        if self.state is not None and emotion_type == self.state.emotion_type:
+            self._candidate = None
+            self._candidate_count = 0
+            return None
+
+        if emotion_type == self._candidate:
+            self._candidate_count += 1
+        else:
+            self._candidate = emotion_type
+            self._candidate_count = 1
+
+        # The first state is reported immediately; later changes need confirmation
+        if self.state is not None and self._candidate_count < self.confirm_updates:
+            return None
+
+        self.state = EmotionResult(
+            emotion_type=emotion_type,
+            confidence_score=confidence_score,
+            timestamp=datetime.now()
+        )
+        self._candidate = None
+        self._candidate_count = 0
+        return self.state
+
+    def update_from_bytes(
+        self,
+        audio_chunk: Union[bytes, DecodedAudio],
+        sample_rate: int = 16000
+    ) -> Optional[EmotionResult]:
+        """Decode an audio chunk (unless already decoded) and fold it into the window."""
+        return self.update(self.analyzer._bytes_to_audio(audio_chunk, sample_rate))
+
+
+class EmotionTrackerRegistry:
+    """Holds one StreamingEmotionTracker per (consultation, speaker)."""
+
+    def __init__(self, analyzer: EmotionAnalyzer):
+        self.analyzer = analyzer
+        self.trackers: Dict[Tuple[str, str], StreamingEmotionTracker] = {}
+
+    def get_tracker(self, consultation_id: Optional[str], speaker_id: str) -> StreamingEmotionTracker:
+        """Get or create the tracker for a speaker in a consultation."""
+        key = (consultation_id or "", speaker_id)
+        if key not in self.trackers:
+            self.trackers[key] = StreamingEmotionTracker(self.analyzer)
+            logger.info(f"Started emotion tracking for {speaker_id} in consultation {consultation_id}")
+        return self.trackers[key]
+
+    def remove_tracker(self, consultation_id: Optional[str], speaker_id: str):
+        """Drop a speaker's tracker, e.g. when their socket closes."""
+        self.trackers.pop((consultation_id or "", speaker_id), None)
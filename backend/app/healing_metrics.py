@@ -0,0 +1,257 @@
+"""
+Local Healing Metrics for Before/After Image Comparisons
+
+Measures how a lesion changed between two photos without any API call,
+with NumPy only:
+- registration: the after image is aligned to the before image by the
+  translation found with phase correlation, when its peak is clear (a
+  lesion that changed a lot weakens the peak; the other metrics do not
+  depend on alignment)
+- lesion segmentation: pixels whose redness (R minus the mean of G and B)
+  is above an Otsu threshold computed over both images together, so a
+  healed lesion shows up as a smaller area rather than a new split
+- color: RGB histograms of the lesion region in both images and their
+  intersection, plus the mean redness of the lesion
+- structure: mean SSIM of the registered grayscale images
+
+The numbers go into the Gemini comparison prompt as context, or are turned
+into a comparison on their own in fast mode. The area is a fraction of the
+photo, so it also changes with the distance the photo was taken from (a
+1.6x closer photo of an unchanged lesion measures about +150%); fast mode
+therefore reports it as a trend and never recommends seeing a doctor or
+sets an urgency from it.
+"""
+
+import io
+import time
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Longest side the images are measured at
+METRICS_SIZE = 256
+HISTOGRAM_BINS = 16
+SSIM_WINDOW = 7
+# Phase correlation peaks below this are treated as "no reliable shift"
+MIN_REGISTRATION_CONFIDENCE = 0.15
+# Largest shift accepted, as a fraction of the image size
+MAX_SHIFT_FRACTION = 0.25
+# Lesion area change (percent) that counts as no change
+AREA_STABLE_PERCENT = 5.0
+
+
+def _load(image_data: bytes, size: Tuple[int, int] = None) -> np.ndarray:
+    """Decode to a float32 RGB array, at METRICS_SIZE or an exact size"""
+    with Image.open(io.BytesIO(image_data)) as image:
+        image = image.convert("RGB")
+        if size is None:
+            image.thumbnail((METRICS_SIZE, METRICS_SIZE), Image.Resampling.BILINEAR)
+        else:
+            image = image.resize(size, Image.Resampling.BILINEAR)
+        return np.asarray(image, dtype=np.float32)
+
+
+def _gray(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _redness(rgb: np.ndarray) -> np.ndarray:
+    return rgb[..., 0] - (rgb[..., 1] + rgb[..., 2]) / 2
+
+
+def register(before: np.ndarray, after: np.ndarray) -> Tuple[int, int, float]:
+    """
+    Translation that best aligns after to before (phase correlation).
+
+    Returns:
+        (dy, dx, confidence); after shifted by (dy, dx) matches before
+    """
+    height, width = before.shape
+    window = np.outer(np.hanning(height), np.hanning(width)).astype(np.float32)
+    f_before = np.fft.rfft2((before - before.mean()) * window)
+    f_after = np.fft.rfft2((after - after.mean()) * window)
+    cross = f_before * np.conj(f_after)
+    correlation = np.fft.irfft2(cross / (np.abs(cross) + 1e-6), s=before.shape)
+
+    dy, dx = np.unravel_index(np.argmax(correlation), correlation.shape)
+    confidence = float(correlation[dy, dx])
+    # Peaks past the middle are negative shifts
+    dy = int(dy - height if dy > height // 2 else dy)
+    dx = int(dx - width if dx > width // 2 else dx)
+
+    too_far = abs(dy) > height * MAX_SHIFT_FRACTION or abs(dx) > width * MAX_SHIFT_FRACTION
+    if confidence < MIN_REGISTRATION_CONFIDENCE or too_far:
+        return 0, 0, confidence
+    return dy, dx, confidence
+
+
+def _overlap(before: np.ndarray, after: np.ndarray, dy: int, dx: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The parts of both images that overlap once after is shifted by (dy, dx)"""
+    height, width = before.shape[:2]
+    b_rows = slice(max(dy, 0), height + min(dy, 0))
+    b_cols = slice(max(dx, 0), width + min(dx, 0))
+    a_rows = slice(max(-dy, 0), height + min(-dy, 0))
+    a_cols = slice(max(-dx, 0), width + min(-dx, 0))
+    return before[b_rows, b_cols], after[a_rows, a_cols]
+
+
+def otsu_threshold(values: np.ndarray, bins: int = 256) -> float:
+    """Threshold that best separates values into two classes"""
+    counts, edges = np.histogram(values, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight_low = np.cumsum(counts)
+    weight_high = weight_low[-1] - weight_low
+    sum_low = np.cumsum(counts * centers)
+    mean_low = sum_low / np.maximum(weight_low, 1)
+    mean_high = (sum_low[-1] - sum_low) / np.maximum(weight_high, 1)
+    between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    return float(centers[np.argmax(between)])
+
+
+def _box_mean(image: np.ndarray, size: int) -> np.ndarray:
+    """Mean over each size x size window (valid region), via summed-area tables"""
+    table = np.pad(image, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    window = table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+    return window / (size * size)
+
+
+def ssim(before: np.ndarray, after: np.ndarray, window: int = SSIM_WINDOW) -> float:
+    """Mean structural similarity of two grayscale images (0-255), box window"""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    before = before.astype(np.float64)
+    after = after.astype(np.float64)
+    mean_b = _box_mean(before, window)
+    mean_a = _box_mean(after, window)
+    var_b = _box_mean(before * before, window) - mean_b ** 2
+    var_a = _box_mean(after * after, window) - mean_a ** 2
+    covariance = _box_mean(before * after, window) - mean_b * mean_a
+    score = ((2 * mean_b * mean_a + c1) * (2 * covariance + c2)) / (
+        (mean_b ** 2 + mean_a ** 2 + c1) * (var_b + var_a + c2)
+    )
+    return float(score.mean())
+
+
+def _histogram(rgb: np.ndarray) -> np.ndarray:
+    """Normalized per-channel histograms, concatenated"""
+    bins = np.minimum((rgb.reshape(-1, 3) * (HISTOGRAM_BINS / 256.0)).astype(np.int32), HISTOGRAM_BINS - 1)
+    counts = np.stack([np.bincount(bins[:, c], minlength=HISTOGRAM_BINS) for c in range(3)])
+    return (counts / max(len(bins), 1)).ravel()
+
+
+def compute_healing_metrics(before_data: bytes, after_data: bytes) -> Dict[str, Any]:
+    """
+    Compare a before and after photo of a lesion.
+
+    Args:
+        before_data: Encoded before image
+        after_data: Encoded after image
+
+    Returns:
+        Registration shift, lesion area of both images and its change,
+        lesion redness, color histogram similarity of the lesion region,
+        SSIM and the time it took
+    """
+    start = time.perf_counter()
+    before = _load(before_data)
+    after = _load(after_data, size=(before.shape[1], before.shape[0]))
+
+    dy, dx, confidence = register(_gray(before), _gray(after))
+    before, after = _overlap(before, after, dy, dx)
+
+    redness_before, redness_after = _redness(before), _redness(after)
+    threshold = otsu_threshold(np.concatenate([redness_before.ravel(), redness_after.ravel()]))
+    mask_before, mask_after = redness_before > threshold, redness_after > threshold
+    area_before, area_after = float(mask_before.mean()), float(mask_after.mean())
+    area_change = (area_after - area_before) / area_before * 100 if area_before > 0 else 0.0
+
+    # Color of the region either lesion covers (bounding box), whole overlap if none
+    region = mask_before | mask_after
+    if region.any():
+        rows, cols = np.nonzero(region.any(axis=1))[0], np.nonzero(region.any(axis=0))[0]
+        box = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+    else:
+        box = (slice(None), slice(None))
+    histogram_similarity = float(np.minimum(_histogram(before[box]), _histogram(after[box])).sum() / 3)
+
+    return {
+        "registration": {"dy": dy, "dx": dx, "confidence": round(confidence, 3)},
+        "lesion_area": {
+            "before_fraction": round(area_before, 4),
+            "after_fraction": round(area_after, 4),
+            "change_percent": round(area_change, 1)
+        },
+        "lesion_redness": {
+            "before": round(float(redness_before[mask_before].mean()), 1) if mask_before.any() else None,
+            "after": round(float(redness_after[mask_after].mean()), 1) if mask_after.any() else None
+        },
+        "color_histogram_similarity": round(histogram_similarity, 3),
+        "ssim": round(ssim(_gray(before), _gray(after)), 3),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def metrics_comparison(metrics: Dict[str, Any], days_between: int) -> Dict[str, Any]:
+    """
+    A comparison built from the local metrics alone (fast mode), in the
+    shape of MedicalImageAnalyzer.compare_images.
+
+    Shrinking areas map to excellent/good/fair, an unchanged one to stable
+    and a growing one to poor. Because the area depends on framing, a
+    growing area is reported as a concern to check with a full review or a
+    photo from the same distance, not as a reason to see a doctor.
+    """
+    change = metrics["lesion_area"]["change_percent"]
+    if change <= -50:
+        progress = "excellent"
+    elif change <= -25:
+        progress = "good"
+    elif change < -AREA_STABLE_PERCENT:
+        progress = "fair"
+    elif change <= AREA_STABLE_PERCENT:
+        progress = "stable"
+    else:
+        progress = "poor"
+
+    changes = {"improved": [], "worsened": [], "unchanged": []}
+    area_note = f"Affected area looks {abs(change):.0f}% {'smaller' if change < 0 else 'larger'}"
+    if abs(change) <= AREA_STABLE_PERCENT:
+        changes["unchanged"].append("Affected area about the same size")
+    else:
+        changes["improved" if change < 0 else "worsened"].append(area_note)
+
+    redness = metrics["lesion_redness"]
+    if redness["before"] is not None and redness["after"] is not None:
+        delta = redness["after"] - redness["before"]
+        if abs(delta) < 5:
+            changes["unchanged"].append("Redness about the same")
+        else:
+            changes["improved" if delta < 0 else "worsened"].append(f"Redness {'lower' if delta < 0 else 'higher'}")
+
+    growing = change > AREA_STABLE_PERCENT
+    concerns = [
+        "The affected area looks larger in the newer photo. This can also happen when the photo is taken "
+        "closer or framed differently, so compare photos taken from the same distance or request a full review."
+    ] if growing else []
+
+    return {
+        "overall_progress": progress,
+        "improvement_percentage": int(np.clip(-change, 0, 100)),
+        "changes": changes,
+        "healing_assessment": "Measured from the photos only (lesion area, color and structure), without an AI review. "
+                              "The area is measured relative to the photo, so distance and framing affect it.",
+        "concerns": concerns,
+        "recommendations": {
+            "continue_treatment": True,
+            # Not decided from framing-dependent measurements
+            "see_doctor": False,
+            "urgency": "routine",
+            "care_adjustments": [],
+            "next_photo_days": 3 if growing else 7
+        },
+        "local_metrics": metrics,
+        "mode": "fast",
+        "days_between": days_between,
+        "disclaimer": "These measurements depend on lighting and framing and are for tracking only. "
+                      "If the area looks worse to you, or you are worried, consult your healthcare provider."
+    }
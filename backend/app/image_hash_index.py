@@ -0,0 +1,226 @@
+"""
+Perceptual Hash Index for Medical Images
+
+Every uploaded image gets two 64-bit perceptual hashes:
+- pHash: signs of the low-frequency DCT coefficients of a 32x32 grayscale
+  copy, robust to rescaling, recompression and small lighting changes
+- dHash: signs of horizontal gradients of a 9x8 grayscale copy, cheap and
+  sensitive to structure
+
+The hashes are stored as BIGINT columns of medical_images. Per patient they
+are held in NumPy uint64 arrays, and the distance between two images is the
+number of differing bits (Hamming distance) of both hashes together, 0-128,
+computed for all of a patient's images at once. A small distance means the
+same photo uploaded again; a moderate one usually the same lesion photographed
+another day, which is suggested as the parent of a follow-up.
+
+Images with almost no detail (blank, black or uniformly colored) get no
+hashes: every such image hashes the same (a flat image has dHash 0), so they
+would all match each other.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Combined pHash + dHash distance at or below which an upload is a duplicate
+IMAGE_DUPLICATE_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_DISTANCE", "6"))
+# Combined distance at or below which a prior image is suggested as parent
+IMAGE_FOLLOW_UP_DISTANCE = int(os.getenv("IMAGE_FOLLOW_UP_DISTANCE", "30"))
+# Patients whose hashes are kept in memory
+IMAGE_HASH_INDEX_MAX_PATIENTS = int(os.getenv("IMAGE_HASH_INDEX_MAX_PATIENTS", "1000"))
+
+# Grayscale standard deviation (0-255) under which an image is too flat to hash
+IMAGE_HASH_MIN_DETAIL = float(os.getenv("IMAGE_HASH_MIN_DETAIL", "2.0"))
+
+PHASH_SIZE = 32
+PHASH_BITS = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix (rows are basis vectors)"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _pack(bits: np.ndarray) -> int:
+    """64 booleans to an unsigned 64-bit int, first bit most significant"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def phash(image: Image.Image) -> int:
+    """DCT perceptual hash of an image as an unsigned 64-bit int"""
+    gray = image.convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:PHASH_BITS, :PHASH_BITS]
+    # The DC term is the mean brightness; leave it out of the median
+    median = np.median(low.ravel()[1:])
+    return _pack(low > median)
+
+
+def dhash(image: Image.Image) -> int:
+    """Difference hash of an image as an unsigned 64-bit int"""
+    gray = image.convert("L").resize((9, 8), Image.Resampling.BOX)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(image: Image.Image) -> Optional[Tuple[int, int]]:
+    """
+    pHash and dHash of an image.
+
+    Returns:
+        (phash, dhash), or None if the image has too little detail to be
+        told apart from other flat images
+    """
+    gray = image.convert("L")
+    small = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX), dtype=np.float64)
+    if small.std() < IMAGE_HASH_MIN_DETAIL:
+        return None
+    return phash(gray), dhash(gray)
+
+
+def to_signed(value: int) -> int:
+    """Unsigned 64-bit hash to the signed value stored in a BIGINT column"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Set bits of each uint64"""
+        return np.bitwise_count(values)
+else:
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Set bits of each uint64 (byte lookup table for NumPy < 2.0)"""
+        return _BYTE_BITS[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def hamming_distances(hashes: np.ndarray, query: int) -> np.ndarray:
+    """Bits differing between each hash of a uint64 array and one query hash"""
+    return popcount(hashes ^ np.uint64(query)).astype(np.int32)
+
+
+class PatientHashes:
+    """Hashes of one patient's images as parallel arrays."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        rows = [row for row in rows if row.get("phash") is not None and row.get("dhash") is not None]
+        self.image_ids: List[str] = [str(row["id"]) for row in rows]
+        self.uploaded_at: List[Optional[str]] = [row.get("uploaded_at") for row in rows]
+        # BIGINT values come back signed; reinterpret the bits as unsigned
+        self.phashes = np.array([row["phash"] for row in rows], dtype=np.int64).view(np.uint64)
+        self.dhashes = np.array([row["dhash"] for row in rows], dtype=np.int64).view(np.uint64)
+
+    def add(self, image_id: str, phash_value: int, dhash_value: int, uploaded_at: Optional[str] = None):
+        self.image_ids.append(image_id)
+        self.uploaded_at.append(uploaded_at)
+        self.phashes = np.append(self.phashes, np.uint64(phash_value))
+        self.dhashes = np.append(self.dhashes, np.uint64(dhash_value))
+
+    def remove(self, image_id: str):
+        if image_id not in self.image_ids:
+            return
+        i = self.image_ids.index(image_id)
+        del self.image_ids[i], self.uploaded_at[i]
+        self.phashes = np.delete(self.phashes, i)
+        self.dhashes = np.delete(self.dhashes, i)
+
+
+class ImageHashIndex:
+    """
+    Per-patient nearest-neighbour search over perceptual hashes.
+
+    A patient's hashes are loaded with load_rows(patient_id) the first time
+    they are searched and then kept up to date with add() and remove(). The
+    least recently searched patients are dropped beyond max_patients.
+    Methods may block on load_rows and are meant to be called from a worker
+    thread.
+    """
+
+    def __init__(self, load_rows: Callable[[str], List[Dict[str, Any]]],
+                 max_patients: int = IMAGE_HASH_INDEX_MAX_PATIENTS):
+        self.load_rows = load_rows
+        self.max_patients = max_patients
+        self._patients: "OrderedDict[str, PatientHashes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _patient(self, patient_id: str) -> PatientHashes:
+        with self._lock:
+            hashes = self._patients.get(patient_id)
+            if hashes is not None:
+                self._patients.move_to_end(patient_id)
+                return hashes
+
+        hashes = PatientHashes(self.load_rows(patient_id))
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the first
+            hashes = self._patients.setdefault(patient_id, hashes)
+            while len(self._patients) > self.max_patients:
+                self._patients.popitem(last=False)
+        return hashes
+
+    def nearest(self, patient_id: str, phash_value: int, dhash_value: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find a patient's images closest to the given hashes.
+
+        Args:
+            patient_id: Patient whose images are searched
+            phash_value: pHash of the new image
+            dhash_value: dHash of the new image
+            limit: Most matches returned
+
+        Returns:
+            Matches, closest first: image_id, distance (0-128), uploaded_at,
+            duplicate and follow_up flags
+        """
+        hashes = self._patient(patient_id)
+        with self._lock:
+            if not hashes.image_ids:
+                return []
+            distances = (hamming_distances(hashes.phashes, phash_value)
+                         + hamming_distances(hashes.dhashes, dhash_value))
+            order = np.argsort(distances, kind="stable")[:limit]
+            return [
+                {
+                    "image_id": hashes.image_ids[i],
+                    "distance": int(distances[i]),
+                    "uploaded_at": hashes.uploaded_at[i],
+                    "duplicate": bool(distances[i] <= IMAGE_DUPLICATE_DISTANCE),
+                    "follow_up": bool(distances[i] <= IMAGE_FOLLOW_UP_DISTANCE)
+                }
+                for i in order
+            ]
+
+    def add(self, patient_id: str, image_id: str, phash_value: int, dhash_value: int,
+            uploaded_at: Optional[str] = None):
+        """Add a newly stored image to a patient's hashes, if they are loaded."""
+        with self._lock:
+            hashes = self._patients.get(patient_id)
+            if hashes is not None and image_id not in hashes.image_ids:
+                hashes.add(image_id, phash_value, dhash_value, uploaded_at)
+
+    def remove(self, patient_id: str, image_id: str):
+        """Drop a deleted image from a patient's hashes."""
+        with self._lock:
+            hashes = self._patients.get(patient_id)
+            if hashes is not None:
+                hashes.remove(image_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "patients": len(self._patients),
+                "images": sum(len(hashes.image_ids) for hashes in self._patients.values())
+            }
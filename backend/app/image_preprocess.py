@@ -0,0 +1,242 @@
+"""
+Medical Image Preprocessing
+
+Decodes an uploaded photo once, in a worker process, and produces the
+renditions everything else uses:
+- an analysis-size image (EXIF-rotated, EXIF stripped, at most
+  IMAGE_ANALYSIS_MAX_DIMENSION on its longest side) that is stored, shown
+  full-size in the UI and sent to Gemini
+- a comparison-size image, two of which go into one healing comparison
+- a small thumbnail for image lists
+- its perceptual hashes (see image_hash_index) and the SHA-256 of the
+  uploaded bytes
+
+JPEG uploads are decoded straight to a reduced scale (Pillow's draft mode),
+so a 12 megapixel phone photo is never fully decoded. The outputs are a
+fraction of the original's size, which cuts storage egress and the bytes
+sent to the model, and location and device metadata never leave the server.
+"""
+
+import io
+import os
+import time
+import hashlib
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any
+
+from PIL import Image, ImageOps, features
+
+from .image_hash_index import image_hashes
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for image decoding (0 decodes in a thread instead)
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+# Longest side of the stored/analyzed rendition
+IMAGE_ANALYSIS_MAX_DIMENSION = int(os.getenv("IMAGE_ANALYSIS_MAX_DIMENSION", "1536"))
+# Longest side of the renditions compared side by side
+IMAGE_COMPARISON_MAX_DIMENSION = int(os.getenv("IMAGE_COMPARISON_MAX_DIMENSION", "1024"))
+# Longest side of the thumbnail
+IMAGE_THUMBNAIL_MAX_DIMENSION = int(os.getenv("IMAGE_THUMBNAIL_MAX_DIMENSION", "320"))
+# Rendition format: WEBP or JPEG (WEBP falls back to JPEG if Pillow lacks it)
+IMAGE_RENDITION_FORMAT = os.getenv("IMAGE_RENDITION_FORMAT", "WEBP").upper()
+
+RENDITION_QUALITY = {"analysis": 85, "comparison": 85, "thumbnail": 75}
+
+_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def content_type_for(extension: str) -> str:
+    """Content type of a rendition file extension ("webp" or "jpg")"""
+    return _CONTENT_TYPES["WEBP"] if extension == "webp" else _CONTENT_TYPES["JPEG"]
+
+
+def rendition_format() -> str:
+    """Format the renditions are encoded in"""
+    if IMAGE_RENDITION_FORMAT == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return IMAGE_RENDITION_FORMAT if IMAGE_RENDITION_FORMAT in _CONTENT_TYPES else "JPEG"
+
+
+class PreparedImage:
+    """Renditions of one uploaded image and what it took to make them."""
+
+    def __init__(self, analysis: bytes, comparison: bytes, thumbnail: bytes, image_format: str,
+                 original_size: tuple, analysis_size: tuple, original_bytes: int, decode_ms: float,
+                 phash: Optional[int] = None, dhash: Optional[int] = None, sha256: str = ""):
+        self.analysis = analysis
+        self.comparison = comparison
+        self.thumbnail = thumbnail
+        self.image_format = image_format
+        self.original_size = original_size
+        self.analysis_size = analysis_size
+        self.original_bytes = original_bytes
+        self.decode_ms = decode_ms
+        # None when the image is too flat to hash
+        self.phash = phash
+        self.dhash = dhash
+        self.sha256 = sha256
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self.image_format]
+
+    @property
+    def extension(self) -> str:
+        return "webp" if self.image_format == "WEBP" else "jpg"
+
+    def renditions(self) -> Dict[str, bytes]:
+        """Encoded renditions by kind, for the rendition store"""
+        return {"analysis": self.analysis, "comparison": self.comparison, "thumbnail": self.thumbnail}
+
+    def metadata(self) -> Dict[str, Any]:
+        """Sizes and content hash for the image record's metadata column"""
+        return {
+            "original": {
+                "width": self.original_size[0],
+                "height": self.original_size[1],
+                "bytes": self.original_bytes,
+                "sha256": self.sha256
+            },
+            "analysis": {
+                "width": self.analysis_size[0],
+                "height": self.analysis_size[1],
+                "bytes": len(self.analysis),
+                "content_type": self.content_type
+            },
+            "thumbnail_bytes": len(self.thumbnail)
+        }
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    out = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(out, format="WEBP", quality=quality, method=2)
+    else:
+        image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def prepare_image(
+    image_data: bytes,
+    analysis_max: int = IMAGE_ANALYSIS_MAX_DIMENSION,
+    comparison_max: int = IMAGE_COMPARISON_MAX_DIMENSION,
+    thumbnail_max: int = IMAGE_THUMBNAIL_MAX_DIMENSION,
+    image_format: Optional[str] = None
+) -> PreparedImage:
+    """
+    Decode an image once and build its renditions (runs in a worker process).
+
+    Args:
+        image_data: Uploaded image bytes
+        analysis_max: Longest side of the analysis rendition
+        comparison_max: Longest side of the comparison rendition
+        thumbnail_max: Longest side of the thumbnail
+        image_format: WEBP or JPEG (default: rendition_format())
+
+    Returns:
+        PreparedImage with the encoded renditions
+
+    Raises:
+        ValueError: If the bytes are not a decodable image
+    """
+    start = time.perf_counter()
+    image_format = image_format or rendition_format()
+    try:
+        with Image.open(io.BytesIO(image_data)) as source:
+            original_size = source.size
+            # JPEG only: decode at 1/2, 1/4 or 1/8 scale when that is still large
+            # enough; draft needs both sides of the target, not the bounding box
+            scale = min(1.0, analysis_max / max(original_size))
+            source.draft("RGB", (int(original_size[0] * scale), int(original_size[1] * scale)))
+            # Apply the camera orientation; the re-encoded renditions carry no EXIF
+            image = ImageOps.exif_transpose(source)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail((analysis_max, analysis_max), Image.Resampling.LANCZOS)
+
+            # Each smaller rendition is resized from the previous one
+            comparison = image.copy()
+            comparison.thumbnail((comparison_max, comparison_max), Image.Resampling.LANCZOS)
+            thumbnail = comparison.copy()
+            thumbnail.thumbnail((thumbnail_max, thumbnail_max), Image.Resampling.LANCZOS)
+
+            analysis = _encode(image, image_format, RENDITION_QUALITY["analysis"])
+            comparison_bytes = _encode(comparison, image_format, RENDITION_QUALITY["comparison"])
+            thumbnail_bytes = _encode(thumbnail, image_format, RENDITION_QUALITY["thumbnail"])
+            analysis_size = image.size
+            hashes = image_hashes(comparison) or (None, None)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Could not decode image: {str(e)}")
+
+    return PreparedImage(
+        analysis=analysis,
+        comparison=comparison_bytes,
+        thumbnail=thumbnail_bytes,
+        image_format=image_format,
+        original_size=original_size,
+        analysis_size=analysis_size,
+        original_bytes=len(image_data),
+        decode_ms=round((time.perf_counter() - start) * 1000, 1),
+        phash=hashes[0],
+        dhash=hashes[1],
+        sha256=hashlib.sha256(image_data).hexdigest()
+    )
+
+
+class ImagePreprocessor:
+    """Runs prepare_image in worker processes so decoding never blocks the event loop."""
+
+    def __init__(self, workers: int = IMAGE_PREPROCESS_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> Optional[ProcessPoolExecutor]:
+        """Worker processes, started on first use (None: use threads)"""
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def prepare(self, image_data: bytes) -> PreparedImage:
+        """
+        Build the renditions of an uploaded image off the event loop.
+
+        Raises:
+            ValueError: If the bytes are not a decodable image
+        """
+        if self.pool is None:
+            return await asyncio.to_thread(prepare_image, image_data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, prepare_image, image_data)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global preprocessor instance
+_preprocessor: Optional[ImagePreprocessor] = None
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """
+    Get or create the global ImagePreprocessor instance.
+
+    Returns:
+        ImagePreprocessor singleton instance
+    """
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = ImagePreprocessor()
+    return _preprocessor
+
+
+def shutdown_image_preprocessor():
+    """Stop the preprocessor's worker processes, if it was ever created"""
+    if _preprocessor is not None:
+        _preprocessor.shutdown()
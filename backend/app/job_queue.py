@@ -0,0 +1,540 @@
+"""
+Background Job Queue
+
+Runs slow work (SOAP generation, lab report analysis, medical image
+analysis) outside the HTTP request. submit() records the job in a local
+SQLite database and returns its id immediately; worker tasks pick jobs up
+with a per-job-type concurrency limit and write progress and results back
+to the same table, so status survives a restart and jobs that were queued
+or interrupted are run again when the server comes back.
+
+Every queued or running job records the queue instance that holds it in
+memory and a heartbeat that instance refreshes. Jobs whose heartbeat has
+gone stale belonged to a server that died; any live server adopts them, so
+neither its running nor its queued jobs wait for a restart, and a second
+server sharing the file never takes jobs a live server is holding. The
+SQLite calls run in a worker thread, off the event loop.
+
+Clients poll GET /api/jobs/{job_id} or subscribe to /ws/jobs/{job_id}.
+"""
+
+import os
+import json
+import uuid
+import socket
+import asyncio
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Set, Any, Optional, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the queue
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite3")
+# Finished jobs older than this are deleted at start-up
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+# A job interrupted by this many restarts is marked failed instead of rerun
+JOB_MAX_ATTEMPTS = 3
+# How often running jobs' heartbeat and progress are written
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+# A running job whose heartbeat is older than this was interrupted and is requeued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+# report_progress(fraction between 0 and 1, message)
+ProgressCallback = Callable[[float, str], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for tables created before them
+MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "heartbeat_at": "ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT"
+}
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _by_type(rows) -> Dict[str, list]:
+    """Job ids of (id, type) rows grouped by job type."""
+    grouped: Dict[str, list] = {}
+    for row in rows:
+        grouped.setdefault(row["type"], []).append(row["id"])
+    return grouped
+
+
+class JobStore:
+    """
+    SQLite persistence for jobs.
+
+    Calls block, so the queue makes them through asyncio.to_thread; a lock
+    keeps each call's statements and commit together across threads.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(statement)
+        self.conn.commit()
+
+    def insert(self, job_id: str, job_type: str, payload: Dict[str, Any], owner: Optional[str] = None):
+        now = _now()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, type, status, payload, owner, heartbeat_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, JOB_QUEUED, json.dumps(payload), owner, now if owner else None, now)
+            )
+            self.conn.commit()
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def claim(self, job_id: str, owner: str) -> Optional[sqlite3.Row]:
+        """
+        Mark a queued job running for owner.
+
+        Returns:
+            The job's row, or None if it is not queued (finished, or already
+            claimed by another queue sharing the file)
+        """
+        now = _now()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, started_at = ?, "
+                "attempts = attempts + 1 WHERE id = ? AND status = ?",
+                (JOB_RUNNING, owner, now, now, job_id, JOB_QUEUED)
+            )
+            self.conn.commit()
+            if cursor.rowcount == 0:
+                return None
+            return self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def heartbeat(self, owner: str, progress: Dict[str, tuple]):
+        """
+        Refresh the heartbeat of owner's queued and running jobs and save
+        the progress of the running ones.
+
+        Args:
+            owner: Queue instance id
+            progress: (progress, message) by running job id
+        """
+        now = _now()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (now, owner, JOB_QUEUED, JOB_RUNNING)
+            )
+            self.conn.executemany(
+                "UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND owner = ? AND status = ?",
+                [(fraction, message, job_id, owner, JOB_RUNNING)
+                 for job_id, (fraction, message) in progress.items()]
+            )
+            self.conn.commit()
+
+    def requeue_stale(self, stale_before: datetime, max_attempts: int, owner: str) -> Dict[str, list]:
+        """
+        Adopt queued and running jobs whose heartbeat is older than stale_before.
+
+        Their server stopped without finishing them. They become queued jobs
+        of owner; a running job interrupted max_attempts times is failed
+        instead.
+
+        Returns:
+            Adopted job ids by job type, oldest first
+        """
+        stale = "(heartbeat_at IS NULL OR heartbeat_at < ?)"
+        cutoff = stale_before.isoformat()
+        now = _now()
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL "
+                f"WHERE status = ? AND attempts >= ? AND {stale}",
+                (JOB_FAILED, "Interrupted by server restart too many times", now,
+                 JOB_RUNNING, max_attempts, cutoff)
+            )
+            rows = self.conn.execute(
+                f"SELECT id, type FROM jobs WHERE status IN (?, ?) AND {stale} ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING, cutoff)
+            ).fetchall()
+            self.conn.executemany(
+                f"UPDATE jobs SET status = ?, progress = 0, message = NULL, owner = ?, heartbeat_at = ? "
+                f"WHERE id = ? AND {stale}",
+                [(JOB_QUEUED, owner, now, row["id"], cutoff) for row in rows]
+            )
+            self.conn.commit()
+        return _by_type(rows)
+
+    def release(self, owner: str, max_attempts: int) -> Dict[str, list]:
+        """
+        Hand back the jobs of an owner that is shutting down.
+
+        Its running jobs are queued again (or failed after max_attempts
+        interruptions) and all of them lose their owner, so the next server
+        to look adopts them right away.
+
+        Returns:
+            Released job ids by job type
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL "
+                "WHERE status = ? AND attempts >= ? AND owner = ?",
+                (JOB_FAILED, "Interrupted by server restart too many times", _now(),
+                 JOB_RUNNING, max_attempts, owner)
+            )
+            rows = self.conn.execute(
+                "SELECT id, type FROM jobs WHERE status IN (?, ?) AND owner = ? ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING, owner)
+            ).fetchall()
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, progress = 0, message = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status IN (?, ?) AND owner = ?",
+                (JOB_QUEUED, JOB_QUEUED, JOB_RUNNING, owner)
+            )
+            self.conn.commit()
+        return _by_type(rows)
+
+    def recover(self, max_attempts: int, stale_before: datetime, owner: str) -> Dict[str, list]:
+        """
+        Prepare the table after a restart.
+
+        Queued and running jobs whose heartbeat went stale, or that were
+        released by a server shutting down, are adopted by owner: running
+        ones are queued again, or failed once they have been interrupted
+        max_attempts times. Jobs with a fresh heartbeat belong to a server
+        that is still up and are left alone.
+
+        Returns:
+            Queued job ids of owner by job type, oldest first
+        """
+        return self.requeue_stale(stale_before, max_attempts, owner)
+
+    def purge(self, older_than: datetime) -> int:
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED_STATUSES, older_than.isoformat())
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class JobQueue:
+    """
+    Durable job queue with a bounded worker pool per job type.
+
+    Handlers are registered per job type with register() and receive the
+    job payload plus a report_progress callback; whatever JSON-serializable
+    dict they return becomes the job result.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self._store = store
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self.concurrency: Dict[str, int] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: list = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running: Dict[str, int] = {}
+        # get() snapshots of the jobs this queue is running, kept current by report_progress
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self.started = False
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: int = 2):
+        """
+        Register the handler for a job type.
+
+        Args:
+            job_type: Name of the job type, e.g. "soap"
+            handler: async handler(payload, report_progress) -> result dict
+            concurrency: Jobs of this type run at once; JOB_CONCURRENCY_<TYPE>
+                overrides it
+        """
+        self.handlers[job_type] = handler
+        self.concurrency[job_type] = int(os.getenv(f"JOB_CONCURRENCY_{job_type.upper()}", concurrency))
+        self._queues.setdefault(job_type, asyncio.Queue())
+        self._running.setdefault(job_type, 0)
+        if self.started:
+            self._start_workers(job_type)
+
+    async def start(self):
+        """Requeue unfinished jobs from the last run and start the workers."""
+        if self.started:
+            return
+        self.started = True
+
+        if self._store is None:
+            self._store = await asyncio.to_thread(JobStore)
+        purged = await asyncio.to_thread(
+            self.store.purge, datetime.now() - timedelta(hours=JOB_RETENTION_HOURS)
+        )
+        recovered = await asyncio.to_thread(
+            self.store.recover, self.max_attempts, self._stale_before(), self.owner
+        )
+        self._enqueue(recovered)
+
+        for job_type in self.handlers:
+            self._start_workers(job_type)
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+        pending = sum(len(job_ids) for job_ids in recovered.values())
+        logger.info(f"Job queue started: {pending} pending jobs resumed, {purged} old jobs purged")
+
+    def _start_workers(self, job_type: str):
+        for _ in range(self.concurrency[job_type]):
+            self._workers.append(asyncio.create_task(self._worker(job_type)))
+
+    def _enqueue(self, job_ids_by_type: Dict[str, list]):
+        for job_type, job_ids in job_ids_by_type.items():
+            queue = self._queues.setdefault(job_type, asyncio.Queue())
+            for job_id in job_ids:
+                queue.put_nowait(job_id)
+            if job_type not in self.handlers:
+                logger.warning(f"{len(job_ids)} queued '{job_type}' jobs have no registered handler")
+
+    @staticmethod
+    def _stale_before() -> datetime:
+        return datetime.now() - timedelta(seconds=JOB_STALE_SECONDS)
+
+    async def _heartbeat_loop(self):
+        """Keep this queue's jobs fresh and adopt the jobs of servers that died."""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                progress = {job_id: (job["progress"], job["message"]) for job_id, job in self._active.items()}
+                await asyncio.to_thread(self.store.heartbeat, self.owner, progress)
+                requeued = await asyncio.to_thread(
+                    self.store.requeue_stale, self._stale_before(), self.max_attempts, self.owner
+                )
+                if requeued:
+                    logger.info(f"Requeued {sum(len(ids) for ids in requeued.values())} interrupted jobs")
+                    self._enqueue(requeued)
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    async def stop(self):
+        """Stop the workers. Jobs still queued or running are handed back for the next server."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._active.clear()
+        if self.started:
+            await asyncio.to_thread(self.store.release, self.owner, self.max_attempts)
+        self.started = False
+
+    async def submit(self, job_type: str, payload: Dict[str, Any]) -> str:
+        """
+        Queue a job.
+
+        Args:
+            job_type: Registered job type
+            payload: JSON-serializable arguments for the handler
+
+        Returns:
+            The new job id
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = str(uuid.uuid4())
+        await asyncio.to_thread(self.store.insert, job_id, job_type, payload, self.owner)
+        self._queues[job_type].put_nowait(job_id)
+        logger.info(f"Queued {job_type} job {job_id}")
+        return job_id
+
+    async def _worker(self, job_type: str):
+        queue = self._queues[job_type]
+        while True:
+            job_id = await queue.get()
+            self._running[job_type] += 1
+            try:
+                await self._run(job_type, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{job_type} job {job_id} could not be run: {e}")
+            finally:
+                self._running[job_type] -= 1
+                queue.task_done()
+
+    async def _run(self, job_type: str, job_id: str):
+        row = await asyncio.to_thread(self.store.claim, job_id, self.owner)
+        if row is None:
+            return
+
+        job = self._job_dict(row)
+        self._active[job_id] = job
+        self._notify(job_id)
+
+        def report_progress(fraction: float, message: str):
+            # Written to the table with the next heartbeat
+            job["progress"] = round(min(max(fraction, 0.0), 1.0), 3)
+            job["message"] = message
+            self._notify(job_id)
+
+        try:
+            result = await self.handlers[job_type](json.loads(row["payload"]), report_progress)
+        except asyncio.CancelledError:
+            # Server shutting down: stop() requeues the job
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e) or type(e).__name__
+            logger.error(f"{job_type} job {job_id} failed: {error}")
+            fields = {"status": JOB_FAILED, "error": str(error), "finished_at": _now()}
+        else:
+            fields = {
+                "status": JOB_COMPLETED, "result": result or {}, "progress": 1.0,
+                "message": job["message"], "finished_at": _now()
+            }
+            logger.info(f"{job_type} job {job_id} completed")
+
+        try:
+            await asyncio.to_thread(self.store.update, job_id, **fields)
+        finally:
+            del self._active[job_id]
+        job.update(fields)
+        self._notify(job_id, job)
+
+    @staticmethod
+    def _job_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "type": row["type"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the current state of a job.
+
+        Returns:
+            Dictionary with id, type, status, progress, message, result and
+            error, or None if the job does not exist
+        """
+        job = self._active.get(job_id)
+        if job is not None:
+            return dict(job)
+        row = await asyncio.to_thread(self.store.get, job_id)
+        if row is None:
+            return None
+        return self._job_dict(row)
+
+    def watch(self, job_id: str) -> asyncio.Queue:
+        """Subscribe to state changes of a job; each update is a get() snapshot."""
+        updates: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, set()).add(updates)
+        return updates
+
+    def unwatch(self, job_id: str, updates: asyncio.Queue):
+        watchers = self._watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(updates)
+            if not watchers:
+                del self._watchers[job_id]
+
+    def _notify(self, job_id: str, job: Optional[Dict[str, Any]] = None):
+        watchers = self._watchers.get(job_id)
+        if not watchers:
+            return
+        snapshot = dict(job if job is not None else self._active[job_id])
+        for updates in watchers:
+            updates.put_nowait(snapshot)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth, running jobs and concurrency limit per job type."""
+        return {
+            job_type: {
+                "queued": self._queues[job_type].qsize(),
+                "running": self._running.get(job_type, 0),
+                "concurrency": self.concurrency.get(job_type, 0)
+            }
+            for job_type in self._queues
+        }
+
+
+# Global job queue instance
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get or create the global JobQueue instance.
+
+    Returns:
+        JobQueue singleton instance
+    """
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,78 @@
+"""
+Background Job API Routes
+Status polling and live progress for jobs submitted with ?background=true
+"""
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+
+from .job_queue import get_job_queue, FINISHED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/api/jobs/stats")
+async def get_job_stats():
+    """
+    Get queue depth and running jobs per job type
+    """
+    return {
+        "success": True,
+        "stats": get_job_queue().get_stats()
+    }
+
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status, progress and (once finished) result of a job
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "success": True,
+        **job
+    }
+
+
+@router.websocket("/ws/jobs/{job_id}")
+async def job_websocket(websocket: WebSocket, job_id: str):
+    """
+    Push job updates until the job finishes.
+
+    Sends the current state on connect, then a message on every status or
+    progress change. The socket is closed after the completed/failed update.
+    """
+    await websocket.accept()
+    job_queue = get_job_queue()
+
+    updates = job_queue.watch(job_id)
+    try:
+        job = await job_queue.get(job_id)
+        if job is None:
+            await websocket.send_json({"type": "error", "message": "Job not found"})
+            return
+
+        while True:
+            await websocket.send_json({"type": "job_update", **job})
+            if job["status"] in FINISHED_STATUSES:
+                return
+            job = await updates.get()
+
+    except WebSocketDisconnect:
+        logger.info(f"Job socket for {job_id} disconnected")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Job socket error for {job_id}: {e}")
+    finally:
+        job_queue.unwatch(job_id, updates)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
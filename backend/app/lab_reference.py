@@ -0,0 +1,342 @@
+"""
+Lab Reference Range Knowledge Base
+
+Reference ranges for common lab tests keyed by normalized test name, with
+synonyms, the canonical unit and conversion factors from other units, and
+age/sex-specific ranges. The table (lab_reference_ranges.csv) is loaded once
+into NumPy arrays padded to the largest number of ranges per test, so
+flagging a batch of values is a handful of array operations: the most
+specific range matching each patient is picked with an argmax and values
+are compared after unit conversion. Each test may also have critical
+limits (one pair per test, in the canonical unit) beyond which a value
+needs prompt medical attention.
+"""
+
+import os
+import re
+import csv
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Sequence, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Reference range table
+LAB_REFERENCE_PATH = os.getenv(
+    "LAB_REFERENCE_PATH",
+    os.path.join(os.path.dirname(__file__), "lab_reference_ranges.csv")
+)
+
+# Status codes returned by ReferenceIndex.flag
+STATUS_UNKNOWN = -1
+STATUS_NORMAL = 0
+STATUS_LOW = 1
+STATUS_HIGH = 2
+STATUS_LABELS = {STATUS_NORMAL: "normal", STATUS_LOW: "low", STATUS_HIGH: "high"}
+
+# Sex codes ("any" ranges apply to everyone)
+SEX_ANY = 0
+SEX_MALE = 1
+SEX_FEMALE = 2
+_SEX_CODES = {"any": SEX_ANY, "male": SEX_MALE, "m": SEX_MALE, "female": SEX_FEMALE, "f": SEX_FEMALE}
+
+# Unit spellings that mean the same thing
+_UNIT_SPELLINGS = [
+    (re.compile(r"[µμ]"), "u"),
+    (re.compile(r"\s+"), ""),
+    (re.compile(r"cumm|cu\.?mm|mm3|mm\^3|microl"), "ul"),
+    (re.compile(r"^(?:x|\*)"), ""),
+    (re.compile(r"10\*\*?|10e"), "10^"),
+    (re.compile(r"^cells/"), "/"),
+]
+
+
+# Reports repeat the same few hundred names and units, so normalizing is cached
+@lru_cache(maxsize=4096)
+def normalize_test_name(name: str) -> str:
+    """Lowercase, drop punctuation and collapse spaces: "SGPT (ALT)" -> "sgpt alt" """
+    return " ".join(re.sub(r"[^a-z0-9%]+", " ", name.lower()).split())
+
+
+@lru_cache(maxsize=1024)
+def normalize_unit(unit: str) -> str:
+    """Canonical spelling of a unit: "cells/cumm" -> "/ul", "µIU/mL" -> "uiu/ml" """
+    unit = unit.strip().lower()
+    for pattern, replacement in _UNIT_SPELLINGS:
+        unit = pattern.sub(replacement, unit)
+    return unit
+
+
+def parse_sex(value: Optional[str]) -> int:
+    """Sex code for a free-text value; unknown values match only "any" ranges"""
+    return _SEX_CODES.get((value or "").strip().lower(), SEX_ANY)
+
+
+class ReferenceIndex:
+    """
+    Reference ranges indexed by test.
+
+    Tests are numbered in file order; synonyms and the canonical name map to
+    the test number. Ranges are stored in (n_tests, max_ranges) arrays, with
+    unused slots marked by sex -1. Open-ended ranges use NaN for the missing
+    limit. Critical limits are stored per test, taken from the first row of
+    the test that gives them, NaN where there is none.
+    """
+
+    def __init__(self, path: str = LAB_REFERENCE_PATH):
+        self.tests: List[str] = []
+        self.units: List[str] = []
+        self.names: Dict[str, int] = {}
+        # (test, normalized unit) -> factor converting to the canonical unit
+        self.factors: Dict[Tuple[int, str], float] = {}
+        ranges: List[List[Tuple[int, float, float, float, float]]] = []
+        critical: List[List[float]] = []
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = normalize_test_name(row["test"])
+                if name not in self.names:
+                    test_id = len(self.tests)
+                    self.tests.append(name)
+                    self.units.append(row["unit"])
+                    self.names[name] = test_id
+                    self.factors[(test_id, normalize_unit(row["unit"]))] = 1.0
+                    ranges.append([])
+                    critical.append([np.nan, np.nan])
+                test_id = self.names[name]
+                for side, column in enumerate(("critical_low", "critical_high")):
+                    if row.get(column) and np.isnan(critical[test_id][side]):
+                        critical[test_id][side] = float(row[column])
+
+                for synonym in filter(None, (row.get("synonyms") or "").split("|")):
+                    self.names.setdefault(normalize_test_name(synonym), test_id)
+                for conversion in filter(None, (row.get("conversions") or "").split("|")):
+                    unit, factor = conversion.rsplit("=", 1)
+                    self.factors[(test_id, normalize_unit(unit))] = float(factor)
+
+                ranges[test_id].append((
+                    parse_sex(row["sex"]),
+                    float(row["age_min"] or 0),
+                    float(row["age_max"] or 200),
+                    float(row["low"]) if row["low"] else np.nan,
+                    float(row["high"]) if row["high"] else np.nan
+                ))
+
+        for test_id, test_ranges in enumerate(ranges):
+            if not any(sex == SEX_ANY and age_min == 0 for sex, age_min, _, _, _ in test_ranges):
+                raise ValueError(f"Reference test '{self.tests[test_id]}' has no range for everyone (sex any, age from 0)")
+
+        width = max(len(test_ranges) for test_ranges in ranges)
+        shape = (len(self.tests), width)
+        self._sex = np.full(shape, -1, dtype=np.int8)
+        self._age_min = np.zeros(shape, dtype=np.float32)
+        self._age_max = np.zeros(shape, dtype=np.float32)
+        self._low = np.full(shape, np.nan)
+        self._high = np.full(shape, np.nan)
+        for test_id, test_ranges in enumerate(ranges):
+            for slot, (sex, age_min, age_max, low, high) in enumerate(test_ranges):
+                self._sex[test_id, slot] = sex
+                self._age_min[test_id, slot] = age_min
+                self._age_max[test_id, slot] = age_max
+                self._low[test_id, slot] = low
+                self._high[test_id, slot] = high
+        self._critical_low = np.array([low for low, _ in critical], dtype=np.float64)
+        self._critical_high = np.array([high for _, high in critical], dtype=np.float64)
+        # Sex-specific ranges beat age-specific ones, which beat the default
+        self._specificity = (
+            (self._sex > SEX_ANY) * 2 + ((self._age_min > 0) | (self._age_max < 200))
+        ).astype(np.int8)
+        self._age_default = (self._age_min == 0) & (self._age_max >= 200)
+        self._max_name_words = max(len(name.split()) for name in self.names)
+
+        logger.info(f"Loaded {len(self.tests)} reference tests ({len(self.names)} names) from {path}")
+
+    def test_id(self, name: str) -> int:
+        """Test number for a test name or synonym, -1 if unknown"""
+        return self.names.get(normalize_test_name(name), -1)
+
+    def mentions_test(self, text: str) -> bool:
+        """True if a test name or synonym appears in text as whole words"""
+        words = normalize_test_name(text).split()
+        return any(
+            " ".join(words[start:start + length]) in self.names
+            for length in range(1, self._max_name_words + 1)
+            for start in range(len(words) - length + 1)
+        )
+
+    def canonical_name(self, name: str) -> str:
+        """Canonical name of a known test, else the normalized name"""
+        test_id = self.test_id(name)
+        return self.tests[test_id] if test_id >= 0 else normalize_test_name(name)
+
+    def resolve(self, names: Sequence[str], units: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map test names and units to test numbers and unit conversion factors.
+
+        Returns:
+            (test_ids, factors): -1 for unknown tests, NaN factors for units
+            that cannot be converted to the test's canonical unit (an empty
+            unit is assumed to be the canonical one)
+        """
+        names_index, factors_index = self.names, self.factors
+        test_ids = np.fromiter(
+            (names_index.get(normalize_test_name(name), -1) for name in names),
+            dtype=np.int32, count=len(names)
+        )
+        factors = np.fromiter(
+            (
+                factors_index.get((test_id, normalize_unit(unit)), np.nan) if unit else 1.0
+                for test_id, unit in zip(test_ids.tolist(), units)
+            ),
+            dtype=np.float64, count=len(names)
+        )
+        return test_ids, factors
+
+    def ranges(self, test_ids: np.ndarray, sex: Any = SEX_ANY, age: Any = np.nan) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pick the most specific range for each test and patient.
+
+        Args:
+            test_ids: Test numbers (-1 for unknown tests)
+            sex: Sex code, scalar or one per test
+            age: Age in years (NaN if unknown), scalar or one per test
+
+        Returns:
+            (low, high) in canonical units, NaN for open ends and unknown tests
+        """
+        test_ids = np.asarray(test_ids)
+        known = test_ids >= 0
+        rows = np.where(known, test_ids, 0)
+        sex = np.broadcast_to(np.asarray(sex, dtype=np.int8), test_ids.shape)[:, None]
+        age = np.broadcast_to(np.asarray(age, dtype=np.float32), test_ids.shape)[:, None]
+
+        slot_sex = self._sex[rows]
+        match = (slot_sex == SEX_ANY) | (slot_sex == sex)
+        with np.errstate(invalid="ignore"):
+            in_age = (self._age_min[rows] <= age) & (age < self._age_max[rows])
+        match &= np.where(np.isnan(age), self._age_default[rows], in_age)
+
+        best = np.argmax(np.where(match, self._specificity[rows], -1), axis=1)
+        low = self._low[rows, best]
+        high = self._high[rows, best]
+        low[~known] = np.nan
+        high[~known] = np.nan
+        return low, high
+
+    def flag(self, test_ids: np.ndarray, values: np.ndarray, factors: np.ndarray,
+             sex: Any = SEX_ANY, age: Any = np.nan) -> np.ndarray:
+        """
+        Flag a batch of values against the reference ranges.
+
+        Args:
+            test_ids, factors: From resolve()
+            values: Measured values in the reported units
+            sex, age: Patient sex code and age (scalar or per value)
+
+        Returns:
+            int8 status codes (STATUS_*); STATUS_UNKNOWN for unknown tests
+            and unconvertible units
+        """
+        low, high = self.ranges(test_ids, sex, age)
+        converted = np.asarray(values, dtype=np.float64) * factors
+        status = np.full(converted.shape, STATUS_NORMAL, dtype=np.int8)
+        with np.errstate(invalid="ignore"):
+            status[converted < low] = STATUS_LOW
+            status[converted > high] = STATUS_HIGH
+        status[(np.asarray(test_ids) < 0) | np.isnan(converted)] = STATUS_UNKNOWN
+        return status
+
+    def critical(self, test_ids: np.ndarray, values: np.ndarray, factors: np.ndarray) -> np.ndarray:
+        """
+        Flag a batch of values against the critical limits.
+
+        Args:
+            test_ids, factors: From resolve()
+            values: Measured values in the reported units
+
+        Returns:
+            int8 codes: STATUS_LOW/STATUS_HIGH past a critical limit,
+            STATUS_NORMAL otherwise, STATUS_UNKNOWN for unknown tests and
+            unconvertible units
+        """
+        test_ids = np.asarray(test_ids)
+        known = test_ids >= 0
+        rows = np.where(known, test_ids, 0)
+        converted = np.asarray(values, dtype=np.float64) * factors
+        status = np.full(converted.shape, STATUS_NORMAL, dtype=np.int8)
+        with np.errstate(invalid="ignore"):
+            status[converted < self._critical_low[rows]] = STATUS_LOW
+            status[converted > self._critical_high[rows]] = STATUS_HIGH
+        status[~known | np.isnan(converted)] = STATUS_UNKNOWN
+        return status
+
+    def critical_values(self, names: Sequence[str], values: Sequence[float],
+                        units: Sequence[str]) -> List[Optional[bool]]:
+        """
+        Check named values against their tests' critical limits.
+
+        Returns:
+            Per value: True if past a critical limit, False if not (or the
+            test has no critical limits), None if the test or unit is unknown
+        """
+        test_ids, factors = self.resolve(names, units)
+        status = self.critical(test_ids, np.asarray(values, dtype=np.float64), factors)
+        return [None if code == STATUS_UNKNOWN else code != STATUS_NORMAL for code in status.tolist()]
+
+    def flag_values(self, names: Sequence[str], values: Sequence[float], units: Sequence[str],
+                    sex: Optional[str] = None, age: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Flag named values for one patient.
+
+        Returns:
+            Per value: status, the range used (in the reported unit) and the
+            canonical test name, or None if the test or unit is unknown
+        """
+        test_ids, factors = self.resolve(names, units)
+        sex_code = parse_sex(sex)
+        age_value = np.nan if age is None else float(age)
+        status = self.flag(test_ids, np.asarray(values, dtype=np.float64), factors, sex_code, age_value)
+        low, high = self.ranges(test_ids, sex_code, age_value)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            low, high = low / factors, high / factors
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for i, code in enumerate(status.tolist()):
+            if code == STATUS_UNKNOWN:
+                results.append(None)
+                continue
+            results.append({
+                "test": self.tests[test_ids[i]],
+                "status": STATUS_LABELS[code],
+                "low": None if np.isnan(low[i]) else round(float(low[i]), 4),
+                "high": None if np.isnan(high[i]) else round(float(high[i]), 4)
+            })
+        return results
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "tests": len(self.tests),
+            "names": len(self.names),
+            "ranges": int((self._sex >= 0).sum()),
+            "critical_limits": int((~np.isnan(self._critical_low)).sum() + (~np.isnan(self._critical_high)).sum()),
+            "unit_conversions": len(self.factors)
+        }
+
+
+# Global index instance
+_reference_index: Optional[ReferenceIndex] = None
+
+
+def get_reference_index() -> ReferenceIndex:
+    """
+    Get or load the global ReferenceIndex instance.
+
+    Returns:
+        ReferenceIndex singleton instance
+    """
+    global _reference_index
+    if _reference_index is None:
+        _reference_index = ReferenceIndex()
+    return _reference_index
@@ -4,11 +4,19 @@ Extracts text from PDF/images and analyzes using Gemini AI
 """
 
 import os
+import io
 import json
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Optional, Any
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from .content_cache import ContentCache, get_content_cache, file_sha256
+from .lab_value_parser import parse_lab_text, parse_lab_tables, build_analysis, needs_llm, apply_reference_flags
+
 # PDF processing
 import PyPDF2
 import pdfplumber
@@ -16,64 +24,348 @@ import pdfplumber
 # Image OCR - Google Cloud Vision
 try:
     from google.cloud import vision
-    from PIL import Image
     VISION_API_AVAILABLE = True
 except ImportError:
     VISION_API_AVAILABLE = False
 
+# Local OCR fallback - Tesseract (offline and test environments)
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
 load_dotenv()
 
 # Configure Gemini
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 
 
+# Worker processes for PDF text extraction (0 parses in a thread instead)
+LAB_PARSE_WORKERS = int(os.getenv("LAB_PARSE_WORKERS", "2"))
+# Try PyPDF2's text layer before pdfplumber's (much slower) layout analysis
+LAB_PDF_FAST_PATH = os.getenv("LAB_PDF_FAST_PATH", "true").lower() == "true"
+# Pages handed to one worker task; smaller PDFs are extracted in one task
+PDF_PAGES_PER_TASK = 4
+# A fast-path page with less text than this is re-extracted with pdfplumber
+PDF_MIN_PAGE_CHARS = 40
+# Parse values and ranges locally and only ask Gemini to explain them
+LAB_LOCAL_PARSE = os.getenv("LAB_LOCAL_PARSE", "true").lower() == "true"
+# Fewer parsed rows than this falls back to PDF tables, then to the full-text prompt
+LAB_MIN_PARSED_ROWS = 3
+# Report lines the parser could not read that are still sent to Gemini
+LAB_MAX_UNPARSED_LINES = 60
+# OCR engine for image reports: "vision" (Google Cloud Vision) or "tesseract" (local)
+LAB_OCR_ENGINE = os.getenv("LAB_OCR_ENGINE", "vision").lower()
+# Longest side of images sent to OCR; larger photos are downscaled first
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "2048"))
+# Images per batch_annotate_images request (the API's limit)
+VISION_BATCH_SIZE = 16
+# Version of the analysis stored in the content cache. Bump it whenever the
+# parser, the reference table, the critical limits or the prompts change, so
+# reports uploaded again are re-analyzed instead of served a stale result.
+LAB_ANALYSIS_VERSION = 3
+# Cache result name: per version, and separate for full-text-only analyses
+ANALYSIS_CACHE_KEY = f"analysis_v{LAB_ANALYSIS_VERSION}" + ("" if LAB_LOCAL_PARSE else "_full_text")
+
+
+def _usable_text_layer(text: Optional[str]) -> bool:
+    """True if a text layer looks like real text rather than empty or garbled glyphs"""
+    if not text:
+        return False
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < PDF_MIN_PAGE_CHARS:
+        return False
+    readable = sum(1 for c in visible if c.isalnum() or c in ".,:;()/%-<>=+*[]'")
+    return readable / len(visible) >= 0.8
+
+
+def _pdf_page_count(file_path: str) -> int:
+    return len(PyPDF2.PdfReader(file_path).pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int = 0, end: Optional[int] = None,
+                       fast_path: bool = LAB_PDF_FAST_PATH) -> List[str]:
+    """
+    Extract the text of pages [start, end) (runs in a worker process).
+    
+    Pages with a usable PyPDF2 text layer are taken as is; the rest go
+    through pdfplumber.
+    
+    Returns:
+        Text of each page in the range ("" for pages without text)
+    """
+    try:
+        texts: List[Optional[str]] = []
+        if fast_path:
+            reader = PyPDF2.PdfReader(file_path)
+            for page in reader.pages[start:end]:
+                try:
+                    page_text = page.extract_text()
+                except Exception:
+                    page_text = None
+                texts.append(page_text if _usable_text_layer(page_text) else None)
+        
+        if not fast_path or None in texts:
+            with pdfplumber.open(file_path) as pdf:
+                pages = pdf.pages[start:end]
+                if not fast_path:
+                    texts = [None] * len(pages)
+                for i, page in enumerate(pages):
+                    if texts[i] is None:
+                        texts[i] = page.extract_text() or ""
+                    # Release parsed layout objects as we go
+                    page.close()
+        
+        return [text.strip() for text in texts]
+    except Exception as e:
+        raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+
+def _extract_pdf_tables(file_path: str) -> List[List[List[Optional[str]]]]:
+    """Extract the tables of every page with pdfplumber (runs in a worker process)"""
+    tables = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            tables.extend(page.extract_tables())
+            page.close()
+    return tables
+
+
+def _prepare_ocr_image(content: bytes, max_dimension: int = OCR_MAX_DIMENSION) -> bytes:
+    """
+    Downscale and grayscale an image before OCR.
+    
+    Phone photos are often 12+ megapixels of color that OCR does not need;
+    a grayscale JPEG no larger than max_dimension is a fraction of the
+    upload size. The original bytes are returned if they are already
+    smaller or the image cannot be decoded here.
+    """
+    if not PIL_AVAILABLE:
+        return content
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image).convert("L")
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=90)
+    except Exception:
+        return content
+    prepared = out.getvalue()
+    return prepared if len(prepared) < len(content) else content
+
+
+def _tesseract_ocr(content: bytes) -> str:
+    """Extract text from (prepared) image bytes with the local Tesseract engine"""
+    with Image.open(io.BytesIO(content)) as image:
+        return pytesseract.image_to_string(image).strip()
+
+
+def _read_ocr_image(file_path: str) -> bytes:
+    with open(file_path, 'rb') as image_file:
+        return _prepare_ocr_image(image_file.read())
+
+
+def _vision_text(response) -> str:
+    """Full text of one Vision text_detection response"""
+    if response.error.message:
+        raise Exception(f"Vision API error: {response.error.message}")
+    # First annotation contains all text
+    return response.text_annotations[0].description.strip() if response.text_annotations else ""
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split pages into one contiguous range per worker, at least PDF_PAGES_PER_TASK each.
+    
+    Returns:
+        [start, end) page ranges; none for a document without pages
+    """
+    if page_count <= 0:
+        return []
+    tasks = max(1, min(workers, page_count // PDF_PAGES_PER_TASK))
+    size = -(-page_count // tasks)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _join_pages(texts: List[str]) -> str:
+    return "\n".join(text for text in texts if text).strip()
+
+
 class LabReportAnalyzer:
     """Analyzes lab reports from PDF or image files"""
     
-    def __init__(self):
+    def __init__(self, parse_workers: int = LAB_PARSE_WORKERS, cache: Optional[ContentCache] = None):
         self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.cache = cache or get_content_cache()
+        self.parse_workers = parse_workers
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Vision clients, created once on first use
+        self._vision_client = None
+        self._vision_async_client = None
+        self._client_lock = threading.Lock()
+        
+        # How reports were analyzed, and prompt size sent to Gemini
+        self.stats = {"structured": 0, "full_text": 0, "llm_skipped": 0, "prompt_chars": 0}
+    
+    @property
+    def parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Worker processes for PDF parsing, started on first use (None: use threads)"""
+        if self._parse_pool is None and self.parse_workers > 0:
+            self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        return self._parse_pool
+    
+    def shutdown(self):
+        """Stop the parsing worker processes"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
     
     def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using pdfplumber"""
-        try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text.strip()
-        except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
+        """Extract text from PDF (PyPDF2 text layer, pdfplumber where needed)"""
+        return _join_pages(_extract_pdf_pages(file_path))
+    
+    async def extract_text_from_pdf_parallel(self, file_path: str) -> str:
+        """
+        Extract text from PDF with page ranges spread over the worker processes.
+        
+        Falls back to a single thread when no worker pool is configured.
+        """
+        if self.parse_pool is None:
+            return await asyncio.to_thread(self.extract_text_from_pdf, file_path)
+        
+        loop = asyncio.get_running_loop()
+        page_count = await asyncio.to_thread(_pdf_page_count, file_path)
+        ranges = _page_ranges(page_count, self.parse_workers)
+        if not ranges:
+            # No pages: no text, reported like any other unreadable file
+            return ""
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(self.parse_pool, _extract_pdf_pages, file_path, start, end)
+            for start, end in ranges
+        ))
+        return _join_pages([text for part in parts for text in part])
+    
+    @property
+    def ocr_engine(self) -> str:
+        """OCR engine in use: LAB_OCR_ENGINE, or Tesseract when Vision is not installed"""
+        if LAB_OCR_ENGINE == "tesseract" or (not VISION_API_AVAILABLE and TESSERACT_AVAILABLE):
+            return "tesseract"
+        return "vision"
+    
+    @property
+    def vision_client(self):
+        """Vision client shared by all requests"""
+        with self._client_lock:
+            if self._vision_client is None:
+                self._vision_client = vision.ImageAnnotatorClient()
+            return self._vision_client
+    
+    @property
+    def vision_async_client(self):
+        """Async Vision client for batched OCR"""
+        if self._vision_async_client is None:
+            self._vision_async_client = vision.ImageAnnotatorAsyncClient()
+        return self._vision_async_client
     
-    def extract_text_from_image(self, file_path: str) -> str:
-        """Extract text from image using Google Cloud Vision API"""
-        if not VISION_API_AVAILABLE:
+    def _check_ocr_engine(self):
+        if self.ocr_engine == "tesseract":
+            if not TESSERACT_AVAILABLE:
+                raise Exception("Tesseract OCR is not available. Please install pytesseract and tesseract-ocr.")
+        elif not VISION_API_AVAILABLE:
             raise Exception("Google Cloud Vision API is not available. Please install google-cloud-vision.")
+    
+    def _ocr(self, content: bytes) -> str:
+        """OCR one prepared image with the configured engine"""
+        if self.ocr_engine == "tesseract":
+            return _tesseract_ocr(content)
+        response = self.vision_client.text_detection(image=vision.Image(content=content))
+        return _vision_text(response)
+    
+    def extract_text_from_image(self, file_path: str, content_hash: Optional[str] = None) -> str:
+        """
+        Extract text from image using Google Cloud Vision API (or Tesseract)
+        
+        The image is downscaled and converted to grayscale before it is
+        sent. OCR results are cached by the SHA-256 of the original image,
+        so the same photo is only sent to Vision once.
+        """
+        self._check_ocr_engine()
         
         try:
-            # Initialize Vision API client
-            client = vision.ImageAnnotatorClient()
-            
             # Read image file
             with open(file_path, 'rb') as image_file:
                 content = image_file.read()
             
-            image = vision.Image(content=content)
+            content_hash = content_hash or hashlib.sha256(content).hexdigest()
+            cached_text = self.cache.lookup(content_hash, "extracted_text", saves=f"{self.ocr_engine}_ocr")
+            if cached_text is not None:
+                return cached_text
             
-            # Perform text detection
-            response = client.text_detection(image=image)
-            texts = response.text_annotations
+            text = self._ocr(_prepare_ocr_image(content))
+            self.cache.update(content_hash, extracted_text=text)
+            return text
+                
+        except Exception as e:
+            raise Exception(f"Error extracting text from image: {str(e)}")
+    
+    async def extract_text_from_images(self, file_paths: List[str],
+                                       content_hashes: Optional[List[Optional[str]]] = None) -> List[str]:
+        """
+        Extract text from several images, e.g. the photographed pages of one report.
+        
+        Cached images are skipped; the rest are prepared in threads and sent
+        to Vision in batch_annotate_images requests of up to
+        VISION_BATCH_SIZE images (or OCRed with Tesseract in threads).
+        
+        Returns:
+            Text of each image, in order
+        """
+        self._check_ocr_engine()
+        engine = self.ocr_engine
+        
+        try:
+            content_hashes = list(content_hashes or [None] * len(file_paths))
+            for i, file_path in enumerate(file_paths):
+                if content_hashes[i] is None:
+                    content_hashes[i] = await asyncio.to_thread(file_sha256, file_path)
+            
+            texts: List[Optional[str]] = list(await asyncio.gather(*(
+                asyncio.to_thread(self.cache.lookup, content_hash, "extracted_text", f"{engine}_ocr")
+                for content_hash in content_hashes
+            )))
+            missing = [i for i, text in enumerate(texts) if text is None]
+            if not missing:
+                return texts
             
-            if response.error.message:
-                raise Exception(f"Vision API error: {response.error.message}")
+            images = await asyncio.gather(*(asyncio.to_thread(_read_ocr_image, file_paths[i]) for i in missing))
             
-            # Extract full text (first annotation contains all text)
-            if texts:
-                return texts[0].description.strip()
+            if engine == "tesseract":
+                results = await asyncio.gather(*(asyncio.to_thread(_tesseract_ocr, image) for image in images))
             else:
-                return ""
-                
+                feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+                requests = [
+                    vision.AnnotateImageRequest(image=vision.Image(content=image), features=[feature])
+                    for image in images
+                ]
+                batches = await asyncio.gather(*(
+                    self.vision_async_client.batch_annotate_images(requests=requests[start:start + VISION_BATCH_SIZE])
+                    for start in range(0, len(requests), VISION_BATCH_SIZE)
+                ))
+                results = [_vision_text(response) for batch in batches for response in batch.responses]
+            
+            for i, text in zip(missing, results):
+                texts[i] = text
+                await asyncio.to_thread(self.cache.update, content_hashes[i], extracted_text=text)
+            return texts
+        
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
     
@@ -86,8 +378,160 @@ class LabReportAnalyzer:
         else:
             raise Exception(f"Unsupported file type: {file_type}")
     
-    async def analyze_lab_report(self, extracted_text: str) -> Dict:
-        """Analyze lab report text using Gemini AI"""
+    async def extract_text_async(self, file_path: str, file_type: str, content_hash: Optional[str] = None) -> str:
+        """
+        Extract text without blocking the event loop.
+        
+        PDF parsing is CPU-bound pure Python, so it runs in the worker
+        processes; OCR goes through the async Vision client. Both are
+        skipped when the same file was extracted before.
+        """
+        if file_type.lower() != 'pdf':
+            return (await self.extract_text_from_images([file_path], [content_hash]))[0]
+        
+        content_hash = content_hash or await asyncio.to_thread(file_sha256, file_path)
+        cached_text = await asyncio.to_thread(self.cache.lookup, content_hash, "extracted_text", "pdf_parse")
+        if cached_text is not None:
+            return cached_text
+        
+        text = await self.extract_text_from_pdf_parallel(file_path)
+        await asyncio.to_thread(self.cache.update, content_hash, extracted_text=text)
+        return text
+    
+    async def parse_values(self, extracted_text: str, file_path: Optional[str] = None,
+                           file_type: str = 'pdf') -> Dict[str, Any]:
+        """
+        Parse test rows out of the extracted text, falling back to the PDF's
+        tables (in the worker processes) when the text yields too few rows.
+        """
+        parsed = parse_lab_text(extracted_text)
+        if len(parsed["rows"]) < LAB_MIN_PARSED_ROWS and file_path and file_type.lower() == 'pdf':
+            try:
+                if self.parse_pool is None:
+                    tables = await asyncio.to_thread(_extract_pdf_tables, file_path)
+                else:
+                    loop = asyncio.get_running_loop()
+                    tables = await loop.run_in_executor(self.parse_pool, _extract_pdf_tables, file_path)
+            except Exception:
+                tables = []
+            table_rows = parse_lab_tables(tables)
+            if len(table_rows) > len(parsed["rows"]):
+                parsed["rows"] = table_rows
+        return parsed
+    
+    async def analyze_lab_report(self, extracted_text: str, parsed: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Analyze lab report text
+        
+        Values and abnormal flags come from the local parser when it can
+        read the report; Gemini then only explains the compact rows (or is
+        skipped entirely for common panels). Reports the parser cannot read
+        are sent to Gemini in full, and the values it extracts are then
+        flagged against the printed or reference ranges.
+        """
+        if not LAB_LOCAL_PARSE:
+            return await self.analyze_full_text(extracted_text)
+        
+        parsed = parsed or parse_lab_text(extracted_text)
+        if len(parsed["rows"]) >= LAB_MIN_PARSED_ROWS:
+            return await self.analyze_parsed_values(parsed)
+        
+        analysis = await self.analyze_full_text(extracted_text)
+        if "error" not in analysis:
+            apply_reference_flags(analysis, parsed.get("patient"))
+        return analysis
+    
+    async def analyze_parsed_values(self, parsed: Dict[str, Any]) -> Dict:
+        """Explain locally parsed and flagged values, with Gemini only where needed"""
+        analysis = build_analysis(parsed["rows"])
+        self.stats["structured"] += 1
+        if not needs_llm(parsed, analysis):
+            self.stats["llm_skipped"] += 1
+            return analysis
+        
+        rows = "\n".join(
+            f"- {value['name']}: {value['value']} {value['unit']} (normal {value['normal_range']}) {value['status']}"
+            for value in analysis["values"]
+        )
+        unparsed = "\n".join(parsed["unparsed"][:LAB_MAX_UNPARSED_LINES]) or "(none)"
+        
+        prompt = f"""
+You are a medical AI assistant explaining lab results to a patient. The values below were already extracted from the report and compared with their reference ranges.
+
+Values:
+{rows}
+
+Other report lines that may contain results:
+{unparsed}
+
+Format your response as a valid JSON object with this exact structure:
+{{
+  "explanations": [
+    {{"name": "Test Name", "explanation": "Simple explanation of what this means for the patient", "recommendation": "What the patient should do"}}
+  ],
+  "additional_values": [
+    {{"name": "Test Name", "value": "value", "unit": "unit", "status": "normal/high/low", "normal_range": "range"}}
+  ],
+  "summary": "Overall health summary in simple, patient-friendly language",
+  "urgent_attention": false,
+  "urgent_message": "Message if urgent attention is needed"
+}}
+
+Important:
+- Give one explanation for every value that is high or low, including additional values
+- List results found in the other report lines under additional_values; leave it empty if there are none
+- Use simple, non-medical language for explanations
+- Be encouraging and not alarming
+- Always recommend consulting a doctor for abnormal values
+"""
+        
+        try:
+            result = await self._generate_json(prompt)
+        except json.JSONDecodeError:
+            # The locally flagged values are still correct, only unexplained
+            return analysis
+        
+        for value in result.get("additional_values") or []:
+            if isinstance(value, dict) and value.get("name"):
+                value = {key: value.get(key, "") for key in ("name", "value", "unit", "status", "normal_range")}
+                analysis["values"].append(value)
+                if value["status"] in ("high", "low"):
+                    analysis["abnormal_values"].append({**value, "explanation": "", "recommendation": ""})
+        
+        explanations = {
+            str(item.get("name", "")).lower(): item
+            for item in result.get("explanations") or [] if isinstance(item, dict)
+        }
+        for value in analysis["abnormal_values"]:
+            item = explanations.get(value["name"].lower())
+            if item and not value["explanation"]:
+                value["explanation"] = item.get("explanation", "")
+                value["recommendation"] = item.get("recommendation", "")
+        
+        analysis["summary"] = result.get("summary") or analysis["summary"]
+        # A critical value flagged locally stays urgent whatever Gemini says
+        if result.get("urgent_attention"):
+            analysis["urgent_attention"] = True
+            analysis["urgent_message"] = result.get("urgent_message") or analysis["urgent_message"]
+        return analysis
+    
+    async def _generate_json(self, prompt: str) -> Dict:
+        """Run a prompt and parse the JSON object in Gemini's response"""
+        self.stats["prompt_chars"] += len(prompt)
+        response = await self.model.generate_content_async(prompt)
+        result_text = response.text
+        
+        # Sometimes Gemini wraps JSON in markdown code blocks
+        if "```json" in result_text:
+            result_text = result_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_text:
+            result_text = result_text.split("```")[1].split("```")[0].strip()
+        
+        return json.loads(result_text)
+    
+    async def analyze_full_text(self, extracted_text: str) -> Dict:
+        """Analyze the whole lab report text using Gemini AI"""
+        self.stats["full_text"] += 1
         
         prompt = f"""
 You are a medical AI assistant specialized in analyzing lab reports. Analyze the following lab report text and provide a structured analysis.
@@ -131,19 +575,7 @@ Important:
 """
         
         try:
-            response = await self.model.generate_content_async(prompt)
-            result_text = response.text
-            
-            # Try to extract JSON from response
-            # Sometimes Gemini wraps JSON in markdown code blocks
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            # Parse JSON
-            analysis = json.loads(result_text)
-            return analysis
+            return await self._generate_json(prompt)
             
         except json.JSONDecodeError as e:
             # If JSON parsing fails, return a structured error
@@ -153,38 +585,97 @@ Important:
                 "summary": "Unable to parse lab report. The text may not contain clear lab values or the format is not recognized.",
                 "urgent_attention": False,
                 "error": f"JSON parsing error: {str(e)}",
-                "raw_response": response.text if 'response' in locals() else None
+                "raw_response": e.doc
             }
         except Exception as e:
             raise Exception(f"Error analyzing lab report: {str(e)}")
     
-    async def process_lab_report(self, file_path: str, file_type: str) -> Dict:
-        """Complete pipeline: extract text and analyze"""
+    async def process_lab_report(self, file_path: str, file_type: str, content_hash: Optional[str] = None) -> Dict:
+        """
+        Complete pipeline: extract text and analyze
+        
+        A file that was analyzed before (same SHA-256, same
+        LAB_ANALYSIS_VERSION) returns the cached text and analysis without
+        any extraction or Gemini call.
+        """
         try:
-            # Step 1: Extract text
-            extracted_text = self.extract_text(file_path, file_type)
-            
-            if not extracted_text or len(extracted_text) < 50:
-                return {
-                    "success": False,
-                    "error": "Could not extract sufficient text from the file. Please ensure the image is clear or the PDF is not scanned.",
-                    "extracted_text": extracted_text
-                }
-            
-            # Step 2: Analyze with Gemini
-            analysis = await self.analyze_lab_report(extracted_text)
-            
+            content_hash = content_hash or await asyncio.to_thread(file_sha256, file_path)
+            return await self._process(
+                content_hash, file_type,
+                lambda: self.extract_text_async(file_path, file_type, content_hash),
+                file_path
+            )
+        except Exception as e:
             return {
-                "success": True,
-                "extracted_text": extracted_text,
-                "analysis": analysis
+                "success": False,
+                "error": str(e)
             }
+    
+    async def process_lab_report_images(self, file_paths: List[str],
+                                        content_hashes: Optional[List[Optional[str]]] = None) -> Dict:
+        """
+        Complete pipeline for a report photographed as several images
+        
+        The pages are OCRed in one batch and analyzed as one report; the
+        analysis is cached under the hash of the page hashes in order.
+        """
+        try:
+            content_hashes = list(content_hashes or [None] * len(file_paths))
+            for i, file_path in enumerate(file_paths):
+                if content_hashes[i] is None:
+                    content_hashes[i] = await asyncio.to_thread(file_sha256, file_path)
+            report_hash = hashlib.sha256("".join(content_hashes).encode()).hexdigest()
             
+            async def extract() -> str:
+                texts = await self.extract_text_from_images(file_paths, content_hashes)
+                return "\n\n".join(text for text in texts if text)
+            
+            return await self._process(report_hash, 'image', extract)
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
+    
+    async def _process(self, content_hash: str, file_type: str, extract, file_path: Optional[str] = None) -> Dict:
+        """Cache lookup, text extraction and analysis shared by the pipelines"""
+        cached_analysis = await asyncio.to_thread(self.cache.lookup, content_hash, ANALYSIS_CACHE_KEY, "gemini")
+        if cached_analysis is not None:
+            # Extraction is skipped as well
+            self.cache.record_saved("pdf_parse" if file_type.lower() == 'pdf' else f"{self.ocr_engine}_ocr")
+            entry = await asyncio.to_thread(self.cache.get, content_hash)
+            return {
+                "success": True,
+                "extracted_text": entry.get("extracted_text", ""),
+                "analysis": cached_analysis,
+                "cached": True
+            }
+        
+        # Step 1: Extract text, off the event loop
+        extracted_text = await extract()
+        
+        if not extracted_text or len(extracted_text) < 50:
+            return {
+                "success": False,
+                "error": "Could not extract sufficient text from the file. Please ensure the image is clear or the PDF is not scanned.",
+                "extracted_text": extracted_text
+            }
+        
+        # Step 2: Parse values locally, then analyze (Gemini only where needed)
+        parsed = await self.parse_values(extracted_text, file_path, file_type) if LAB_LOCAL_PARSE else None
+        analysis = await self.analyze_lab_report(extracted_text, parsed)
+        if "error" not in analysis:
+            # Unparseable responses are not cached so a re-upload retries them
+            await asyncio.to_thread(
+                self.cache.update, content_hash, extracted_text=extracted_text, **{ANALYSIS_CACHE_KEY: analysis}
+            )
+        
+        return {
+            "success": True,
+            "extracted_text": extracted_text,
+            "analysis": analysis,
+            "cached": False
+        }
 
 
 # Singleton instance
@@ -196,3 +687,9 @@ def get_lab_report_analyzer() -> LabReportAnalyzer:
     if _analyzer is None:
         _analyzer = LabReportAnalyzer()
     return _analyzer
+
+
+def shutdown_lab_report_analyzer():
+    """Stop the analyzer's worker processes, if it was ever created"""
+    if _analyzer is not None:
+        _analyzer.shutdown()
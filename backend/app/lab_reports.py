@@ -3,16 +3,21 @@ Lab Reports API Routes
 Handles file upload, text extraction, and AI analysis
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
-from typing import Optional
+from typing import Optional, List
 import os
+import logging
 import uuid
-import shutil
+import asyncio
 from pathlib import Path
 
 from .lab_report_analyzer import get_lab_report_analyzer
 from .database import DatabaseClient
+from .job_queue import get_job_queue, JOB_QUEUED
+from .upload_stream import stream_upload
+from .content_cache import get_content_cache
+from .lab_trends import LabTrendStore
 
 router = APIRouter(prefix="/api/lab-reports", tags=["Lab Reports"])
 
@@ -20,80 +25,232 @@ router = APIRouter(prefix="/api/lab-reports", tags=["Lab Reports"])
 UPLOAD_DIR = Path("uploads/lab_reports")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+logger = logging.getLogger(__name__)
+
+# Largest accepted lab report upload (all files together)
+LAB_REPORT_MAX_BYTES = int(os.getenv("LAB_REPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+# Photographed pages accepted for one report
+LAB_REPORT_MAX_IMAGES = int(os.getenv("LAB_REPORT_MAX_IMAGES", "10"))
+
+# Form fields of the upload endpoint, for the API docs (the body is parsed by hand)
+LAB_REPORT_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "patient_id"],
+                    "properties": {
+                        "file": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "One PDF or image, or several images (pages of one report)"
+                        },
+                        "patient_id": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
 db_client = DatabaseClient()
+trend_store = LabTrendStore(db_client.client)
 
 
-@router.post("/upload")
+@router.post("/upload", openapi_extra=LAB_REPORT_UPLOAD_SCHEMA)
 async def upload_lab_report(
-    file: UploadFile = File(...),
-    patient_id: str = Form(...)
+    request: Request,
+    background: bool = Query(False, description="Queue the analysis and return a job id")
 ):
     """
     Upload and analyze a lab report (PDF or image)
+    
+    Expects multipart/form-data with `file` and `patient_id`. A report
+    photographed as several pages can be sent as several `file` images,
+    which are OCRed in one batch. Files are streamed to disk as they
+    arrive and rejected with 413 once they exceed LAB_REPORT_MAX_BYTES.
+    
+    With background=true the file is saved and the request returns 202 with
+    a job id; progress and the result come from /api/jobs/{job_id}.
     """
+    upload = await stream_upload(
+        request, "file", _lab_report_paths(), LAB_REPORT_MAX_BYTES, max_files=LAB_REPORT_MAX_IMAGES
+    )
+    file_path = upload.path
+    
     try:
-        # Validate file type
-        file_extension = file.filename.split('.')[-1].lower()
-        allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png']
-        
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
-            )
-        
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        file_name = f"{file_id}.{file_extension}"
-        file_path = UPLOAD_DIR / file_name
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        patient_id = upload.fields.get('patient_id')
+        if not patient_id:
+            raise HTTPException(status_code=400, detail="patient_id is required")
         
         # Determine file type for processing
-        file_type = 'pdf' if file_extension == 'pdf' else 'image'
-        
-        # Process and analyze
-        analyzer = get_lab_report_analyzer()
-        result = await analyzer.process_lab_report(str(file_path), file_type)
+        file_type = 'pdf' if file_path.suffix == '.pdf' else 'image'
+        if len(upload.files) > 1 and any(file.path.suffix == '.pdf' for file in upload.files):
+            raise HTTPException(status_code=400, detail="Only images can be uploaded as several pages")
         
-        if not result['success']:
-            # Clean up file
-            os.remove(file_path)
-            raise HTTPException(status_code=400, detail=result.get('error', 'Analysis failed'))
-        
-        # Save to database
-        lab_report_data = {
+        job_payload = {
             'patient_id': patient_id,
-            'file_name': file.filename,
+            'file_name': upload.filename,
             'file_path': str(file_path),
             'file_type': file_type,
-            'extracted_text': result['extracted_text'],
-            'analysis_result': result['analysis'],
-            'status': 'completed'
+            'content_sha256': upload.sha256
         }
+        if len(upload.files) > 1:
+            job_payload['page_paths'] = [str(file.path) for file in upload.files[1:]]
+            job_payload['page_sha256s'] = [file.sha256 for file in upload.files[1:]]
+        
+        if background:
+            job_id = await get_job_queue().submit("lab_report", job_payload)
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "message": "Lab report queued for analysis",
+                "job_id": job_id,
+                "status": JOB_QUEUED
+            })
         
-        # Insert into database
-        db_result = db_client.client.table('lab_reports').insert(lab_report_data).execute()
+        try:
+            result = await analyze_and_store_lab_report(job_payload)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return JSONResponse(content={
             "success": True,
             "message": "Lab report analyzed successfully",
-            "report_id": db_result.data[0]['id'] if db_result.data else None,
-            "analysis": result['analysis']
+            **result
         })
         
-    except HTTPException:
-        raise
     except Exception as e:
-        # Clean up file if it exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+        # Clean up files if they exist
+        _remove_report_files(str(file_path))
         
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"Error processing lab report: {str(e)}")
 
 
+def _lab_report_paths():
+    """
+    Path picker for one upload: validates each file's extension, gives the
+    first file a unique name and further pages that name with .p2, .p3, ...
+    """
+    stem = str(uuid.uuid4())
+    count = 0
+    
+    def pick(filename: str) -> Path:
+        nonlocal count
+        file_extension = filename.split('.')[-1].lower()
+        allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png']
+        
+        if file_extension not in allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
+            )
+        
+        count += 1
+        page = "" if count == 1 else f".p{count}"
+        return UPLOAD_DIR / f"{stem}{page}.{file_extension}"
+    
+    return pick
+
+
+def _remove_report_files(file_path: str):
+    """Remove a report's file and its further pages, if any."""
+    path = Path(file_path)
+    for page in [path, *path.parent.glob(f"{path.stem}.p*")]:
+        if page.exists():
+            os.remove(page)
+
+
+async def analyze_and_store_lab_report(job: dict, report_progress=None) -> dict:
+    """
+    Analyze a saved lab report file and insert it into the database.
+    
+    Args:
+        job: patient_id, file_name, file_path and file_type of the upload,
+            plus page_paths for further pages of a photographed report
+        report_progress: Optional progress callback (fraction, message)
+    
+    Returns:
+        Dictionary with report_id and analysis
+    
+    Raises:
+        ValueError: If the file could not be analyzed (the file is removed)
+    """
+    if report_progress:
+        report_progress(0.1, "Extracting text and analyzing report")
+    
+    # Process and analyze
+    analyzer = get_lab_report_analyzer()
+    if job.get('page_paths'):
+        result = await analyzer.process_lab_report_images(
+            [job['file_path'], *job['page_paths']],
+            [job.get('content_sha256'), *job.get('page_sha256s', [None] * len(job['page_paths']))]
+        )
+    else:
+        result = await analyzer.process_lab_report(job['file_path'], job['file_type'], job.get('content_sha256'))
+    
+    if not result['success']:
+        # Clean up files
+        _remove_report_files(job['file_path'])
+        raise ValueError(result.get('error', 'Analysis failed'))
+    
+    if report_progress:
+        report_progress(0.9, "Saving report")
+    
+    # Save to database
+    lab_report_data = {
+        'patient_id': job['patient_id'],
+        'file_name': job['file_name'],
+        'file_path': job['file_path'],
+        'file_type': job['file_type'],
+        'extracted_text': result['extracted_text'],
+        'analysis_result': result['analysis'],
+        'status': 'completed'
+    }
+    
+    # Insert into database (blocking client, keep it off the event loop)
+    try:
+        db_result = await asyncio.to_thread(
+            db_client.client.table('lab_reports').insert(lab_report_data).execute
+        )
+    except Exception:
+        # No row points at the files, so nothing would ever remove them
+        _remove_report_files(job['file_path'])
+        raise
+    
+    if db_result.data:
+        # Index the values for trends; the report itself is already saved
+        try:
+            await asyncio.to_thread(trend_store.record_report, db_result.data[0])
+        except Exception as e:
+            logger.warning(f"Could not store lab values of report {db_result.data[0]['id']}: {e}")
+    
+    return {
+        "report_id": db_result.data[0]['id'] if db_result.data else None,
+        "analysis": result['analysis'],
+        "cached": result.get('cached', False)
+    }
+
+
+get_job_queue().register("lab_report", analyze_and_store_lab_report, concurrency=2)
+
+
+@router.get("/cache/stats")
+async def get_lab_report_cache_stats():
+    """
+    Get hit rates of the extraction/analysis cache and the API calls it saved,
+    and how many analyses used the local value parser or skipped Gemini
+    """
+    return JSONResponse(content={
+        "success": True,
+        "stats": get_content_cache().get_stats(),
+        "analysis": get_lab_report_analyzer().stats
+    })
+
+
 @router.get("/patient/{patient_id}")
 async def get_patient_lab_reports(patient_id: str):
     """
@@ -115,6 +272,32 @@ async def get_patient_lab_reports(patient_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching lab reports: {str(e)}")
 
 
+@router.get("/patient/{patient_id}/trends")
+async def get_patient_lab_trends(
+    patient_id: str,
+    test: Optional[List[str]] = Query(None, description="Only these tests (any name or synonym, repeatable)"),
+    since: Optional[str] = Query(None, description="Only values measured on or after this ISO date")
+):
+    """
+    Get how each lab value of a patient has moved over time
+    
+    Returns one entry per test with its series, latest value, change since
+    the previous and first result, and how many of the latest results in a
+    row were out of range. Values come from the lab_values index, not the
+    stored report analyses.
+    """
+    try:
+        trends = await asyncio.to_thread(trend_store.get_trends, patient_id, test, since)
+        
+        return JSONResponse(content={
+            "success": True,
+            "trends": trends
+        })
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching lab trends: {str(e)}")
+
+
 @router.get("/{report_id}")
 async def get_lab_report(report_id: str):
     """
@@ -159,8 +342,8 @@ async def delete_lab_report(report_id: str):
         
         # Delete file if it exists
         file_path = result.data.get('file_path')
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+        if file_path:
+            _remove_report_files(file_path)
         
         # Delete from database
         db_client.client.table('lab_reports').delete().eq('id', report_id).execute()
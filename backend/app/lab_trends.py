@@ -0,0 +1,262 @@
+"""
+Lab Value Trends
+
+Every numeric value of an analyzed lab report is written once to the
+lab_values table, one row per (patient, test, measured_at), when the report
+is stored. A patient's history of a test is then one indexed query instead
+of reading every lab_reports.analysis_result blob, and series, deltas and
+out-of-range streaks are computed server-side from those rows.
+
+A value is dated by the sample collection (or report) date printed on the
+report, read from its extracted text; reports without a readable date fall
+back to the upload time. measured_at_source records which one was used.
+
+Test names are mapped to the reference table's canonical names, and values
+are also stored converted to the test's canonical unit, so "HbA1c" and
+"Glycated Hemoglobin" reported in different units land in one series.
+Reports analyzed before the table existed are backfilled the first time a
+patient's trends are requested.
+"""
+
+import math
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Sequence
+
+from .lab_reference import get_reference_index, normalize_unit
+from .lab_value_parser import parse_report_date
+
+logger = logging.getLogger(__name__)
+
+# Relative change below which a trend counts as stable
+TREND_STABLE_FRACTION = 0.02
+
+# measured_at_source values: date printed on the report, or upload time
+MEASURED_AT_REPORT = "report"
+MEASURED_AT_UPLOAD = "upload"
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def report_values(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build lab_values rows from a lab_reports row.
+
+    Args:
+        report: id, patient_id, uploaded_at, analysis_result and (optionally)
+            extracted_text of a report
+
+    Returns:
+        One row per numeric value (qualitative results are skipped)
+    """
+    analysis = report.get("analysis_result") or {}
+    values = [value for value in analysis.get("values") or [] if isinstance(value, dict)]
+    values = [(value, _number(value.get("value"))) for value in values]
+    values = [(value, number) for value, number in values if number is not None and value.get("name")]
+    if not values:
+        return []
+
+    index = get_reference_index()
+    test_ids, factors = index.resolve(
+        [str(value["name"]) for value, _ in values],
+        [str(value.get("unit") or "") for value, _ in values]
+    )
+
+    collected_at = parse_report_date(report.get("extracted_text") or "")
+    if collected_at is not None:
+        measured_at, source = collected_at, MEASURED_AT_REPORT
+    else:
+        measured_at, source = report.get("uploaded_at"), MEASURED_AT_UPLOAD
+
+    rows = []
+    for (value, number), test_id, factor in zip(values, test_ids.tolist(), factors.tolist()):
+        known = test_id >= 0
+        rows.append({
+            "patient_id": report["patient_id"],
+            "report_id": report["id"],
+            "test": index.tests[test_id] if known else index.canonical_name(str(value["name"])),
+            "name": str(value["name"]),
+            "value": number,
+            "unit": str(value.get("unit") or ""),
+            "canonical_value": number * factor if known and not math.isnan(factor) else None,
+            "canonical_unit": index.units[test_id] if known else None,
+            "status": value.get("status") or "unknown",
+            "normal_range": value.get("normal_range") or "",
+            "measured_at": measured_at,
+            "measured_at_source": source
+        })
+    return rows
+
+
+def compute_trend(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Series, deltas and out-of-range streak of one test.
+
+    Values are compared in the canonical unit when every row has one;
+    otherwise only the rows in the latest row's unit are used.
+
+    Args:
+        rows: lab_values rows of one patient and test, oldest first
+    """
+    latest_row = rows[-1]
+    if all(row.get("canonical_value") is not None for row in rows):
+        unit = latest_row["canonical_unit"]
+        points = [(row, row["canonical_value"]) for row in rows]
+    else:
+        unit = latest_row["unit"]
+        points = [(row, row["value"]) for row in rows if normalize_unit(row["unit"]) == normalize_unit(unit)]
+
+    series = [
+        {
+            "measured_at": row["measured_at"],
+            "measured_at_source": row.get("measured_at_source") or MEASURED_AT_UPLOAD,
+            "value": round(value, 4),
+            "status": row["status"],
+            "report_id": row["report_id"]
+        }
+        for row, value in points
+    ]
+
+    latest = points[-1][1]
+    previous = points[-2][1] if len(points) > 1 else None
+    first = points[0][1]
+    delta = latest - previous if previous is not None else None
+    percent_change = round(delta / previous * 100, 1) if delta is not None and previous else None
+
+    if delta is None:
+        direction = None
+    elif abs(delta) <= abs(previous) * TREND_STABLE_FRACTION:
+        direction = "stable"
+    else:
+        direction = "up" if delta > 0 else "down"
+
+    # Consecutive most recent results outside the normal range
+    streak = 0
+    for row, _ in reversed(points):
+        if row["status"] not in ("high", "low"):
+            break
+        streak += 1
+
+    return {
+        "test": latest_row["test"],
+        "name": latest_row["name"],
+        "unit": unit,
+        "count": len(series),
+        "series": series,
+        "latest": round(latest, 4),
+        "latest_status": latest_row["status"],
+        "normal_range": latest_row["normal_range"],
+        "previous": round(previous, 4) if previous is not None else None,
+        "delta": round(delta, 4) if delta is not None else None,
+        "percent_change": percent_change,
+        "change_since_first": round(latest - first, 4),
+        "direction": direction,
+        "out_of_range_streak": streak,
+        "first_measured_at": series[0]["measured_at"],
+        "last_measured_at": series[-1]["measured_at"]
+    }
+
+
+class LabTrendStore:
+    """
+    lab_values rows of each patient, written per report and read per test.
+
+    Methods make blocking Supabase calls and are meant to run in a worker
+    thread.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        # Patients whose older reports have been backfilled by this process
+        self._backfilled: set = set()
+        self._lock = threading.Lock()
+
+    def record_report(self, report: Dict[str, Any]) -> int:
+        """
+        Store the values of a newly analyzed report.
+
+        Args:
+            report: The inserted lab_reports row
+
+        Returns:
+            Number of values stored
+        """
+        rows = report_values(report)
+        if rows:
+            self.client.table("lab_values").insert(rows).execute()
+        return len(rows)
+
+    def _backfill(self, patient_id: str):
+        """Store values of the patient's reports that have none yet (once per process)."""
+        with self._lock:
+            if patient_id in self._backfilled:
+                return
+            self._backfilled.add(patient_id)
+
+        try:
+            reports = self.client.table("lab_reports")\
+                .select("id")\
+                .eq("patient_id", patient_id)\
+                .execute()
+            stored = self.client.table("lab_values")\
+                .select("report_id")\
+                .eq("patient_id", patient_id)\
+                .execute()
+            missing = {row["id"] for row in reports.data or []} - {row["report_id"] for row in stored.data or []}
+            if not missing:
+                return
+
+            result = self.client.table("lab_reports")\
+                .select("id, patient_id, uploaded_at, analysis_result, extracted_text")\
+                .in_("id", sorted(missing))\
+                .execute()
+            count = sum(self.record_report(report) for report in result.data or [])
+            logger.info(f"Backfilled {count} lab values from {len(missing)} reports of patient {patient_id}")
+        except Exception:
+            with self._lock:
+                self._backfilled.discard(patient_id)
+            raise
+
+    def get_trends(
+        self,
+        patient_id: str,
+        tests: Optional[Sequence[str]] = None,
+        since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a patient's trend for each test.
+
+        Args:
+            patient_id: ID of the patient
+            tests: Only these tests (any name or synonym); all tests if None
+            since: Only values measured at or after this ISO timestamp
+
+        Returns:
+            compute_trend() result per test, most recently measured first
+        """
+        self._backfill(patient_id)
+
+        query = self.client.table("lab_values")\
+            .select("report_id, test, name, value, unit, canonical_value, canonical_unit, status, normal_range, "
+                    "measured_at, measured_at_source")\
+            .eq("patient_id", patient_id)
+        if tests:
+            index = get_reference_index()
+            query = query.in_("test", sorted({index.canonical_name(test) for test in tests}))
+        if since:
+            query = query.gte("measured_at", since)
+        result = query.order("measured_at").execute()
+
+        by_test: Dict[str, List[Dict[str, Any]]] = {}
+        for row in result.data or []:
+            by_test.setdefault(row["test"], []).append(row)
+
+        trends = [compute_trend(rows) for rows in by_test.values()]
+        trends.sort(key=lambda trend: trend["last_measured_at"] or "", reverse=True)
+        return trends
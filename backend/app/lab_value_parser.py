@@ -0,0 +1,589 @@
+"""
+Lab Value Parser Module
+Deterministically extracts (test, value, unit, reference range) rows from lab
+report text and tables and flags abnormal values numerically, so Gemini only
+has to explain results instead of reading the whole report. Values past the
+critical limits of the reference table mark the report for urgent attention
+without relying on the model.
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional, Any
+
+from .lab_reference import get_reference_index
+
+NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+"
+
+# "13.0 - 17.0", "13-17", "4000 to 11000"
+RANGE_BETWEEN = re.compile(rf"^\(?\s*(?P<low>{NUMBER})\s*(?:-|–|to)\s*(?P<high>{NUMBER})\s*\)?$", re.IGNORECASE)
+# "< 200", "upto 40", "less than 5"
+RANGE_BELOW = re.compile(rf"^\(?\s*(?:<=?|≤|up\s?to|less than|below)\s*(?P<high>{NUMBER})\s*\)?$", re.IGNORECASE)
+# "> 40", "more than 60"
+RANGE_ABOVE = re.compile(rf"^\(?\s*(?:>=?|≥|more than|greater than|above)\s*(?P<low>{NUMBER})\s*\)?$", re.IGNORECASE)
+
+RANGE = (
+    rf"\(?\s*(?:{NUMBER})\s*(?:-|–|to)\s*(?:{NUMBER})\s*\)?"
+    rf"|\(?\s*(?:<=?|≤|>=?|≥|up\s?to|less than|below|more than|greater than|above)\s*(?:{NUMBER})\s*\)?"
+)
+# "g/dL", "10^3/µL", and per-volume units printed with their slash: "/cumm", "/µL"
+UNIT = r"(?:x?10\^\d+\s?/\s?[A-Za-zµμ]+|/?[A-Za-zµμ%][A-Za-z0-9µμ%^*./]*(?:\s?/\s?[A-Za-z0-9µμ.]+)?)"
+NAME = r"[A-Za-z][A-Za-z0-9 ,()/%.+'\-]*?"
+
+# Hemoglobin 14.2 g/dL 13.0 - 17.0   |   SGPT (ALT) : 61 H U/L (7-56)
+LINE_UNIT_FIRST = re.compile(
+    rf"^(?P<name>{NAME})\s*:?\s+(?P<value>{NUMBER})\s*(?P<flag>\b[HL]\b|\*)?\s*"
+    rf"(?P<unit>{UNIT})?\s+(?P<range>{RANGE})\s*$"
+)
+# Hemoglobin 14.2 13.0 - 17.0 g/dL
+LINE_RANGE_FIRST = re.compile(
+    rf"^(?P<name>{NAME})\s*:?\s+(?P<value>{NUMBER})\s*(?P<flag>\b[HL]\b|\*)?\s+"
+    rf"(?P<range>{RANGE})\s*(?P<unit>{UNIT})?\s*$"
+)
+
+# Hemoglobin 14.2 g/dL (no printed range; only kept for tests in the reference table)
+LINE_NO_RANGE = re.compile(
+    rf"^(?P<name>{NAME})\s*:?\s+(?P<value>{NUMBER})\s*(?P<flag>\b[HL]\b|\*)?\s*(?P<unit>{UNIT})?\s*$"
+)
+
+# Patient details printed in the report header, for age/sex-specific ranges
+AGE_SEX = re.compile(
+    r"\bage\s*/\s*(?:sex|gender)\s*[:\-]?\s*(?P<age>\d{1,3})\s*(?:y|yrs?|years?)?\s*/\s*(?P<sex>male|female|m|f)\b",
+    re.IGNORECASE
+)
+AGE = re.compile(r"\bage\s*[:\-]?\s*(?P<age>\d{1,3})\s*(?:y\b|yrs?\b|years?\b)", re.IGNORECASE)
+SEX = re.compile(r"\b(?:sex|gender)\s*[:\-]?\s*(?P<sex>male|female|m|f)\b", re.IGNORECASE)
+
+# Dates printed in the report header: when the sample was collected, else when
+# the report was issued. "12/03/2026" is read day first, as Indian labs print it.
+DATE = (
+    r"\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}"
+    r"|\d{1,2}[\s\-/]*[A-Za-z]{3,9}[\s\-/,]*\d{2,4}"
+    r"|[A-Za-z]{3,9}\s+\d{1,2},?\s+\d{4}"
+)
+TIME = r"\d{1,2}:\d{2}(?::\d{2})?\s*(?:[AaPp][Mm])?"
+COLLECTION_LABEL = (
+    r"(?:sample\s+)?collect(?:ed|ion)(?:\s+(?:on|date|at|date\s*(?:&|and)\s*time))?"
+    r"|date\s+of\s+(?:sample\s+)?collection|sample\s+(?:date|drawn(?:\s+on)?)|drawn\s+on"
+)
+REPORT_LABEL = r"report(?:ed)?\s+(?:on|date)|date\s+of\s+report|report\s+generated\s+on"
+# Tried in order on the date with its separators replaced by spaces
+DATE_FORMATS = [
+    "%Y %m %d", "%d %m %Y", "%d %m %y", "%m %d %Y", "%m %d %y",
+    "%d %b %Y", "%d %B %Y", "%d %b %y", "%b %d %Y", "%B %d %Y"
+]
+TIME_FORMATS = ["%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M:%S %p"]
+
+# Unparsed lines that still look like a result and need a human-readable reading
+RESULT_HINT = re.compile(
+    r"\d\s*/?\s*(?:mg|g/|µ|μ|u/|ul\b|iu|mmol|pg|ng|fl|%|cumm|lakh|mill|hpf|sec)|\b(?:positive|negative|reactive|present|absent|detected)\b",
+    re.IGNORECASE
+)
+
+# For tests without critical limits in the reference table, values this far
+# outside the printed range (relative to the limit) count as critical
+CRITICAL_FACTOR = 2.0
+
+
+def _to_float(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def parse_range(text: str) -> Optional[Dict[str, Optional[float]]]:
+    """
+    Parse a reference range.
+
+    Returns:
+        {"low": ..., "high": ...} with None for an open end, or None if the
+        text is not a range
+    """
+    text = text.strip()
+    match = RANGE_BETWEEN.match(text)
+    if match:
+        return {"low": _to_float(match.group("low")), "high": _to_float(match.group("high"))}
+    match = RANGE_BELOW.match(text)
+    if match:
+        return {"low": None, "high": _to_float(match.group("high"))}
+    match = RANGE_ABOVE.match(text)
+    if match:
+        return {"low": _to_float(match.group("low")), "high": None}
+    return None
+
+
+def flag_value(value: float, low: Optional[float], high: Optional[float]) -> str:
+    """Compare a value with its reference range: 'low', 'high' or 'normal'"""
+    if low is not None and value < low:
+        return "low"
+    if high is not None and value > high:
+        return "high"
+    return "normal"
+
+
+def is_critical(row: Dict[str, Any]) -> bool:
+    """True if a value is CRITICAL_FACTOR times outside its printed range"""
+    low, high, value = row["low"], row["high"], row["value"]
+    if row["status"] == "high" and high:
+        return value > high * CRITICAL_FACTOR
+    if row["status"] == "low" and low:
+        return value < low / CRITICAL_FACTOR
+    return False
+
+
+def critical_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rows whose value needs prompt attention: past the test's critical limits
+    in the reference table, or for tests (and units) the table does not
+    know, CRITICAL_FACTOR times outside the printed range.
+    """
+    if not rows:
+        return []
+    flags = get_reference_index().critical_values(
+        [row["name"] for row in rows],
+        [row["value"] for row in rows],
+        [row["unit"] for row in rows]
+    )
+    return [row for row, flag in zip(rows, flags) if (is_critical(row) if flag is None else flag)]
+
+
+def _urgent_message(names: List[str]) -> str:
+    return (
+        f"{', '.join(names)} {'is' if len(names) == 1 else 'are'} far outside the normal range. "
+        "Please contact your doctor or seek medical care today rather than waiting for your next visit."
+    )
+
+
+def _looks_like_result(line: str) -> bool:
+    """
+    True if a line no row pattern matched still reads as a result: a value
+    with a unit, a qualitative result, or a number next to a known test name.
+    Such lines go to Gemini rather than being dropped.
+    """
+    if RESULT_HINT.search(line):
+        return True
+    return any(c.isdigit() for c in line) and get_reference_index().mentions_test(line)
+
+
+def _make_row(name: str, value: str, unit: Optional[str], range_text: str) -> Optional[Dict[str, Any]]:
+    reference = parse_range(range_text)
+    if reference is None:
+        return None
+    number = _to_float(value)
+    return {
+        "name": " ".join(name.split()).strip(" :-"),
+        "value": number,
+        "unit": (unit or "").strip(),
+        "normal_range": " ".join(range_text.strip("() ").split()),
+        "low": reference["low"],
+        "high": reference["high"],
+        "status": flag_value(number, reference["low"], reference["high"])
+    }
+
+
+def parse_patient(text: str) -> Dict[str, Any]:
+    """
+    Find the patient's age and sex in the report header.
+
+    Returns:
+        {"age": years or None, "sex": "male"/"female" or None}
+    """
+    match = AGE_SEX.search(text)
+    age_match = match or AGE.search(text)
+    sex_match = match or SEX.search(text)
+    sex = sex_match.group("sex").lower() if sex_match else None
+    return {
+        "age": int(age_match.group("age")) if age_match else None,
+        "sex": {"m": "male", "f": "female"}.get(sex, sex)
+    }
+
+
+def _parse_date(date_text: str, time_text: Optional[str]) -> Optional[str]:
+    date_text = " ".join(re.sub(r"[.\-/,]+", " ", date_text).split())
+    for date_format in DATE_FORMATS:
+        try:
+            value = datetime.strptime(date_text, date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    if time_text:
+        time_text = " ".join(re.sub(r"(?i)([ap]m)", r" \1", time_text).upper().split())
+        for time_format in TIME_FORMATS:
+            try:
+                clock = datetime.strptime(time_text, time_format)
+                return value.replace(hour=clock.hour, minute=clock.minute, second=clock.second).isoformat()
+            except ValueError:
+                continue
+    return value.date().isoformat()
+
+
+def parse_report_date(text: str) -> Optional[str]:
+    """
+    Find when the report's sample was collected in the report header.
+
+    The collection date is preferred; the date the report was issued is
+    the fallback.
+
+    Returns:
+        ISO date (or date and time, when printed), or None if no labelled
+        date could be read
+    """
+    for label in (COLLECTION_LABEL, REPORT_LABEL):
+        pattern = re.compile(
+            rf"\b(?:{label})\s*[:\-]?\s*(?P<date>{DATE})(?:\s*[,/]?\s*(?P<time>{TIME}))?",
+            re.IGNORECASE
+        )
+        for match in pattern.finditer(text):
+            value = _parse_date(match.group("date"), match.group("time"))
+            if value is not None:
+                return value
+    return None
+
+
+def _format_range(low: Optional[float], high: Optional[float]) -> str:
+    # Converted limits are rounded to what a report would print
+    if low is None:
+        return f"< {round(high, 2):g}"
+    if high is None:
+        return f"> {round(low, 2):g}"
+    return f"{round(low, 2):g} - {round(high, 2):g}"
+
+
+def parse_lab_text(text: str) -> Dict[str, Any]:
+    """
+    Parse result rows out of extracted report text, one result per line.
+
+    Rows without a printed range are flagged against the reference table
+    for the patient's age and sex (in one vectorized batch), if the test
+    and unit are known.
+
+    Returns:
+        {"rows": parsed rows, "unparsed": lines that look like results but
+        did not match any row pattern, "patient": parse_patient() result}
+    """
+    rows: List[Optional[Dict[str, Any]]] = []
+    unparsed = []
+    # Rows waiting for a reference range: (position in rows, match, line)
+    pending: List[Tuple[int, Any, str]] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = LINE_UNIT_FIRST.match(line) or LINE_RANGE_FIRST.match(line)
+        row = _make_row(match.group("name"), match.group("value"), match.group("unit"), match.group("range")) if match else None
+        if row is not None:
+            rows.append(row)
+            continue
+        match = LINE_NO_RANGE.match(line)
+        if match:
+            pending.append((len(rows), match, line))
+            rows.append(None)
+        elif _looks_like_result(line):
+            unparsed.append(line)
+
+    patient = parse_patient(text)
+    if pending:
+        references = get_reference_index().flag_values(
+            [match.group("name") for _, match, _ in pending],
+            [_to_float(match.group("value")) for _, match, _ in pending],
+            [match.group("unit") or "" for _, match, _ in pending],
+            sex=patient["sex"], age=patient["age"]
+        )
+        for (position, match, line), reference in zip(pending, references):
+            if reference is None:
+                if _looks_like_result(line):
+                    unparsed.append(line)
+                continue
+            rows[position] = {
+                "name": " ".join(match.group("name").split()).strip(" :-"),
+                "value": _to_float(match.group("value")),
+                "unit": (match.group("unit") or "").strip(),
+                "normal_range": _format_range(reference["low"], reference["high"]),
+                "low": reference["low"],
+                "high": reference["high"],
+                "status": reference["status"]
+            }
+
+    return {"rows": [row for row in rows if row is not None], "unparsed": unparsed, "patient": patient}
+
+
+def parse_lab_tables(tables: List[List[List[Optional[str]]]]) -> List[Dict[str, Any]]:
+    """
+    Parse result rows out of pdfplumber extract_tables() output.
+
+    Columns are identified per row: the first text cell is the test name,
+    the first numeric cell its value, the cell that parses as a range the
+    reference range, and a short non-numeric cell after the value the unit.
+    """
+    rows = []
+    value_pattern = re.compile(rf"^(?P<value>{NUMBER})\s*(?:[HL*])?$")
+    for table in tables:
+        for cells in table:
+            cells = [" ".join((cell or "").split()) for cell in cells]
+            name = value = unit = range_text = None
+            for cell in cells:
+                if not cell:
+                    continue
+                if name is None:
+                    if re.match(r"^[A-Za-z]", cell):
+                        name = cell
+                    continue
+                value_match = value_pattern.match(cell)
+                if value is None and value_match:
+                    value = value_match.group("value")
+                elif range_text is None and parse_range(cell) is not None:
+                    range_text = cell
+                elif value is not None and unit is None and re.fullmatch(UNIT, cell):
+                    unit = cell
+            if name and value and range_text:
+                row = _make_row(name, value, unit, range_text)
+                if row is not None:
+                    rows.append(row)
+    return rows
+
+
+# Patient-friendly notes for the common CBC, LFT and lipid panel tests, so
+# reports made only of these can be explained without an LLM call.
+# reference test name -> (meaning if low, meaning if high, recommendation)
+PANEL_TEST_NOTES: Dict[str, Tuple[str, str, str]] = {
+    "hemoglobin": (
+        "Your hemoglobin, which carries oxygen in your blood, is lower than usual. This can cause tiredness and is often linked to low iron.",
+        "Your hemoglobin is higher than usual. This can happen with dehydration, smoking or living at high altitude.",
+        "Discuss this with your doctor, who may check your iron levels or repeat the test."
+    ),
+    "wbc": (
+        "Your white blood cell count is lower than usual. These cells fight infection, and some medicines or recent viral illness can lower them.",
+        "Your white blood cell count is higher than usual. This is often a sign your body is fighting an infection or inflammation.",
+        "Mention any recent fever or infection to your doctor, who may repeat the test."
+    ),
+    "platelets": (
+        "Your platelet count is lower than usual. Platelets help your blood clot, so you may bruise more easily.",
+        "Your platelet count is higher than usual. This can follow an infection, inflammation or low iron.",
+        "Your doctor can tell you whether this needs a repeat test."
+    ),
+    "rbc": (
+        "Your red blood cell count is lower than usual, which can go along with anemia.",
+        "Your red blood cell count is higher than usual, which can happen with dehydration.",
+        "Discuss this together with your hemoglobin result with your doctor."
+    ),
+    "hematocrit": (
+        "The share of your blood made up of red cells is lower than usual, which can go along with anemia.",
+        "The share of your blood made up of red cells is higher than usual, often from dehydration.",
+        "Drink enough fluids and discuss the result with your doctor."
+    ),
+    "mcv": (
+        "Your red blood cells are smaller than usual, which is commonly seen with low iron.",
+        "Your red blood cells are larger than usual, which can be linked to low vitamin B12 or folate.",
+        "Your doctor may check your iron or vitamin levels."
+    ),
+    "alt": (
+        "Your ALT liver enzyme is lower than usual, which is rarely a concern.",
+        "Your ALT liver enzyme is higher than usual. This can be caused by fatty liver, alcohol, some medicines or recent illness.",
+        "Limit alcohol and ask your doctor whether the liver tests should be repeated."
+    ),
+    "ast": (
+        "Your AST enzyme is lower than usual, which is rarely a concern.",
+        "Your AST enzyme is higher than usual. It can rise with liver strain, heavy exercise or some medicines.",
+        "Limit alcohol and ask your doctor whether the liver tests should be repeated."
+    ),
+    "alkaline phosphatase": (
+        "Your alkaline phosphatase is lower than usual, which is usually not a concern.",
+        "Your alkaline phosphatase is higher than usual. It comes from the liver and bones and can rise with either.",
+        "Your doctor can tell you whether further tests are needed."
+    ),
+    "bilirubin": (
+        "Your bilirubin is lower than usual, which is not a concern.",
+        "Your bilirubin is higher than usual. It is processed by the liver, and mild rises are common and often harmless.",
+        "Discuss this with your doctor, especially if you notice yellowing of the skin or eyes."
+    ),
+    "albumin": (
+        "Your albumin, a protein made by the liver, is lower than usual. It can be affected by diet, liver or kidney health.",
+        "Your albumin is higher than usual, which usually points to dehydration.",
+        "Make sure you eat and drink well, and discuss the result with your doctor."
+    ),
+    "total cholesterol": (
+        "Your total cholesterol is lower than usual, which is generally not a concern.",
+        "Your total cholesterol is higher than recommended, which over time can raise the risk of heart disease.",
+        "A diet lower in saturated fat, regular exercise and a follow-up with your doctor can help."
+    ),
+    "ldl": (
+        "Your LDL cholesterol is lower than usual, which is generally good.",
+        "Your LDL (\"bad\") cholesterol is higher than recommended, which over time can raise the risk of heart disease.",
+        "A diet lower in saturated fat, regular exercise and a follow-up with your doctor can help."
+    ),
+    "hdl": (
+        "Your HDL (\"good\") cholesterol is lower than recommended. Regular exercise is one of the best ways to raise it.",
+        "Your HDL (\"good\") cholesterol is higher than usual, which is generally good.",
+        "Keep active and discuss your overall cholesterol with your doctor."
+    ),
+    "triglycerides": (
+        "Your triglycerides are lower than usual, which is generally not a concern.",
+        "Your triglycerides, a type of blood fat, are higher than recommended. Sugar, alcohol and not fasting before the test can raise them.",
+        "Cut down on sugary foods and alcohol, and ask your doctor whether to repeat the test fasting."
+    ),
+}
+
+def canonical_test_name(name: str) -> str:
+    """Reference table name of a test ("SGPT (ALT)" -> "alt"), else the normalized name"""
+    return get_reference_index().canonical_name(name)
+
+
+def panel_note(row: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Explanation and recommendation for an abnormal panel test, if known"""
+    note = PANEL_TEST_NOTES.get(canonical_test_name(row["name"]))
+    if note is None or row["status"] == "normal":
+        return None
+    low_text, high_text, recommendation = note
+    return {
+        "explanation": low_text if row["status"] == "low" else high_text,
+        "recommendation": recommendation
+    }
+
+
+def _format_value(value: float) -> str:
+    return f"{value:g}"
+
+
+def build_analysis(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the analysis result (same shape as Gemini's) from parsed rows.
+
+    Abnormal values of known panel tests get their notes; the others are
+    left with empty explanations for Gemini to fill in. urgent_attention is
+    set when any value is past its critical limits.
+    """
+    values, abnormal_values, unique_rows, seen = [], [], [], set()
+    for row in rows:
+        # Multi-page reports often repeat rows in their headers/footers
+        key = (canonical_test_name(row["name"]), row["value"], row["unit"])
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_rows.append(row)
+
+        value = {
+            "name": row["name"],
+            "value": _format_value(row["value"]),
+            "unit": row["unit"],
+            "status": row["status"],
+            "normal_range": row["normal_range"]
+        }
+        values.append(value)
+        if row["status"] != "normal":
+            note = panel_note(row) or {"explanation": "", "recommendation": ""}
+            abnormal_values.append({**value, **note})
+
+    critical = [row["name"] for row in critical_rows(unique_rows)]
+    return {
+        "values": values,
+        "abnormal_values": abnormal_values,
+        "summary": _local_summary(values, abnormal_values, urgent=bool(critical)),
+        "urgent_attention": bool(critical),
+        "urgent_message": _urgent_message(critical) if critical else ""
+    }
+
+
+def _local_summary(values: List[Dict], abnormal_values: List[Dict], urgent: bool = False) -> str:
+    if not abnormal_values:
+        return f"All {len(values)} of your results are within their normal ranges. Keep up your healthy habits."
+    names = ", ".join(value["name"] for value in abnormal_values)
+    normal = len(values) - len(abnormal_values)
+    return (
+        f"{normal} of your {len(values)} results are within their normal ranges. "
+        f"{names} {'is' if len(abnormal_values) == 1 else 'are'} outside the normal range; "
+        + ("see the notes below and contact your doctor today." if urgent else
+           "see the notes below and discuss them with your doctor at your next visit.")
+    )
+
+
+def needs_llm(parsed: Dict[str, Any], analysis: Dict[str, Any]) -> bool:
+    """
+    True if Gemini still has to look at the report: there are result-like
+    lines the parser could not read, an abnormal value without a local note,
+    or a critical value that should be explained with more care than the
+    panel notes give (urgent_attention is already set locally).
+    """
+    if parsed["unparsed"]:
+        return True
+    if any(not value["explanation"] for value in analysis["abnormal_values"]):
+        return True
+    return bool(analysis["urgent_attention"])
+
+
+def apply_reference_flags(analysis: Dict[str, Any], patient: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Recompute the status of values Gemini extracted from a report's full text.
+
+    Values with a printed range are compared with it, the others with the
+    reference table, so abnormal flags are a numeric comparison rather
+    than the model's judgement. abnormal_values is updated to match; values
+    whose status cannot be computed keep Gemini's. Values past their critical
+    limits set urgent_attention, which Gemini cannot clear, and the urgent
+    message names them; without them only an urgent_attention Gemini set
+    keeps its message.
+    """
+    patient = patient or {}
+    values = [value for value in analysis.get("values") or [] if isinstance(value, dict)]
+    statuses: Dict[int, str] = {}
+    lookup: List[Tuple[int, float]] = []
+    numeric_rows: List[Dict[str, Any]] = []
+    for i, value in enumerate(values):
+        try:
+            number = _to_float(str(value.get("value", "")).strip())
+        except ValueError:
+            continue
+        reference = parse_range(str(value.get("normal_range") or ""))
+        if reference is not None:
+            statuses[i] = flag_value(number, reference["low"], reference["high"])
+        else:
+            lookup.append((i, number))
+            reference = {"low": None, "high": None}
+        numeric_rows.append({
+            "name": str(value.get("name", "")),
+            "value": number,
+            "unit": str(value.get("unit") or ""),
+            "low": reference["low"],
+            "high": reference["high"],
+            "status": statuses.get(i, "normal")
+        })
+
+    if lookup:
+        references = get_reference_index().flag_values(
+            [str(values[i].get("name", "")) for i, _ in lookup],
+            [number for _, number in lookup],
+            [str(values[i].get("unit") or "") for i, _ in lookup],
+            sex=patient.get("sex"), age=patient.get("age")
+        )
+        for (i, _), reference in zip(lookup, references):
+            if reference is not None:
+                statuses[i] = reference["status"]
+                if not values[i].get("normal_range"):
+                    values[i]["normal_range"] = _format_range(reference["low"], reference["high"])
+
+    abnormal = {
+        str(value.get("name", "")).lower(): value
+        for value in analysis.get("abnormal_values") or [] if isinstance(value, dict)
+    }
+    for i, status in statuses.items():
+        value = values[i]
+        value["status"] = status
+        key = str(value.get("name", "")).lower()
+        if status == "normal":
+            abnormal.pop(key, None)
+        elif key in abnormal:
+            abnormal[key]["status"] = status
+        else:
+            note = panel_note({"name": str(value.get("name", "")), "status": status})
+            abnormal[key] = {**value, **(note or {"explanation": "", "recommendation": ""})}
+
+    analysis["abnormal_values"] = list(abnormal.values())
+
+    critical = [row["name"] for row in critical_rows(numeric_rows)]
+    if critical:
+        analysis["urgent_attention"] = True
+        analysis["urgent_message"] = _urgent_message(critical)
+    elif not analysis.get("urgent_attention"):
+        # Gemini fills the field even when nothing is urgent
+        analysis["urgent_message"] = ""
+    return analysis
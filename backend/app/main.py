@@ -11,19 +11,26 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime
 import json
+import asyncio
 
 from .alert_engine import AlertEngine, Alert
 from .emotion_analyzer import EmotionAnalyzer, EmotionResult
+from .emotion_tracker import EmotionTrackerRegistry
 from .database import DatabaseClient
 from .stt_pipeline import get_stt_pipeline, validate_stt_configuration
 from .audio_converter_ffmpeg import get_audio_converter
 from .appointments import router as appointments_router
 from .lab_reports import router as lab_reports_router
+from .lab_report_analyzer import shutdown_lab_report_analyzer
+from .lab_reference import get_reference_index
+from .image_preprocess import shutdown_image_preprocessor
 from .medical_images import router as medical_images_router
 from .signaling import router as signaling_router
 from .health_tips import router as health_tips_router
 from .captions import router as captions_router
-from .summarizer import generate_notes_with_empathy
+from .jobs import router as jobs_router
+from .job_queue import get_job_queue
+from .rolling_summarizer import get_rolling_summarizer
 import logging
 
 # Configure logging
@@ -69,6 +76,13 @@ async def startup_validation():
     else:
         logger.info("\n✅ All critical services initialized successfully")
     
+    # Load the lab reference ranges once, before the first report comes in
+    reference_stats = get_reference_index().get_stats()
+    logger.info(f"   Lab Reference Ranges: ✅ {reference_stats['tests']} tests, {reference_stats['names']} names")
+    
+    # Resume background jobs left over from the last run
+    await get_job_queue().start()
+    
     logger.info("=" * 80)
 
 # Include appointment routes
@@ -84,6 +98,8 @@ app.include_router(signaling_router)
 app.include_router(health_tips_router)
 # Include captions routes for live transcription
 app.include_router(captions_router)
+# Include background job status routes
+app.include_router(jobs_router)
 
 # Enable CORS for frontend integration
 app.add_middleware(
@@ -97,15 +113,26 @@ app.add_middleware(
 # Initialize services
 alert_engine = AlertEngine()
 emotion_analyzer = EmotionAnalyzer()
+emotion_trackers = EmotionTrackerRegistry(emotion_analyzer)
 db_client = DatabaseClient()
 stt_pipeline = get_stt_pipeline()
 audio_converter = get_audio_converter()
 
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Stop background worker processes."""
+    await get_job_queue().stop()
+    emotion_analyzer.shutdown()
+    shutdown_lab_report_analyzer()
+    shutdown_image_preprocessor()
+
+
 # WebSocket connection manager
 class ConnectionManager:
     """Manages WebSocket connections for real-time communication"""
     
-    def _init_(self):
+    def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
     
     async def connect(self, user_id: str, websocket: WebSocket):
@@ -123,6 +150,16 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+async def push_emotion_stats(user_id: str, summary: dict):
+    """Push a user's updated emotion summary to their emotion socket."""
+    await manager.send_personal_message({
+        "type": "stats_update",
+        "data": summary
+    }, user_id)
+
+db_client.emotion_stats.add_listener(push_emotion_stats)
+
+
 class TranscriptRequest(BaseModel):
     """Request model for transcript analysis"""
     text: str
@@ -303,21 +340,88 @@ async def delete_user_emotions(user_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def publish_emotion_change(user_id: str, consultation_id: Optional[str], result):
+    """
+    Log a changed emotional state and push it to the user's emotion socket.
+    
+    Args:
+        user_id: ID of the speaker
+        consultation_id: Consultation the audio belongs to
+        result: EmotionResult returned by a StreamingEmotionTracker
+    """
+    await db_client.log_emotion(
+        user_id=user_id,
+        emotion_type=result.emotion_type,
+        confidence_score=result.confidence_score,
+        consultation_id=consultation_id
+    )
+    await manager.send_personal_message({
+        "type": "emotion_update",
+        "data": {
+            **result.to_dict(),
+            **emotion_analyzer.get_emotion_info(result.emotion_type),
+            "consultation_id": consultation_id
+        }
+    }, user_id)
+
+
+# Emotion tracking tasks running next to speech-to-text, kept referenced until done
+emotion_tasks: set = set()
+
+
+async def track_emotion(
+    tracker,
+    audio_chunk,
+    user_id: str,
+    consultation_id: Optional[str],
+    previous: Optional[asyncio.Task] = None
+):
+    """
+    Fold a chunk into a speaker's emotion tracker and publish a changed state.
+    
+    Runs as its own task so captions never wait for emotion analysis. The
+    chunk is featurized right away, but folded into the window only after
+    the previous chunk's task, so the window stays in arrival order.
+    Errors are logged and never reach the socket.
+    """
+    try:
+        frames = await tracker.analyzer.frame_features(audio_chunk)
+        if previous is not None:
+            await asyncio.wait([previous])
+        emotion = tracker.add_frames(frames)
+        if emotion:
+            await publish_emotion_change(user_id, consultation_id, emotion)
+    except Exception as e:
+        print(f"⚠️  Emotion tracking error: {e}")
+
+
 @app.websocket("/ws/{consultation_id}/{user_type}")
-async def video_call_websocket(websocket: WebSocket, consultation_id: str, user_type: str):
+async def video_call_websocket(
+    websocket: WebSocket,
+    consultation_id: str,
+    user_type: str,
+    user_id: Optional[str] = None
+):
     """
     WebSocket endpoint for video call room with real-time translation.
     
     Handles audio streaming and returns translated captions.
     
+    Each audio chunk is decoded once and the same PCM feeds both STT and,
+    for patients, the streaming emotion tracker. Emotion changes are pushed
+    to the patient's /ws/emotions socket, never on this caption socket.
+    
     Args:
         websocket: WebSocket connection
         consultation_id: ID of the consultation
         user_type: Type of user (doctor or patient)
+        user_id: Optional ID of the speaker, enables emotion tracking (query parameter)
     """
     connection_id = f"{consultation_id}_{user_type}"
     await websocket.accept()
     print(f"Video call WebSocket connected: {connection_id}")
+    # Latest emotion tracking task of this socket; each new one waits for it
+    emotion_task: Optional[asyncio.Task] = None
     
     try:
         while True:
@@ -339,16 +443,30 @@ async def video_call_websocket(websocket: WebSocket, consultation_id: str, user_
                     continue
                 
                 print(f"✅ Audio validation passed")
-                print(f"✅ Sending {len(audio_data)} bytes directly to Google Cloud (OGG Opus)")
                 
-                # Process audio through STT pipeline (no conversion needed for OGG Opus)
+                # Decode once (FFmpeg, off the event loop); STT and emotion
+                # analysis share the same PCM
+                loop = asyncio.get_running_loop()
+                decoded = await loop.run_in_executor(None, stt_pipeline.decode_audio, audio_data)
+                
+                if decoded is not None and user_type == "patient" and user_id:
+                    # Emotion tracking runs alongside STT instead of ahead of it
+                    emotion_task = asyncio.create_task(track_emotion(
+                        emotion_trackers.get_tracker(consultation_id, user_id),
+                        decoded, user_id, consultation_id, previous=emotion_task
+                    ))
+                    emotion_tasks.add(emotion_task)
+                    emotion_task.add_done_callback(emotion_tasks.discard)
+                
+                # Process audio through STT pipeline
                 try:
                     print(f"🔄 Processing through STT pipeline...")
                     result = await stt_pipeline.process_audio_stream(
                         audio_chunk=audio_data,
                         user_type=user_type,
                         consultation_id=consultation_id,
-                        db_client=db_client
+                        db_client=db_client,
+                        decoded=decoded
                     )
                     
                     print(f"✅ STT result: {result}")
@@ -386,6 +504,12 @@ async def video_call_websocket(websocket: WebSocket, consultation_id: str, user_
     except Exception as e:
         print(f"Video call WebSocket error: {e}")
     finally:
+        if user_id:
+            emotion_trackers.remove_tracker(consultation_id, user_id)
+        # Fold the last transcript lines into the SOAP draft right away
+        rolling_summarizer = get_rolling_summarizer()
+        if rolling_summarizer is not None:
+            rolling_summarizer.flush(consultation_id)
         # Clean up connection
         try:
             await websocket.close()
@@ -394,24 +518,48 @@ async def video_call_websocket(websocket: WebSocket, consultation_id: str, user_
 
 
 @app.websocket("/ws/emotions/{user_id}")
-async def emotion_websocket(websocket: WebSocket, user_id: str):
+async def emotion_websocket(websocket: WebSocket, user_id: str, consultation_id: Optional[str] = None):
     """
     WebSocket endpoint for real-time emotion updates.
     
     Clients connect and receive emotion updates in real-time.
     Can also send simulated emotions for testing.
     
+    Binary messages are treated as audio chunks from this user. They are
+    folded into a streaming per-speaker tracker, and an "emotion_update" is
+    pushed (and logged) only when the smoothed emotional state changes.
+    
     Args:
         websocket: WebSocket connection
         user_id: ID of the user
+        consultation_id: Optional consultation the audio belongs to (query parameter)
     """
     await manager.connect(user_id, websocket)
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            # Audio chunk: update the rolling emotion state
+            if message.get("bytes") is not None:
+                try:
+                    tracker = emotion_trackers.get_tracker(consultation_id, user_id)
+                    loop = asyncio.get_running_loop()
+                    decoded = await loop.run_in_executor(None, stt_pipeline.decode_audio, message["bytes"])
+                    result = await tracker.update_async(decoded if decoded is not None else message["bytes"])
+                    
+                    if result:
+                        await publish_emotion_change(user_id, consultation_id, result)
+                except Exception as e:
+                    # One bad chunk must not drop the socket
+                    print(f"⚠️  Emotion tracking error for {user_id}: {e}")
+                continue
             
+            data = json.loads(message.get("text") or "{}")
             message_type = data.get("type")
             
             if message_type == "emotion_update":
@@ -432,7 +580,7 @@ async def emotion_websocket(websocket: WebSocket, user_id: str):
                 }, user_id)
             
             elif message_type == "get_stats":
-                # Send current stats
+                # Send current stats (served from the in-memory aggregate)
                 stats = await db_client.get_emotion_summary(user_id)
                 await manager.send_personal_message({
                     "type": "stats_update",
@@ -440,10 +588,12 @@ async def emotion_websocket(websocket: WebSocket, user_id: str):
                 }, user_id)
     
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
         manager.disconnect(user_id)
+        emotion_trackers.remove_tracker(consultation_id, user_id)
 
 
 # ============================================================================
@@ -524,80 +674,27 @@ async def get_patterns():
 # SOAP NOTES GENERATION ENDPOINTS
 # ============================================================================
 
-@app.post("/api/consultations/{consultation_id}/generate_soap")
-async def generate_soap_notes(consultation_id: str):
+@app.get("/api/consultations/{consultation_id}/soap_draft")
+async def get_soap_draft(consultation_id: str):
     """
-    Generate SOAP notes for a consultation.
-    
-    Fetches the consultation transcript, generates SOAP notes using AI,
-    analyzes for stigmatizing language, and saves the results to the database.
+    Get the rolling SOAP draft kept while a consultation is in progress.
     
     Args:
         consultation_id: ID of the consultation
     
     Returns:
-        Dictionary with generated SOAP notes and de-stigmatization suggestions
-    
-    Raises:
-        HTTPException: If consultation not found or generation fails
+        Current draft sections and how much of the transcript they cover
     """
-    try:
-        # 1. Fetch the consultation transcript
-        logger.info(f"Fetching transcript for consultation {consultation_id}")
-        transcript = await db_client.get_transcript(consultation_id)
-        
-        if not transcript:
-            logger.error(f"Consultation {consultation_id} not found or has no transcript")
-            raise HTTPException(
-                status_code=404,
-                detail="Consultation not found"
-            )
-        
-        # 2. Generate SOAP notes with Compassion Reflex
-        logger.info(f"Generating SOAP notes for consultation {consultation_id}")
-        soap_note, stigma_suggestions = await generate_notes_with_empathy(transcript)
-        
-        # 3. Save to database
-        logger.info(f"Saving SOAP notes to database for consultation {consultation_id}")
-        try:
-            db_client.client.table("consultations")\
-                .update({
-                    "raw_soap_note": soap_note,
-                    "de_stigma_suggestions": stigma_suggestions,
-                    "soap_notes": soap_note,  # Also update old column for compatibility
-                    "stigma_suggestions": stigma_suggestions  # Also update old column
-                })\
-                .eq("id", consultation_id)\
-                .execute()
-            
-            logger.info(f"SOAP notes saved successfully for consultation {consultation_id}")
-        except Exception as db_error:
-            logger.error(f"Error saving SOAP notes to database: {db_error}")
-            # Continue anyway - we can still return the generated notes
-        
-        # 4. Return the generated notes
-        return {
-            "success": True,
-            "consultation_id": consultation_id,
-            "soap_note": soap_note,
-            "stigma_suggestions": stigma_suggestions,
-            "message": "SOAP notes generated successfully"
-        }
+    rolling_summarizer = get_rolling_summarizer()
+    draft = rolling_summarizer.get_draft(consultation_id) if rolling_summarizer else None
+    if draft is None:
+        raise HTTPException(status_code=404, detail="No SOAP draft for this consultation")
     
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
-    except ValueError as ve:
-        logger.error(f"Validation error generating SOAP notes: {ve}")
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        logger.error(f"Error generating SOAP notes: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate SOAP notes: {str(e)}"
-        )
+    return {
+        "success": True,
+        "consultation_id": consultation_id,
+        **draft
+    }
 
 
 @app.get("/api/consultations/{consultation_id}/soap")
@@ -132,7 +132,8 @@ Format your response as JSON with these keys:
         image_data: bytes,
         body_part: Optional[str] = None,
         symptoms: Optional[List[str]] = None,
-        patient_description: Optional[str] = None
+        patient_description: Optional[str] = None,
+        mime_type: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Analyze a medical image using Gemini Vision
@@ -142,24 +143,30 @@ Format your response as JSON with these keys:
             body_part: Body part shown in image
             symptoms: List of symptoms patient is experiencing
             patient_description: Patient's description of the condition
+            mime_type: Set for an already prepared rendition (see
+                image_preprocess), which is sent as is instead of being
+                decoded and resized here
             
         Returns:
             Dictionary with analysis results
         """
         try:
-            # Load image
-            pil_image = Image.open(io.BytesIO(image_data))
-            
-            # Resize if too large (max 4MB for Gemini)
-            max_size = (2048, 2048)
-            if pil_image.size[0] > max_size[0] or pil_image.size[1] > max_size[1]:
-                pil_image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            if mime_type:
+                image_part = {"mime_type": mime_type, "data": image_data}
+            else:
+                # Load image
+                image_part = Image.open(io.BytesIO(image_data))
+                
+                # Resize if too large (max 4MB for Gemini)
+                max_size = (2048, 2048)
+                if image_part.size[0] > max_size[0] or image_part.size[1] > max_size[1]:
+                    image_part.thumbnail(max_size, Image.Resampling.LANCZOS)
             
             # Create prompt
             prompt = self._create_analysis_prompt(body_part, symptoms, patient_description)
             
             # Generate analysis
-            response = self.model.generate_content([prompt, pil_image])
+            response = await self.model.generate_content_async([prompt, image_part])
             
             # Parse response
             response_text = response.text.strip()
@@ -215,12 +222,30 @@ Format your response as JSON with these keys:
                 "disclaimer": "Analysis failed. Please consult a healthcare professional."
             }
     
+    def _metrics_context(self, metrics: Dict[str, Any]) -> str:
+        """Local measurements as prompt context for a comparison"""
+        area = metrics['lesion_area']
+        redness = metrics['lesion_redness']
+        lines = [
+            "MEASURED FROM THE PIXELS (automatic, approximate; sensitive to lighting and framing):",
+            f"- Affected area: {area['before_fraction'] * 100:.1f}% of the image before, "
+            f"{area['after_fraction'] * 100:.1f}% after ({area['change_percent']:+.0f}%)",
+            f"- Color similarity of the affected region: {metrics['color_histogram_similarity']:.2f} (1 = identical)",
+            f"- Structural similarity (SSIM): {metrics['ssim']:.2f} (1 = identical)"
+        ]
+        if redness['before'] is not None and redness['after'] is not None:
+            lines.append(f"- Redness of the affected area: {redness['before']:.0f} before, {redness['after']:.0f} after")
+        lines.append("Use these numbers to support your visual assessment, not to replace it.")
+        return "\n".join(lines)
+    
     async def compare_images(
         self,
         before_image_data: bytes,
         after_image_data: bytes,
         days_between: int,
-        condition_type: Optional[str] = None
+        condition_type: Optional[str] = None,
+        mime_types: Optional[List[str]] = None,
+        metrics: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Compare two images to track healing progress
@@ -230,25 +255,34 @@ Format your response as JSON with these keys:
             after_image_data: Follow-up image bytes
             days_between: Number of days between images
             condition_type: Type of condition being tracked
+            mime_types: Content types (before, after) of prepared
+                renditions, which are sent as is
+            metrics: Local measurements (see healing_metrics), added to
+                the prompt as context
             
         Returns:
             Dictionary with comparison results
         """
         try:
-            # Load images
-            before_image = Image.open(io.BytesIO(before_image_data))
-            after_image = Image.open(io.BytesIO(after_image_data))
-            
-            # Resize if needed
-            max_size = (2048, 2048)
-            before_image.thumbnail(max_size, Image.Resampling.LANCZOS)
-            after_image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            if mime_types:
+                before_image = {"mime_type": mime_types[0], "data": before_image_data}
+                after_image = {"mime_type": mime_types[1], "data": after_image_data}
+            else:
+                # Load images
+                before_image = Image.open(io.BytesIO(before_image_data))
+                after_image = Image.open(io.BytesIO(after_image_data))
+                
+                # Resize if needed
+                max_size = (2048, 2048)
+                before_image.thumbnail(max_size, Image.Resampling.LANCZOS)
+                after_image.thumbnail(max_size, Image.Resampling.LANCZOS)
             
             prompt = f"""Compare these two medical images taken {days_between} days apart.
 
 FIRST IMAGE: Initial condition (BEFORE)
 SECOND IMAGE: Current condition (AFTER)
 {f'CONDITION TYPE: {condition_type}' if condition_type else ''}
+{self._metrics_context(metrics) if metrics else ''}
 
 Provide a detailed comparison:
 
@@ -296,7 +330,7 @@ Format as JSON:
 }}
 """
             
-            response = self.model.generate_content([prompt, before_image, after_image])
+            response = await self.model.generate_content_async([prompt, before_image, after_image])
             response_text = response.text.strip()
             
             # Parse JSON
@@ -3,7 +3,7 @@ Pydantic models for medical image analysis
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from uuid import UUID
 
@@ -58,6 +58,8 @@ class MedicalImageResponse(BaseModel):
     patient_id: UUID
     appointment_id: Optional[UUID]
     image_url: str
+    thumbnail_url: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
     image_type: str
     body_part: Optional[str]
     patient_description: Optional[str]
@@ -80,6 +82,10 @@ class ImageComparisonRequest(BaseModel):
     before_image_id: UUID
     after_image_id: UUID
     condition_type: Optional[str] = None
+    mode: Literal["full", "fast"] = Field(
+        "full",
+        description="full: Gemini comparison with local measurements as context; fast: local measurements only"
+    )
 
 class ImageComparisonResponse(BaseModel):
     """Response from image comparison"""
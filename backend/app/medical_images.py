@@ -2,13 +2,16 @@
 Medical Image Analysis API endpoints
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, Response
 from typing import Optional, List
-from uuid import UUID
+from uuid import UUID, uuid4
+from pathlib import Path
 import os
 from datetime import datetime
 import json
+import time
+import asyncio
 
 from .medical_image_analyzer import MedicalImageAnalyzer
 from .medical_image_models import (
@@ -17,6 +20,11 @@ from .medical_image_models import (
     ImageComparisonResponse,
     DoctorNoteUpdate
 )
+from .job_queue import get_job_queue, JOB_QUEUED
+from .image_preprocess import get_image_preprocessor, content_type_for
+from .rendition_store import get_rendition_store, RENDITION_KINDS
+from .image_hash_index import ImageHashIndex, to_signed
+from .healing_metrics import compute_healing_metrics, metrics_comparison
 from supabase import create_client, Client
 
 router = APIRouter(prefix="/api/medical-images", tags=["medical-images"])
@@ -30,8 +38,13 @@ supabase: Client = create_client(
 # Initialize analyzer
 analyzer = MedicalImageAnalyzer()
 
+# Images waiting for a background analysis job
+PENDING_DIR = Path("uploads/medical_images_pending")
+PENDING_DIR.mkdir(parents=True, exist_ok=True)
+
 @router.post("/upload", response_model=MedicalImageResponse)
 async def upload_medical_image(
+    response: Response,
     file: UploadFile = File(...),
     patient_id: str = Form(...),
     body_part: Optional[str] = Form(None),
@@ -40,7 +53,8 @@ async def upload_medical_image(
     image_type: str = Form("other"),
     appointment_id: Optional[str] = Form(None),
     is_follow_up: bool = Form(False),
-    parent_image_id: Optional[str] = Form(None)
+    parent_image_id: Optional[str] = Form(None),
+    background: bool = Query(False, description="Queue the analysis and return a job id")
 ):
     """
     Upload and analyze a medical image
@@ -54,6 +68,10 @@ async def upload_medical_image(
     - **appointment_id**: Related appointment (optional)
     - **is_follow_up**: Is this a follow-up image?
     - **parent_image_id**: Original image ID for follow-ups
+    - **background**: Return 202 with a job id instead of waiting for the analysis
+    
+    The time of each step is returned in a Server-Timing header and kept in
+    the record's metadata.timings_ms.
     """
     try:
         # Validate file type
@@ -75,93 +93,35 @@ async def upload_medical_image(
             except json.JSONDecodeError:
                 symptoms_list = [symptoms]
         
-        # Upload to Supabase Storage
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        storage_path = f"{patient_id}/{timestamp}_{file.filename}"
-        
-        storage_response = supabase.storage.from_('medical-images').upload(
-            storage_path,
-            image_data,
-            file_options={"content-type": file.content_type}
-        )
-        
-        # Get public URL
-        image_url = supabase.storage.from_('medical-images').get_public_url(storage_path)
-        
-        # Analyze image with Gemini Vision
-        analysis = await analyzer.analyze_image(
-            image_data=image_data,
-            body_part=body_part,
-            symptoms=symptoms_list,
-            patient_description=patient_description
-        )
-        
-        # Ensure analysis is a dict, not a string
-        if isinstance(analysis, str):
-            try:
-                analysis = json.loads(analysis)
-            except json.JSONDecodeError:
-                analysis = {
-                    "visual_description": analysis,
-                    "severity": "unknown",
-                    "possible_conditions": [],
-                    "recommendations": {},
-                    "disclaimer": "This is not a medical diagnosis. Please consult a healthcare professional."
-                }
-        
-        # Extract key information from analysis
-        severity_level = analysis.get('severity', 'unknown')
-        detected_conditions = [
-            cond.get('name', '') 
-            for cond in analysis.get('possible_conditions', [])
-        ]
-        recommendations_list = []
-        if 'recommendations' in analysis:
-            recs = analysis['recommendations']
-            if isinstance(recs, dict):
-                recommendations_list = recs.get('home_care', []) + recs.get('monitoring', [])
-        
-        requires_immediate = analysis.get('requires_immediate_attention', False)
-        
-        # Calculate days since previous if follow-up
-        days_since_previous = None
-        if is_follow_up and parent_image_id:
-            try:
-                parent = supabase.table('medical_images').select('uploaded_at').eq('id', parent_image_id).single().execute()
-                if parent.data:
-                    parent_date = datetime.fromisoformat(parent.data['uploaded_at'].replace('Z', '+00:00'))
-                    days_since_previous = (datetime.now() - parent_date).days
-            except Exception as e:
-                print(f"Error calculating days since previous: {e}")
-        
-        # Save to database
-        image_record = {
+        upload = {
+            'filename': file.filename,
+            'content_type': file.content_type,
             'patient_id': patient_id,
-            'appointment_id': appointment_id if appointment_id else None,
-            'image_url': image_url,
-            'storage_path': storage_path,
-            'image_type': image_type,
             'body_part': body_part,
-            'patient_description': patient_description,
             'symptoms': symptoms_list,
-            'ai_analysis': analysis,
-            'severity_level': severity_level,
-            'detected_conditions': detected_conditions,
-            'recommendations': recommendations_list,
-            'requires_immediate_attention': requires_immediate,
-            'analyzed_at': datetime.now().isoformat(),
+            'patient_description': patient_description,
+            'image_type': image_type,
+            'appointment_id': appointment_id,
             'is_follow_up': is_follow_up,
-            'parent_image_id': parent_image_id if parent_image_id else None,
-            'days_since_previous': days_since_previous
+            'parent_image_id': parent_image_id
         }
         
-        result = supabase.table('medical_images').insert(image_record).execute()
-        
-        if not result.data:
-            raise HTTPException(status_code=500, detail="Failed to save image record")
-        
-        return result.data[0]
+        if background:
+            # Keep the bytes on disk so the job survives a restart
+            pending_path = PENDING_DIR / f"{uuid4()}_{os.path.basename(file.filename)}"
+            pending_path.write_bytes(image_data)
+            job_id = await get_job_queue().submit("medical_image", {**upload, 'pending_path': str(pending_path)})
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "message": "Image queued for analysis",
+                "job_id": job_id,
+                "status": JOB_QUEUED
+            })
+        
+        record = await process_medical_image(image_data, upload)
+        timings = (record.get('metadata') or {}).get('timings_ms', {})
+        response.headers['Server-Timing'] = ', '.join(f"{step};dur={ms}" for step, ms in timings.items())
+        return record
         
     except HTTPException:
         raise
@@ -169,6 +129,317 @@ async def upload_medical_image(
         print(f"Error uploading medical image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
 
+
+async def process_medical_image(image_data: bytes, upload: dict, report_progress=None) -> dict:
+    """
+    Store an uploaded image, analyze it and save the image record.
+    
+    The image is decoded once in a worker process into an analysis-size
+    rendition (EXIF stripped) and a thumbnail; those are what gets stored,
+    analyzed and shown, never the original upload.
+    
+    Storage upload, analysis and the parent lookup run concurrently, so
+    the upload takes about as long as its slowest step; the time of each
+    step is kept in metadata.timings_ms.
+    
+    The image's perceptual hashes are matched against the patient's other
+    images. A near-duplicate reuses that image's analysis instead of calling
+    Gemini only if it has the same bytes or was uploaded with the same body
+    part, symptoms and description; otherwise the match is only recorded as
+    a suggestion. A follow-up sent without parent_image_id gets the most
+    similar prior image as its parent.
+    
+    Args:
+        image_data: Raw image bytes
+        upload: Form fields of the upload (patient_id, body_part, symptoms, ...)
+        report_progress: Optional progress callback (fraction, message)
+    
+    Returns:
+        The saved medical_images row
+    """
+    started = time.perf_counter()
+    patient_id = upload['patient_id']
+    is_follow_up = upload['is_follow_up']
+    parent_image_id = upload['parent_image_id']
+    
+    timings = {}
+    
+    if report_progress:
+        report_progress(0.05, "Preparing image")
+    
+    try:
+        prepared = await _timed(timings, 'prepare', get_image_preprocessor().prepare(image_data))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Images too flat to hash are not matched against anything
+    matches = []
+    if prepared.phash is not None:
+        matches = await _timed(timings, 'hash_lookup', asyncio.to_thread(
+            hash_index.nearest, patient_id, prepared.phash, prepared.dhash
+        ))
+    best = matches[0] if matches else None
+    duplicate_of = best['image_id'] if best and best['duplicate'] else None
+    suggested_parent_id = best['image_id'] if best and best['follow_up'] else None
+    if is_follow_up and not parent_image_id:
+        parent_image_id = suggested_parent_id
+    
+    if report_progress:
+        report_progress(0.1, "Uploading and analyzing image")
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stem = os.path.splitext(os.path.basename(upload['filename']))[0]
+    storage_path = f"{patient_id}/{timestamp}_{stem}.{prepared.extension}"
+    thumbnail_path = f"{patient_id}/thumbnails/{timestamp}_{stem}.{prepared.extension}"
+    
+    # Storage upload, Gemini analysis and the parent lookup only meet at the insert
+    (image_url, thumbnail_url), analysis, days_since_previous = await asyncio.gather(
+        _timed(timings, 'upload', _upload_renditions(prepared, storage_path, thumbnail_path)),
+        _timed(timings, 'analysis', _analyze_or_reuse(prepared, upload, duplicate_of)),
+        _timed(timings, 'parent_lookup', _days_since_parent(parent_image_id if is_follow_up else None))
+    )
+    
+    # Ensure analysis is a dict, not a string
+    if isinstance(analysis, str):
+        try:
+            analysis = json.loads(analysis)
+        except json.JSONDecodeError:
+            analysis = {
+                "visual_description": analysis,
+                "severity": "unknown",
+                "possible_conditions": [],
+                "recommendations": {},
+                "disclaimer": "This is not a medical diagnosis. Please consult a healthcare professional."
+            }
+    
+    if report_progress:
+        report_progress(0.9, "Saving analysis")
+    
+    # Extract key information from analysis
+    severity_level = analysis.get('severity', 'unknown')
+    detected_conditions = [
+        cond.get('name', '') 
+        for cond in analysis.get('possible_conditions', [])
+    ]
+    recommendations_list = []
+    if 'recommendations' in analysis:
+        recs = analysis['recommendations']
+        if isinstance(recs, dict):
+            recommendations_list = recs.get('home_care', []) + recs.get('monitoring', [])
+    
+    requires_immediate = analysis.get('requires_immediate_attention', False)
+    
+    # Save to database
+    image_record = {
+        'patient_id': patient_id,
+        'appointment_id': upload['appointment_id'] if upload['appointment_id'] else None,
+        'image_url': image_url,
+        'storage_path': storage_path,
+        'thumbnail_url': thumbnail_url,
+        'thumbnail_path': thumbnail_path,
+        'metadata': {
+            **prepared.metadata(),
+            'timings_ms': timings,
+            'similar': {
+                'suggested_parent_id': suggested_parent_id,
+                'duplicate_of': duplicate_of,
+                'analysis_reused': 'duplicate_of' in analysis,
+                'distance': best['distance'] if best else None
+            }
+        },
+        'phash': to_signed(prepared.phash) if prepared.phash is not None else None,
+        'dhash': to_signed(prepared.dhash) if prepared.dhash is not None else None,
+        'image_type': upload['image_type'],
+        'body_part': upload['body_part'],
+        'patient_description': upload['patient_description'],
+        'symptoms': upload['symptoms'],
+        'ai_analysis': analysis,
+        'severity_level': severity_level,
+        'detected_conditions': detected_conditions,
+        'recommendations': recommendations_list,
+        'requires_immediate_attention': requires_immediate,
+        'analyzed_at': datetime.now().isoformat(),
+        'is_follow_up': is_follow_up,
+        'parent_image_id': parent_image_id if parent_image_id else None,
+        'days_since_previous': days_since_previous
+    }
+    
+    # Insert blocks, keep it off the event loop; its time is known only afterwards
+    insert_start = time.perf_counter()
+    result = await asyncio.to_thread(supabase.table('medical_images').insert(image_record).execute)
+    timings['insert'] = round((time.perf_counter() - insert_start) * 1000, 1)
+    timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+    
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to save image record")
+    
+    saved = result.data[0]
+    if prepared.phash is not None:
+        hash_index.add(patient_id, saved['id'], prepared.phash, prepared.dhash, saved.get('uploaded_at'))
+    
+    # Keep the renditions locally for thumbnails and comparisons
+    try:
+        await asyncio.to_thread(
+            get_rendition_store().put, result.data[0]['id'], prepared.extension, **prepared.renditions()
+        )
+    except OSError as e:
+        print(f"Could not cache renditions of image {result.data[0]['id']}: {str(e)}")
+    
+    return result.data[0]
+
+
+async def _timed(timings: dict, step: str, awaitable):
+    """Await a step and record how long it took in timings (ms)."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[step] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _upload_context(record: dict) -> tuple:
+    """Body part, symptoms and description of an upload, normalized for comparison."""
+    def normalize(text) -> str:
+        return ' '.join(str(text or '').lower().split())
+    symptoms = record.get('symptoms') or []
+    if not isinstance(symptoms, list):
+        symptoms = [symptoms]
+    return (
+        normalize(record.get('body_part')),
+        tuple(sorted(normalize(symptom) for symptom in symptoms if normalize(symptom))),
+        normalize(record.get('patient_description'))
+    )
+
+
+async def _analyze_or_reuse(prepared, upload: dict, duplicate_of: Optional[str]) -> dict:
+    """
+    Analyze the prepared image with Gemini, unless it duplicates an image
+    that already has a successful analysis and either has the same bytes or
+    was uploaded with the same context (the analysis depends on the body
+    part, symptoms and description too); then that analysis is reused.
+    """
+    if duplicate_of:
+        try:
+            previous = await asyncio.to_thread(
+                supabase.table('medical_images')
+                .select('ai_analysis, metadata, body_part, symptoms, patient_description')
+                .eq('id', duplicate_of).single().execute
+            )
+            record = previous.data or {}
+            previous_analysis = record.get('ai_analysis')
+            previous_sha256 = ((record.get('metadata') or {}).get('original') or {}).get('sha256')
+            same_image = bool(prepared.sha256) and previous_sha256 == prepared.sha256
+            if (isinstance(previous_analysis, dict) and 'error' not in previous_analysis
+                    and (same_image or _upload_context(record) == _upload_context(upload))):
+                return {**previous_analysis, 'duplicate_of': duplicate_of}
+        except Exception as e:
+            print(f"Error reusing analysis of image {duplicate_of}: {e}")
+    
+    return await analyzer.analyze_image(
+        image_data=prepared.analysis,
+        body_part=upload['body_part'],
+        symptoms=upload['symptoms'],
+        patient_description=upload['patient_description'],
+        mime_type=prepared.content_type
+    )
+
+
+def _load_patient_hashes(patient_id: str) -> List[dict]:
+    """Perceptual hashes of a patient's stored images, for the hash index."""
+    result = supabase.table('medical_images')\
+        .select('id, phash, dhash, uploaded_at')\
+        .eq('patient_id', patient_id)\
+        .execute()
+    return result.data or []
+
+
+# Perceptual hashes of each patient's images, loaded on the patient's first upload
+hash_index = ImageHashIndex(_load_patient_hashes)
+
+
+async def _upload_renditions(prepared, storage_path: str, thumbnail_path: str) -> tuple:
+    """Upload the analysis rendition and thumbnail; returns their public URLs."""
+    bucket = supabase.storage.from_('medical-images')
+    file_options = {"content-type": prepared.content_type}
+    await asyncio.gather(
+        asyncio.to_thread(bucket.upload, storage_path, prepared.analysis, file_options=file_options),
+        asyncio.to_thread(bucket.upload, thumbnail_path, prepared.thumbnail, file_options=file_options)
+    )
+    return bucket.get_public_url(storage_path), bucket.get_public_url(thumbnail_path)
+
+
+async def _days_since_parent(parent_image_id: Optional[str]) -> Optional[int]:
+    """Days since the parent image of a follow-up was uploaded (None if unknown)."""
+    if not parent_image_id:
+        return None
+    try:
+        parent = await asyncio.to_thread(
+            supabase.table('medical_images').select('uploaded_at').eq('id', parent_image_id).single().execute
+        )
+        if parent.data:
+            parent_date = datetime.fromisoformat(parent.data['uploaded_at'].replace('Z', '+00:00'))
+            return (datetime.now(parent_date.tzinfo) - parent_date).days
+    except Exception as e:
+        print(f"Error calculating days since previous: {e}")
+    return None
+
+
+async def load_rendition(image_id: str, kind: str, storage_path: Optional[str] = None) -> tuple:
+    """
+    Get a rendition of a stored image from the local rendition store.
+    
+    On a miss the stored image is downloaded once and all its renditions
+    are rebuilt and cached (images uploaded before renditions existed
+    only have their original in storage).
+    
+    Args:
+        image_id: ID of the medical image
+        kind: thumbnail, analysis or comparison
+        storage_path: Storage path of the image (looked up on a miss if not given)
+    
+    Returns:
+        (bytes, content_type)
+    
+    Raises:
+        HTTPException: 404 if the image does not exist
+    """
+    store = get_rendition_store()
+    cached = await asyncio.to_thread(store.get, image_id, kind)
+    if cached:
+        data, extension = cached
+        return data, content_type_for(extension)
+    
+    if storage_path is None:
+        image = await asyncio.to_thread(
+            supabase.table('medical_images').select('storage_path').eq('id', image_id).execute
+        )
+        if not image.data:
+            raise HTTPException(status_code=404, detail="Image not found")
+        storage_path = image.data[0]['storage_path']
+    
+    stored = await asyncio.to_thread(supabase.storage.from_('medical-images').download, storage_path)
+    prepared = await get_image_preprocessor().prepare(stored)
+    await asyncio.to_thread(store.put, image_id, prepared.extension, **prepared.renditions())
+    return prepared.renditions()[kind], prepared.content_type
+
+
+async def run_medical_image_job(payload: dict, report_progress) -> dict:
+    """Background job handler for upload?background=true"""
+    pending_path = Path(payload['pending_path'])
+    try:
+        record = await process_medical_image(pending_path.read_bytes(), payload, report_progress)
+    except asyncio.CancelledError:
+        # Shutting down: keep the file, the job is resumed on the next start
+        raise
+    except Exception:
+        pending_path.unlink(missing_ok=True)
+        raise
+    pending_path.unlink(missing_ok=True)
+    return record
+
+
+get_job_queue().register("medical_image", run_medical_image_job, concurrency=2)
+
 @router.get("/patient/{patient_id}", response_model=List[MedicalImageResponse])
 async def get_patient_images(patient_id: str, limit: int = 50):
     """Get all medical images for a patient"""
@@ -186,6 +457,11 @@ async def get_patient_images(patient_id: str, limit: int = 50):
         print(f"Error fetching patient images: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/renditions/stats")
+async def get_rendition_stats():
+    """Get hit rates and disk usage of the local rendition cache, and the size of the hash index"""
+    return {"success": True, "stats": get_rendition_store().get_stats(), "hash_index": hash_index.get_stats()}
+
 @router.get("/{image_id}", response_model=MedicalImageResponse)
 async def get_image(image_id: str):
     """Get a specific medical image"""
@@ -207,33 +483,88 @@ async def get_image(image_id: str):
         print(f"Error fetching image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{image_id}/renditions/{kind}")
+async def get_image_rendition(image_id: str, kind: str):
+    """
+    Get a rendition (thumbnail, analysis or comparison) of an image
+    
+    Served from the local rendition cache, so listing a patient's images
+    does not pull every full-size image from storage.
+    """
+    if kind not in RENDITION_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown rendition: {kind}")
+    try:
+        UUID(image_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    try:
+        data, content_type = await load_rendition(image_id, kind)
+        return Response(
+            content=data,
+            media_type=content_type,
+            headers={"Cache-Control": "private, max-age=86400"}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching image rendition: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/compare")
 async def compare_images(request: ImageComparisonRequest):
-    """Compare two images to track healing progress"""
+    """
+    Compare two images to track healing progress
+    
+    Lesion area, color and structural similarity are first measured
+    locally. In fast mode those measurements are the whole result (no
+    Gemini call); otherwise they are given to Gemini as context.
+    """
     try:
-        # Get both images
-        before = supabase.table('medical_images').select('*').eq('id', str(request.before_image_id)).single().execute()
-        after = supabase.table('medical_images').select('*').eq('id', str(request.after_image_id)).single().execute()
+        # Get both images, off the event loop and at the same time
+        before, after = await asyncio.gather(*(
+            asyncio.to_thread(supabase.table('medical_images').select('*').eq('id', str(image_id)).single().execute)
+            for image_id in (request.before_image_id, request.after_image_id)
+        ))
         
         if not before.data or not after.data:
             raise HTTPException(status_code=404, detail="One or both images not found")
         
-        # Download images from storage
-        before_data = supabase.storage.from_('medical-images').download(before.data['storage_path'])
-        after_data = supabase.storage.from_('medical-images').download(after.data['storage_path'])
+        # Comparison-size renditions from the local store (storage only on a miss)
+        (before_data, before_type), (after_data, after_type) = await asyncio.gather(
+            load_rendition(before.data['id'], 'comparison', before.data['storage_path']),
+            load_rendition(after.data['id'], 'comparison', after.data['storage_path'])
+        )
         
         # Calculate days between
         before_date = datetime.fromisoformat(before.data['uploaded_at'].replace('Z', '+00:00'))
         after_date = datetime.fromisoformat(after.data['uploaded_at'].replace('Z', '+00:00'))
         days_between = (after_date - before_date).days
         
+        try:
+            metrics = await asyncio.to_thread(compute_healing_metrics, before_data, after_data)
+        except Exception as e:
+            if request.mode == 'fast':
+                raise
+            print(f"Error measuring healing metrics: {str(e)}")
+            metrics = None
+        
+        if request.mode == 'fast':
+            comparison = metrics_comparison(metrics, days_between)
+            comparison['compared_at'] = datetime.now().isoformat()
+            return comparison
+        
         # Compare images
         comparison = await analyzer.compare_images(
             before_image_data=before_data,
             after_image_data=after_data,
             days_between=days_between,
-            condition_type=request.condition_type
+            condition_type=request.condition_type,
+            mime_types=[before_type, after_type],
+            metrics=metrics
         )
+        comparison['local_metrics'] = metrics
+        comparison['mode'] = 'full'
         
         return comparison
         
@@ -274,7 +605,7 @@ async def delete_image(image_id: str, patient_id: str):
     """Delete a medical image"""
     try:
         # Get image to get storage path
-        image = supabase.table('medical_images').select('storage_path, patient_id').eq('id', image_id).single().execute()
+        image = supabase.table('medical_images').select('storage_path, thumbnail_path, patient_id').eq('id', image_id).single().execute()
         
         if not image.data:
             raise HTTPException(status_code=404, detail="Image not found")
@@ -284,7 +615,12 @@ async def delete_image(image_id: str, patient_id: str):
             raise HTTPException(status_code=403, detail="Not authorized to delete this image")
         
         # Delete from storage
-        supabase.storage.from_('medical-images').remove([image.data['storage_path']])
+        supabase.storage.from_('medical-images').remove(
+            [path for path in (image.data['storage_path'], image.data.get('thumbnail_path')) if path]
+        )
+        
+        await asyncio.to_thread(get_rendition_store().remove, image_id)
+        hash_index.remove(patient_id, image_id)
         
         # Delete from database
         supabase.table('medical_images').delete().eq('id', image_id).execute()
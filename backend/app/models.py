@@ -4,7 +4,7 @@ Pydantic Models for Arogya-AI Backend API
 This module defines all request and response models used in the API.
 """
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, AliasChoices
 from typing import List, Optional
 from datetime import datetime
 
@@ -25,9 +25,23 @@ class LexiconTerm(BaseModel):
 
 
 class StigmaSuggestion(BaseModel):
-    """Model for de-stigmatization suggestion"""
-    original_phrase: str = Field(..., description="Original stigmatizing phrase")
-    suggested_alternative: str = Field(..., description="Person-first alternative")
+    """
+    Model for de-stigmatization suggestion
+
+    Serialized with the original/suggested keys the summarizer and frontend
+    use. The earlier original_phrase/suggested_alternative keys are still
+    accepted on input.
+    """
+    original: str = Field(
+        ...,
+        validation_alias=AliasChoices("original", "original_phrase"),
+        description="Original stigmatizing phrase"
+    )
+    suggested: str = Field(
+        ...,
+        validation_alias=AliasChoices("suggested", "suggested_alternative"),
+        description="Person-first alternative"
+    )
     rationale: str = Field(..., description="Explanation for the suggestion")
     section: str = Field(..., description="SOAP section (assessment or plan)")
     
@@ -0,0 +1,187 @@
+"""
+Medical Image Rendition Store
+
+Local disk cache of the renditions of each medical image (thumbnail,
+analysis size, comparison size), keyed by image id. Renditions are written
+at upload, so thumbnails are served and comparisons run without going back
+to Supabase storage or decoding the image again. Reading an entry marks it
+as recently used; once the cache holds more than max_bytes the least
+recently used files are removed until it is back under 90% of the limit.
+"""
+
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory holding cached renditions
+RENDITION_CACHE_DIR = os.getenv("RENDITION_CACHE_DIR", "data/renditions")
+# Disk space the cache may use
+RENDITION_CACHE_MAX_MB = int(os.getenv("RENDITION_CACHE_MAX_MB", "512"))
+
+RENDITION_KINDS = ("thumbnail", "analysis", "comparison")
+# File extensions renditions are stored with (see image_preprocess)
+RENDITION_EXTENSIONS = ("webp", "jpg")
+
+
+class RenditionStore:
+    """
+    Rendition bytes by image id and kind, with LRU eviction by total size.
+
+    Methods do blocking file I/O and are meant to be called from a worker
+    thread.
+    """
+
+    def __init__(self, directory: str = RENDITION_CACHE_DIR, max_bytes: int = RENDITION_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = sum(path.stat().st_size for path in self.directory.glob("*/*/*"))
+
+        # Hits/misses per kind and entries evicted
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evicted = 0
+
+    def _dir(self, image_id: str) -> Path:
+        if not image_id.replace("-", "").isalnum():
+            raise ValueError(f"Invalid image id: {image_id}")
+        return self.directory / image_id[:2] / image_id
+
+    def _path(self, image_id: str, kind: str, extension: str) -> Path:
+        if kind not in RENDITION_KINDS:
+            raise ValueError(f"Unknown rendition: {kind}")
+        return self._dir(image_id) / f"{kind}.{extension}"
+
+    def get(self, image_id: str, kind: str) -> Optional[tuple]:
+        """
+        Get a cached rendition and mark it as recently used.
+
+        Returns:
+            (bytes, extension) or None if it is not cached
+        """
+        found = None
+        # Only the exact rendition files; never .tmp files of a write in progress
+        for extension in RENDITION_EXTENSIONS if kind in RENDITION_KINDS else ():
+            path = self._path(image_id, kind, extension)
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Ignoring unreadable rendition {path}: {e}")
+                continue
+            found = (data, extension)
+            break
+
+        with self._lock:
+            counts = self.misses if found is None else self.hits
+            counts[kind] = counts.get(kind, 0) + 1
+        return found
+
+    def put(self, image_id: str, extension: str, **renditions: bytes):
+        """
+        Store renditions of an image, e.g. put(id, "webp", thumbnail=..., analysis=...).
+
+        A rendition of the same kind in the other format is removed, so get()
+        never returns one left over from before a format change.
+        """
+        if extension not in RENDITION_EXTENSIONS:
+            raise ValueError(f"Unknown rendition extension: {extension}")
+        with self._lock:
+            for kind, data in renditions.items():
+                path = self._path(image_id, kind, extension)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                previous = path.stat().st_size if path.exists() else 0
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                self._bytes += len(data) - previous
+
+                for other in RENDITION_EXTENSIONS:
+                    if other != extension:
+                        stale = self._path(image_id, kind, other)
+                        try:
+                            self._bytes -= stale.stat().st_size
+                            stale.unlink()
+                        except FileNotFoundError:
+                            pass
+
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def remove(self, image_id: str):
+        """Drop every rendition of an image."""
+        directory = self._dir(image_id)
+        with self._lock:
+            for path in directory.glob("*"):
+                try:
+                    self._bytes -= path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Remove least recently used files until under 90% of max_bytes."""
+        files = []
+        for path in self.directory.glob("*/*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda entry: entry[0])
+
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evicted += 1
+        self._bytes = total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate per rendition kind and disk usage."""
+        with self._lock:
+            results = {}
+            for kind in RENDITION_KINDS:
+                hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+                results[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+                }
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted,
+                "results": results
+            }
+
+
+# Global store instance
+_rendition_store: Optional[RenditionStore] = None
+
+
+def get_rendition_store() -> RenditionStore:
+    """
+    Get or create the global RenditionStore instance.
+
+    Returns:
+        RenditionStore singleton instance
+    """
+    global _rendition_store
+    if _rendition_store is None:
+        _rendition_store = RenditionStore()
+    return _rendition_store
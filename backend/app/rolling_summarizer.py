@@ -0,0 +1,403 @@
+"""
+Rolling SOAP Draft Module
+
+Keeps a running SOAP note per consultation while the call is in progress.
+New transcript segments are buffered and periodically folded into the draft
+with a small delta prompt (current draft + new lines only), so when the
+doctor hangs up only the last few lines remain to be folded in and the
+final note is ready almost immediately.
+
+Every fold sends at most ROLLING_SOAP_MAX_DELTA_CHARS of new transcript and
+a draft whose sections are capped at ROLLING_SOAP_SECTION_WORDS words, so
+the tokens per LLM call stay bounded no matter how long the consultation
+runs. The note returned by finalize() comes from one last, uncapped pass
+over the draft and the end of the stored transcript, so it is complete and
+carries no truncation markers or placeholders.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Optional
+
+from .summarizer import (
+    SOAP_FIELDS,
+    GEMINI_API_KEY,
+    SoapPipeline,
+    get_soap_pipeline,
+    _parse_json_response,
+    _validate_soap_note,
+    _describe_error
+)
+
+logger = logging.getLogger(__name__)
+
+# Keep a rolling draft during consultations (needs GEMINI_API_KEY)
+ROLLING_SOAP_ENABLED = os.getenv("ROLLING_SOAP_ENABLED", "true").lower() == "true"
+# Fold buffered segments once this much new transcript has accumulated...
+ROLLING_SOAP_BATCH_CHARS = int(os.getenv("ROLLING_SOAP_BATCH_CHARS", "1200"))
+# ...or once the oldest buffered segment is this old
+ROLLING_SOAP_INTERVAL_SECONDS = float(os.getenv("ROLLING_SOAP_INTERVAL_SECONDS", "20"))
+# Upper bound on new transcript sent in one delta prompt
+ROLLING_SOAP_MAX_DELTA_CHARS = int(os.getenv("ROLLING_SOAP_MAX_DELTA_CHARS", "4000"))
+# Upper bound on each draft section carried between folds
+ROLLING_SOAP_SECTION_WORDS = int(os.getenv("ROLLING_SOAP_SECTION_WORDS", "150"))
+# Consultations tracked at once; the least recently updated draft is dropped
+ROLLING_SOAP_MAX_DRAFTS = 500
+
+NOT_YET_DISCUSSED = "Not yet discussed."
+# Written in place of NOT_YET_DISCUSSED in the finished note
+NOTHING_DISCUSSED = "No relevant information discussed."
+
+ROLLING_SOAP_PROMPT = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context, keeping a running SOAP note during a live consultation.
+
+Current draft SOAP note (JSON):
+{draft}
+
+New transcript lines (multilingual, may be code-switched Hinglish) since the draft was written:
+{segments}
+
+Update the draft with any clinically relevant information from the new lines:
+- Keep facts already in the draft unless the new lines correct them
+- Use professional medical terminology, in English only
+- Ignore casual conversation
+- Keep each section under {max_words} words, condensing older detail if needed
+- Use "Not yet discussed." for sections with no information yet
+
+Output the updated SOAP note as a JSON object with EXACTLY these keys:
+{{
+  "subjective": "Patient's reported symptoms, history, and concerns",
+  "objective": "Observable findings, vital signs, physical examination results",
+  "assessment": "Clinical diagnosis and medical impression",
+  "plan": "Treatment plan, medications, follow-up instructions"
+}}
+
+Return ONLY the JSON object, no additional text or explanation."""
+
+ROLLING_SOAP_FINAL_PROMPT = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context. A consultation has just ended; write its final SOAP note.
+
+Running draft SOAP note (JSON), kept during the call with each section condensed to a word limit, so sections may be abbreviated or end in "...":
+{draft}
+
+End of the consultation transcript (multilingual, may be code-switched Hinglish), including lines the draft does not cover yet:
+{transcript_tail}
+
+Write the complete, final SOAP note:
+- Keep every fact from the draft unless the transcript corrects it, and add what the transcript lines add
+- Write full sentences; do not truncate sections or use "..."
+- Use professional medical terminology, in English only
+- Ignore casual conversation
+- Use "{nothing_discussed}" for sections with no information, never "{not_yet_discussed}"
+
+Output the SOAP note as a JSON object with EXACTLY these keys:
+{{
+  "subjective": "Patient's reported symptoms, history, and concerns",
+  "objective": "Observable findings, vital signs, physical examination results",
+  "assessment": "Clinical diagnosis and medical impression",
+  "plan": "Treatment plan, medications, follow-up instructions"
+}}
+
+Return ONLY the JSON object, no additional text or explanation."""
+
+
+def _cap_words(text: str, max_words: int) -> str:
+    words = text.split()
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words]) + " ..."
+
+
+class RollingSoapDraft:
+    """Running SOAP draft and unfolded transcript segments for one consultation."""
+
+    def __init__(self, consultation_id: str):
+        self.consultation_id = consultation_id
+        self.draft: Dict[str, str] = {field: NOT_YET_DISCUSSED for field in SOAP_FIELDS}
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.segments_received = 0
+        self.segments_folded = 0
+        self.lock = asyncio.Lock()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def take_delta(self, max_chars: int) -> List[str]:
+        """Remove and return the oldest pending segments, up to max_chars."""
+        taken, size = [], 0
+        while self.pending and (not taken or size + len(self.pending[0]) <= max_chars):
+            segment = self.pending.pop(0)
+            taken.append(segment[:max_chars])
+            size += len(segment)
+        self.pending_chars = sum(len(segment) for segment in self.pending)
+        return taken
+
+    def tail(self, transcript: str, max_chars: int) -> str:
+        """
+        The last lines of the transcript, up to max_chars but always
+        including every pending line.
+        """
+        lines = [line for line in transcript.split("\n") if line.strip()]
+        taken, size = [], 0
+        for line in reversed(lines):
+            if len(taken) >= len(self.pending) and size + len(line) > max_chars:
+                break
+            taken.append(line)
+            size += len(line)
+        return "\n".join(reversed(taken))
+
+    def covers(self, transcript: str) -> bool:
+        """True if every line of the stored transcript has reached this draft."""
+        lines = [line for line in transcript.split("\n") if line.strip()]
+        return len(lines) == self.segments_received
+
+
+class RollingSummarizer:
+    """
+    Maintains rolling SOAP drafts for live consultations.
+
+    add_segment() is called for every transcript line; folds run in the
+    background, at most one at a time per consultation. Drafts are capped
+    at section_words per section; finalize() writes the finished note in
+    one uncapped pass and runs Compassion Reflex on it.
+    """
+
+    def __init__(
+        self,
+        pipeline: Optional[SoapPipeline] = None,
+        batch_chars: int = ROLLING_SOAP_BATCH_CHARS,
+        interval_seconds: float = ROLLING_SOAP_INTERVAL_SECONDS,
+        max_delta_chars: int = ROLLING_SOAP_MAX_DELTA_CHARS,
+        section_words: int = ROLLING_SOAP_SECTION_WORDS
+    ):
+        """
+        Initialize the summarizer.
+
+        Args:
+            pipeline: SoapPipeline providing the Gemini model and timeouts
+            batch_chars: Pending transcript size that triggers a fold
+            interval_seconds: Maximum time a segment waits before being folded
+            max_delta_chars: Maximum new transcript per delta prompt
+            section_words: Maximum words per draft section
+        """
+        self._pipeline = pipeline
+        self.batch_chars = batch_chars
+        self.interval_seconds = interval_seconds
+        self.max_delta_chars = max_delta_chars
+        self.section_words = section_words
+        self.drafts: "OrderedDict[str, RollingSoapDraft]" = OrderedDict()
+        self._inflight: set = set()
+
+        # Usage tracking
+        self.folds = 0
+        self.failed_folds = 0
+        self.prompt_chars = 0
+        self.max_prompt_chars = 0
+        self.fold_seconds = 0.0
+
+    @property
+    def pipeline(self) -> SoapPipeline:
+        if self._pipeline is None:
+            self._pipeline = get_soap_pipeline()
+        return self._pipeline
+
+    def add_segment(self, consultation_id: str, segment: str):
+        """
+        Buffer a new transcript line and schedule a fold.
+
+        Args:
+            consultation_id: ID of the consultation
+            segment: Transcript entry, e.g. "[PATIENT]: ..."
+        """
+        if not segment or not segment.strip():
+            return
+
+        draft = self.drafts.get(consultation_id)
+        if draft is None:
+            draft = self.drafts[consultation_id] = RollingSoapDraft(consultation_id)
+            while len(self.drafts) > ROLLING_SOAP_MAX_DRAFTS:
+                _, dropped = self.drafts.popitem(last=False)
+                if dropped.timer is not None:
+                    dropped.timer.cancel()
+        self.drafts.move_to_end(consultation_id)
+
+        draft.pending.append(segment)
+        draft.pending_chars += len(segment)
+        draft.segments_received += 1
+
+        loop = asyncio.get_running_loop()
+        if draft.pending_chars >= self.batch_chars:
+            self._start_fold(draft)
+        elif draft.timer is None:
+            draft.timer = loop.call_later(self.interval_seconds, self._start_fold, draft)
+
+    def flush(self, consultation_id: str):
+        """Fold any buffered segments now, e.g. when a participant hangs up."""
+        draft = self.drafts.get(consultation_id)
+        if draft is not None and draft.pending:
+            self._start_fold(draft)
+
+    def _start_fold(self, draft: RollingSoapDraft):
+        """Launch a background fold and keep a reference to it."""
+        if draft.timer is not None:
+            draft.timer.cancel()
+            draft.timer = None
+        task = asyncio.get_running_loop().create_task(self._fold_pending(draft))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _fold_pending(self, draft: RollingSoapDraft):
+        """Fold all pending segments into the draft, one bounded delta at a time."""
+        async with draft.lock:
+            while draft.pending:
+                segments = draft.take_delta(self.max_delta_chars)
+                if not await self._fold(draft, segments):
+                    # Keep the lines for the next attempt
+                    draft.pending[:0] = segments
+                    draft.pending_chars = sum(len(segment) for segment in draft.pending)
+                    return
+
+    async def _generate(self, draft: RollingSoapDraft, prompt: str) -> Optional[Dict[str, str]]:
+        """Run one draft prompt and record its usage; None if it failed."""
+        start = time.perf_counter()
+        try:
+            response_text = await self.pipeline.generate_text(prompt, self.pipeline.soap_timeout)
+            note = _validate_soap_note(_parse_json_response(response_text))
+        except Exception as e:
+            self.failed_folds += 1
+            logger.warning(
+                f"Rolling SOAP update failed for consultation {draft.consultation_id}: {_describe_error(e)}"
+            )
+            return None
+
+        self.folds += 1
+        self.prompt_chars += len(prompt)
+        self.max_prompt_chars = max(self.max_prompt_chars, len(prompt))
+        self.fold_seconds += time.perf_counter() - start
+        return note
+
+    async def _fold(self, draft: RollingSoapDraft, segments: List[str]) -> bool:
+        """Apply one delta prompt to the draft."""
+        prompt = ROLLING_SOAP_PROMPT.format(
+            draft=json.dumps(draft.draft, indent=2, ensure_ascii=False),
+            segments="\n".join(segments),
+            max_words=self.section_words
+        )
+        updated = await self._generate(draft, prompt)
+        if updated is None:
+            return False
+
+        draft.draft = {field: _cap_words(updated[field], self.section_words) for field in SOAP_FIELDS}
+        draft.segments_folded += len(segments)
+        logger.debug(
+            f"Folded {len(segments)} segments into SOAP draft for {draft.consultation_id} "
+            f"({draft.segments_folded}/{draft.segments_received})"
+        )
+        return True
+
+    def get_draft(self, consultation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the current draft for display during the call.
+
+        Returns:
+            Dictionary with the draft sections and how many segments it
+            includes, or None if the consultation has no draft
+        """
+        draft = self.drafts.get(consultation_id)
+        if draft is None:
+            return None
+        return {
+            "soap_note": dict(draft.draft),
+            "segments_folded": draft.segments_folded,
+            "segments_pending": len(draft.pending)
+        }
+
+    async def finalize(
+        self,
+        consultation_id: str,
+        transcript: str
+    ) -> Optional[Tuple[Dict[str, str], List[Dict[str, Any]]]]:
+        """
+        Finish the rolling draft and run Compassion Reflex on it.
+
+        Pending segments beyond one delta are folded first; then a single
+        uncapped pass over the draft and the end of the transcript (which
+        includes the remaining pending lines) writes the final note.
+
+        Args:
+            consultation_id: ID of the consultation
+            transcript: Stored transcript, used to check the draft saw all of
+                it and to complete the condensed draft sections
+
+        Returns:
+            Tuple of (SOAP note, de-stigmatization suggestions), or None if no
+            usable draft exists and the full pipeline should run instead
+        """
+        draft = self.drafts.get(consultation_id)
+        if draft is None or not draft.covers(transcript):
+            return None
+
+        async with draft.lock:
+            # Leave at most one delta of pending lines for the final pass
+            while draft.pending_chars > self.max_delta_chars:
+                segments = draft.take_delta(self.max_delta_chars)
+                if not await self._fold(draft, segments):
+                    draft.pending[:0] = segments
+                    draft.pending_chars = sum(len(segment) for segment in draft.pending)
+                    return None
+
+            prompt = ROLLING_SOAP_FINAL_PROMPT.format(
+                draft=json.dumps(draft.draft, indent=2, ensure_ascii=False),
+                transcript_tail=draft.tail(transcript, self.max_delta_chars),
+                nothing_discussed=NOTHING_DISCUSSED,
+                not_yet_discussed=NOT_YET_DISCUSSED
+            )
+            final = await self._generate(draft, prompt)
+            if final is None:
+                return None
+
+        self.drafts.pop(consultation_id, None)
+        if draft.timer is not None:
+            draft.timer.cancel()
+        soap_note = {
+            field: NOTHING_DISCUSSED if final[field].strip() == NOT_YET_DISCUSSED else final[field]
+            for field in SOAP_FIELDS
+        }
+        suggestions = await self.pipeline.analyze_for_stigma(soap_note["assessment"], soap_note["plan"])
+        logger.info(
+            f"SOAP note for {consultation_id} finalized from rolling draft "
+            f"({draft.segments_received} segments)"
+        )
+        return soap_note, suggestions
+
+    def get_stats(self) -> Dict[str, Any]:
+        """LLM usage of the rolling drafts."""
+        return {
+            "active_drafts": len(self.drafts),
+            "folds": self.folds,
+            "failed_folds": self.failed_folds,
+            "avg_prompt_chars": round(self.prompt_chars / self.folds) if self.folds else 0,
+            "max_prompt_chars": self.max_prompt_chars,
+            "avg_fold_ms": round(self.fold_seconds / self.folds * 1000, 1) if self.folds else 0.0
+        }
+
+
+# Global rolling summarizer instance
+_rolling_summarizer: Optional[RollingSummarizer] = None
+
+
+def get_rolling_summarizer() -> Optional[RollingSummarizer]:
+    """
+    Get or create the global RollingSummarizer instance.
+
+    Returns:
+        RollingSummarizer singleton, or None when rolling drafts are disabled
+        or no Gemini API key is configured
+    """
+    global _rolling_summarizer
+    if not ROLLING_SOAP_ENABLED or not GEMINI_API_KEY:
+        return None
+    if _rolling_summarizer is None:
+        _rolling_summarizer = RollingSummarizer()
+    return _rolling_summarizer
@@ -0,0 +1,301 @@
+"""
+SOAP Note Job Service
+
+Single entry point for generating a consultation's SOAP note: fetch the
+transcript, run the summarizer, and save the result to the consultation.
+
+Concurrent requests for the same consultation (double-clicks, client
+retries) share one in-flight generation instead of each starting its own
+LLM run, and results are cached by a hash of the transcript so
+regenerating an unchanged transcript returns immediately. The shared
+generation runs in its own task, so a request that gives up (client
+disconnect, timeout) does not cancel it for the others. Supabase calls are
+blocking and run in worker threads.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Optional, AsyncIterator
+
+from supabase import Client
+
+from .summarizer import SOAP_FIELDS, EmptyTranscript, generate_notes_with_empathy, stream_notes_with_empathy
+
+logger = logging.getLogger(__name__)
+
+# Generated notes kept in memory, keyed by transcript hash
+SOAP_CACHE_SIZE = int(os.getenv("SOAP_CACHE_SIZE", "256"))
+
+# Columns the transcript may be stored in, in order of preference
+TRANSCRIPT_COLUMNS = ["transcript", "full_transcript", "transcript_text"]
+
+
+class ConsultationNotFound(Exception):
+    """The consultation does not exist."""
+
+
+def _generation_error(error: Exception) -> Exception:
+    """
+    Other ValueErrors of the summarizer are a bad LLM response or
+    configuration, not a bad request: raise them as RuntimeError (500).
+    EmptyTranscript stays a ValueError (400).
+    """
+    if isinstance(error, ValueError) and not isinstance(error, EmptyTranscript):
+        return RuntimeError(str(error))
+    return error
+
+
+def transcript_hash(transcript: str) -> str:
+    """SHA-256 of the transcript text, used as the cache key."""
+    return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+
+class SoapJobService:
+    """
+    Coalesces and caches SOAP note generation per consultation.
+
+    Raises from generate():
+        ConsultationNotFound: Consultation does not exist
+        EmptyTranscript: Consultation has no transcript
+        ValueError: Consultation has no transcript column
+        RuntimeError: SOAP generation failed
+    """
+
+    def __init__(self, cache_size: int = SOAP_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[Dict[str, str], List[Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.runs = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    async def generate(self, db: Client, consultation_id: str) -> Dict[str, Any]:
+        """
+        Generate (or reuse) the SOAP note for a consultation and save it.
+
+        Args:
+            db: Supabase client
+            consultation_id: ID of the consultation
+
+        Returns:
+            Dictionary with soap_note, stigma_suggestions and cached (True if
+            no LLM call was needed)
+        """
+        task = self._inflight.get(consultation_id)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"Joining in-flight SOAP generation for consultation {consultation_id}")
+        else:
+            task = self._start(consultation_id, self._generate(db, consultation_id))
+        return await asyncio.shield(task)
+
+    def _start(self, consultation_id: str, job) -> asyncio.Task:
+        """Run a generation in its own task, shared by every request for the consultation."""
+        task = asyncio.get_running_loop().create_task(job)
+        self._inflight[consultation_id] = task
+        task.add_done_callback(lambda done: self._finished(consultation_id, done))
+        return task
+
+    def _finished(self, consultation_id: str, task: asyncio.Task):
+        if self._inflight.get(consultation_id) is task:
+            del self._inflight[consultation_id]
+        # Mark the exception retrieved in case every request gave up waiting
+        if not task.cancelled():
+            task.exception()
+
+    async def _generate(self, db: Client, consultation_id: str) -> Dict[str, Any]:
+        transcript = await asyncio.to_thread(self._fetch_transcript, db, consultation_id)
+        key = transcript_hash(transcript)
+
+        cached = self._cached(key, consultation_id)
+        if cached is not None:
+            soap_note, suggestions = cached
+        else:
+            logger.info(f"Generating SOAP notes for consultation {consultation_id} ({len(transcript)} chars)")
+            self.runs += 1
+            try:
+                soap_note, suggestions = await generate_notes_with_empathy(
+                    transcript,
+                    consultation_id=consultation_id
+                )
+            except ValueError as e:
+                raise _generation_error(e)
+            self._remember(key, soap_note, suggestions)
+
+        await asyncio.to_thread(self._save, db, consultation_id, soap_note, suggestions)
+        return {
+            "soap_note": soap_note,
+            "stigma_suggestions": suggestions,
+            "cached": cached is not None
+        }
+
+    async def stream(self, db: Client, consultation_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate the SOAP note for a consultation, yielding sections as they arrive.
+
+        Generation runs in its own task, so the note is still finished and
+        saved if the client stops listening. Requests that arrive while it
+        runs join it like they do for generate().
+
+        Args:
+            db: Supabase client
+            consultation_id: ID of the consultation
+
+        Yields:
+            The events of SoapPipeline.stream(), ending with "complete"
+        """
+        task = self._inflight.get(consultation_id)
+        if task is None:
+            transcript = await asyncio.to_thread(self._fetch_transcript, db, consultation_id)
+            key = transcript_hash(transcript)
+            cached = self._cached(key, consultation_id)
+            if cached is not None:
+                await asyncio.to_thread(self._save, db, consultation_id, *cached)
+                for event in _result_events({"soap_note": cached[0], "stigma_suggestions": cached[1]}):
+                    yield event
+                return
+            # Another request may have started a run while the transcript was read
+            task = self._inflight.get(consultation_id)
+
+        if task is not None:
+            self.coalesced += 1
+            for event in _result_events(await asyncio.shield(task)):
+                yield event
+            return
+
+        events: asyncio.Queue = asyncio.Queue()
+        self._start(consultation_id, self._stream_job(db, consultation_id, transcript, events))
+
+        while True:
+            event = await events.get()
+            if isinstance(event, Exception):
+                raise event
+            yield event
+            if event["type"] == "complete":
+                return
+
+    async def _stream_job(
+        self,
+        db: Client,
+        consultation_id: str,
+        transcript: str,
+        events: asyncio.Queue
+    ) -> Dict[str, Any]:
+        """Background half of stream(): run the pipeline, save, return the result for joiners."""
+        logger.info(f"Streaming SOAP notes for consultation {consultation_id} ({len(transcript)} chars)")
+        self.runs += 1
+        try:
+            result = None
+            async for event in stream_notes_with_empathy(transcript, consultation_id=consultation_id):
+                if event["type"] == "complete":
+                    soap_note, suggestions = event["soap_note"], event["stigma_suggestions"]
+                    self._remember(transcript_hash(transcript), soap_note, suggestions)
+                    await asyncio.to_thread(self._save, db, consultation_id, soap_note, suggestions)
+                    result = {"soap_note": soap_note, "stigma_suggestions": suggestions, "cached": False}
+                events.put_nowait(event)
+            if result is None:
+                raise RuntimeError("SOAP generation ended without a result")
+            return result
+        except Exception as e:
+            error = _generation_error(e)
+            events.put_nowait(error)
+            raise error
+
+    def _cached(
+        self,
+        key: str,
+        consultation_id: str
+    ) -> Optional[Tuple[Dict[str, str], List[Dict[str, Any]]]]:
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            logger.info(f"SOAP note for consultation {consultation_id} served from cache")
+        return cached
+
+    def _remember(self, key: str, soap_note: Dict[str, str], suggestions: List[Dict[str, Any]]):
+        self._cache[key] = (soap_note, suggestions)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _fetch_transcript(self, db: Client, consultation_id: str) -> str:
+        """Read only the transcript columns of the consultation (blocking)."""
+        try:
+            result = db.table("consultations")\
+                .select(", ".join(TRANSCRIPT_COLUMNS[:2]))\
+                .eq("id", consultation_id)\
+                .execute()
+        except Exception:
+            # Older schemas lack one of the columns; read the whole row instead
+            result = db.table("consultations").select("*").eq("id", consultation_id).execute()
+
+        if not result.data:
+            raise ConsultationNotFound("Consultation not found")
+
+        consultation = result.data[0]
+        transcript = next((consultation[c] for c in TRANSCRIPT_COLUMNS if consultation.get(c)), None)
+
+        if not transcript or not transcript.strip():
+            if not any(column in consultation for column in TRANSCRIPT_COLUMNS):
+                raise ValueError(
+                    f"Transcript column not found in database. Available columns: {list(consultation.keys())}. "
+                    "Please run migration 003_add_transcript_column.sql to add the transcript column."
+                )
+            raise EmptyTranscript(
+                "Consultation transcript is empty. Cannot generate SOAP notes without a transcript. "
+                "Please ensure the consultation has a transcript (from captions/audio processing) "
+                "before generating SOAP notes."
+            )
+        return transcript
+
+    def _save(self, db: Client, consultation_id: str, soap_note: Dict[str, str], suggestions: List[Dict[str, Any]]):
+        """Write the note to both the legacy and the frontend column names (blocking)."""
+        result = db.table("consultations").update({
+            "soap_notes": soap_note,
+            "raw_soap_note": soap_note,
+            "stigma_suggestions": suggestions,
+            "de_stigma_suggestions": suggestions
+        }).eq("id", consultation_id).execute()
+
+        if not result.data:
+            raise RuntimeError("Failed to save SOAP notes to database")
+        logger.info(f"Saved SOAP notes for consultation {consultation_id}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """LLM runs avoided by caching and coalescing."""
+        return {
+            "runs": self.runs,
+            "cache_hits": self.cache_hits,
+            "coalesced_requests": self.coalesced,
+            "cached_notes": len(self._cache)
+        }
+
+
+def _result_events(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Stream events for a note that is already finished."""
+    soap_note, suggestions = result["soap_note"], result["stigma_suggestions"]
+    events = [{"type": "section", "section": section, "text": soap_note[section]} for section in SOAP_FIELDS]
+    events.append({"type": "suggestions", "suggestions": suggestions})
+    events.append({"type": "complete", "soap_note": soap_note, "stigma_suggestions": suggestions})
+    return events
+
+
+# Global service instance
+_soap_service: Optional[SoapJobService] = None
+
+
+def get_soap_service() -> SoapJobService:
+    """
+    Get or create the global SoapJobService instance.
+
+    Returns:
+        SoapJobService singleton instance
+    """
+    global _soap_service
+    if _soap_service is None:
+        _soap_service = SoapJobService()
+    return _soap_service
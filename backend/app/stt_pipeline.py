@@ -45,6 +45,8 @@ except ImportError:
 
 from dotenv import load_dotenv
 from .database import DatabaseClient
+from .decoded_audio import DecodedAudio
+from .rolling_summarizer import get_rolling_summarizer
 
 # Audio converter for WebM/Opus to PCM conversion
 # Try FFmpeg converter first (has better error handling), then fall back to pydub
@@ -342,11 +344,46 @@ class STTPipeline:
         # Default: assume WebM with default sample rate
         return ('webm', True, sample_rate)
     
+    def decode_audio(self, audio_chunk: bytes, target_sample_rate: int = 16000) -> Optional[DecodedAudio]:
+        """
+        Decode an audio chunk once into shared 16kHz mono LINEAR16 PCM.
+        
+        The returned DecodedAudio is passed to every audio stage (STT, emotion
+        analysis, ...) so each chunk goes through FFmpeg at most once.
+        Raw PCM input is wrapped without any conversion.
+        
+        Args:
+            audio_chunk: Raw audio bytes as received from the client
+            target_sample_rate: Sample rate to decode to (default: 16000 Hz)
+            
+        Returns:
+            DecodedAudio, or None if the chunk could not be decoded
+        """
+        format_name, _, _ = self._detect_audio_format(audio_chunk)
+        
+        if format_name == 'pcm':
+            return DecodedAudio(audio_chunk, target_sample_rate, source_format='pcm')
+        
+        if not AUDIO_CONVERTER_AVAILABLE:
+            logger.warning("⚠️ Audio converter not available, cannot decode audio chunk")
+            return None
+        
+        try:
+            pcm = get_audio_converter().webm_to_pcm(audio_chunk, target_sample_rate)
+        except Exception as e:
+            logger.warning(f"⚠️ Audio decode error: {e}")
+            return None
+        
+        if not pcm:
+            return None
+        return DecodedAudio(pcm, target_sample_rate, source_format=format_name)
+    
     async def transcribe_audio_google(
         self,
         audio_chunk: bytes,
         language_code: str,
-        alternative_language_codes: Optional[list] = None
+        alternative_language_codes: Optional[list] = None,
+        decoded: Optional[DecodedAudio] = None
     ) -> Optional[str]:
         """
         Transcribe audio using Google Cloud Speech-to-Text.
@@ -399,6 +436,7 @@ class STTPipeline:
             audio_chunk: Raw audio bytes (LINEAR16 PCM, WAV, WebM/Opus, etc.)
             language_code: Primary language code (e.g., 'hi-IN', 'en-IN')
             alternative_language_codes: Alternative language codes for code-switching
+            decoded: Audio already decoded by decode_audio; skips detection and conversion
             
         Returns:
             Transcribed text or None if transcription fails
@@ -408,41 +446,49 @@ class STTPipeline:
             return None
         
         try:
-            # Detect audio format
-            format_name, needs_conversion, detected_sample_rate = self._detect_audio_format(audio_chunk)
-            
-            # Convert WebM/Opus/OGG to LINEAR16 PCM if needed
-            processed_audio = audio_chunk
-            target_sample_rate = 16000  # Standard 16kHz for speech recognition (required by task 5.2)
-            conversion_attempted = False
-            conversion_successful = False
-            
-            if needs_conversion and AUDIO_CONVERTER_AVAILABLE:
-                logger.info(f"🔄 Converting {format_name.upper()} to LINEAR16 PCM (16kHz)")
-                conversion_attempted = True
-                try:
-                    converter = get_audio_converter()
-                    converted_audio = converter.webm_to_pcm(audio_chunk, target_sample_rate)
-                    if converted_audio:
-                        processed_audio = converted_audio
-                        conversion_successful = True
-                        logger.info(f"✅ Converted {len(audio_chunk)} bytes to {len(processed_audio)} bytes LINEAR16 PCM")
-                    else:
-                        logger.warning("⚠️ Audio conversion failed, will try original format as fallback")
+            if decoded is not None:
+                # Reuse the shared decode - no second FFmpeg pass for this chunk
+                format_name = decoded.source_format
+                processed_audio = decoded.pcm
+                target_sample_rate = decoded.sample_rate
+                conversion_attempted = format_name != 'pcm'
+                conversion_successful = conversion_attempted
+            else:
+                # Detect audio format
+                format_name, needs_conversion, detected_sample_rate = self._detect_audio_format(audio_chunk)
+            
+                # Convert WebM/Opus/OGG to LINEAR16 PCM if needed
+                processed_audio = audio_chunk
+                target_sample_rate = 16000  # Standard 16kHz for speech recognition (required by task 5.2)
+                conversion_attempted = False
+                conversion_successful = False
+            
+                if needs_conversion and AUDIO_CONVERTER_AVAILABLE:
+                    logger.info(f"🔄 Converting {format_name.upper()} to LINEAR16 PCM (16kHz)")
+                    conversion_attempted = True
+                    try:
+                        converter = get_audio_converter()
+                        converted_audio = converter.webm_to_pcm(audio_chunk, target_sample_rate)
+                        if converted_audio:
+                            processed_audio = converted_audio
+                            conversion_successful = True
+                            logger.info(f"✅ Converted {len(audio_chunk)} bytes to {len(processed_audio)} bytes LINEAR16 PCM")
+                        else:
+                            logger.warning("⚠️ Audio conversion failed, will try original format as fallback")
+                            logger.info(f"   Fallback: Attempting to send {format_name.upper()} directly to Google Cloud STT")
+                            # Fall back to original format
+                            needs_conversion = False
+                    except Exception as conv_error:
+                        logger.warning(f"⚠️ Audio conversion error: {conv_error}")
                         logger.info(f"   Fallback: Attempting to send {format_name.upper()} directly to Google Cloud STT")
+                        logger.debug(f"   Conversion error details: {conv_error}")
                         # Fall back to original format
                         needs_conversion = False
-                except Exception as conv_error:
-                    logger.warning(f"⚠️ Audio conversion error: {conv_error}")
+                elif needs_conversion and not AUDIO_CONVERTER_AVAILABLE:
+                    logger.warning("⚠️ Audio converter not available")
                     logger.info(f"   Fallback: Attempting to send {format_name.upper()} directly to Google Cloud STT")
-                    logger.debug(f"   Conversion error details: {conv_error}")
-                    # Fall back to original format
+                    logger.info("   Note: Install FFmpeg for better audio format support")
                     needs_conversion = False
-            elif needs_conversion and not AUDIO_CONVERTER_AVAILABLE:
-                logger.warning("⚠️ Audio converter not available")
-                logger.info(f"   Fallback: Attempting to send {format_name.upper()} directly to Google Cloud STT")
-                logger.info("   Note: Install FFmpeg for better audio format support")
-                needs_conversion = False
             
             # Configure recognition based on format and conversion status
             # Task 5.2: Ensure correct encoding (LINEAR16 after conversion) and sample rate (16kHz)
@@ -639,7 +685,8 @@ class STTPipeline:
     async def transcribe_audio(
         self,
         audio_chunk: bytes,
-        user_type: str
+        user_type: str,
+        decoded: Optional[DecodedAudio] = None
     ) -> Optional[str]:
         """
         Transcribe audio with ASR fallback logic and language-specific configuration.
@@ -649,6 +696,7 @@ class STTPipeline:
         Args:
             audio_chunk: Raw audio bytes
             user_type: 'doctor' or 'patient'
+            decoded: Optional shared decode of audio_chunk (see decode_audio)
             
         Returns:
             Transcribed text or None if all ASR services fail
@@ -672,7 +720,8 @@ class STTPipeline:
         transcript = await self.transcribe_audio_google(
             audio_chunk,
             language_code,
-            alternative_codes
+            alternative_codes,
+            decoded=decoded
         )
         
         if transcript:
@@ -814,7 +863,8 @@ class STTPipeline:
         audio_chunk: bytes,
         user_type: str,
         consultation_id: str,
-        db_client: Optional[DatabaseClient] = None
+        db_client: Optional[DatabaseClient] = None,
+        decoded: Optional[DecodedAudio] = None
     ) -> Dict[str, str]:
         """
         Main STT pipeline: ASR → Lexicon Lookup → Translation → Storage.
@@ -868,6 +918,8 @@ class STTPipeline:
             user_type: 'doctor' or 'patient' (determines language configuration)
             consultation_id: UUID of the consultation session
             db_client: Database client for transcript storage and lexicon lookup
+            decoded: Optional shared decode of audio_chunk, reused instead of
+                converting the chunk again for STT
             
         Returns:
             Dictionary with:
@@ -887,7 +939,7 @@ class STTPipeline:
         try:
             # Step 1: Transcribe audio with ASR fallback
             transcription_start = time.time()
-            original_text = await self.transcribe_audio(audio_chunk, user_type)
+            original_text = await self.transcribe_audio(audio_chunk, user_type, decoded=decoded)
             stage_timings['transcription'] = (time.time() - transcription_start) * 1000
             
             if not original_text:
@@ -956,7 +1008,11 @@ class STTPipeline:
             try:
                 if db_client and hasattr(db_client, 'append_transcript'):
                     transcript_entry = f"[{user_type.upper()}]: {original_text}"
-                    await db_client.append_transcript(consultation_id, transcript_entry)
+                    if await db_client.append_transcript(consultation_id, transcript_entry):
+                        # Keep the live SOAP draft up to date
+                        rolling_summarizer = get_rolling_summarizer()
+                        if rolling_summarizer is not None:
+                            rolling_summarizer.add_segment(consultation_id, transcript_entry)
                 stage_timings['transcript_save'] = (time.time() - transcript_start) * 1000
             except Exception as e:
                 # Task 5.3: Continue processing even if transcript save fails
@@ -9,9 +9,13 @@ Based on EMNLP 2024 'Words Matter' research for person-first clinical documentat
 """
 
 import os
+import re
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, List, Tuple, Any, Optional
+from collections import deque
+from typing import Dict, List, Tuple, Any, Optional, AsyncIterator
 import google.generativeai as genai
 
 # Handle imports for both direct execution and module import
@@ -31,9 +35,38 @@ if GEMINI_API_KEY:
 else:
     logger.warning("GEMINI_API_KEY not found in environment variables")
 
+# Gemini model shared by every SOAP request (gemini-2.5-flash for better availability)
+SOAP_MODEL_NAME = 'models/gemini-2.5-flash'
+
+# How SOAP generation and Compassion Reflex are scheduled:
+# - "streaming": stream the SOAP note and start Compassion Reflex as soon as the
+#   assessment and plan sections are complete (default)
+# - "sequential": generate the SOAP note, then run Compassion Reflex
+# - "combined": one structured call returning the SOAP note and suggestions
+# - "mapreduce": summarize transcript chunks concurrently, then merge them
+SOAP_PIPELINE_MODES = ("streaming", "sequential", "combined", "mapreduce")
+SOAP_PIPELINE_MODE = os.getenv("SOAP_PIPELINE_MODE", "streaming")
+
+# Per-call timeouts for the Gemini requests
+SOAP_TIMEOUT_SECONDS = float(os.getenv("SOAP_TIMEOUT_SECONDS", "60"))
+COMPASSION_TIMEOUT_SECONDS = float(os.getenv("COMPASSION_TIMEOUT_SECONDS", "30"))
+
+# Map-reduce summarization for long transcripts: transcripts longer than the
+# threshold are split on speaker turns into chunks of at most SOAP_CHUNK_CHARS,
+# with at most SOAP_MAP_CONCURRENCY chunk summaries in flight
+# (crossover measured with benchmark_soap_mapreduce.py)
+SOAP_MAPREDUCE_THRESHOLD_CHARS = int(os.getenv("SOAP_MAPREDUCE_THRESHOLD_CHARS", "27000"))
+SOAP_CHUNK_CHARS = int(os.getenv("SOAP_CHUNK_CHARS", "6000"))
+SOAP_MAP_CONCURRENCY = int(os.getenv("SOAP_MAP_CONCURRENCY", "4"))
+
+# Lines starting a new speaker turn, e.g. "[PATIENT]: ..." or "Doctor: ..."
+SPEAKER_TURN_PATTERN = re.compile(r"^\s*(\[[A-Za-z _-]+\]|[A-Za-z][A-Za-z _-]{0,20}):")
+
+SOAP_FIELDS = ['subjective', 'objective', 'assessment', 'plan']
+
 
 # Prompts for the two-step LLM chain
-SOAP_GENERATION_PROMPT = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context. 
+SOAP_INSTRUCTIONS = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context. 
 
 Analyze this multilingual, code-switched (Hinglish) transcript from a doctor-patient consultation and generate a structured, professional, English-only SOAP note.
 
@@ -49,7 +82,9 @@ Guidelines:
 
 Transcript:
 {transcript}
+"""
 
+SOAP_GENERATION_PROMPT = SOAP_INSTRUCTIONS + """
 Output the SOAP note as a JSON object with this exact structure:
 {{
   "subjective": "Patient's reported symptoms, history, and concerns",
@@ -60,16 +95,31 @@ Output the SOAP note as a JSON object with this exact structure:
 
 Return ONLY the JSON object, no additional text or explanation."""
 
-COMPASSION_REFLEX_PROMPT = """You are a medical ethics expert specializing in person-first language and de-stigmatization in clinical documentation, based on EMNLP 2024 'Words Matter' research.
+# Same note, but assessment and plan are written first so Compassion Reflex
+# can start on them while subjective and objective are still streaming
+SOAP_STREAMING_PROMPT = SOAP_INSTRUCTIONS + """
+Output the SOAP note as a JSON object with this exact structure and key order:
+{{
+  "assessment": "Clinical diagnosis and medical impression",
+  "plan": "Treatment plan, medications, follow-up instructions",
+  "subjective": "Patient's reported symptoms, history, and concerns",
+  "objective": "Observable findings, vital signs, physical examination results"
+}}
 
-Review the following clinical note sections (Assessment and Plan) for stigmatizing, judgmental, or non-person-first language.
+Return ONLY the JSON object, no additional text or explanation."""
 
-Common issues to identify:
+STIGMA_GUIDELINES = """Common issues to identify:
 - Non-person-first language (e.g., "diabetic patient" → "patient with diabetes")
 - Judgmental terms (e.g., "non-compliant" → "reports difficulty adhering to")
 - Deficit-focused descriptions (e.g., "drug abuser" → "patient with substance use disorder")
 - Blame-oriented language (e.g., "patient refuses" → "patient declines")
-- Stigmatizing mental health terms (e.g., "crazy", "psycho" → clinical terms)
+- Stigmatizing mental health terms (e.g., "crazy", "psycho" → clinical terms)"""
+
+COMPASSION_REFLEX_PROMPT = """You are a medical ethics expert specializing in person-first language and de-stigmatization in clinical documentation, based on EMNLP 2024 'Words Matter' research.
+
+Review the following clinical note sections (Assessment and Plan) for stigmatizing, judgmental, or non-person-first language.
+
+""" + STIGMA_GUIDELINES + """
 
 Assessment Section:
 {assessment}
@@ -102,9 +152,526 @@ If NO stigmatizing language is found, return:
 
 Return ONLY the JSON object, no additional text or explanation."""
 
+# Map step: clinical facts from one part of a long transcript
+SOAP_MAP_PROMPT = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context.
+
+Below is part {part} of {total} of a multilingual, code-switched (Hinglish) doctor-patient consultation transcript. Extract the clinically relevant facts from THIS PART ONLY, in English, grouped by SOAP section.
+
+Guidelines:
+- Extract only clinically relevant facts; ignore casual conversation
+- Use professional medical terminology
+- Be brief: short factual phrases, not prose
+- Use an empty string for sections with nothing in this part
+
+Transcript part:
+{transcript}
+
+Output a JSON object with EXACTLY these keys: "subjective", "objective", "assessment", "plan".
+
+Return ONLY the JSON object, no additional text or explanation."""
+
+# Reduce step: merge per-part facts into one note
+SOAP_REDUCE_PROMPT = """You are an expert, HIPAA-compliant AI medical scribe for the Indian healthcare context.
+
+A long doctor-patient consultation was split into consecutive parts, and the clinically relevant facts of each part were extracted by SOAP section. Merge them, in order, into ONE structured, professional, English-only SOAP note.
+
+Guidelines:
+- Combine and de-duplicate facts across parts; later parts may update or correct earlier ones
+- Use professional medical terminology
+- Be concise but comprehensive
+- Maintain patient confidentiality (no identifying information beyond clinical relevance)
+
+Facts by part (JSON):
+{partials}
+
+Output the SOAP note as a JSON object with this exact structure:
+{{
+  "subjective": "Patient's reported symptoms, history, and concerns",
+  "objective": "Observable findings, vital signs, physical examination results",
+  "assessment": "Clinical diagnosis and medical impression",
+  "plan": "Treatment plan, medications, follow-up instructions"
+}}
+
+Return ONLY the JSON object, no additional text or explanation."""
+
+# Single structured call: SOAP note plus Compassion Reflex review of it
+SOAP_WITH_COMPASSION_PROMPT = SOAP_INSTRUCTIONS + """
+After writing the note, review your own Assessment and Plan sections for stigmatizing, judgmental, or non-person-first language, following 'Words Matter' (EMNLP 2024) person-first documentation practice. Write the note itself neutrally, and report any phrase in it that a reviewer could still find stigmatizing.
+
+""" + STIGMA_GUIDELINES + """
+
+Output a JSON object with this exact structure:
+{{
+  "soap_note": {{
+    "subjective": "Patient's reported symptoms, history, and concerns",
+    "objective": "Observable findings, vital signs, physical examination results",
+    "assessment": "Clinical diagnosis and medical impression",
+    "plan": "Treatment plan, medications, follow-up instructions"
+  }},
+  "suggestions": [
+    {{
+      "section": "assessment",
+      "original": "exact phrase from the note",
+      "suggested": "person-first alternative",
+      "rationale": "brief explanation"
+    }}
+  ]
+}}
+
+Use an empty "suggestions" list if no stigmatizing language is found.
+
+Return ONLY the JSON object, no additional text or explanation."""
+
+
+class EmptyTranscript(ValueError):
+    """There is no transcript to summarize (a client error, unlike other ValueErrors here)."""
+
+
+class SoapStreamParser:
+    """
+    Incremental parser for a streamed JSON object of string fields.
+    
+    feed() takes each chunk as it arrives and returns the fields whose
+    string value closed within it, so every character is scanned once no
+    matter how many chunks there are. Text before the opening brace (such
+    as a markdown fence) is skipped, and non-string or nested values are
+    ignored rather than treated as errors.
+    """
+    
+    def __init__(self, fields: Tuple[str, ...] = SOAP_FIELDS):
+        self.fields = fields
+        self.text = ""
+        self.completed: Dict[str, str] = {}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._expect_value = False
+    
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """
+        Consume the next chunk of the response.
+        
+        Returns:
+            Fields completed by this chunk, in the order they closed
+        """
+        offset = len(self.text)
+        self.text += chunk
+        new: Dict[str, str] = {}
+        
+        for i, char in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_string(self.text[self._string_start:i + 1], new)
+            elif self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                # Nested value: not a section
+                self._depth += 1
+                self._expect_value = False
+            elif char in "}]":
+                self._depth -= 1
+            elif self._depth == 1:
+                if char == ":":
+                    self._expect_value = True
+                elif char == ",":
+                    self._key, self._expect_value = None, False
+        
+        return new
+    
+    def _close_string(self, raw: str, new: Dict[str, str]):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = None
+        
+        if not self._expect_value:
+            self._key = value
+            return
+        
+        self._expect_value = False
+        if self._key in self.fields and self._key not in self.completed and isinstance(value, str):
+            self.completed[self._key] = value
+            new[self._key] = value
+
+
+class SoapPipeline:
+    """
+    Async SOAP note generation with Compassion Reflex.
+    
+    Holds one Gemini model for all requests, bounds every call with a
+    timeout and records end-to-end latency per pipeline mode.
+    """
+    
+    def __init__(
+        self,
+        model: Optional[Any] = None,
+        mode: str = SOAP_PIPELINE_MODE,
+        soap_timeout: float = SOAP_TIMEOUT_SECONDS,
+        compassion_timeout: float = COMPASSION_TIMEOUT_SECONDS,
+        mapreduce_threshold: int = SOAP_MAPREDUCE_THRESHOLD_CHARS,
+        chunk_chars: int = SOAP_CHUNK_CHARS,
+        map_concurrency: int = SOAP_MAP_CONCURRENCY
+    ):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            model: Gemini model exposing generate_content_async (created on first use if omitted)
+            mode: Default pipeline mode, one of SOAP_PIPELINE_MODES
+            soap_timeout: Seconds allowed for SOAP generation (or the combined call)
+            compassion_timeout: Seconds allowed for Compassion Reflex analysis
+            mapreduce_threshold: Transcript length (chars) above which map-reduce
+                is used unless a mode is requested explicitly
+            chunk_chars: Maximum transcript chars per map-reduce chunk
+            map_concurrency: Maximum chunk summaries in flight at once
+        """
+        if mode not in SOAP_PIPELINE_MODES:
+            logger.warning(f"Unknown SOAP_PIPELINE_MODE '{mode}', using 'streaming'")
+            mode = "streaming"
+        
+        self._model = model
+        self.mode = mode
+        self.soap_timeout = soap_timeout
+        self.compassion_timeout = compassion_timeout
+        self.mapreduce_threshold = mapreduce_threshold
+        self.chunk_chars = chunk_chars
+        self.map_concurrency = max(1, map_concurrency)
+        
+        # Recent end-to-end latencies (seconds) per mode
+        self.latencies: Dict[str, deque] = {m: deque(maxlen=200) for m in SOAP_PIPELINE_MODES}
+        # Time from request to the first streamed section
+        self.latencies["first_section"] = deque(maxlen=200)
+    
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = genai.GenerativeModel(SOAP_MODEL_NAME)
+        return self._model
+    
+    async def generate(
+        self,
+        transcript: str,
+        mode: Optional[str] = None
+    ) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+        """
+        Generate a SOAP note and de-stigmatization suggestions.
+        
+        Transcripts longer than the map-reduce threshold are summarized in
+        chunks unless a mode is given explicitly.
+        
+        Args:
+            transcript: Full consultation transcript
+            mode: Pipeline mode for this call (default: the pipeline's mode)
+            
+        Returns:
+            Tuple of (SOAP note sections, de-stigmatization suggestions)
+            
+        Raises:
+            RuntimeError: If SOAP generation fails
+        """
+        if mode is None and len(transcript) > self.mapreduce_threshold:
+            mode = "mapreduce"
+        mode = mode or self.mode
+        if mode not in SOAP_PIPELINE_MODES:
+            raise ValueError(f"Unknown SOAP pipeline mode: {mode}")
+        
+        start = time.perf_counter()
+        
+        if mode == "combined":
+            result = await self._generate_combined(transcript)
+        elif mode == "mapreduce":
+            soap_note = await self.generate_soap_note_chunked(transcript)
+            suggestions = await self.analyze_for_stigma(soap_note["assessment"], soap_note["plan"])
+            result = (soap_note, suggestions)
+        elif mode == "streaming":
+            result = await self._generate_streaming(transcript)
+        else:
+            soap_note = await self.generate_soap_note(transcript)
+            suggestions = await self.analyze_for_stigma(soap_note["assessment"], soap_note["plan"])
+            result = (soap_note, suggestions)
+        
+        elapsed = time.perf_counter() - start
+        self.latencies[mode].append(elapsed)
+        logger.info(f"SOAP pipeline ({mode}) completed in {elapsed * 1000:.0f}ms")
+        return result
+    
+    async def generate_text(self, prompt: str, timeout: float, **kwargs) -> str:
+        """Make one Gemini call bounded by a timeout."""
+        response = await asyncio.wait_for(
+            self.model.generate_content_async(prompt, **kwargs),
+            timeout=timeout
+        )
+        return response.text.strip()
+    
+    async def generate_soap_note(self, transcript: str) -> Dict[str, str]:
+        """
+        Step 1: Generate SOAP note from transcript using Gemini API.
+        
+        Args:
+            transcript: Full consultation transcript
+            
+        Returns:
+            Dictionary with keys: subjective, objective, assessment, plan
+            
+        Raises:
+            RuntimeError: If API call fails or response is invalid
+        """
+        try:
+            logger.debug("Calling Gemini API for SOAP note generation")
+            response_text = await self.generate_text(
+                SOAP_GENERATION_PROMPT.format(transcript=transcript),
+                self.soap_timeout
+            )
+            logger.debug(f"Received response: {response_text[:200]}...")
+            return _validate_soap_note(_parse_json_response(response_text))
+        
+        except Exception as e:
+            logger.error(f"Error generating SOAP note: {_describe_error(e)}")
+            raise RuntimeError(f"Failed to generate SOAP note: {_describe_error(e)}")
+    
+    async def generate_soap_note_chunked(self, transcript: str) -> Dict[str, str]:
+        """
+        Map-reduce SOAP generation for long transcripts.
+        
+        The transcript is split on speaker turns, each chunk's clinical facts
+        are extracted concurrently (bounded by map_concurrency), and the
+        per-chunk facts are merged into the four SOAP sections. If the facts
+        are themselves too long for one prompt they are merged in groups first.
+        
+        Args:
+            transcript: Full consultation transcript
+            
+        Returns:
+            Dictionary with keys: subjective, objective, assessment, plan
+            
+        Raises:
+            RuntimeError: If any chunk or the merge fails
+        """
+        chunks = split_transcript(transcript, self.chunk_chars)
+        slots = asyncio.Semaphore(self.map_concurrency)
+        logger.info(f"Map-reduce SOAP generation over {len(chunks)} chunks")
+        
+        async def summarize_chunk(index: int, chunk: str) -> Dict[str, str]:
+            async with slots:
+                response_text = await self.generate_text(
+                    SOAP_MAP_PROMPT.format(part=index + 1, total=len(chunks), transcript=chunk),
+                    self.soap_timeout
+                )
+            facts = _parse_json_response(response_text)
+            return {field: str(facts.get(field) or "") for field in SOAP_FIELDS}
+        
+        async def merge(partials: List[Dict[str, str]]) -> Dict[str, Any]:
+            async with slots:
+                response_text = await self.generate_text(
+                    SOAP_REDUCE_PROMPT.format(partials=json.dumps(partials, indent=1, ensure_ascii=False)),
+                    self.soap_timeout
+                )
+            return _parse_json_response(response_text)
+        
+        try:
+            partials = list(await asyncio.gather(
+                *(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks))
+            ))
+            
+            # Merge in groups until the facts fit in one reduce prompt; facts are
+            # terse, so a reduce prompt may carry two chunks' worth of text
+            reduce_chars = 2 * self.chunk_chars
+            while len(partials) > 1 and len(json.dumps(partials)) > reduce_chars:
+                group_size = max(2, reduce_chars // max(1, len(json.dumps(partials[0]))))
+                groups = [partials[i:i + group_size] for i in range(0, len(partials), group_size)]
+                merged = await asyncio.gather(*(merge(group) for group in groups))
+                partials = [{field: str(note.get(field) or "") for field in SOAP_FIELDS} for note in merged]
+            
+            return _validate_soap_note(await merge(partials))
+        
+        except Exception as e:
+            logger.error(f"Error generating SOAP note: {_describe_error(e)}")
+            raise RuntimeError(f"Failed to generate SOAP note: {_describe_error(e)}")
+    
+    async def analyze_for_stigma(self, assessment: str, plan: str) -> List[Dict[str, Any]]:
+        """
+        Step 2: Analyze SOAP note for stigmatizing language using Gemini API.
+        
+        Args:
+            assessment: Assessment section of SOAP note
+            plan: Plan section of SOAP note
+            
+        Returns:
+            List of suggestion dictionaries (empty if no issues found or on error)
+        """
+        try:
+            logger.debug("Calling Gemini API for Compassion Reflex analysis")
+            response_text = await self.generate_text(
+                COMPASSION_REFLEX_PROMPT.format(assessment=assessment, plan=plan),
+                self.compassion_timeout
+            )
+            logger.debug(f"Received response: {response_text[:200]}...")
+            return _validate_suggestions(_parse_json_response(response_text).get("suggestions", []))
+        
+        except Exception as e:
+            logger.error(f"Error analyzing for stigma: {_describe_error(e)}")
+            # Return empty list on error rather than failing the entire process
+            logger.warning("Returning empty suggestions due to error")
+            return []
+    
+    async def _generate_streaming(self, transcript: str) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+        """Run stream() to completion and return its final result."""
+        async for event in self.stream(transcript):
+            if event["type"] == "complete":
+                return event["soap_note"], event["stigma_suggestions"]
+        raise RuntimeError("Failed to generate SOAP note: stream ended early")
+    
+    async def stream(self, transcript: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the SOAP note section by section, overlapping Compassion Reflex.
+        
+        The streaming prompt asks for assessment and plan first; once both
+        strings have fully arrived, the stigma analysis starts while the
+        subjective and objective sections are still being generated.
+        
+        Args:
+            transcript: Full consultation transcript
+            
+        Yields:
+            {"type": "section", "section": name, "text": value} as each section closes,
+            {"type": "suggestions", "suggestions": [...]} once Compassion Reflex is done,
+            then {"type": "complete", "soap_note": {...}, "stigma_suggestions": [...]}
+            
+        Raises:
+            RuntimeError: If SOAP generation fails
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.soap_timeout
+        start = time.perf_counter()
+        parser = SoapStreamParser()
+        stigma_task: Optional[asyncio.Task] = None
+        
+        try:
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(
+                        SOAP_STREAMING_PROMPT.format(transcript=transcript),
+                        stream=True
+                    ),
+                    timeout=self.soap_timeout
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunk without text parts (e.g. final metadata)
+                        continue
+                    
+                    completed = parser.feed(text)
+                    if completed and len(completed) == len(parser.completed):
+                        self.latencies["first_section"].append(time.perf_counter() - start)
+                    for section, value in completed.items():
+                        yield {"type": "section", "section": section, "text": value}
+                    
+                    if stigma_task is None and "assessment" in parser.completed and "plan" in parser.completed:
+                        logger.debug("Assessment and plan complete, starting Compassion Reflex")
+                        stigma_task = asyncio.create_task(
+                            self.analyze_for_stigma(parser.completed["assessment"], parser.completed["plan"])
+                        )
+                
+                soap_note = _validate_soap_note(_parse_json_response(parser.text))
+            except Exception as e:
+                logger.error(f"Error generating SOAP note: {_describe_error(e)}")
+                raise RuntimeError(f"Failed to generate SOAP note: {_describe_error(e)}")
+            
+            # Sections the incremental parser could not pick out early
+            for section in SOAP_FIELDS:
+                if section not in parser.completed:
+                    yield {"type": "section", "section": section, "text": soap_note[section]}
+            
+            if stigma_task is None:
+                # Sections arrived in a different order; analyze the finished note
+                suggestions = await self.analyze_for_stigma(soap_note["assessment"], soap_note["plan"])
+            else:
+                suggestions = await stigma_task
+            yield {"type": "suggestions", "suggestions": suggestions}
+            yield {"type": "complete", "soap_note": soap_note, "stigma_suggestions": suggestions}
+        finally:
+            # Also reached when the consumer stops listening early
+            if stigma_task is not None and not stigma_task.done():
+                stigma_task.cancel()
+    
+    async def _generate_combined(self, transcript: str) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+        """Request the SOAP note and stigma analysis in one structured call."""
+        try:
+            response_text = await self.generate_text(
+                SOAP_WITH_COMPASSION_PROMPT.format(transcript=transcript),
+                self.soap_timeout,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            result = _parse_json_response(response_text)
+            soap_note = _validate_soap_note(result.get("soap_note", {}))
+        except Exception as e:
+            logger.error(f"Error generating SOAP note: {_describe_error(e)}")
+            raise RuntimeError(f"Failed to generate SOAP note: {_describe_error(e)}")
+        
+        return soap_note, _validate_suggestions(result.get("suggestions", []))
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize recorded end-to-end latencies.
+        
+        Returns:
+            Per mode (and "first_section", the time until the first streamed
+            section arrived): number of runs and mean/p50/p95 latency in milliseconds
+        """
+        stats = {}
+        for mode, samples in self.latencies.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats[mode] = {
+                "runs": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            }
+        return stats
+
+
+# Global pipeline instance (reuses one Gemini model across requests)
+_soap_pipeline: Optional[SoapPipeline] = None
+
+
+def get_soap_pipeline() -> SoapPipeline:
+    """
+    Get or create the global SoapPipeline instance.
+    
+    Returns:
+        SoapPipeline singleton instance
+    """
+    global _soap_pipeline
+    if _soap_pipeline is None:
+        _soap_pipeline = SoapPipeline()
+    return _soap_pipeline
+
 
 async def generate_notes_with_empathy(
-    full_transcript: str
+    full_transcript: str,
+    mode: Optional[str] = None,
+    consultation_id: Optional[str] = None
 ) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
     """
     Generate SOAP notes with Compassion Reflex de-stigmatization suggestions.
@@ -113,8 +680,15 @@ async def generate_notes_with_empathy(
     1. Generate SOAP note from multilingual transcript
     2. Analyze for stigmatizing language and provide suggestions
     
+    By default the two steps overlap (see SOAP_PIPELINE_MODE); "combined"
+    mode does both in a single structured Gemini call. When consultation_id
+    is given and a rolling draft kept during the call covers the whole
+    transcript, that draft is finished instead of summarizing from scratch.
+    
     Args:
         full_transcript: Complete consultation transcript (may be multilingual/Hinglish)
+        mode: Optional pipeline mode override ('streaming', 'sequential' or 'combined')
+        consultation_id: Optional consultation ID, enables the rolling draft
         
     Returns:
         Tuple containing:
@@ -126,146 +700,170 @@ async def generate_notes_with_empathy(
         RuntimeError: If LLM API calls fail
     """
     if not full_transcript or not full_transcript.strip():
-        raise ValueError("Transcript cannot be empty")
+        raise EmptyTranscript("Transcript cannot be empty")
     
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not configured")
     
     logger.info("Starting SOAP note generation with Compassion Reflex")
     
-    # Step 1: Generate SOAP note
-    logger.info("Step 1: Generating SOAP note from transcript")
-    raw_soap_note = await _generate_soap_note(full_transcript)
-    
-    # Step 2: Run Compassion Reflex analysis
-    logger.info("Step 2: Running Compassion Reflex de-stigmatization analysis")
-    de_stigma_suggestions = await _analyze_for_stigma(
-        raw_soap_note["assessment"],
-        raw_soap_note["plan"]
-    )
+    result = None
+    if consultation_id:
+        from .rolling_summarizer import get_rolling_summarizer
+        rolling = get_rolling_summarizer()
+        if rolling is not None:
+            result = await rolling.finalize(consultation_id, full_transcript)
     
+    if result is None:
+        result = await get_soap_pipeline().generate(full_transcript, mode)
+    soap_note, de_stigma_suggestions = result
     logger.info(f"SOAP generation complete. Found {len(de_stigma_suggestions)} suggestions")
     
-    return raw_soap_note, de_stigma_suggestions
+    return soap_note, de_stigma_suggestions
 
 
-async def _generate_soap_note(transcript: str) -> Dict[str, str]:
+async def stream_notes_with_empathy(
+    full_transcript: str,
+    consultation_id: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
     """
-    Step 1: Generate SOAP note from transcript using Gemini API.
+    Streaming variant of generate_notes_with_empathy.
+    
+    Yields the events of SoapPipeline.stream(): each SOAP section as soon as
+    it has been generated, then the suggestions, then a "complete" event
+    with the full result. A finished rolling draft is emitted all at once.
     
     Args:
-        transcript: Full consultation transcript
-        
-    Returns:
-        Dictionary with keys: subjective, objective, assessment, plan
+        full_transcript: Complete consultation transcript (may be multilingual/Hinglish)
+        consultation_id: Optional consultation ID, enables the rolling draft
         
     Raises:
-        RuntimeError: If API call fails or response is invalid
+        ValueError: If transcript is empty or API key not configured
+        RuntimeError: If LLM API calls fail
     """
-    try:
-        # Initialize Gemini model (using gemini-2.5-flash for better availability)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        # Format prompt with transcript
-        prompt = SOAP_GENERATION_PROMPT.format(transcript=transcript)
-        
-        # Generate content
-        logger.debug("Calling Gemini API for SOAP note generation")
-        response = model.generate_content(prompt)
-        
-        # Extract text from response
-        response_text = response.text.strip()
-        logger.debug(f"Received response: {response_text[:200]}...")
-        
-        # Parse JSON response
-        soap_note = _parse_json_response(response_text)
-        
-        # Validate required fields
-        required_fields = ['subjective', 'objective', 'assessment', 'plan']
-        for field in required_fields:
-            if field not in soap_note:
-                raise ValueError(f"Missing required field: {field}")
-            if not soap_note[field] or not soap_note[field].strip():
-                raise ValueError(f"Field '{field}' cannot be empty")
-        
-        # Validate using Pydantic model
-        validated_note = SoapNoteResponse(**soap_note)
-        
-        return {
-            "subjective": validated_note.subjective,
-            "objective": validated_note.objective,
-            "assessment": validated_note.assessment,
-            "plan": validated_note.plan
-        }
-        
-    except Exception as e:
-        logger.error(f"Error generating SOAP note: {str(e)}")
-        raise RuntimeError(f"Failed to generate SOAP note: {str(e)}")
-
-
-async def _analyze_for_stigma(
-    assessment: str,
-    plan: str
-) -> List[Dict[str, Any]]:
+    if not full_transcript or not full_transcript.strip():
+        raise EmptyTranscript("Transcript cannot be empty")
+    
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not configured")
+    
+    result = None
+    if consultation_id:
+        from .rolling_summarizer import get_rolling_summarizer
+        rolling = get_rolling_summarizer()
+        if rolling is not None:
+            result = await rolling.finalize(consultation_id, full_transcript)
+    
+    if result is None:
+        async for event in get_soap_pipeline().stream(full_transcript):
+            yield event
+        return
+    
+    soap_note, de_stigma_suggestions = result
+    for section in SOAP_FIELDS:
+        yield {"type": "section", "section": section, "text": soap_note[section]}
+    yield {"type": "suggestions", "suggestions": de_stigma_suggestions}
+    yield {"type": "complete", "soap_note": soap_note, "stigma_suggestions": de_stigma_suggestions}
+
+
+def _validate_soap_note(soap_note: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Check that every SOAP section is present and non-empty.
+    
+    Raises:
+        ValueError: If a section is missing or empty
+    """
+    for field in SOAP_FIELDS:
+        if field not in soap_note:
+            raise ValueError(f"Missing required field: {field}")
+        if not soap_note[field] or not str(soap_note[field]).strip():
+            raise ValueError(f"Field '{field}' cannot be empty")
+    
+    # Validate using Pydantic model
+    validated_note = SoapNoteResponse(**{field: soap_note[field] for field in SOAP_FIELDS})
+    
+    return {
+        "subjective": validated_note.subjective,
+        "objective": validated_note.objective,
+        "assessment": validated_note.assessment,
+        "plan": validated_note.plan
+    }
+
+
+def _validate_suggestions(suggestions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep well-formed suggestions, dropping any the model got wrong."""
+    validated_suggestions = []
+    for suggestion in suggestions:
+        try:
+            validated = StigmaSuggestion(**suggestion)
+            validated_suggestions.append({
+                "section": validated.section,
+                "original": validated.original,
+                "suggested": validated.suggested,
+                "rationale": validated.rationale
+            })
+        except Exception as e:
+            logger.warning(f"Invalid suggestion format, skipping: {e}")
+            continue
+    
+    return validated_suggestions
+
+
+def split_transcript(transcript: str, max_chars: int) -> List[str]:
     """
-    Step 2: Analyze SOAP note for stigmatizing language using Gemini API.
+    Split a transcript into chunks on speaker-turn boundaries.
+    
+    Lines that do not start a new turn are kept with the turn before them.
+    Turns are packed into chunks of at most max_chars; a single turn longer
+    than that is split on whitespace.
     
     Args:
-        assessment: Assessment section of SOAP note
-        plan: Plan section of SOAP note
+        transcript: Full consultation transcript
+        max_chars: Maximum characters per chunk
         
     Returns:
-        List of suggestion dictionaries (empty if no issues found)
-        
-    Raises:
-        RuntimeError: If API call fails or response is invalid
+        List of transcript chunks, in order
     """
-    try:
-        # Initialize Gemini model (using gemini-2.5-flash for better availability)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        # Format prompt with assessment and plan sections
-        prompt = COMPASSION_REFLEX_PROMPT.format(
-            assessment=assessment,
-            plan=plan
-        )
-        
-        # Generate content
-        logger.debug("Calling Gemini API for Compassion Reflex analysis")
-        response = model.generate_content(prompt)
-        
-        # Extract text from response
-        response_text = response.text.strip()
-        logger.debug(f"Received response: {response_text[:200]}...")
-        
-        # Parse JSON response
-        result = _parse_json_response(response_text)
-        
-        # Extract suggestions array
-        suggestions = result.get("suggestions", [])
-        
-        # Validate each suggestion using Pydantic model
-        validated_suggestions = []
-        for suggestion in suggestions:
-            try:
-                validated = StigmaSuggestion(**suggestion)
-                validated_suggestions.append({
-                    "section": validated.section,
-                    "original": validated.original,
-                    "suggested": validated.suggested,
-                    "rationale": validated.rationale
-                })
-            except Exception as e:
-                logger.warning(f"Invalid suggestion format, skipping: {e}")
-                continue
-        
-        return validated_suggestions
+    turns: List[str] = []
+    for line in transcript.splitlines():
+        if not line.strip():
+            continue
+        if turns and not SPEAKER_TURN_PATTERN.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+    
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for turn in turns:
+        pieces = [turn]
+        if len(turn) > max_chars:
+            pieces, piece = [], ""
+            for word in turn.split(" "):
+                if piece and len(piece) + len(word) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = word
+                else:
+                    piece = f"{piece} {word}" if piece else word
+            pieces.append(piece)
         
-    except Exception as e:
-        logger.error(f"Error analyzing for stigma: {str(e)}")
-        # Return empty list on error rather than failing the entire process
-        logger.warning("Returning empty suggestions due to error")
-        return []
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return "Gemini API request timed out"
+    return str(error)
 
 
 def _parse_json_response(response_text: str) -> Dict[str, Any]:
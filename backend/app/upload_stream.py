@@ -0,0 +1,225 @@
+"""
+Streaming Multipart Uploads
+
+Parses a multipart/form-data request body as it arrives instead of letting
+the framework spool the whole file to a temporary file and then copying it
+a second time. File data is written to its destination chunk by chunk with
+async file I/O, its SHA-256 is computed on the fly and the size limit is
+enforced while streaming, so memory per upload stays at about one network
+chunk regardless of file size.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple, Any, Optional, Callable
+
+import anyio
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Non-file form fields are small (IDs, flags); anything larger is rejected
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class StreamedFile:
+    """One file saved from a streamed upload."""
+
+    def __init__(self, filename: str, content_type: str, path: Path):
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = 0
+        self.sha256: Optional[str] = None
+
+
+class StreamedUpload:
+    """
+    Form fields and the saved files of a streamed upload.
+
+    filename, content_type, path and sha256 describe the first file; size
+    is the total of all files.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.files: List[StreamedFile] = []
+
+    @property
+    def filename(self) -> Optional[str]:
+        return self.files[0].filename if self.files else None
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.files[0].content_type if self.files else None
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.files[0].path if self.files else None
+
+    @property
+    def sha256(self) -> Optional[str]:
+        return self.files[0].sha256 if self.files else None
+
+    @property
+    def size(self) -> int:
+        return sum(file.size for file in self.files)
+
+
+class _PartCollector:
+    """MultipartParser callbacks that queue parsed events for the async loop."""
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def _on_headers_finished(self):
+        self.events.append(("part", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self.events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self):
+        self.events.append(("end", None))
+
+
+async def stream_upload(
+    request: Request,
+    file_field: str,
+    destination: Callable[[str], Path],
+    max_bytes: int,
+    max_files: int = 1
+) -> StreamedUpload:
+    """
+    Save the file(s) of a multipart/form-data request while they are received.
+
+    Args:
+        request: Incoming request
+        file_field: Name of the form field holding the file(s)
+        destination: Called with the client's filename, returns the path to
+            save the file to (may raise HTTPException to reject the file)
+        max_bytes: Maximum total size of the files in bytes
+        max_files: Maximum number of files in file_field
+
+    Returns:
+        StreamedUpload with the other form fields and the saved paths, sizes and SHA-256s
+
+    Raises:
+        HTTPException: 400 for a malformed body, a missing file or too many
+            files, 413 if the files exceed max_bytes (saved files are removed)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    # Reject obviously oversized bodies before reading any of them
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > max_bytes + MAX_FIELD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+    collector = _PartCollector()
+    parser = MultipartParser(params[b"boundary"], collector.callbacks())
+    upload = StreamedUpload()
+
+    out = None
+    hasher = None
+    current: Optional[StreamedFile] = None
+    received = 0
+    field_name: Optional[str] = None
+    field_value = bytearray()
+
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise HTTPException(status_code=400, detail=f"Malformed upload: {str(e)}")
+
+            for kind, value in collector.events:
+                if kind == "part":
+                    _, options = parse_options_header(value.get(b"content-disposition", b""))
+                    field_name = options.get(b"name", b"").decode("utf-8", "replace")
+                    filename = options.get(b"filename")
+                    field_value = bytearray()
+                    if filename is not None and field_name == file_field:
+                        if len(upload.files) >= max_files:
+                            raise HTTPException(status_code=400, detail=f"Too many files (max {max_files})")
+                        filename = filename.decode("utf-8", "replace")
+                        content_type = value.get(b"content-type", b"application/octet-stream").decode("latin-1")
+                        current = StreamedFile(filename, content_type, destination(filename))
+                        upload.files.append(current)
+                        out = await anyio.open_file(current.path, "wb")
+                        hasher = hashlib.sha256()
+
+                elif kind == "data":
+                    if current is not None:
+                        current.size += len(value)
+                        received += len(value)
+                        if received > max_bytes:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)"
+                            )
+                        hasher.update(value)
+                        await out.write(value)
+                    else:
+                        field_value += value
+                        if len(field_value) > MAX_FIELD_BYTES:
+                            raise HTTPException(status_code=400, detail=f"Form field '{field_name}' too large")
+
+                elif kind == "end":
+                    if current is not None:
+                        await out.aclose()
+                        out = None
+                        current.sha256 = hasher.hexdigest()
+                        current = None
+                    elif field_name:
+                        upload.fields[field_name] = field_value.decode("utf-8", "replace")
+
+            collector.events.clear()
+
+        parser.finalize()
+
+        if not upload.files or any(file.sha256 is None for file in upload.files):
+            raise HTTPException(status_code=400, detail=f"No file uploaded in field '{file_field}'")
+
+    except BaseException:
+        if out is not None:
+            await out.aclose()
+        for file in upload.files:
+            if file.path.exists():
+                file.path.unlink()
+        raise
+
+    for file in upload.files:
+        logger.info(f"Received upload {file.filename} ({file.size} bytes, sha256 {file.sha256[:12]})")
+    return upload
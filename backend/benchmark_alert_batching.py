@@ -0,0 +1,193 @@
+"""
+Benchmark for micro-batched Gemini triage in the Alert Engine.
+
+Starts a local fake Gemini server that answers triage prompts with a fixed
+latency, then drives many concurrent consultations through AlertEngine
+with batching disabled and enabled. Reports API requests (quota units),
+utterances per request, wall time and per-utterance latency.
+
+Run with: python benchmark_alert_batching.py
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.alert_engine import AlertEngine, TriageBatcher
+
+# Fake server behaviour
+BASE_LATENCY_S = 0.40
+PER_ITEM_LATENCY_S = 0.01
+
+# Load profile
+CONSULTATIONS = 25
+UTTERANCES_PER_CONSULTATION = 6
+UTTERANCE_INTERVAL_S = 0.3
+
+SAMPLE_UTTERANCES = [
+    "I have severe chest pain and my left arm is numb",
+    "mujhe kal se halka sir dard hai",
+    "I think I broke my arm when I fell",
+    "just a mild cough for two days",
+    "I can't breathe properly when I lie down",
+    "my knee hurts a little after walking",
+]
+
+
+def fake_triage(text: str) -> dict:
+    """Deterministic stand-in for Gemini's triage judgement."""
+    text_lower = text.lower()
+    if "chest" in text_lower or "breathe" in text_lower:
+        severity, symptom_type = 5, "chest_pain"
+    elif "broke" in text_lower:
+        severity, symptom_type = 4, "injury"
+    else:
+        severity, symptom_type = 2, "other"
+    return {
+        "is_critical": severity >= 3,
+        "symptom_type": symptom_type,
+        "severity_score": severity,
+        "analysis": "fake analysis",
+        "recommendations": "fake recommendation",
+        "emergency_keywords": []
+    }
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers single and batched triage prompts like Gemini would."""
+
+    request_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        prompt = json.loads(self.rfile.read(length))["prompt"]
+
+        with FakeGeminiHandler.lock:
+            FakeGeminiHandler.request_count += 1
+
+        batch_items = re.findall(r'^(\d+)\. (".*")$', prompt, flags=re.MULTILINE)
+        if batch_items:
+            payload = [
+                {"id": int(number), **fake_triage(json.loads(text))}
+                for number, text in batch_items
+            ]
+        else:
+            text = re.search(r'Patient says: "(.*)"', prompt).group(1)
+            payload = fake_triage(text)
+
+        time.sleep(BASE_LATENCY_S + PER_ITEM_LATENCY_S * max(1, len(batch_items)))
+
+        body = json.dumps({
+            "candidates": [{"content": {"parts": [{"text": json.dumps(payload)}]}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Minimal GenerativeModel look-alike that talks to the fake server."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"prompt": prompt}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            data = json.loads(response.read())
+        return FakeResponse(data["candidates"][0]["content"]["parts"][0]["text"])
+
+    async def generate_content_async(self, prompt: str) -> FakeResponse:
+        return await asyncio.to_thread(self.generate_content, prompt)
+
+
+async def run_load(engine: AlertEngine) -> list:
+    """Drive concurrent consultations through the engine, returning latencies."""
+    latencies = []
+
+    async def consultation(index: int):
+        await asyncio.sleep(random.uniform(0, UTTERANCE_INTERVAL_S))
+        for turn in range(UTTERANCES_PER_CONSULTATION):
+            text = SAMPLE_UTTERANCES[(index + turn) % len(SAMPLE_UTTERANCES)]
+            start = time.perf_counter()
+            await engine.analyze_transcript(text, f"consultation-{index}", "patient")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(UTTERANCE_INTERVAL_S)
+
+    await asyncio.gather(*(consultation(i) for i in range(CONSULTATIONS)))
+    return latencies
+
+
+def make_engine(model: FakeGeminiModel, batched: bool) -> AlertEngine:
+    engine = AlertEngine()
+    engine.model = model
+    engine.ai_enabled = True
+    engine.batcher = TriageBatcher(model) if batched else None
+    return engine
+
+
+async def benchmark(label: str, engine: AlertEngine):
+    FakeGeminiHandler.request_count = 0
+    start = time.perf_counter()
+    latencies = await run_load(engine)
+    wall_time = time.perf_counter() - start
+    requests = FakeGeminiHandler.request_count
+    latencies.sort()
+
+    print(f"{label}:")
+    print(f"   Utterances:            {len(latencies)}")
+    print(f"   Gemini requests:       {requests}")
+    print(f"   Utterances / request:  {len(latencies) / max(requests, 1):.2f}")
+    print(f"   Wall time:             {wall_time:.2f}s")
+    print(f"   Latency p50 / p95:     {latencies[len(latencies) // 2] * 1000:.0f}ms / "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms")
+    print()
+    return requests
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    model = FakeGeminiModel(f"http://127.0.0.1:{server.server_address[1]}/generate")
+
+    print("=" * 60)
+    print("Alert Engine Triage Batching Benchmark")
+    print(f"{CONSULTATIONS} consultations x {UTTERANCES_PER_CONSULTATION} utterances, "
+          f"fake Gemini latency {BASE_LATENCY_S * 1000:.0f}ms")
+    print("=" * 60)
+    print()
+
+    unbatched = asyncio.run(benchmark("One request per utterance", make_engine(model, batched=False)))
+    batched = asyncio.run(benchmark("Micro-batched", make_engine(model, batched=True)))
+
+    print(f"Quota reduction: {unbatched / max(batched, 1):.1f}x fewer Gemini requests")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark for emotion classifier inference throughput.
+
+Builds a logistic regression and a small MLP with random weights (the
+architecture, not the accuracy, is what is being timed) and compares:
+- the rule-based classifier, one feature dictionary at a time
+- the NumPy model, one feature vector per call
+- the NumPy model on batches of feature vectors
+Also reports analyzer construction time and the one-off cost of the lazy
+model load on first prediction.
+
+Run with: python benchmark_emotion_classifier.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer, EMOTION_CATEGORIES
+from app.emotion_classifier import CLASSIFIER_FEATURES, NumpyEmotionClassifier, feature_vector, save_model
+from benchmark_emotion_features import synthetic_voice
+
+VECTORS = 20000
+BATCH_SIZES = [32, 256, 4096]
+
+
+def random_model(path: str, hidden: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n_features, n_classes = len(CLASSIFIER_FEATURES), len(EMOTION_CATEGORIES)
+    params = {"mean": rng.normal(size=n_features), "scale": rng.uniform(0.5, 2, n_features)}
+    if hidden:
+        params.update(W1=rng.normal(size=(n_features, hidden)), b1=np.zeros(hidden),
+                      W2=rng.normal(size=(hidden, n_classes)), b2=np.zeros(n_classes))
+    else:
+        params.update(W1=rng.normal(size=(n_features, n_classes)), b1=np.zeros(n_classes))
+    save_model(path, list(EMOTION_CATEGORIES), params)
+
+
+def rate(fn, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    analyzer = EmotionAnalyzer(workers=0)
+    base = analyzer._extract_features(synthetic_voice(3.0))
+    rng = np.random.default_rng(1)
+    X = feature_vector(base) * (1 + 0.1 * rng.standard_normal((VECTORS, len(CLASSIFIER_FEATURES))))
+    feature_dicts = [dict(base, pitch_mean=p, energy_mean=e) for p, e in X[:2000, :3:2]]
+
+    print("=" * 60)
+    print("Emotion Classifier Inference Benchmark")
+    print(f"{len(CLASSIFIER_FEATURES)} features, {len(EMOTION_CATEGORIES)} classes")
+    print("=" * 60)
+    print()
+
+    per_dict = rate(lambda: [analyzer._classify_with_rules(f) for f in feature_dicts], len(feature_dicts))
+    print(f"Rule-based (per chunk):        {per_dict:12,.0f} vectors/s")
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, hidden in [("Logistic regression", 0), ("MLP (32 hidden)", 32)]:
+            path = os.path.join(tmp, f"model_{hidden}.npz")
+            random_model(path, hidden)
+
+            start = time.perf_counter()
+            model_analyzer = EmotionAnalyzer(workers=0, classifier=NumpyEmotionClassifier(path))
+            construct_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            model_analyzer._classify_emotion(base)
+            first_ms = (time.perf_counter() - start) * 1000
+
+            classifier = model_analyzer.classifier
+            print(f"{name}  ({os.path.getsize(path)} bytes on disk)")
+            print(f"   Analyzer construction:      {construct_ms:8.2f}ms (model not read)")
+            print(f"   First prediction:           {first_ms:8.2f}ms (includes lazy load)")
+
+            single = rate(lambda: [classifier.classify(f) for f in feature_dicts], len(feature_dicts))
+            print(f"   Per chunk:                  {single:12,.0f} vectors/s")
+            for batch in BATCH_SIZES:
+                def run():
+                    for i in range(0, VECTORS, batch):
+                        classifier.predict_batch(X[i:i + batch])
+                print(f"   Batch of {batch:<5}             {rate(run, VECTORS):12,.0f} vectors/s")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark for EmotionAnalyzer feature extraction.
+
+Compares the shared single-STFT pipeline in EmotionAnalyzer._extract_features
+against the previous approach, where every librosa feature computed its own
+STFT and pitch selection looped over frames in Python. Uses synthetic
+voiced audio so no recordings are required.
+
+Run with: python benchmark_emotion_features.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import librosa
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = [1.0, 3.0, 5.0]
+ITERATIONS = 30
+
+
+def synthetic_voice(seconds: float, seed: int = 0) -> np.ndarray:
+    """Vibrato tone with harmonics, syllable-rate amplitude envelope and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    f0 = 170 + 25 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3.5 * t))
+    return (0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def legacy_extract_features(analyzer: EmotionAnalyzer, audio: np.ndarray) -> dict:
+    """The previous per-feature librosa implementation, kept for comparison."""
+    sr = analyzer.sample_rate
+    features = {}
+
+    pitches, magnitudes = librosa.piptrack(y=audio, sr=sr, fmin=50, fmax=400)
+    pitch_values = []
+    for t in range(pitches.shape[1]):
+        index = magnitudes[:, t].argmax()
+        pitch = pitches[index, t]
+        if pitch > 0:
+            pitch_values.append(pitch)
+    features['pitch_mean'] = np.mean(pitch_values) if pitch_values else 0
+
+    rms = librosa.feature.rms(y=audio)[0]
+    features['energy_mean'] = np.mean(rms)
+
+    zcr = librosa.feature.zero_crossing_rate(audio)[0]
+    features['speech_rate'] = np.mean(zcr) * sr / 2
+
+    mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=analyzer.n_mfcc)
+    features['mfcc_mean'] = np.mean(mfccs, axis=1)
+
+    features['spectral_centroid_mean'] = np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr)[0])
+    features['spectral_rolloff_mean'] = np.mean(librosa.feature.spectral_rolloff(y=audio, sr=sr)[0])
+    features['spectral_bandwidth_mean'] = np.mean(librosa.feature.spectral_bandwidth(y=audio, sr=sr)[0])
+
+    return analyzer._normalize_features({**analyzer._get_default_features(), **features})
+
+
+def time_per_chunk(fn, audio: np.ndarray) -> float:
+    fn(audio)  # warm-up (numba JIT, caches)
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        fn(audio)
+    return (time.process_time() - start) / ITERATIONS * 1000
+
+
+def main():
+    analyzer = EmotionAnalyzer(workers=0)
+
+    print("=" * 60)
+    print("Emotion Feature Extraction Benchmark (CPU time per chunk)")
+    print("=" * 60)
+    print()
+
+    for seconds in CHUNK_SECONDS:
+        audio = synthetic_voice(seconds)
+
+        legacy_ms = time_per_chunk(lambda a: legacy_extract_features(analyzer, a), audio)
+        shared_ms = time_per_chunk(analyzer._extract_features, audio)
+
+        print(f"{seconds:.1f}s chunk:")
+        print(f"   Per-feature STFTs:  {legacy_ms:7.2f}ms")
+        print(f"   Shared STFT:        {shared_ms:7.2f}ms")
+        print(f"   Speed-up:           {legacy_ms / shared_ms:7.2f}x")
+
+        legacy = legacy_extract_features(analyzer, audio)
+        shared = analyzer._extract_features(audio)
+        for name in ['pitch_mean', 'energy_mean', 'speech_rate',
+                     'spectral_centroid_mean', 'spectral_rolloff_mean', 'spectral_bandwidth_mean']:
+            print(f"   {name:<24} legacy={float(legacy[name]):10.4f}  shared={float(shared[name]):10.4f}")
+        mfcc_gap = np.max(np.abs(legacy['mfcc_mean'] - shared['mfcc_mean']))
+        print(f"   {'mfcc_mean max abs diff':<24} {mfcc_gap:.4f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
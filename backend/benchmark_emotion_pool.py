@@ -0,0 +1,103 @@
+"""
+Benchmark for running emotion analysis in a process pool.
+
+Feeds WAV-encoded synthetic audio chunks through EmotionAnalyzer inline and
+with a worker pool, while a heartbeat task measures how long the event loop
+is blocked. Reports chunks per second, chunks per second per core and the
+worst event-loop stall for each mode.
+
+Run with: python benchmark_emotion_pool.py [workers]
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+
+import soundfile as sf
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer
+from benchmark_emotion_features import synthetic_voice, SAMPLE_RATE
+
+CHUNKS = 60
+CHUNK_SECONDS = 3.0
+HEARTBEAT_S = 0.01
+
+
+def wav_chunks() -> list:
+    chunks = []
+    for seed in range(CHUNKS):
+        buffer = io.BytesIO()
+        sf.write(buffer, synthetic_voice(CHUNK_SECONDS, seed=seed), SAMPLE_RATE, format="WAV")
+        chunks.append(buffer.getvalue())
+    return chunks
+
+
+async def measure(analyzer: EmotionAnalyzer, chunks: list) -> dict:
+    """Analyze all chunks concurrently while tracking event-loop stalls."""
+    worst_stall = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal worst_stall
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_S)
+            worst_stall = max(worst_stall, time.perf_counter() - before - HEARTBEAT_S)
+
+    monitor = asyncio.create_task(heartbeat())
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(analyzer.analyze_audio(chunk) for chunk in chunks))
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    running = False
+    await monitor
+
+    return {
+        "elapsed": elapsed,
+        "cpu_seconds": cpu_seconds,
+        "worst_stall_ms": worst_stall * 1000
+    }
+
+
+def report(label: str, chunks: int, result: dict, per_core: float):
+    print(f"{label}:")
+    print(f"   Chunks/second:           {chunks / result['elapsed']:.2f}")
+    print(f"   Chunks/second/core:      {per_core:.2f}")
+    print(f"   Worst event-loop stall:  {result['worst_stall_ms']:.1f}ms")
+    print()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    chunks = wav_chunks()
+
+    print("=" * 60)
+    print("Emotion Analysis Process Pool Benchmark")
+    print(f"{CHUNKS} x {CHUNK_SECONDS:.0f}s WAV chunks, {workers} worker(s), {os.cpu_count()} CPU(s)")
+    print("=" * 60)
+    print()
+
+    inline = EmotionAnalyzer(workers=0)
+    inline.classify_chunk(chunks[0])  # warm-up
+    result = asyncio.run(measure(inline, chunks))
+    report("Inline (event loop)", CHUNKS, result, CHUNKS / result["cpu_seconds"])
+
+    pooled = EmotionAnalyzer(workers=workers)
+    asyncio.run(measure(pooled, chunks[:workers]))  # wait for warm workers
+    pooled.worker_pool.chunks_processed = 0
+    pooled.worker_pool.worker_cpu_seconds = 0.0
+    result = asyncio.run(measure(pooled, chunks))
+    stats = pooled.worker_pool.get_stats()
+    report("Process pool", CHUNKS, result, stats["chunks_per_second_per_core"])
+    print(f"Pool stats: {stats}")
+    pooled.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for local healing metrics (fast-mode image comparison).
+
+Builds synthetic before/after photos of a lesion at the comparison rendition
+size (1024px WebP), with the lesion shrinking, unchanged and growing, and
+measures compute_healing_metrics: decode, registration, segmentation,
+histograms and SSIM. The target is under 100ms per comparison.
+
+Run with: python benchmark_healing_metrics.py
+"""
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.healing_metrics import compute_healing_metrics, metrics_comparison
+
+ROUNDS = 20
+TARGET_MS = 100
+
+
+def make_photo(radius: int, shift=(0, 0), seed: int = 1) -> bytes:
+    """Skin-toned noise with a red lesion and a dark landmark"""
+    rng = np.random.default_rng(seed)
+    pixels = (np.array([205, 170, 150]) + rng.normal(0, 6, (768, 1024, 3))).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(image)
+    cx, cy = 512 + shift[0], 384 + shift[1]
+    draw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=(190, 70, 70))
+    draw.rectangle([100 + shift[0], 100 + shift[1], 160 + shift[0], 300 + shift[1]], fill=(120, 100, 90))
+    out = io.BytesIO()
+    image.save(out, format="WEBP", quality=85)
+    return out.getvalue()
+
+
+def main():
+    before = make_photo(200)
+    cases = {
+        "healing": make_photo(120, shift=(40, -25), seed=2),
+        "unchanged": make_photo(200, shift=(60, 30), seed=3),
+        "worsening": make_photo(260, shift=(10, 5), seed=4)
+    }
+
+    print("=" * 60)
+    print("Healing Metrics Benchmark (fast mode, no API call)")
+    print("=" * 60)
+    print()
+    print(f"{'case':<11} {'ms':>7} {'area':>8} {'ssim':>6} {'color':>6}  progress")
+
+    for name, after in cases.items():
+        compute_healing_metrics(before, after)
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            metrics = compute_healing_metrics(before, after)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / ROUNDS
+
+        comparison = metrics_comparison(metrics, days_between=7)
+        print(f"{name:<11} {elapsed_ms:>7.1f} {metrics['lesion_area']['change_percent']:>+7.0f}% "
+              f"{metrics['ssim']:>6.2f} {metrics['color_histogram_similarity']:>6.2f}  "
+              f"{comparison['overall_progress']}  {'OK' if elapsed_ms < TARGET_MS else 'above target'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for medical image preprocessing.
+
+Compares, for a synthetic 12 megapixel phone photo:
+- the old path: full decode and a LANCZOS resize to 2048px, the image then
+  sent to Gemini as is and the original stored
+- prepare_image: draft-mode decode, one analysis rendition and a thumbnail
+
+and reports the time per image and the bytes stored and sent to the model.
+
+Run with: python benchmark_image_preprocess.py
+"""
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.image_preprocess import prepare_image
+
+ROUNDS = 5
+
+
+def make_photo(width: int = 4000, height: int = 3000) -> bytes:
+    """A noisy gradient JPEG about the size of a phone camera upload"""
+    rng = np.random.default_rng(3)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def legacy_resize(image_data: bytes) -> Image.Image:
+    """What analyze_image did before: full decode, LANCZOS down to 2048px"""
+    image = Image.open(io.BytesIO(image_data))
+    image.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
+    return image
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    photo = make_photo()
+
+    legacy, legacy_ms = timed(legacy_resize, photo)
+    # The SDK sends a PIL image as PNG
+    out = io.BytesIO()
+    legacy.save(out, format="PNG")
+    legacy_sent = len(out.getvalue())
+
+    prepared, prepared_ms = timed(prepare_image, photo)
+
+    print("=" * 60)
+    print("Medical Image Preprocessing Benchmark")
+    print(f"12MP JPEG, {len(photo) / 1024:.0f} KB, {ROUNDS} rounds")
+    print("=" * 60)
+    print()
+    print(f"{'':<16} {'ms/image':>10} {'stored KB':>10} {'sent KB':>10} {'thumb KB':>10}")
+    print(f"{'full decode':<16} {legacy_ms:>10.1f} {len(photo) / 1024:>10.0f} {legacy_sent / 1024:>10.0f} {'-':>10}")
+    print(f"{'prepare_image':<16} {prepared_ms:>10.1f} {len(prepared.analysis) / 1024:>10.0f} "
+          f"{len(prepared.analysis) / 1024:>10.0f} {len(prepared.thumbnail) / 1024:>10.1f}")
+    print()
+    print(f"Speedup: {legacy_ms / prepared_ms:.1f}x, "
+          f"bytes sent to the model: {legacy_sent / len(prepared.analysis):.0f}x fewer "
+          f"({prepared.image_format} {prepared.analysis_size[0]}x{prepared.analysis_size[1]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for lab report analysis prompt size.
+
+Compares the original full-text Gemini prompt with the locally parsed,
+compact prompt on generated reports. Gemini is replaced by a stand-in whose
+latency grows with prompt and response tokens (LATENCY_* below), so the
+numbers show the relative effect without an API key:
+- a mixed report (some tests need a Gemini explanation)
+- a CBC/liver/lipid-only report (explained locally, no Gemini call)
+
+Run with: python benchmark_lab_analysis.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.lab_report_analyzer import LabReportAnalyzer
+from app.content_cache import ContentCache
+import benchmark_pdf_extraction
+from benchmark_pdf_extraction import generate_pdf
+
+# Stand-in model latency: fixed overhead plus time per prompt/response token
+LATENCY_BASE_S = 0.4
+LATENCY_PER_PROMPT_TOKEN_S = 0.0002
+LATENCY_PER_RESPONSE_TOKEN_S = 0.004
+CHARS_PER_TOKEN = 4
+
+PANEL_TESTS = [
+    ("Hemoglobin", "g/dL", "13.0 - 17.0", 12.1),
+    ("Total Leukocyte Count", "cells/uL", "4000 - 11000", 7350),
+    ("Platelet Count", "lakh/uL", "1.5 - 4.1", 2.6),
+    ("SGPT (ALT)", "U/L", "7 - 56", 61),
+    ("Total Cholesterol", "mg/dL", "< 200", 214),
+    ("HDL Cholesterol", "mg/dL", "> 40", 46),
+    ("Triglycerides", "mg/dL", "< 150", 132),
+]
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StandInModel:
+    """Answers like Gemini would, with token-proportional latency"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def generate_content_async(self, prompt: str) -> _Response:
+        self.calls += 1
+        tokens = len(prompt) // CHARS_PER_TOKEN
+        self.prompt_tokens += tokens
+        if "already extracted" in prompt:
+            # Explanations only
+            body = {"explanations": [], "additional_values": [], "summary": "ok",
+                    "urgent_attention": False, "urgent_message": ""}
+            response_tokens = 60 * prompt.count(") high") + 60 * prompt.count(") low") + 80
+        else:
+            # Every value re-extracted as JSON
+            body = {"values": [], "abnormal_values": [], "summary": "ok", "urgent_attention": False}
+            response_tokens = 25 * prompt.count("\n") + 80
+        await asyncio.sleep(LATENCY_BASE_S + tokens * LATENCY_PER_PROMPT_TOKEN_S
+                            + response_tokens * LATENCY_PER_RESPONSE_TOKEN_S)
+        return _Response(json.dumps(body))
+
+
+async def run(analyzer: LabReportAnalyzer, text: str, structured: bool):
+    model = StandInModel()
+    analyzer.model = model
+    start = time.perf_counter()
+    if structured:
+        await analyzer.analyze_lab_report(text)
+    else:
+        await analyzer.analyze_full_text(text)
+    return time.perf_counter() - start, model.calls, model.prompt_tokens
+
+
+def main():
+    print("=" * 60)
+    print("Lab Report Analysis Prompt Benchmark")
+    print("=" * 60)
+    print()
+    print(f"{'report':<12} {'mode':<11} {'calls':>5} {'prompt tok':>11} {'latency':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = LabReportAnalyzer(parse_workers=0, cache=ContentCache(os.path.join(tmp, "cache")))
+        reports = {"mixed": benchmark_pdf_extraction.TESTS, "panels": PANEL_TESTS}
+        for label, tests in reports.items():
+            benchmark_pdf_extraction.TESTS = tests
+            path = os.path.join(tmp, f"{label}.pdf")
+            generate_pdf(path, 1)
+            text = analyzer.extract_text_from_pdf(path)
+
+            for mode, structured in (("full text", False), ("structured", True)):
+                seconds, calls, tokens = asyncio.run(run(analyzer, text, structured))
+                print(f"{label:<12} {mode:<11} {calls:>5} {tokens:>11} {seconds * 1000:>7.0f}ms")
+
+    print()
+    print(f"Analyzer stats: {analyzer.stats}")
+
+
+if __name__ == "__main__":
+    main()
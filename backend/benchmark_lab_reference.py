@@ -0,0 +1,81 @@
+"""
+Benchmark for the lab reference range index.
+
+Measures values per second for:
+- loading the reference table
+- resolving test names/units to test numbers and conversion factors
+- vectorized flagging of already resolved values (mixed ages and sexes)
+- the whole lookup (resolve + flag)
+
+The target is over 100k values per second for the whole lookup.
+
+Run with: python benchmark_lab_reference.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.lab_reference import ReferenceIndex, LAB_REFERENCE_PATH, SEX_ANY, SEX_MALE, SEX_FEMALE
+
+BATCH_SIZES = [1_000, 100_000, 1_000_000]
+TARGET_PER_SECOND = 100_000
+
+
+def make_batch(index: ReferenceIndex, size: int, rng: np.random.Generator):
+    """Random test names (synonyms included), units and values"""
+    names = list(index.names)
+    units_by_test = {}
+    for test_id, unit in index.factors:
+        units_by_test.setdefault(test_id, []).append(unit)
+
+    picked = [names[i] for i in rng.integers(0, len(names), size)]
+    units = []
+    for name in picked:
+        options = units_by_test[index.names[name]]
+        units.append(options[rng.integers(0, len(options))])
+    values = rng.uniform(0, 300, size)
+    sex = rng.choice([SEX_ANY, SEX_MALE, SEX_FEMALE], size).astype(np.int8)
+    age = rng.uniform(1, 90, size).astype(np.float32)
+    return picked, units, values, sex, age
+
+
+def main():
+    rng = np.random.default_rng(7)
+
+    start = time.perf_counter()
+    index = ReferenceIndex(LAB_REFERENCE_PATH)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 60)
+    print("Lab Reference Range Lookup Benchmark")
+    stats = index.get_stats()
+    print(f"{stats['tests']} tests, {stats['names']} names, {stats['ranges']} ranges, loaded in {load_ms:.1f}ms")
+    print("=" * 60)
+    print()
+    print(f"{'values':>9} {'resolve/s':>12} {'flag/s':>14} {'lookup/s':>12}")
+
+    for size in BATCH_SIZES:
+        names, units, values, sex, age = make_batch(index, size, rng)
+
+        start = time.perf_counter()
+        test_ids, factors = index.resolve(names, units)
+        resolve_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        status = index.flag(test_ids, values, factors, sex, age)
+        flag_s = time.perf_counter() - start
+
+        assert (status >= 0).all(), "every generated name and unit is in the table"
+        lookup_rate = size / (resolve_s + flag_s)
+        print(f"{size:>9} {size / resolve_s:>12,.0f} {size / flag_s:>14,.0f} {lookup_rate:>12,.0f}"
+              f"  {'OK' if lookup_rate > TARGET_PER_SECOND else 'below target'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark for lab report PDF text extraction.
+
+Generates multi-page lab-report-like PDFs and measures pages per second for:
+- sequential pdfplumber (the original extractor)
+- PyPDF2 text layer fast path, falling back to pdfplumber per page
+- the fast path with page ranges spread over the worker processes
+
+Run with: python benchmark_pdf_extraction.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pdfplumber
+
+from app.lab_report_analyzer import LabReportAnalyzer, LAB_PARSE_WORKERS, _extract_pdf_pages, _join_pages
+
+PAGE_COUNTS = [1, 10, 25, 50]
+LINES_PER_PAGE = 40
+
+TESTS = [
+    ("Hemoglobin", "g/dL", "13.0 - 17.0", 14.2),
+    ("Total Leukocyte Count", "cells/uL", "4000 - 11000", 7350),
+    ("Platelet Count", "lakh/uL", "1.5 - 4.1", 2.6),
+    ("Fasting Blood Glucose", "mg/dL", "70 - 100", 112),
+    ("Serum Creatinine", "mg/dL", "0.7 - 1.3", 0.9),
+    ("SGPT (ALT)", "U/L", "7 - 56", 61),
+    ("Total Cholesterol", "mg/dL", "< 200", 214),
+    ("TSH", "uIU/mL", "0.4 - 4.0", 2.1),
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def generate_pdf(path: str, pages: int):
+    """Write a PDF with one table-like lab report page per page, using only the stdlib."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"BT /F1 10 Tf 50 800 Td (City Diagnostics - Report page {page + 1}) Tj ET"]
+        for i in range(LINES_PER_PAGE):
+            name, unit, reference, value = TESTS[(page + i) % len(TESTS)]
+            y = 770 - i * 18
+            for x, cell in ((50, name), (250, f"{value}"), (330, unit), (430, reference)):
+                lines.append(f"BT /F1 9 Tf {x} {y} Td ({_escape(cell)}) Tj ET")
+        stream = "\n".join(lines).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def sequential_pdfplumber(path: str) -> str:
+    text = ""
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text.strip()
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    result = fn(*args)
+    if asyncio.iscoroutine(result):
+        asyncio.run(result)
+    return time.perf_counter() - start
+
+
+def main():
+    analyzer = LabReportAnalyzer()
+
+    print("=" * 60)
+    print("Lab Report PDF Extraction Benchmark")
+    print(f"{LINES_PER_PAGE} table rows per page, {LAB_PARSE_WORKERS} worker processes, {os.cpu_count()} CPUs")
+    print("=" * 60)
+    print()
+    print(f"{'pages':>5} {'pdfplumber':>14} {'fast path':>14} {'fast+parallel':>14}   (pages/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in PAGE_COUNTS:
+            path = os.path.join(tmp, f"report_{pages}.pdf")
+            generate_pdf(path, pages)
+
+            # Same text from both extractors
+            assert "Hemoglobin" in _join_pages(_extract_pdf_pages(path))
+
+            plumber_s = timed(sequential_pdfplumber, path)
+            fast_s = timed(analyzer.extract_text_from_pdf, path)
+            # Warm the pool so process start-up is not counted
+            asyncio.run(analyzer.extract_text_from_pdf_parallel(path))
+            parallel_s = timed(analyzer.extract_text_from_pdf_parallel, path)
+
+            print(f"{pages:>5} {pages / plumber_s:>14.1f} {pages / fast_s:>14.1f} {pages / parallel_s:>14.1f}")
+
+    analyzer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
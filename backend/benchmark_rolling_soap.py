@@ -0,0 +1,104 @@
+"""
+Benchmark for the rolling SOAP draft.
+
+Feeds synthetic consultations of increasing length into RollingSummarizer
+line by line, then measures how long it takes from hang-up to a finished
+note, compared with summarizing the whole transcript at hang-up. Also
+reports the largest prompt sent, which should stay flat as consultations
+get longer.
+
+Run with: python benchmark_rolling_soap.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.rolling_summarizer import RollingSummarizer
+from app.summarizer import SoapPipeline
+from benchmark_soap_pipeline import FakeGeminiModel, FakeResponse, FIRST_TOKEN_S, TOKENS_PER_SECOND, CHARS_PER_TOKEN
+
+CONSULTATION_LINES = [60, 240, 960]
+# Seconds of fake model time per prompt token (input is cheaper than output)
+INPUT_SECONDS_PER_TOKEN = 0.00005
+
+LINES = [
+    "[PATIENT]: Doctor, mujhe teen din se pet mein dard ho raha hai, especially after eating.",
+    "[DOCTOR]: Any fever or vomiting? Koi bukhar ya ulti?",
+    "[PATIENT]: Thoda bukhar hai, no vomiting. I took some painkillers for my back last week.",
+    "[DOCTOR]: Which painkillers, and how many per day?",
+    "[PATIENT]: Ibuprofen, two or three tablets daily.",
+    "[DOCTOR]: Okay. I will check your abdomen now. Let me know if it hurts.",
+]
+
+
+class RollingFakeModel(FakeGeminiModel):
+    """Also answers rolling delta prompts; latency grows with prompt size."""
+
+    def __init__(self):
+        super().__init__()
+        self.max_prompt_chars = 0
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        self.max_prompt_chars = max(self.max_prompt_chars, len(prompt))
+        await asyncio.sleep(len(prompt) / CHARS_PER_TOKEN * INPUT_SECONDS_PER_TOKEN)
+        if "running SOAP note" in prompt:
+            text = self._answer("")
+            await asyncio.sleep(FIRST_TOKEN_S + len(text) / CHARS_PER_TOKEN / TOKENS_PER_SECOND)
+            return FakeResponse(text)
+        return await super().generate_content_async(prompt, stream=stream, **kwargs)
+
+
+async def run(lines: int):
+    transcript_lines = [LINES[i % len(LINES)] for i in range(lines)]
+    transcript = "\n".join(transcript_lines)
+
+    # Whole transcript at hang-up
+    model = RollingFakeModel()
+    pipeline = SoapPipeline(model=model, mode="sequential")
+    start = time.perf_counter()
+    await pipeline.generate(transcript)
+    full_s = time.perf_counter() - start
+    full_prompt = model.max_prompt_chars
+
+    # Rolling draft: lines arrive during the call, folds run in the background
+    model = RollingFakeModel()
+    rolling = RollingSummarizer(
+        pipeline=SoapPipeline(model=model, mode="sequential"),
+        batch_chars=1200,
+        interval_seconds=5
+    )
+    for line in transcript_lines:
+        rolling.add_segment("bench", line)
+        await asyncio.sleep(0.005)  # compressed call time
+    await asyncio.gather(*list(rolling._inflight))
+
+    start = time.perf_counter()
+    result = await rolling.finalize("bench", transcript)
+    rolling_s = time.perf_counter() - start
+    assert result is not None
+
+    stats = rolling.get_stats()
+    print(f"{lines:4d} lines ({len(transcript):6d} chars):")
+    print(f"   Full summary at hang-up:   {full_s * 1000:7.0f}ms   prompt {full_prompt:6d} chars")
+    print(f"   Rolling draft at hang-up:  {rolling_s * 1000:7.0f}ms   max prompt {model.max_prompt_chars:6d} chars, "
+          f"{stats['folds']} folds during call")
+    print()
+
+
+async def main():
+    print("=" * 60)
+    print("Rolling SOAP Draft Benchmark")
+    print("=" * 60)
+    print()
+    for lines in CONSULTATION_LINES:
+        await run(lines)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
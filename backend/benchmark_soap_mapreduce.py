@@ -0,0 +1,133 @@
+"""
+Benchmark for single-shot vs map-reduce SOAP generation.
+
+Generates synthetic consultation transcripts of increasing length and runs
+SoapPipeline in "sequential" (whole transcript in one prompt) and
+"mapreduce" mode against a fake Gemini model whose latency follows the
+usual shape of a hosted LLM:
+- fixed time to first token
+- prefill time proportional to prompt tokens
+- decode time per output token that grows with context length
+Reports end-to-end latency for both modes and the crossover length, which
+is what SOAP_MAPREDUCE_THRESHOLD_CHARS should be set to.
+
+Sleeps are scaled by TIME_SCALE so the benchmark finishes quickly; reported
+times are scaled back up.
+
+Run with: python benchmark_soap_mapreduce.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.summarizer import SoapPipeline, SOAP_CHUNK_CHARS, SOAP_MAP_CONCURRENCY, split_transcript
+
+# Fake model behaviour
+FIRST_TOKEN_S = 0.3
+PREFILL_TOKENS_PER_S = 4000
+DECODE_TOKENS_PER_S = 150
+CONTEXT_SLOWDOWN_TOKENS = 8000  # decode is 2x slower at this context length
+CHARS_PER_TOKEN = 4
+TIME_SCALE = 0.05
+
+CONSULTATION_MINUTES = [5, 10, 20, 30, 45, 60, 90]
+CHARS_PER_MINUTE = 900
+
+TURNS = [
+    "[PATIENT]: Doctor, mujhe kuch dino se pet mein dard hai, especially khana khane ke baad.",
+    "[DOCTOR]: Kitne din se? Any fever, vomiting or loose motions?",
+    "[PATIENT]: About a week. Thoda bukhar tha kal raat, no vomiting.",
+    "[DOCTOR]: Are you taking any medicines regularly, painkillers or antacids?",
+    "[PATIENT]: Haan, back pain ke liye ibuprofen le raha hoon, din mein do baar.",
+    "[DOCTOR]: Okay. Let me examine you. Lie down please, bataiye kahan dard hota hai.",
+    "[PATIENT]: Yahan upar, beech mein. It burns a little.",
+    "[DOCTOR]: Your BP is 130 by 84, pulse 90. Mild tenderness in the epigastrium.",
+]
+
+
+def synthetic_transcript(minutes: int) -> str:
+    lines, size, i = [], 0, 0
+    while size < minutes * CHARS_PER_MINUTE:
+        line = TURNS[i % len(TURNS)]
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+class LatencyModelGemini:
+    """Fake Gemini returning valid JSON with LLM-shaped latency."""
+
+    def __init__(self):
+        self.calls = 0
+
+    @staticmethod
+    def _output_tokens(prompt: str, prompt_tokens: int) -> int:
+        if "Transcript part:" in prompt:
+            return min(40 + prompt_tokens // 12, 300)
+        if "Facts by part" in prompt:
+            return min(200 + prompt_tokens // 3, 1000)
+        if "Assessment Section:" in prompt:
+            return 100
+        return min(200 + prompt_tokens // 20, 1000)
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        output_tokens = self._output_tokens(prompt, prompt_tokens)
+        decode_s = output_tokens / DECODE_TOKENS_PER_S * (1 + prompt_tokens / CONTEXT_SLOWDOWN_TOKENS)
+        latency = FIRST_TOKEN_S + prompt_tokens / PREFILL_TOKENS_PER_S + decode_s
+        await asyncio.sleep(latency * TIME_SCALE)
+
+        if "Assessment Section:" in prompt:
+            text = json.dumps({"suggestions": []})
+        else:
+            section = "x" * (output_tokens * CHARS_PER_TOKEN // 4)
+            text = json.dumps({"subjective": section, "objective": section,
+                               "assessment": section, "plan": section})
+        return type("Response", (), {"text": text})()
+
+
+async def timed(pipeline: SoapPipeline, transcript: str, mode: str) -> float:
+    start = time.perf_counter()
+    await pipeline.generate(transcript, mode=mode)
+    return (time.perf_counter() - start) / TIME_SCALE
+
+
+async def main():
+    model = LatencyModelGemini()
+    pipeline = SoapPipeline(model=model)
+
+    print("=" * 60)
+    print("Single-shot vs Map-Reduce SOAP Generation")
+    print(f"Chunks of {SOAP_CHUNK_CHARS} chars, {SOAP_MAP_CONCURRENCY} concurrent")
+    print("=" * 60)
+    print()
+    print(f"{'minutes':>7} {'chars':>7} {'single-shot':>12} {'map-reduce':>11} {'chunks':>7}")
+
+    crossover = None
+    for minutes in CONSULTATION_MINUTES:
+        transcript = synthetic_transcript(minutes)
+        single_s = await timed(pipeline, transcript, "sequential")
+        mapreduce_s = await timed(pipeline, transcript, "mapreduce")
+        chunks = len(split_transcript(transcript, SOAP_CHUNK_CHARS))
+
+        print(f"{minutes:>7} {len(transcript):>7} {single_s:>11.1f}s {mapreduce_s:>10.1f}s {chunks:>7}")
+        if crossover is None and mapreduce_s < single_s:
+            crossover = len(transcript)
+
+    print()
+    if crossover:
+        print(f"Map-reduce is faster from about {crossover} characters")
+    else:
+        print("Map-reduce was not faster at any measured length")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
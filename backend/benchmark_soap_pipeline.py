@@ -0,0 +1,124 @@
+"""
+Benchmark for SOAP note generation with Compassion Reflex.
+
+Runs SoapPipeline against a fake Gemini model that produces output at a
+fixed token rate after a fixed time-to-first-token, and measures end-to-end
+latency for each pipeline mode:
+- sequential: SOAP call, then Compassion Reflex call
+- streaming:  Compassion Reflex starts once assessment/plan have streamed
+- combined:   one structured call returning both
+
+Run with: python benchmark_soap_pipeline.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.summarizer import SoapPipeline, SOAP_PIPELINE_MODES
+
+# Fake model behaviour
+FIRST_TOKEN_S = 0.35
+TOKENS_PER_SECOND = 300
+CHARS_PER_TOKEN = 4
+RUNS = 3
+
+SOAP_NOTE = {
+    "subjective": "Patient reports epigastric pain for three days, worse after meals, with low-grade fever "
+                  "and reduced appetite. No vomiting or melena. " * 3,
+    "objective": "Temperature 99.8F, pulse 88, BP 124/80. Mild epigastric tenderness without guarding. "
+                 "Bowel sounds normal. " * 3,
+    "assessment": "Acute gastritis, likely related to irregular meals and NSAID use. "
+                  "Non-compliant with previous antacid course. " * 2,
+    "plan": "Start pantoprazole 40 mg once daily before breakfast for 14 days. Avoid NSAIDs and spicy food. "
+            "Review in one week or earlier if pain worsens or vomiting develops. " * 2
+}
+
+SUGGESTIONS = [{
+    "section": "assessment",
+    "original": "Non-compliant with previous antacid course",
+    "suggested": "Reports difficulty completing previous antacid course",
+    "rationale": "Describes the barrier without assigning blame"
+}]
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    """Async iterator yielding the response a few tokens at a time."""
+
+    def __init__(self, text: str, chunk_tokens: int = 8):
+        self.text = text
+        self.chunk_chars = chunk_tokens * CHARS_PER_TOKEN
+
+    async def __aiter__(self):
+        await asyncio.sleep(FIRST_TOKEN_S)
+        for i in range(0, len(self.text), self.chunk_chars):
+            piece = self.text[i:i + self.chunk_chars]
+            await asyncio.sleep(len(piece) / CHARS_PER_TOKEN / TOKENS_PER_SECOND)
+            yield FakeChunk(piece)
+
+
+class FakeGeminiModel:
+    """Answers the summarizer prompts like Gemini would, at a fixed token rate."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        if '"soap_note"' in prompt:
+            return json.dumps({"soap_note": SOAP_NOTE, "suggestions": SUGGESTIONS})
+        if "Assessment Section:" in prompt:
+            return json.dumps({"suggestions": SUGGESTIONS})
+        if "exact structure and key order" in prompt:
+            order = ["assessment", "plan", "subjective", "objective"]
+        else:
+            order = ["subjective", "objective", "assessment", "plan"]
+        return json.dumps({key: SOAP_NOTE[key] for key in order})
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self._answer(prompt)
+        if stream:
+            return FakeStream(text)
+        await asyncio.sleep(FIRST_TOKEN_S + len(text) / CHARS_PER_TOKEN / TOKENS_PER_SECOND)
+        return FakeResponse(text)
+
+
+async def main():
+    model = FakeGeminiModel()
+    pipeline = SoapPipeline(model=model)
+
+    print("=" * 60)
+    print("SOAP Pipeline Latency Benchmark")
+    print(f"Fake model: {FIRST_TOKEN_S * 1000:.0f}ms to first token, {TOKENS_PER_SECOND} tokens/s")
+    print("=" * 60)
+    print()
+
+    for mode in SOAP_PIPELINE_MODES:
+        model.calls = 0
+        for _ in range(RUNS):
+            soap_note, suggestions = await pipeline.generate("Doctor: ... Patient: ...", mode=mode)
+            assert set(soap_note) == set(SOAP_NOTE) and len(suggestions) == len(SUGGESTIONS)
+        print(f"{mode:<10}  {model.calls // RUNS} Gemini call(s) per note")
+
+    print()
+    for mode, stats in pipeline.get_latency_stats().items():
+        print(f"{mode:<10}  mean {stats['mean_ms']:7.1f}ms   p95 {stats['p95_ms']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
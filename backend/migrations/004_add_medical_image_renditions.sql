@@ -0,0 +1,6 @@
+-- Add thumbnail columns to medical_images
+-- Uploads are stored as an analysis-size rendition plus a small thumbnail
+-- for image lists; rendition sizes are kept in the metadata column
+
+ALTER TABLE medical_images ADD COLUMN IF NOT EXISTS thumbnail_url TEXT;
+ALTER TABLE medical_images ADD COLUMN IF NOT EXISTS thumbnail_path TEXT;
@@ -0,0 +1,6 @@
+-- Add perceptual hash columns to medical_images
+-- 64-bit pHash and dHash of each image (stored as signed BIGINT), used to
+-- suggest the parent of a follow-up and to detect duplicate uploads
+
+ALTER TABLE medical_images ADD COLUMN IF NOT EXISTS phash BIGINT;
+ALTER TABLE medical_images ADD COLUMN IF NOT EXISTS dhash BIGINT;
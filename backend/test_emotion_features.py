@@ -0,0 +1,115 @@
+"""
+Tests for the single-STFT feature extraction in EmotionAnalyzer.
+
+Checks that every per-frame feature derived from the one shared STFT
+matches the librosa function it replaces (piptrack, rms, zero crossing
+rate, spectral centroid/rolloff/bandwidth, MFCC), and that features built
+from frame moments do not depend on how the frames were split.
+
+Run with: python test_emotion_features.py  (or pytest)
+"""
+
+import os
+import sys
+
+import numpy as np
+import librosa
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer, FRAME_FEATURES, FRAME_FEATURE_INDEX
+
+SAMPLE_RATE = 16000
+analyzer = EmotionAnalyzer(workers=0)
+
+
+def voice_like(seconds: float = 2.0, f0: float = 150.0, seed: int = 0) -> np.ndarray:
+    """A 150 Hz tone with a harmonic and a little noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    audio = 0.3 * np.sin(2 * np.pi * f0 * t) + 0.1 * np.sin(2 * np.pi * 3 * f0 * t)
+    return (audio + 0.01 * rng.normal(size=t.size)).astype(np.float32)
+
+
+def column(frames: np.ndarray, name: str) -> np.ndarray:
+    return frames[:, FRAME_FEATURE_INDEX[name]]
+
+
+def test_matches_librosa():
+    """Each shared-STFT feature equals the librosa feature it replaces"""
+    audio = voice_like()
+    frames = analyzer._frame_features(audio)
+    S = np.abs(librosa.stft(audio, n_fft=2048, hop_length=512))
+    assert frames.shape == (S.shape[1], len(FRAME_FEATURES))
+
+    pitches, magnitudes = librosa.piptrack(S=S, sr=SAMPLE_RATE, fmin=50, fmax=400)
+    reference_pitch = pitches[magnitudes.argmax(axis=0), np.arange(S.shape[1])]
+    mel = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=SAMPLE_RATE))
+    references = {
+        "pitch": (reference_pitch, 1e-3),
+        "rms": (librosa.feature.rms(y=audio, frame_length=2048, hop_length=512)[0], 1e-6),
+        # One crossing at the padded edges may differ: 1 / frame_length
+        "zcr": (librosa.feature.zero_crossing_rate(audio, frame_length=2048, hop_length=512)[0], 1e-3),
+        "spectral_centroid": (librosa.feature.spectral_centroid(S=S, sr=SAMPLE_RATE)[0], 1e-2),
+        "spectral_rolloff": (librosa.feature.spectral_rolloff(S=S, sr=SAMPLE_RATE)[0], 1e-6),
+        "spectral_bandwidth": (librosa.feature.spectral_bandwidth(S=S, sr=SAMPLE_RATE)[0], 1e-2)
+    }
+    for name, (reference, tolerance) in references.items():
+        assert np.abs(column(frames, name) - reference).max() < tolerance, name
+
+    mfcc = librosa.feature.mfcc(S=mel, n_mfcc=13)
+    start = FRAME_FEATURE_INDEX["mfcc_0"]
+    assert np.allclose(frames[:, start:start + 13], mfcc.T, atol=1e-3)
+    print("✅ shared-STFT features match librosa")
+
+
+def test_pitch_of_tone():
+    """The voiced frames of a 150 Hz tone track 150 Hz"""
+    frames = analyzer._frame_features(voice_like(f0=150.0))
+    voiced = column(frames, "pitch")[column(frames, "voiced") > 0]
+    assert len(voiced) > 0.9 * len(frames)
+    assert abs(np.median(voiced) - 150.0) < 3
+    print(f"✅ pitch of a 150 Hz tone: {np.median(voiced):.1f} Hz")
+
+
+def test_moments_independent_of_split():
+    """Features from summed frame moments equal those of the frames at once"""
+    frames = analyzer._frame_features(voice_like(seconds=3.0, seed=1))
+    halves = np.array_split(frames, [17])
+
+    whole = analyzer._features_from_moments(
+        len(frames), frames.sum(axis=0), (frames ** 2).sum(axis=0), column(frames, "rms").max()
+    )
+    combined = analyzer._features_from_moments(
+        sum(len(part) for part in halves),
+        sum(part.sum(axis=0) for part in halves),
+        sum((part ** 2).sum(axis=0) for part in halves),
+        max(column(part, "rms").max() for part in halves)
+    )
+    for name, value in whole.items():
+        assert np.allclose(value, combined[name]), name
+    assert abs(whole["pitch_mean"] - 150.0) < 3
+    print("✅ moments do not depend on the split")
+
+
+def test_short_and_silent_chunks():
+    """Chunks under half a second are neutral; silence yields no voiced frames"""
+    short = analyzer.classify_chunk(np.zeros(SAMPLE_RATE // 4, dtype=np.int16).tobytes())
+    assert (short.emotion_type, short.confidence_score) == ("neutral", 0.5)
+
+    frames = analyzer._frame_features(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert column(frames, "voiced").sum() == 0
+    assert analyzer._extract_features(np.zeros(SAMPLE_RATE, dtype=np.float32))["pitch_mean"] == 0
+    print("✅ short and silent chunks")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Emotion Feature Extraction Tests")
+    print("=" * 60)
+    test_matches_librosa()
+    test_pitch_of_tone()
+    test_moments_independent_of_split()
+    test_short_and_silent_chunks()
+    print("\nAll emotion feature extraction tests passed")
@@ -0,0 +1,93 @@
+"""
+Tests for the emotion analysis process pool.
+
+Checks that creating the pool starts no processes, and that chunks handed
+to workers through shared memory (decoded PCM and container bytes) come
+back with the same features and emotion the analyzer computes inline,
+with every shared memory block released afterwards.
+
+Run with: python test_emotion_pool.py  (or pytest)
+"""
+
+import asyncio
+import io
+import os
+import sys
+import wave
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.decoded_audio import DecodedAudio
+from app.emotion_analyzer import EmotionAnalyzer
+from app.emotion_pool import EmotionWorkerPool
+
+SAMPLE_RATE = 16000
+
+
+def speech_like_pcm(seconds: float = 1.5) -> bytes:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    audio = 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+def wav_bytes(pcm: bytes) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return out.getvalue()
+
+
+def shared_blocks() -> set:
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")} if os.path.isdir("/dev/shm") else set()
+
+
+def test_pool_starts_lazily():
+    """Building the analyzer or the pool starts no worker processes"""
+    analyzer = EmotionAnalyzer(workers=2)
+    assert analyzer.worker_pool is not None
+    assert analyzer.worker_pool._executor is None
+    analyzer.shutdown()
+    print("✅ pool starts lazily")
+
+
+def test_round_trip_matches_inline():
+    """Results computed in a worker equal the inline ones, for PCM and for WAV bytes"""
+    pcm = speech_like_pcm()
+    inline = EmotionAnalyzer(workers=0)
+    expected_frames = inline.chunk_frame_features(DecodedAudio(pcm, SAMPLE_RATE))
+    expected = inline.classify_chunk(DecodedAudio(pcm, SAMPLE_RATE))
+
+    async def run():
+        pool = EmotionWorkerPool(workers=1)
+        try:
+            frames = await pool.frame_features(DecodedAudio(pcm, SAMPLE_RATE))
+            result = await pool.analyze_audio(DecodedAudio(pcm, SAMPLE_RATE))
+            from_wav = await pool.frame_features(wav_bytes(pcm), SAMPLE_RATE)
+            return frames, result, from_wav, pool.get_stats()
+        finally:
+            pool.shutdown()
+
+    blocks_before = shared_blocks()
+    frames, result, from_wav, stats = asyncio.run(run())
+
+    assert np.allclose(frames, expected_frames)
+    assert np.allclose(from_wav, expected_frames, atol=1e-4)
+    assert (result.emotion_type, result.confidence_score) == (expected.emotion_type, expected.confidence_score)
+    assert stats["chunks_processed"] == 3 and stats["pending"] == 0
+    assert shared_blocks() == blocks_before
+    print(f"✅ worker round trip: {frames.shape[0]} frames, {result.emotion_type}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Emotion Worker Pool Tests")
+    print("=" * 60)
+    test_pool_starts_lazily()
+    test_round_trip_matches_inline()
+    print("\nAll emotion worker pool tests passed")
@@ -0,0 +1,115 @@
+"""
+Tests for streaming per-speaker emotion tracking.
+
+Checks the sliding window's running moments against a direct computation,
+and the hysteresis: the first state is reported at once, a change only
+after confirm_updates consecutive classifications, and a flicker back to
+the current state resets the candidate.
+
+Run with: python test_emotion_tracker.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer, FRAME_FEATURES
+from app.emotion_classifier import EmotionClassifier
+from app.emotion_tracker import StreamingEmotionTracker, EmotionTrackerRegistry
+
+SAMPLE_RATE = 16000
+
+
+class ScriptedClassifier(EmotionClassifier):
+    """Returns the next label of a script on every classification"""
+
+    labels = ["calm", "anxious", "neutral"]
+
+    def __init__(self, script):
+        self.script = list(script)
+
+    def predict_proba(self, X):
+        proba = np.zeros((len(X), len(self.labels)))
+        proba[:, self.labels.index(self.script.pop(0))] = 0.9
+        return proba
+
+
+def frames(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(0, 1, (count, len(FRAME_FEATURES)))
+
+
+def tracker_for(script, **options) -> StreamingEmotionTracker:
+    return StreamingEmotionTracker(EmotionAnalyzer(workers=0, classifier=ScriptedClassifier(script)), **options)
+
+
+def test_window_moments():
+    """Running sums match the window contents after many pushes and wraps"""
+    tracker = StreamingEmotionTracker(EmotionAnalyzer(workers=0), window_seconds=1.0)
+    pushed = []
+    for seed, count in enumerate([5, 12, 30, 3, 40, 7, 500, 9]):
+        chunk = frames(count, seed)
+        pushed.append(chunk)
+        tracker._push_frames(chunk)
+
+    expected = np.concatenate(pushed)[-tracker.capacity:]
+    assert tracker._size == tracker.capacity
+    assert np.allclose(tracker._sums, expected.sum(axis=0))
+    assert np.allclose(tracker._squares, (expected ** 2).sum(axis=0))
+    print(f"✅ window moments over {tracker.capacity} frames")
+
+
+def test_hysteresis():
+    """A new state needs confirm_updates consecutive classifications"""
+    script = ["calm", "calm", "anxious", "calm", "anxious", "anxious", "anxious"]
+    tracker = tracker_for(script, min_seconds=0.1, confirm_updates=2)
+    reported = [tracker.add_frames(frames(10, i)) for i in range(len(script))]
+    states = [result.emotion_type if result else None for result in reported]
+
+    # First state at once; one "anxious" is not enough, and the flicker back to
+    # calm resets the count; two in a row change the state
+    assert states == ["calm", None, None, None, None, "anxious", None]
+    assert tracker.state.emotion_type == "anxious"
+    assert tracker.state.confidence_score == 0.9
+    print(f"✅ hysteresis: {states}")
+
+
+def test_waits_for_min_audio():
+    """Nothing is reported before the window holds min_seconds of audio"""
+    tracker = tracker_for(["neutral"], min_seconds=0.5)
+    assert tracker.add_frames(frames(tracker.min_frames - 1)) is None
+    assert tracker.add_frames(np.zeros((0, len(FRAME_FEATURES)))) is None
+    assert tracker.add_frames(frames(1)).emotion_type == "neutral"
+    print(f"✅ waits for {tracker.min_frames} frames")
+
+
+def test_update_async_and_registry():
+    """Chunks are featurized off the loop; one tracker per consultation and speaker"""
+    registry = EmotionTrackerRegistry(EmotionAnalyzer(workers=0))
+    tracker = registry.get_tracker("c1", "patient-1")
+    assert registry.get_tracker("c1", "patient-1") is tracker
+    assert registry.get_tracker("c2", "patient-1") is not tracker
+
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    pcm = (0.3 * np.sin(2 * np.pi * 180 * t) * 32767).astype("<i2").tobytes()
+    result = asyncio.run(tracker.update_async(pcm))
+    assert result is not None and tracker._size > 0
+
+    registry.remove_tracker("c1", "patient-1")
+    assert registry.get_tracker("c1", "patient-1") is not tracker
+    print(f"✅ update_async: {result.emotion_type}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Emotion Tracker Tests")
+    print("=" * 60)
+    test_window_moments()
+    test_hysteresis()
+    test_waits_for_min_audio()
+    test_update_async_and_registry()
+    print("\nAll emotion tracker tests passed")
@@ -0,0 +1,124 @@
+"""
+Tests for the local healing metrics behind fast-mode image comparisons.
+
+Checks the building blocks (registration, Otsu threshold, SSIM) and what
+metrics_comparison makes of identical, healing, growing and more closely
+framed photos: an unchanged lesion is "stable", and no measured change,
+however large, turns into a see-a-doctor or urgency recommendation.
+
+Run with: python test_healing_metrics.py  (or pytest)
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.healing_metrics import (
+    register,
+    otsu_threshold,
+    ssim,
+    compute_healing_metrics,
+    metrics_comparison
+)
+
+
+def make_photo(radius: int, shift=(0, 0), seed: int = 1, zoom: float = 1.0) -> bytes:
+    """Skin-toned noise with a red lesion and a dark landmark, optionally photographed closer"""
+    rng = np.random.default_rng(seed)
+    pixels = (np.array([205, 170, 150]) + rng.normal(0, 6, (768, 1024, 3))).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(image)
+    cx, cy = 512 + shift[0], 384 + shift[1]
+    draw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=(190, 70, 70))
+    draw.rectangle([100 + shift[0], 100 + shift[1], 160 + shift[0], 300 + shift[1]], fill=(120, 100, 90))
+    if zoom != 1.0:
+        width, height = int(1024 / zoom), int(768 / zoom)
+        left, top = (1024 - width) // 2, (768 - height) // 2
+        image = image.crop((left, top, left + width, top + height)).resize((1024, 768))
+    out = io.BytesIO()
+    image.save(out, format="WEBP", quality=85)
+    return out.getvalue()
+
+
+BEFORE = make_photo(200)
+
+
+def test_register_finds_shift():
+    """Phase correlation recovers a known translation"""
+    rng = np.random.default_rng(0)
+    before = rng.normal(128, 30, (128, 128)).astype(np.float32)
+    after = np.roll(before, (5, -7), axis=(0, 1))
+    dy, dx, confidence = register(before, after)
+    assert (dy, dx) == (-5, 7)
+    assert confidence > 0.5
+    print(f"✅ register: shift ({dy}, {dx}), confidence {confidence:.2f}")
+
+
+def test_otsu_and_ssim():
+    """Otsu splits two clusters; SSIM is 1 for identical images and lower for noise"""
+    values = np.concatenate([np.full(100, 10.0), np.full(100, 90.0)])
+    assert 10 < otsu_threshold(values) < 90
+
+    rng = np.random.default_rng(0)
+    image = rng.uniform(0, 255, (64, 64))
+    assert abs(ssim(image, image) - 1.0) < 1e-6
+    assert ssim(image, rng.uniform(0, 255, (64, 64))) < 0.2
+    print("✅ otsu_threshold and ssim")
+
+
+def test_unchanged_lesion_is_stable():
+    """The same lesion photographed again is stable, not poor"""
+    metrics = compute_healing_metrics(BEFORE, make_photo(200, shift=(60, 30), seed=3))
+    assert abs(metrics["lesion_area"]["change_percent"]) < 5
+    assert metrics["ssim"] > 0.9
+
+    comparison = metrics_comparison(metrics, days_between=7)
+    assert comparison["overall_progress"] == "stable"
+    assert comparison["concerns"] == []
+    assert comparison["changes"]["unchanged"]
+    print(f"✅ unchanged lesion: {metrics['lesion_area']['change_percent']:+.1f}% -> stable")
+
+
+def test_healing_lesion():
+    """A lesion that shrank shows as improved"""
+    metrics = compute_healing_metrics(BEFORE, make_photo(120, shift=(40, -25), seed=2))
+    comparison = metrics_comparison(metrics, days_between=7)
+    assert metrics["lesion_area"]["change_percent"] < -50
+    assert comparison["overall_progress"] == "excellent"
+    assert comparison["improvement_percentage"] > 50
+    print(f"✅ healing lesion: {metrics['lesion_area']['change_percent']:+.0f}% -> excellent")
+
+
+def test_closer_photo_does_not_escalate():
+    """A 1.6x closer photo of the same lesion measures much larger, but never escalates"""
+    metrics = compute_healing_metrics(BEFORE, make_photo(200, seed=6, zoom=1.6))
+    assert metrics["lesion_area"]["change_percent"] > 100
+
+    comparison = metrics_comparison(metrics, days_between=7)
+    recommendations = comparison["recommendations"]
+    assert comparison["overall_progress"] != "worsening"
+    assert recommendations["see_doctor"] is False
+    assert recommendations["urgency"] == "routine"
+    assert recommendations["continue_treatment"] is True
+    # The growth is still reported, with the framing caveat
+    assert "closer" in comparison["concerns"][0]
+    assert recommendations["next_photo_days"] == 3
+    print(f"✅ closer photo: {metrics['lesion_area']['change_percent']:+.0f}% -> {comparison['overall_progress']}, no escalation")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Healing Metrics Tests")
+    print("=" * 60)
+    test_register_finds_shift()
+    test_otsu_and_ssim()
+    test_unchanged_lesion_is_stable()
+    test_healing_lesion()
+    test_closer_photo_does_not_escalate()
+    print("\nAll healing metrics tests passed")
@@ -0,0 +1,138 @@
+"""
+Tests for the perceptual hash index of medical images.
+
+Checks that pHash/dHash stay close for a resized and recompressed copy and
+far apart for different images, that flat images get no hashes, and that
+ImageHashIndex finds, adds, removes and evicts patients' hashes.
+
+Run with: python test_image_hash_index.py  (or pytest)
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.image_hash_index import (
+    phash,
+    dhash,
+    image_hashes,
+    to_signed,
+    popcount,
+    hamming_distances,
+    ImageHashIndex,
+    IMAGE_DUPLICATE_DISTANCE,
+    IMAGE_FOLLOW_UP_DISTANCE
+)
+
+
+def make_photo(seed: int, size=(640, 480)) -> Image.Image:
+    """Skin-toned noise with a few random shapes"""
+    rng = np.random.default_rng(seed)
+    pixels = (np.array([205, 170, 150]) + rng.normal(0, 6, (size[1], size[0], 3))).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(image)
+    for _ in range(4):
+        x, y = rng.integers(0, size[0] - 150), rng.integers(0, size[1] - 150)
+        r = int(rng.integers(30, 140))
+        color = tuple(int(c) for c in rng.integers(40, 200, 3))
+        draw.ellipse([x, y, x + r, y + r], fill=color)
+    return image
+
+
+def distance(a: Image.Image, b: Image.Image) -> int:
+    return bin(phash(a) ^ phash(b)).count("1") + bin(dhash(a) ^ dhash(b)).count("1")
+
+
+def test_duplicate_stays_close():
+    """A resized, recompressed copy is within the duplicate distance"""
+    image = make_photo(1)
+    out = io.BytesIO()
+    image.resize((320, 240), Image.Resampling.BILINEAR).save(out, format="JPEG", quality=70)
+    copy = Image.open(io.BytesIO(out.getvalue()))
+    assert distance(image, copy) <= IMAGE_DUPLICATE_DISTANCE
+    print(f"✅ recompressed copy: distance {distance(image, copy)}")
+
+
+def test_different_images_far_apart():
+    """Unrelated images are beyond the follow-up distance"""
+    distances = [distance(make_photo(1), make_photo(seed)) for seed in range(2, 7)]
+    assert min(distances) > IMAGE_FOLLOW_UP_DISTANCE
+    print(f"✅ unrelated images: distances {distances}")
+
+
+def test_flat_images_have_no_hashes():
+    """Blank and uniformly colored images would all match each other"""
+    assert dhash(Image.new("RGB", (200, 200), (255, 255, 255))) == 0
+    assert image_hashes(Image.new("RGB", (200, 200), (255, 255, 255))) is None
+    assert image_hashes(Image.new("RGB", (200, 200), (205, 170, 150))) is None
+    assert image_hashes(make_photo(1)) == (phash(make_photo(1)), dhash(make_photo(1)))
+    print("✅ flat images are not hashed")
+
+
+def test_signed_storage_and_popcount():
+    """Hashes round-trip through signed BIGINT values; distances count bits"""
+    value = (1 << 64) - 2
+    assert to_signed(value) == -2
+    assert np.array([to_signed(value)], dtype=np.int64).view(np.uint64)[0] == value
+    assert to_signed(5) == 5
+
+    hashes = np.array([0, 1, 0b1011, (1 << 64) - 1], dtype=np.uint64)
+    assert popcount(hashes).tolist() == [0, 1, 3, 64]
+    assert hamming_distances(hashes, 1).tolist() == [1, 0, 2, 63]
+    print("✅ signed storage and popcount")
+
+
+def test_index_nearest_add_remove():
+    """Rows are loaded once per patient and kept up to date"""
+    loads = []
+    rows = {
+        "p1": [
+            {"id": "a", "phash": to_signed(0), "dhash": to_signed(0), "uploaded_at": "2026-01-01"},
+            {"id": "b", "phash": to_signed((1 << 64) - 1), "dhash": to_signed((1 << 64) - 1), "uploaded_at": "2026-01-02"},
+            {"id": "c", "phash": None, "dhash": None}
+        ]
+    }
+
+    def load_rows(patient_id):
+        loads.append(patient_id)
+        return rows.get(patient_id, [])
+
+    index = ImageHashIndex(load_rows, max_patients=2)
+    matches = index.nearest("p1", 0b11, 0)
+    assert [m["image_id"] for m in matches] == ["a", "b"]
+    assert matches[0]["distance"] == 2 and matches[0]["duplicate"] and matches[0]["follow_up"]
+    assert matches[1]["distance"] == 126 and not matches[1]["follow_up"]
+
+    index.add("p1", "d", 0b11, 0, "2026-01-03")
+    assert index.nearest("p1", 0b11, 0, limit=1)[0]["image_id"] == "d"
+    index.remove("p1", "d")
+    index.remove("p1", "a")
+    assert [m["image_id"] for m in index.nearest("p1", 0, 0)] == ["b"]
+    assert loads == ["p1"]
+
+    # Unloaded patients are not added to; the least recently searched are dropped
+    index.add("p9", "x", 0, 0)
+    assert index.nearest("p2", 0, 0) == []
+    index.nearest("p3", 0, 0)
+    index.nearest("p1", 0, 0)
+    assert loads == ["p1", "p2", "p3", "p1"]
+    assert index.get_stats() == {"patients": 2, "images": 2}
+    print("✅ ImageHashIndex nearest/add/remove/evict")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Hash Index Tests")
+    print("=" * 60)
+    test_duplicate_stays_close()
+    test_different_images_far_apart()
+    test_flat_images_have_no_hashes()
+    test_signed_storage_and_popcount()
+    test_index_nearest_add_remove()
+    print("\nAll image hash index tests passed")
@@ -0,0 +1,145 @@
+"""
+Tests for medical image preprocessing.
+
+Checks the size of each rendition against its configured longest side,
+that the camera orientation is applied and the EXIF data (device, GPS)
+dropped from every rendition, that small images are not upscaled, and
+that undecodable uploads are rejected.
+
+Run with: python test_image_preprocess.py  (or pytest)
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.image_preprocess import prepare_image, ImagePreprocessor, rendition_format
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+GPS_IFD = 0x8825
+
+
+def phone_photo(size=(3000, 2000), orientation: int = 6) -> bytes:
+    """A landscape JPEG whose EXIF says to rotate it upright, with device and GPS tags"""
+    image = Image.new("RGB", size)
+    # Left half red, right half blue, to see where the rotation puts them
+    image.paste((200, 30, 30), (0, 0, size[0] // 2, size[1]))
+    image.paste((30, 30, 200), (size[0] // 2, 0, size[0], size[1]))
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    exif[MAKE] = "PhoneMaker"
+    exif.get_ifd(GPS_IFD).update({1: "N", 2: (12.0, 58.0, 30.0), 3: "E", 4: (77.0, 35.0, 10.0)})
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=90, exif=exif)
+    return out.getvalue()
+
+
+def open_rendition(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def test_rendition_sizes():
+    """Each rendition's longest side is its limit; the aspect ratio is kept"""
+    data = phone_photo(orientation=1)
+    prepared = prepare_image(data, analysis_max=1536, comparison_max=1024, thumbnail_max=320)
+
+    assert prepared.original_size == (3000, 2000)
+    assert prepared.analysis_size == (1536, 1024)
+    sizes = {kind: open_rendition(rendition).size for kind, rendition in prepared.renditions().items()}
+    assert sizes == {"analysis": (1536, 1024), "comparison": (1024, 683), "thumbnail": (320, 213)}
+    assert len(prepared.thumbnail) < len(prepared.comparison) < len(prepared.analysis) < len(data)
+
+    metadata = prepared.metadata()
+    assert metadata["original"]["bytes"] == len(data) and len(metadata["original"]["sha256"]) == 64
+    assert (metadata["analysis"]["width"], metadata["analysis"]["height"]) == (1536, 1024)
+    assert metadata["thumbnail_bytes"] == len(prepared.thumbnail)
+    print(f"✅ rendition sizes: {sizes}")
+
+
+def test_orientation_applied_and_exif_stripped():
+    """The photo is turned upright and no rendition carries EXIF, device or GPS tags"""
+    data = phone_photo(orientation=6)
+    assert Image.open(io.BytesIO(data)).getexif()[MAKE] == "PhoneMaker"
+
+    prepared = prepare_image(data, analysis_max=600, comparison_max=300, thumbnail_max=100)
+    # Orientation 6 is a quarter turn clockwise: the landscape photo becomes portrait
+    assert prepared.analysis_size == (400, 600)
+    for kind, rendition in prepared.renditions().items():
+        image = open_rendition(rendition)
+        assert image.height > image.width, kind
+        assert "exif" not in image.info, kind
+        exif = image.getexif()
+        assert len(exif) == 0 and len(exif.get_ifd(GPS_IFD)) == 0, kind
+        assert b"PhoneMaker" not in rendition, kind
+
+    # The left (red) half of the original is now on top
+    analysis = open_rendition(prepared.analysis).convert("RGB")
+    top, bottom = analysis.getpixel((200, 50)), analysis.getpixel((200, 550))
+    assert top[0] > top[2] and bottom[2] > bottom[0]
+    print("✅ orientation applied, EXIF stripped")
+
+
+def test_small_image_not_upscaled():
+    """An image under every limit keeps its size; transparency is flattened to RGB"""
+    image = Image.new("RGBA", (200, 120), (10, 120, 60, 128))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    prepared = prepare_image(out.getvalue(), image_format="JPEG")
+
+    assert prepared.content_type == "image/jpeg" and prepared.extension == "jpg"
+    for kind, rendition in prepared.renditions().items():
+        decoded = open_rendition(rendition)
+        assert decoded.format == "JPEG" and decoded.mode == "RGB", kind
+    assert open_rendition(prepared.analysis).size == (200, 120)
+    assert open_rendition(prepared.thumbnail).size == (200, 120)
+    print("✅ small image not upscaled")
+
+
+def test_rejects_undecodable_upload():
+    """Bytes that are not an image are a ValueError"""
+    for data in [b"", b"not an image", phone_photo()[:200]]:
+        try:
+            prepare_image(data)
+            raise AssertionError("expected ValueError")
+        except ValueError as e:
+            assert "Could not decode image" in str(e)
+    print("✅ undecodable uploads rejected")
+
+
+def test_preprocessor_pool():
+    """Renditions made in a worker process match the inline ones; the pool starts on first use"""
+    preprocessor = ImagePreprocessor(workers=1)
+    assert preprocessor._pool is None
+    data = phone_photo(size=(1200, 900))
+    try:
+        prepared = asyncio.run(preprocessor.prepare(data))
+    finally:
+        preprocessor.shutdown()
+
+    inline = prepare_image(data)
+    assert prepared.image_format == rendition_format()
+    assert prepared.analysis_size == inline.analysis_size
+    assert prepared.sha256 == inline.sha256
+    assert (prepared.phash, prepared.dhash) == (inline.phash, inline.dhash)
+    print(f"✅ preprocessor pool: {prepared.image_format} {prepared.analysis_size}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Preprocessing Tests")
+    print("=" * 60)
+    test_rendition_sizes()
+    test_orientation_applied_and_exif_stripped()
+    test_small_image_not_upscaled()
+    test_rejects_undecodable_upload()
+    test_preprocessor_pool()
+    print("\nAll image preprocessing tests passed")
@@ -0,0 +1,201 @@
+"""
+Tests for the durable background job queue.
+
+Checks JobStore's claiming, heartbeats, adoption of a dead server's queued
+and running jobs, and release on shutdown against a temporary SQLite file, including a table created before
+the owner/heartbeat columns, and runs jobs end to end through JobQueue.
+
+Run with: python test_job_store.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.job_queue import JobStore, JobQueue, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED
+
+STALE = timedelta(seconds=60)
+
+
+def new_store() -> JobStore:
+    return JobStore(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))
+
+
+def test_claim_once():
+    """A queued job is claimed by one owner only"""
+    store = new_store()
+    store.insert("a", "soap", {"consultation_id": "c1"})
+
+    row = store.claim("a", "server-1")
+    assert row["status"] == JOB_RUNNING and row["owner"] == "server-1" and row["attempts"] == 1
+    assert store.claim("a", "server-2") is None
+    assert store.claim("missing", "server-1") is None
+    print("✅ a job is claimed once")
+
+
+def test_requeue_only_stale_jobs():
+    """Running jobs with a fresh heartbeat are left to their server"""
+    store = new_store()
+    for job_id in ("fresh", "stale"):
+        store.insert(job_id, "soap", {})
+        store.claim(job_id, "server-1")
+    store.update("stale", heartbeat_at=(datetime.now() - timedelta(minutes=5)).isoformat())
+
+    requeued = store.requeue_stale(datetime.now() - STALE, max_attempts=3, owner="server-2")
+    assert requeued == {"soap": ["stale"]}
+    assert store.get("fresh")["status"] == JOB_RUNNING
+    assert store.get("stale")["status"] == JOB_QUEUED and store.get("stale")["owner"] == "server-2"
+
+    # A heartbeat keeps a job fresh
+    store.update("fresh", heartbeat_at=(datetime.now() - timedelta(minutes=5)).isoformat())
+    store.heartbeat("server-1", {"fresh": (0.5, "halfway")})
+    assert store.requeue_stale(datetime.now() - STALE, max_attempts=3, owner="server-2") == {}
+    assert (store.get("fresh")["progress"], store.get("fresh")["message"]) == (0.5, "halfway")
+    print("✅ only stale jobs are requeued")
+
+
+def test_adopt_queued_jobs_of_dead_server():
+    """Queued jobs of a server that stopped heartbeating are adopted; a live server's are not"""
+    store = new_store()
+    store.insert("dead-job", "lab_report", {}, owner="server-1")
+    store.insert("live-job", "lab_report", {}, owner="server-2")
+    store.update("dead-job", heartbeat_at=(datetime.now() - timedelta(minutes=5)).isoformat())
+    store.update("live-job", heartbeat_at=(datetime.now() - timedelta(minutes=5)).isoformat())
+
+    # server-2 is still up: its heartbeat refreshes its queued job too
+    store.heartbeat("server-2", {})
+    assert store.requeue_stale(datetime.now() - STALE, max_attempts=3, owner="server-3") == {
+        "lab_report": ["dead-job"]
+    }
+    assert store.get("dead-job")["owner"] == "server-3"
+    assert store.get("live-job")["owner"] == "server-2"
+
+    # Adopted jobs are fresh again, so no other server takes them as well
+    assert store.requeue_stale(datetime.now() - STALE, max_attempts=3, owner="server-4") == {}
+    print("✅ queued jobs of a dead server are adopted")
+
+
+def test_release_and_max_attempts():
+    """Shutdown requeues the owner's jobs; too many interruptions fail a job"""
+    store = new_store()
+    store.insert("a", "lab_report", {})
+    store.insert("b", "lab_report", {})
+    store.insert("c", "lab_report", {}, owner="server-1")
+    store.claim("a", "server-1")
+    store.claim("b", "server-2")
+
+    assert store.release("server-1", max_attempts=3) == {"lab_report": ["a", "c"]}
+    assert store.get("b")["status"] == JOB_RUNNING
+    # Released jobs have no heartbeat, so the next server adopts them at once
+    assert store.requeue_stale(datetime.now() - STALE, max_attempts=3, owner="server-2") == {
+        "lab_report": ["a", "c"]
+    }
+
+    store.claim("a", "server-1")
+    assert store.release("server-1", max_attempts=2) == {}
+    row = store.get("a")
+    assert row["status"] == JOB_FAILED and "too many times" in row["error"]
+    print("✅ release and max attempts")
+
+
+def test_recover_and_migrate_old_table():
+    """A table without owner/heartbeat gets the columns; its running jobs are stale"""
+    path = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL,
+            result TEXT, error TEXT, progress REAL NOT NULL DEFAULT 0, message TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT
+        );
+        INSERT INTO jobs (id, type, status, payload, attempts, created_at)
+            VALUES ('old', 'soap', 'running', '{}', 1, '2026-01-01T00:00:00');
+        INSERT INTO jobs (id, type, status, payload, created_at)
+            VALUES ('new', 'soap', 'queued', '{}', '2026-01-02T00:00:00');
+    """)
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    assert store.recover(max_attempts=3, stale_before=datetime.now() - STALE, owner="server-1") == {"soap": ["old", "new"]}
+    print("✅ recover migrates an old table")
+
+
+def test_queue_runs_jobs():
+    """Jobs run through their handler; results, failures and progress are reported"""
+    async def run():
+        queue = JobQueue(new_store())
+        progress_seen = []
+
+        async def double(payload, report_progress):
+            report_progress(0.5, "halfway")
+            if payload["n"] < 0:
+                raise ValueError("negative")
+            return {"result": payload["n"] * 2}
+
+        queue.register("double", double, concurrency=1)
+        await queue.start()
+
+        ok = await queue.submit("double", {"n": 21})
+        updates = queue.watch(ok)
+        bad = await queue.submit("double", {"n": -1})
+        failures = queue.watch(bad)
+        while True:
+            job = await asyncio.wait_for(updates.get(), 2)
+            progress_seen.append(job["progress"])
+            if job["status"] == JOB_COMPLETED:
+                break
+        while (await asyncio.wait_for(failures.get(), 2))["status"] != JOB_FAILED:
+            pass
+        await queue.stop()
+        return job, progress_seen, await queue.get(ok), await queue.get(bad)
+
+    job, progress_seen, stored, failed = asyncio.run(run())
+    assert job["result"] == {"result": 42}
+    assert progress_seen == [0, 0.5, 1.0]
+    assert stored["status"] == JOB_COMPLETED and stored["result"] == {"result": 42}
+    assert failed["status"] == JOB_FAILED and failed["error"] == "negative"
+    print("✅ JobQueue runs jobs")
+
+
+def test_stop_requeues_running_job():
+    """A job cancelled by stop() is queued again for the next start"""
+    async def run():
+        queue = JobQueue(new_store())
+        started = asyncio.Event()
+
+        async def slow(payload, report_progress):
+            started.set()
+            await asyncio.sleep(10)
+
+        queue.register("slow", slow, concurrency=1)
+        await queue.start()
+        job_id = await queue.submit("slow", {})
+        await asyncio.wait_for(started.wait(), 2)
+        await queue.stop()
+        return queue, job_id
+
+    queue, job_id = asyncio.run(run())
+    row = queue.store.get(job_id)
+    assert row["status"] == JOB_QUEUED and row["attempts"] == 1
+    print("✅ stop requeues the running job")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Job Queue Tests")
+    print("=" * 60)
+    test_claim_once()
+    test_requeue_only_stale_jobs()
+    test_adopt_queued_jobs_of_dead_server()
+    test_release_and_max_attempts()
+    test_recover_and_migrate_old_table()
+    test_queue_runs_jobs()
+    test_stop_requeues_running_job()
+    print("\nAll job queue tests passed")
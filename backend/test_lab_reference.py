@@ -0,0 +1,148 @@
+"""
+Tests for the lab reference range index.
+
+Checks unit and test name normalization, the lookup of the most specific
+range for a patient's age and sex, conversion of reported units to the
+canonical unit (and of the range back to the reported unit), and loading
+a custom reference table.
+
+Run with: python test_lab_reference.py  (or pytest)
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.lab_reference import (
+    ReferenceIndex,
+    normalize_unit,
+    normalize_test_name,
+    parse_sex,
+    SEX_ANY,
+    SEX_MALE,
+    SEX_FEMALE,
+    STATUS_LOW,
+    STATUS_NORMAL,
+    STATUS_HIGH,
+    STATUS_UNKNOWN
+)
+
+index = ReferenceIndex()
+
+
+def test_normalize_unit():
+    """Spellings of the same unit normalize to one key"""
+    for spelling in ["/cumm", "cells/cumm", "/cu.mm", "/mm3", "cells/µL", "/μL", "/uL", " / uL "]:
+        assert normalize_unit(spelling) == "/ul", spelling
+    assert normalize_unit("x10^3/µL") == normalize_unit("10*3/uL") == "10^3/ul"
+    assert normalize_unit("µIU/mL") == "uiu/ml"
+    assert normalize_unit("mg/dL") == "mg/dl"
+    print("✅ normalize_unit")
+
+
+def test_normalize_test_name_and_sex():
+    """Punctuation and case are dropped from names; sex spellings map to codes"""
+    assert normalize_test_name("SGPT (ALT)") == "sgpt alt"
+    assert normalize_test_name("  Haemoglobin, Hb ") == "haemoglobin hb"
+    assert index.test_id("S. Creatinine") == index.test_id("creatinine") >= 0
+    assert index.canonical_name("Total Leukocyte Count") == "wbc"
+    assert index.canonical_name("Mystery Marker") == "mystery marker"
+    assert [parse_sex(value) for value in ["Male", "f", " FEMALE ", None, "other"]] == [
+        SEX_MALE, SEX_FEMALE, SEX_FEMALE, SEX_ANY, SEX_ANY
+    ]
+    print("✅ normalize test names and sex")
+
+
+def test_unit_factors():
+    """Reported units resolve to factors into the test's canonical unit"""
+    names = ["WBC", "WBC", "Platelets", "Platelets", "Glucose Fasting", "Creatinine", "Hb", "Hb"]
+    units = ["/cumm", "10^3/µL", "lakh/cumm", "/µL", "mmol/L", "µmol/L", "", "mg/L"]
+    test_ids, factors = index.resolve(names, units)
+    assert (test_ids >= 0).all()
+    expected = [1.0, 1000.0, 100.0, 0.001, 18.016, 0.01131, 1.0]
+    assert np.allclose(factors[:-1], expected)
+    # No conversion known: cannot be compared
+    assert np.isnan(factors[-1])
+    print("✅ unit factors")
+
+
+def test_most_specific_range():
+    """Sex-specific adult ranges beat the child range, which beats the default"""
+    hemoglobin = np.full(5, index.test_id("hemoglobin"))
+    low, high = index.ranges(
+        hemoglobin,
+        sex=np.array([SEX_MALE, SEX_FEMALE, SEX_FEMALE, SEX_ANY, SEX_MALE]),
+        age=np.array([40, 40, 12, 40, np.nan])
+    )
+    assert low.tolist() == [13.0, 12.0, 11.0, 12.0, 12.0]
+    assert high.tolist() == [17.0, 15.5, 16.0, 17.0, 17.0]
+
+    # Open ends are NaN; unknown tests have no range
+    low, high = index.ranges(np.array([index.test_id("ldl"), -1]))
+    assert np.isnan(low[0]) and high[0] == 100
+    assert np.isnan(low[1]) and np.isnan(high[1])
+    print("✅ most specific range")
+
+
+def test_flag_values_in_reported_units():
+    """Values are compared in the canonical unit; the range is given back in the reported unit"""
+    results = index.flag_values(
+        ["Fasting Blood Sugar", "Platelet Count", "Total WBC Count", "Hemoglobin", "Hemoglobin", "Unknown"],
+        [7.2, 1.2, 12500, 12.5, 12.5, 1.0],
+        ["mmol/L", "lakh/cumm", "/cumm", "g/dL", "furlongs", ""],
+        sex="female", age=34
+    )
+    glucose, platelets, wbc, hemoglobin, bad_unit, unknown = results
+    assert glucose["test"] == "fasting glucose" and glucose["status"] == "high"
+    assert (glucose["low"], glucose["high"]) == (round(70 / 18.016, 4), round(100 / 18.016, 4))
+    assert platelets["status"] == "low" and (platelets["low"], platelets["high"]) == (1.5, 4.1)
+    assert wbc["status"] == "high" and (wbc["low"], wbc["high"]) == (4000, 11000)
+    assert hemoglobin["status"] == "normal" and hemoglobin["high"] == 15.5
+    assert bad_unit is None and unknown is None
+
+    test_ids, factors = index.resolve(["Hb", "Hb", "Hb"], ["g/dL", "g/L", "g/L"])
+    codes = index.flag(test_ids, np.array([18.0, 90.0, 150.0]), factors, sex=SEX_MALE, age=50)
+    assert codes.tolist() == [STATUS_HIGH, STATUS_LOW, STATUS_NORMAL]
+    print("✅ flag values in reported units")
+
+
+def test_custom_table():
+    """A table is loaded from any path; every test needs a default range"""
+    directory = tempfile.mkdtemp()
+    header = "test,unit,sex,age_min,age_max,low,high,critical_low,critical_high,synonyms,conversions\n"
+    path = os.path.join(directory, "ranges.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + "marker,ng/mL,any,0,200,1,5,,20,mk|marker x,ng/dL=0.01\n")
+    custom = ReferenceIndex(path)
+    assert custom.get_stats()["tests"] == 1
+    assert custom.flag_values(["MK"], [600], ["ng/dL"])[0]["status"] == "high"
+    assert custom.critical_values(["marker x"], [25], ["ng/mL"]) == [True]
+    assert custom.flag(np.array([-1]), np.array([1.0]), np.array([1.0])).tolist() == [STATUS_UNKNOWN]
+
+    broken = os.path.join(directory, "broken.csv")
+    with open(broken, "w", encoding="utf-8") as f:
+        f.write(header + "marker,ng/mL,male,18,200,1,5,,,,\n")
+    try:
+        ReferenceIndex(broken)
+        raise AssertionError("expected ValueError")
+    except ValueError as e:
+        assert "no range for everyone" in str(e)
+    print("✅ custom table")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Lab Reference Index Tests")
+    print("=" * 60)
+    test_normalize_unit()
+    test_normalize_test_name_and_sex()
+    test_unit_factors()
+    test_most_specific_range()
+    test_flag_values_in_reported_units()
+    test_custom_table()
+    print("\nAll lab reference index tests passed")
@@ -0,0 +1,120 @@
+"""
+Tests for splitting PDF lab reports into page ranges.
+
+Checks that _page_ranges covers every page exactly once with at most one
+range per worker and only the last range under PDF_PAGES_PER_TASK pages,
+that a document without pages gives no ranges and no text, and that
+extraction across worker processes returns the same text as extraction in
+one pass.
+
+Run with: python test_lab_report_pages.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from PyPDF2 import PdfWriter
+
+from app.content_cache import ContentCache
+from app.lab_report_analyzer import LabReportAnalyzer, _page_ranges, PDF_PAGES_PER_TASK
+
+
+def text_pdf(pages: list) -> str:
+    """Write a PDF with one line of Helvetica text per page and return its path"""
+    count = len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(count)), count
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 11 Tf 40 760 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, content in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{content}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    path = os.path.join(tempfile.mkdtemp(), "report.pdf")
+    with open(path, "wb") as f:
+        f.write(body)
+    return path
+
+
+def new_analyzer(parse_workers: int) -> LabReportAnalyzer:
+    return LabReportAnalyzer(parse_workers=parse_workers, cache=ContentCache(tempfile.mkdtemp()))
+
+
+def test_page_ranges():
+    """Ranges are contiguous, cover every page and respect workers and task size"""
+    assert _page_ranges(0, 4) == []
+    assert _page_ranges(-1, 4) == []
+    assert _page_ranges(3, 4) == [(0, 3)]
+    assert _page_ranges(8, 2) == [(0, 4), (4, 8)]
+    assert _page_ranges(100, 3) == [(0, 34), (34, 68), (68, 100)]
+
+    for page_count in range(1, 60):
+        for workers in range(0, 6):
+            ranges = _page_ranges(page_count, workers)
+            assert ranges[0][0] == 0 and ranges[-1][1] == page_count
+            assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+            assert len(ranges) <= max(1, workers)
+            # Only the last range may be short
+            assert all(end - start >= PDF_PAGES_PER_TASK for start, end in ranges[:-1])
+    print("✅ page ranges")
+
+
+def test_parallel_matches_single_pass():
+    """Text extracted across worker processes equals the single-pass text, in page order"""
+    pages = [f"Page {i} Hemoglobin {12 + i / 10:.1f} g/dL 13.0 - 17.0 reference interval" for i in range(9)]
+    path = text_pdf(pages)
+    analyzer = new_analyzer(parse_workers=2)
+    try:
+        parallel = asyncio.run(analyzer.extract_text_from_pdf_parallel(path))
+    finally:
+        analyzer.shutdown()
+
+    assert parallel == analyzer.extract_text_from_pdf(path)
+    assert parallel.splitlines() == pages
+    print(f"✅ {len(pages)} pages over {len(_page_ranges(len(pages), 2))} tasks")
+
+
+def test_pdf_without_pages():
+    """A PDF with no pages yields no text instead of failing"""
+    path = os.path.join(tempfile.mkdtemp(), "empty.pdf")
+    with open(path, "wb") as f:
+        PdfWriter().write(f)
+
+    analyzer = new_analyzer(parse_workers=2)
+    try:
+        assert asyncio.run(analyzer.extract_text_from_pdf_parallel(path)) == ""
+    finally:
+        analyzer.shutdown()
+    print("✅ PDF without pages")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Lab Report Page Splitting Tests")
+    print("=" * 60)
+    test_page_ranges()
+    test_parallel_matches_single_pass()
+    test_pdf_without_pages()
+    print("\nAll lab report page splitting tests passed")
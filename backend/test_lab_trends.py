@@ -0,0 +1,135 @@
+"""
+Tests for lab value trends.
+
+Checks that report_values turns an analysis into canonical lab_values rows,
+dated by the collection date printed on the report when there is one, and
+that compute_trend builds series, deltas, direction and out-of-range
+streaks, across synonyms and units of the same test.
+
+Run with: python test_lab_trends.py  (or pytest)
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.lab_trends import report_values, compute_trend
+
+
+def report(report_id: str, uploaded_at: str, values: list, extracted_text: str = "") -> dict:
+    return {
+        "id": report_id,
+        "patient_id": "p1",
+        "uploaded_at": uploaded_at,
+        "extracted_text": extracted_text,
+        "analysis_result": {"values": values}
+    }
+
+
+def value(name: str, number, unit: str, status: str = "normal", normal_range: str = "") -> dict:
+    return {"name": name, "value": number, "unit": unit, "status": status, "normal_range": normal_range}
+
+
+def test_report_values():
+    """Numeric values become rows with canonical names and units; others are skipped"""
+    rows = report_values(report("r1", "2026-03-01", [
+        value("Haemoglobin", "12.5", "g/dL", "low", "13 - 17"),
+        value("Hb", "125", "g/L"),
+        value("Total Cholesterol", "1,240", "mg/dL", "high"),
+        value("Urine Colour", "Pale yellow", ""),
+        value("Mystery Marker", "3.3", "AU"),
+        {"name": "", "value": "5"}
+    ]))
+
+    assert [row["name"] for row in rows] == ["Haemoglobin", "Hb", "Total Cholesterol", "Mystery Marker"]
+    first, second, cholesterol, unknown = rows
+    assert first["test"] == second["test"] == "hemoglobin"
+    assert first["canonical_value"] == second["canonical_value"] == 12.5
+    assert first["report_id"] == "r1" and first["measured_at"] == "2026-03-01"
+    assert first["measured_at_source"] == "upload"
+    assert cholesterol["value"] == 1240.0
+    assert unknown["canonical_value"] is None and unknown["canonical_unit"] is None
+    assert report_values({"id": "r2", "patient_id": "p1", "analysis_result": None}) == []
+    print(f"✅ report_values: {len(rows)} rows")
+
+
+def test_measured_at_from_report_date():
+    """The collection date on the report dates the values; the report date is the fallback"""
+    header = "City Diagnostics\nSample Collected On : 28/02/2026 08:15 AM\nReported On : 02/03/2026\n"
+    rows = report_values(report("r1", "2026-03-05T10:00:00", [value("Glucose", "95", "mg/dL")], header))
+    assert (rows[0]["measured_at"], rows[0]["measured_at_source"]) == ("2026-02-28T08:15:00", "report")
+
+    rows = report_values(report("r2", "2026-03-05T10:00:00", [value("Glucose", "95", "mg/dL")],
+                                "Report Date: 12-Mar-2026"))
+    assert (rows[0]["measured_at"], rows[0]["measured_at_source"]) == ("2026-03-12", "report")
+
+    # An old report uploaded last still comes first in measured_at order
+    late = report_values(report("r3", "2026-04-01", [value("Glucose", "110", "mg/dL")], "Collection Date: 2026-01-15"))
+    trend = compute_trend(sorted(rows + late, key=lambda row: row["measured_at"]))
+    assert [point["value"] for point in trend["series"]] == [110.0, 95.0]
+    assert [point["measured_at_source"] for point in trend["series"]] == ["report", "report"]
+    print("✅ measured_at from the report date")
+
+
+def test_trend_across_units():
+    """Values reported in different units form one series in the canonical unit"""
+    rows = (
+        report_values(report("r1", "2026-01-01", [value("Hemoglobin", "10.0", "g/dL", "low")]))
+        + report_values(report("r2", "2026-02-01", [value("Hb", "110", "g/L", "low")]))
+        + report_values(report("r3", "2026-03-01", [value("Haemoglobin", "13.2", "g/dL", "normal", "13 - 17")]))
+    )
+    trend = compute_trend(rows)
+
+    assert trend["test"] == "hemoglobin"
+    assert trend["unit"] == "g/dL"
+    assert [point["value"] for point in trend["series"]] == [10.0, 11.0, 13.2]
+    assert trend["previous"] == 11.0 and trend["latest"] == 13.2
+    assert trend["delta"] == 2.2 and trend["percent_change"] == 20.0
+    assert trend["change_since_first"] == 3.2
+    assert trend["direction"] == "up"
+    assert trend["out_of_range_streak"] == 0
+    assert (trend["first_measured_at"], trend["last_measured_at"]) == ("2026-01-01", "2026-03-01")
+    print("✅ trend across units")
+
+
+def test_trend_without_canonical_unit():
+    """Unknown tests only use the rows in the latest row's unit"""
+    rows = [
+        {"test": "mystery marker", "name": "Mystery Marker", "value": v, "unit": unit,
+         "canonical_value": None, "canonical_unit": None, "status": status,
+         "normal_range": "", "measured_at": day, "report_id": day}
+        for v, unit, status, day in [
+            (3.0, "AU", "high", "d1"), (99.0, "other", "high", "d2"),
+            (3.05, "au", "high", "d3"), (3.04, "AU", "high", "d4")
+        ]
+    ]
+    trend = compute_trend(rows)
+    assert trend["count"] == 3
+    assert [point["report_id"] for point in trend["series"]] == ["d1", "d3", "d4"]
+    assert trend["direction"] == "stable"
+    assert trend["out_of_range_streak"] == 3
+    print("✅ trend without a canonical unit")
+
+
+def test_single_value_trend():
+    """One result has no previous value, delta or direction"""
+    trend = compute_trend(report_values(report("r1", "2026-01-01", [value("Glucose", "95", "mg/dL")])))
+    assert trend["count"] == 1
+    assert trend["previous"] is None and trend["delta"] is None and trend["percent_change"] is None
+    assert trend["direction"] is None
+    assert trend["change_since_first"] == 0
+    print("✅ single value trend")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Lab Trends Tests")
+    print("=" * 60)
+    test_report_values()
+    test_measured_at_from_report_date()
+    test_trend_across_units()
+    test_trend_without_canonical_unit()
+    test_single_value_trend()
+    print("\nAll lab trends tests passed")
@@ -0,0 +1,235 @@
+"""
+Tests for the lab value parser and the reference range index.
+
+Checks range parsing, row extraction from report text and tables, flagging
+against printed and reference ranges (age/sex-specific, with unit
+conversion) and the critical limits that set urgent_attention locally.
+
+Run with: python test_lab_value_parser.py  (or pytest)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.lab_reference import ReferenceIndex, STATUS_LOW, STATUS_NORMAL, STATUS_UNKNOWN, SEX_MALE, SEX_FEMALE
+from app.lab_value_parser import (
+    parse_range,
+    parse_lab_text,
+    parse_lab_tables,
+    build_analysis,
+    needs_llm,
+    apply_reference_flags,
+    critical_rows
+)
+
+CBC_REPORT = """
+City Diagnostics
+Age / Sex : 45 Yrs / Male
+Hemoglobin 14.2 g/dL 13.0 - 17.0
+Total Leukocyte Count 7800 cells/cumm 4000 - 11000
+Platelet Count 2.5 lakh/cumm 1.5 - 4.1
+"""
+
+
+def test_parse_range():
+    """Between, below and above ranges, and text that is not a range"""
+    assert parse_range("13.0 - 17.0") == {"low": 13.0, "high": 17.0}
+    assert parse_range("(4,000 to 11,000)") == {"low": 4000.0, "high": 11000.0}
+    assert parse_range("< 200") == {"low": None, "high": 200.0}
+    assert parse_range("more than 40") == {"low": 40.0, "high": None}
+    assert parse_range("negative") is None
+    print("✅ parse_range")
+
+
+def test_parse_lab_text():
+    """Rows with printed ranges, and the patient from the report header"""
+    parsed = parse_lab_text(CBC_REPORT)
+    assert parsed["patient"] == {"age": 45, "sex": "male"}
+    rows = {row["name"]: row for row in parsed["rows"]}
+    assert rows["Hemoglobin"]["value"] == 14.2
+    assert rows["Hemoglobin"]["status"] == "normal"
+    assert rows["Total Leukocyte Count"]["unit"] == "cells/cumm"
+    assert parsed["unparsed"] == []
+    print(f"✅ parse_lab_text: {len(parsed['rows'])} rows")
+
+
+def test_per_volume_units():
+    """Units printed with a leading slash or a power of ten parse like any other"""
+    parsed = parse_lab_text(
+        "Total WBC Count 25000 /cumm 4000 - 11000\n"
+        "Platelet Count 180000 /µL 150000 - 410000\n"
+        "Total Leukocyte Count 7.2 10^3/µL 4.0 - 11.0\n"
+        "WBC Count 6400 /cumm"
+    )
+    rows = [(row["name"], row["value"], row["unit"], row["status"]) for row in parsed["rows"]]
+    assert rows == [
+        ("Total WBC Count", 25000.0, "/cumm", "high"),
+        ("Platelet Count", 180000.0, "/µL", "normal"),
+        ("Total Leukocyte Count", 7.2, "10^3/µL", "normal"),
+        # No printed range: /cumm is the reference table's /uL
+        ("WBC Count", 6400.0, "/cumm", "normal")
+    ]
+    assert parsed["unparsed"] == []
+    print("✅ per-volume units")
+
+
+def test_unmatched_result_lines_go_to_unparsed():
+    """A number next to a known test name is kept for Gemini even if no pattern matched it"""
+    parsed = parse_lab_text(
+        "Age / Sex : 45 Yrs / Male\n"
+        "Report Date 12/03/2026\n"
+        "Hemoglobin (by photometry) 14.2 ; ref 13-17\n"
+        "TLC 25000 cells per cubic millimetre\n"
+        "Hemoglobin 14.2 g/dL 13.0 - 17.0"
+    )
+    assert [row["name"] for row in parsed["rows"]] == ["Hemoglobin"]
+    assert parsed["unparsed"] == ["Hemoglobin (by photometry) 14.2 ; ref 13-17", "TLC 25000 cells per cubic millimetre"]
+    analysis = build_analysis(parsed["rows"])
+    assert needs_llm(parsed, analysis)
+    print("✅ unmatched result lines go to unparsed")
+
+
+def test_reference_lookup_by_sex_and_unit():
+    """Rows without a printed range use the patient's reference range, converted"""
+    parsed = parse_lab_text("Age: 30 years\nSex: Female\nHemoglobin 16.0 g/dL\nHaemoglobin 125 g/L")
+    first, second = parsed["rows"]
+    # Female range is 12.0 - 15.5 g/dL; the male one would call 16.0 normal
+    assert first["status"] == "high"
+    assert first["normal_range"] == "12 - 15.5"
+    # 125 g/L = 12.5 g/dL; the range is shown in the reported unit
+    assert second["status"] == "normal"
+    assert second["normal_range"] == "120 - 155"
+    print("✅ reference lookup by sex and unit")
+
+
+def test_parse_lab_tables():
+    """Columns are found per row in extracted tables"""
+    tables = [[
+        ["Test", "Result", "Unit", "Range"],
+        ["SGPT (ALT)", "61 H", "U/L", "7 - 56"],
+        ["Creatinine", "0.9", "mg/dL", "0.7 - 1.3"]
+    ]]
+    rows = parse_lab_tables(tables)
+    assert [(row["name"], row["status"]) for row in rows] == [("SGPT (ALT)", "high"), ("Creatinine", "normal")]
+    print("✅ parse_lab_tables")
+
+
+def test_panel_notes_skip_llm():
+    """Abnormal panel tests are explained locally, without Gemini"""
+    parsed = parse_lab_text("Hemoglobin 11.2 g/dL 13.0 - 17.0\nHemoglobin 11.2 g/dL 13.0 - 17.0\nMCV 85 fL 80 - 100")
+    analysis = build_analysis(parsed["rows"])
+    # The repeated row is counted once
+    assert len(analysis["values"]) == 2
+    assert analysis["abnormal_values"][0]["explanation"]
+    assert analysis["urgent_attention"] is False
+    assert not needs_llm(parsed, analysis)
+    print("✅ panel notes skip the LLM")
+
+
+def test_critical_value_sets_urgent_attention():
+    """Hemoglobin 6.6 is under the critical limit of 7 g/dL, though not half the range"""
+    parsed = parse_lab_text("Hemoglobin 6.6 g/dL 13.0 - 17.0\nPlatelet Count 250 10^3/uL 150 - 410")
+    analysis = build_analysis(parsed["rows"])
+    assert analysis["urgent_attention"] is True
+    assert "Hemoglobin" in analysis["urgent_message"]
+    assert needs_llm(parsed, analysis)
+
+    # Converted before comparing: 66 g/L is the same value
+    rows = parse_lab_text("Hemoglobin 66 g/L 130 - 170")["rows"]
+    assert [row["name"] for row in critical_rows(rows)] == ["Hemoglobin"]
+
+    # A low but not critical value stays non-urgent
+    analysis = build_analysis(parse_lab_text("Hemoglobin 9.5 g/dL 13.0 - 17.0")["rows"])
+    assert analysis["urgent_attention"] is False
+    print("✅ critical value sets urgent_attention")
+
+
+def test_critical_fallback_for_unknown_tests():
+    """Tests missing from the reference table fall back to CRITICAL_FACTOR"""
+    rows = parse_lab_text("Procalcitonin 0.8 ng/mL < 0.5\nLipase 130 U/L < 60")["rows"]
+    assert [row["name"] for row in critical_rows(rows)] == ["Lipase"]
+    print("✅ critical fallback for unknown tests")
+
+
+def test_apply_reference_flags():
+    """Gemini's values are re-flagged numerically and critical ones marked urgent"""
+    analysis = {
+        "values": [
+            {"name": "Potassium", "value": "6.8", "unit": "mmol/L", "status": "normal", "normal_range": ""},
+            {"name": "Sodium", "value": "140", "unit": "mmol/L", "status": "high", "normal_range": "135 - 145"}
+        ],
+        "abnormal_values": [
+            {"name": "Sodium", "value": "140", "unit": "mmol/L", "status": "high", "normal_range": "135 - 145",
+             "explanation": "", "recommendation": ""}
+        ],
+        "urgent_attention": False,
+        "urgent_message": ""
+    }
+    apply_reference_flags(analysis)
+    assert [value["status"] for value in analysis["values"]] == ["high", "normal"]
+    assert [value["name"] for value in analysis["abnormal_values"]] == ["Potassium"]
+    assert analysis["urgent_attention"] is True
+    assert analysis["urgent_message"].startswith("Potassium is far outside")
+    print("✅ apply_reference_flags")
+
+
+def test_urgent_message_from_local_flags():
+    """Gemini's template text never stands in for the urgent message"""
+    placeholder = "Message if urgent attention is needed"
+    critical = {
+        "values": [{"name": "Hemoglobin", "value": "6.1", "unit": "g/dL", "normal_range": "13 - 17"}],
+        "abnormal_values": [], "urgent_attention": False, "urgent_message": placeholder
+    }
+    apply_reference_flags(critical)
+    assert critical["urgent_attention"] is True
+    assert "Hemoglobin" in critical["urgent_message"] and critical["urgent_message"] != placeholder
+
+    normal = {
+        "values": [{"name": "Hemoglobin", "value": "14.1", "unit": "g/dL", "normal_range": "13 - 17"}],
+        "abnormal_values": [], "urgent_attention": False, "urgent_message": placeholder
+    }
+    apply_reference_flags(normal)
+    assert (normal["urgent_attention"], normal["urgent_message"]) == (False, "")
+    print("✅ urgent message from local flags")
+
+
+def test_reference_index():
+    """Most specific range per patient, unit factors and critical limits"""
+    index = ReferenceIndex()
+    test_ids, factors = index.resolve(["Hb", "hemoglobin", "Unknown Test", "Hb"], ["g/dL", "g/L", "g/dL", "furlongs"])
+    assert test_ids.tolist()[:2] == [index.test_id("hemoglobin")] * 2
+    assert test_ids[2] == -1
+    assert factors[1] == 0.1 and np.isnan(factors[3])
+
+    hemoglobin = np.array([index.test_id("hemoglobin")] * 3)
+    low, _ = index.ranges(hemoglobin, sex=np.array([SEX_MALE, SEX_FEMALE, SEX_MALE]), age=np.array([40, 40, 10]))
+    assert low.tolist() == [13.0, 12.0, 11.0]
+
+    status = index.critical(test_ids, np.array([6.6, 90, 1.0, 6.6]), factors)
+    assert status.tolist() == [STATUS_LOW, STATUS_NORMAL, STATUS_UNKNOWN, STATUS_UNKNOWN]
+    assert index.critical_values(["Hb", "Unknown Test"], [25, 1], ["g/dL", ""]) == [True, None]
+    print(f"✅ ReferenceIndex: {index.get_stats()}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Lab Value Parser Tests")
+    print("=" * 60)
+    test_parse_range()
+    test_parse_lab_text()
+    test_per_volume_units()
+    test_unmatched_result_lines_go_to_unparsed()
+    test_reference_lookup_by_sex_and_unit()
+    test_parse_lab_tables()
+    test_panel_notes_skip_llm()
+    test_critical_value_sets_urgent_attention()
+    test_critical_fallback_for_unknown_tests()
+    test_apply_reference_flags()
+    test_urgent_message_from_local_flags()
+    test_reference_index()
+    print("\nAll lab value parser tests passed")
@@ -0,0 +1,103 @@
+"""
+Tests for the incremental parser of streamed SOAP note JSON.
+
+Checks that sections are reported as soon as their string closes, however
+the response is split into chunks, and that fences, escapes, nested values
+and unknown keys do not produce sections.
+
+Run with: python test_soap_stream_parser.py  (or pytest)
+"""
+
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.summarizer import SoapStreamParser, SOAP_FIELDS
+
+NOTE = {
+    "subjective": "Patient reports a \"sharp\" pain, 7/10.\nWorse at night.",
+    "objective": "BP 130/85 \\ HR 88",
+    "assessment": "Likely muscle strain — rule out fracture.",
+    "plan": "Ibuprofen 400 mg; follow up in 1 week."
+}
+
+
+def feed_all(parser: SoapStreamParser, chunks) -> list:
+    """Feed chunks and collect (chunk index, field) in the order fields closed"""
+    closed = []
+    for index, chunk in enumerate(chunks):
+        for field in parser.feed(chunk):
+            closed.append((index, field))
+    return closed
+
+
+def test_whole_response():
+    """One chunk yields every section with its decoded value"""
+    parser = SoapStreamParser()
+    new = parser.feed(json.dumps(NOTE, ensure_ascii=False))
+    assert list(new) == SOAP_FIELDS
+    assert new == NOTE
+    assert parser.completed == NOTE
+    print("✅ whole response")
+
+
+def test_any_chunking():
+    """Splitting the text anywhere, down to single characters, gives the same sections"""
+    text = "```json\n" + json.dumps(NOTE, indent=2) + "\n```"
+    for size in (1, 2, 7, 64):
+        parser = SoapStreamParser()
+        closed = feed_all(parser, [text[i:i + size] for i in range(0, len(text), size)])
+        assert [field for _, field in closed] == SOAP_FIELDS
+        assert parser.completed == NOTE
+    print("✅ any chunking")
+
+
+def test_section_reported_when_it_closes():
+    """A section is returned by the chunk holding its closing quote, not before"""
+    parser = SoapStreamParser()
+    assert parser.feed('{"subjective": "Head') == {}
+    assert parser.feed('ache since Monday') == {}
+    assert parser.feed('", "objective": "Afeb') == {"subjective": "Headache since Monday"}
+    assert parser.feed('rile"}') == {"objective": "Afebrile"}
+    print("✅ section reported when it closes")
+
+
+def test_ignores_nested_and_unknown_values():
+    """Nested objects, arrays, numbers and unknown keys are skipped, not errors"""
+    parser = SoapStreamParser()
+    text = json.dumps({
+        "meta": {"subjective": "not a section"},
+        "tags": ["plan", "objective"],
+        "subjective": 42,
+        "notes": "not a section either",
+        "assessment": "Viral URI",
+        "plan": "Rest and fluids"
+    })
+    closed = feed_all(parser, [text[i:i + 5] for i in range(0, len(text), 5)])
+    assert [field for _, field in closed] == ["assessment", "plan"]
+    assert parser.completed == {"assessment": "Viral URI", "plan": "Rest and fluids"}
+    print("✅ nested and unknown values ignored")
+
+
+def test_repeated_key_keeps_first():
+    """A key that appears twice keeps its first value"""
+    parser = SoapStreamParser(fields=("plan",))
+    new = parser.feed('{"plan": "first", "plan": "second"}')
+    assert new == {"plan": "first"}
+    assert parser.completed == {"plan": "first"}
+    print("✅ repeated key keeps the first value")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SOAP Stream Parser Tests")
+    print("=" * 60)
+    test_whole_response()
+    test_any_chunking()
+    test_section_reported_when_it_closes()
+    test_ignores_nested_and_unknown_values()
+    test_repeated_key_keeps_first()
+    print("\nAll SOAP stream parser tests passed")
@@ -0,0 +1,120 @@
+"""
+Tests for the micro-batching scheduler of Gemini triage requests.
+
+Uses a stand-in model object that records prompts and answers with a JSON
+array, to check that utterances arriving together share one request, that
+results are fanned back to the right caller, that the size cap splits
+batches, and that a missing item, a failed request or a timed-out request
+reaches every waiting caller.
+
+Run with: python test_triage_batcher.py  (or pytest)
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.alert_engine import TriageBatcher
+
+
+class Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class BatchModel:
+    """Answers a batch prompt with one result per numbered statement"""
+
+    def __init__(self, delay: float = 0.0, drop=(), error: Exception = None, fence: bool = False):
+        self.prompts = []
+        self.delay = delay
+        self.drop = set(drop)
+        self.error = error
+        self.fence = fence
+
+    async def generate_content_async(self, prompt: str) -> Response:
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        statements = re.findall(r"^(\d+)\. (\".*\")$", prompt, flags=re.MULTILINE)
+        results = [
+            {"id": int(index), "text": json.loads(text), "severity_score": 3}
+            for index, text in reversed(statements)
+            if int(index) not in self.drop
+        ]
+        text = json.dumps(results)
+        return Response(f"```json\n{text}\n```" if self.fence else text)
+
+
+async def submit_all(batcher: TriageBatcher, texts):
+    return await asyncio.gather(*(batcher.submit(text) for text in texts), return_exceptions=True)
+
+
+def test_one_request_per_window():
+    """Utterances submitted together share a request and get their own results"""
+    model = BatchModel(fence=True)
+    batcher = TriageBatcher(model, window_ms=20)
+    texts = ["chest pain", "mild headache", 'said "can\'t breathe"']
+    results = asyncio.run(submit_all(batcher, texts))
+
+    assert len(model.prompts) == 1
+    assert [result["text"] for result in results] == texts
+    assert batcher.requests_sent == 1 and batcher.items_processed == 3
+    print("✅ one request per window")
+
+
+def test_size_cap_splits_batches():
+    """More utterances than max_batch_size go out as several requests"""
+    model = BatchModel()
+    batcher = TriageBatcher(model, window_ms=1000, max_batch_size=2)
+    texts = [f"symptom {i}" for i in range(5)]
+    results = asyncio.run(submit_all(batcher, texts))
+
+    # Full batches flush without waiting for the window
+    assert len(model.prompts) == 3
+    assert [result["text"] for result in results] == texts
+    print("✅ size cap splits batches")
+
+
+def test_missing_item_fails_only_its_caller():
+    """An item absent from the response raises for that caller alone"""
+    batcher = TriageBatcher(BatchModel(drop={2}), window_ms=10)
+    results = asyncio.run(submit_all(batcher, ["a", "b", "c"]))
+    assert results[0]["text"] == "a" and results[2]["text"] == "c"
+    assert isinstance(results[1], ValueError)
+    print("✅ missing item fails only its caller")
+
+
+def test_request_error_reaches_every_caller():
+    """A failed request raises its error for the whole batch"""
+    batcher = TriageBatcher(BatchModel(error=RuntimeError("quota exceeded")), window_ms=10)
+    results = asyncio.run(submit_all(batcher, ["a", "b"]))
+    assert all(isinstance(result, RuntimeError) for result in results)
+    print("✅ request error reaches every caller")
+
+
+def test_timeout():
+    """A request slower than timeout_seconds raises TimeoutError for the batch"""
+    batcher = TriageBatcher(BatchModel(delay=5), window_ms=10, timeout_seconds=0.1)
+    results = asyncio.run(submit_all(batcher, ["a", "b"]))
+    assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+    assert batcher.timeouts == 1
+    print("✅ slow batch times out")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Triage Batcher Tests")
+    print("=" * 60)
+    test_one_request_per_window()
+    test_size_cap_splits_batches()
+    test_missing_item_fails_only_its_caller()
+    test_request_error_reaches_every_caller()
+    test_timeout()
+    print("\nAll triage batcher tests passed")
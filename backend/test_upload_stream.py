@@ -0,0 +1,153 @@
+"""
+Tests for streaming multipart uploads.
+
+Feeds multipart bodies to stream_upload in small network chunks and checks
+that files are written with their size and SHA-256, form fields are kept,
+and oversized, malformed or file-less uploads are rejected with their
+partly written files removed.
+
+Run with: python test_upload_stream.py  (or pytest)
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.upload_stream import stream_upload
+
+BOUNDARY = "----vibeathon-test-boundary"
+
+
+def multipart_body(fields: dict, files: list) -> bytes:
+    """Encode form fields and (field, filename, bytes) files as multipart/form-data"""
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, data in files:
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b"\r\n"
+        )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def make_request(body: bytes, chunk_size: int = 1000, content_type: str = None) -> Request:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [
+        (b"content-type", (content_type or f"multipart/form-data; boundary={BOUNDARY}").encode()),
+        (b"content-length", str(len(body)).encode())
+    ]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+def paths_in(directory: Path):
+    """Destination picker numbering files in a directory"""
+    count = 0
+
+    def pick(filename: str) -> Path:
+        nonlocal count
+        count += 1
+        return directory / f"{count}_{filename}"
+
+    return pick
+
+
+def upload(body: bytes, directory: Path, max_bytes: int = 1 << 20, max_files: int = 1, **request_options):
+    return asyncio.run(
+        stream_upload(make_request(body, **request_options), "file", paths_in(directory), max_bytes, max_files)
+    )
+
+
+def test_saves_file_and_fields():
+    """The file is written as received; size, SHA-256 and fields are reported"""
+    directory = Path(tempfile.mkdtemp())
+    data = os.urandom(250_000)
+    result = upload(multipart_body({"patient_id": "p-42"}, [("file", "report.pdf", data)]), directory, chunk_size=4096)
+
+    assert result.fields == {"patient_id": "p-42"}
+    assert result.filename == "report.pdf"
+    assert result.path.read_bytes() == data
+    assert result.size == len(data)
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    print(f"✅ saved {result.size} bytes")
+
+
+def test_several_files():
+    """Several files in one field are saved in order, up to max_files"""
+    directory = Path(tempfile.mkdtemp())
+    pages = [b"page one", b"page two", b"page three"]
+    body = multipart_body({}, [("file", f"p{i}.jpg", page) for i, page in enumerate(pages, start=1)])
+    result = upload(body, directory, max_files=3, chunk_size=7)
+    assert [file.path.read_bytes() for file in result.files] == pages
+    assert result.size == sum(len(page) for page in pages)
+
+    try:
+        upload(body, Path(tempfile.mkdtemp()), max_files=2)
+        raise AssertionError("expected too many files")
+    except HTTPException as e:
+        assert e.status_code == 400
+    print("✅ several files")
+
+
+def test_too_large_removes_file():
+    """An upload over max_bytes is rejected with 413 and nothing is left on disk"""
+    directory = Path(tempfile.mkdtemp())
+    body = multipart_body({}, [("file", "scan.jpg", os.urandom(50_000))])
+    try:
+        # Only the streamed size check can catch this: the body fits the content-length allowance
+        upload(body, directory, max_bytes=20_000)
+        raise AssertionError("expected 413")
+    except HTTPException as e:
+        assert e.status_code == 413
+    assert list(directory.iterdir()) == []
+    print("✅ too large upload removed")
+
+
+def test_rejects_bad_requests():
+    """Wrong content type, a missing file and a malformed body are 400s"""
+    directory = Path(tempfile.mkdtemp())
+    cases = [
+        (multipart_body({}, [("file", "a.pdf", b"x")]), {"content_type": "application/json"}),
+        (multipart_body({"patient_id": "p-1"}, []), {}),
+        (multipart_body({}, [("other", "a.pdf", b"x")]), {}),
+        (f"--{BOUNDARY}\r\nbroken".encode() + b"\xff" * 10, {})
+    ]
+    for body, options in cases:
+        try:
+            upload(body, directory, **options)
+            raise AssertionError("expected 400")
+        except HTTPException as e:
+            assert e.status_code == 400, e.detail
+    assert list(directory.iterdir()) == []
+    print("✅ bad requests rejected")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Upload Stream Tests")
+    print("=" * 60)
+    test_saves_file_and_fields()
+    test_several_files()
+    test_too_large_removes_file()
+    test_rejects_bad_requests()
+    print("\nAll upload stream tests passed")
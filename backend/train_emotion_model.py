@@ -0,0 +1,215 @@
+"""
+Train and evaluate the NumPy emotion classifier.
+
+Expects a local dataset laid out as one folder per emotion:
+
+    dataset/
+        calm/*.wav
+        anxious/*.wav
+        sad/*.wav
+        ...
+
+Folder names must be emotion categories known to EmotionAnalyzer. Each
+recording is split into fixed-length segments, featurized with
+EmotionAnalyzer._extract_features and split into train/test sets. The
+script trains a logistic regression (or a one-hidden-layer MLP with
+--hidden), prints accuracy and a confusion matrix next to the rule-based
+classifier's score on the same test set, and writes the model as .npz.
+
+Run with: python train_emotion_model.py dataset/ --output emotion_model.npz
+Then set EMOTION_MODEL_PATH=emotion_model.npz in .env
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import librosa
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.emotion_analyzer import EmotionAnalyzer, EMOTION_CATEGORIES
+from app.emotion_classifier import CLASSIFIER_FEATURES, feature_vector, forward, save_model
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg", ".mp3", ".webm"}
+
+
+def load_dataset(root: str, analyzer: EmotionAnalyzer, segment_seconds: float):
+    """
+    Featurize every recording under root.
+
+    Returns:
+        Tuple of (feature matrix, label indices, label names, recording ids)
+    """
+    labels = sorted(
+        entry.name for entry in Path(root).iterdir()
+        if entry.is_dir() and entry.name in EMOTION_CATEGORIES
+    )
+    if len(labels) < 2:
+        raise SystemExit(f"Need at least two emotion folders under {root}, found {labels}")
+
+    segment = int(segment_seconds * analyzer.sample_rate)
+    rows, targets, recordings = [], [], []
+
+    for label_index, label in enumerate(labels):
+        files = sorted(p for p in (Path(root) / label).rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS)
+        print(f"   {label:<12} {len(files)} recordings")
+        for recording_id, path in enumerate(files):
+            audio, _ = librosa.load(path, sr=analyzer.sample_rate, mono=True)
+            for start in range(0, max(len(audio) - segment // 2, 1), segment):
+                piece = audio[start:start + segment]
+                if len(piece) < analyzer.sample_rate * 0.5:
+                    continue
+                rows.append(feature_vector(analyzer._extract_features(piece)))
+                targets.append(label_index)
+                recordings.append(f"{label}/{recording_id}")
+
+    return np.array(rows), np.array(targets), labels, np.array(recordings)
+
+
+def split_by_recording(recordings: np.ndarray, test_fraction: float, seed: int):
+    """Train/test split that keeps all segments of a recording on one side."""
+    rng = np.random.default_rng(seed)
+    unique = np.unique(recordings)
+    rng.shuffle(unique)
+    test_ids = set(unique[:max(1, int(len(unique) * test_fraction))])
+    test_mask = np.array([rec in test_ids for rec in recordings])
+    return ~test_mask, test_mask
+
+
+def train(X: np.ndarray, y: np.ndarray, n_classes: int, hidden: int,
+          epochs: int, lr: float, l2: float, seed: int) -> dict:
+    """
+    Fit the model with full-batch Adam on softmax cross-entropy.
+
+    Returns:
+        Model parameters in the layout expected by NumpyEmotionClassifier
+    """
+    rng = np.random.default_rng(seed)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale < 1e-8] = 1.0
+    Z = (X - mean) / scale
+    onehot = np.eye(n_classes)[y]
+
+    # Balance classes so a dominant emotion does not swamp the loss
+    counts = np.bincount(y, minlength=n_classes)
+    sample_weight = (len(y) / (n_classes * np.maximum(counts, 1)))[y][:, None] / len(y)
+
+    if hidden:
+        params = {
+            "W1": rng.normal(0, np.sqrt(2 / Z.shape[1]), (Z.shape[1], hidden)),
+            "b1": np.zeros(hidden),
+            "W2": rng.normal(0, np.sqrt(1 / hidden), (hidden, n_classes)),
+            "b2": np.zeros(n_classes)
+        }
+    else:
+        params = {"W1": np.zeros((Z.shape[1], n_classes)), "b1": np.zeros(n_classes)}
+
+    moments = {name: (np.zeros_like(p), np.zeros_like(p)) for name, p in params.items()}
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+    for epoch in range(1, epochs + 1):
+        pre = Z @ params["W1"] + params["b1"]
+        if hidden:
+            act = np.maximum(pre, 0.0)
+            logits = act @ params["W2"] + params["b2"]
+        else:
+            logits = pre
+
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        proba = np.exp(shifted)
+        proba /= proba.sum(axis=1, keepdims=True)
+        d_logits = (proba - onehot) * sample_weight
+
+        grads = {}
+        if hidden:
+            grads["W2"] = act.T @ d_logits + l2 * params["W2"]
+            grads["b2"] = d_logits.sum(axis=0)
+            d_pre = (d_logits @ params["W2"].T) * (pre > 0)
+        else:
+            d_pre = d_logits
+        grads["W1"] = Z.T @ d_pre + l2 * params["W1"]
+        grads["b1"] = d_pre.sum(axis=0)
+
+        for name, grad in grads.items():
+            m, v = moments[name]
+            m[:] = beta1 * m + (1 - beta1) * grad
+            v[:] = beta2 * v + (1 - beta2) * grad ** 2
+            m_hat = m / (1 - beta1 ** epoch)
+            v_hat = v / (1 - beta2 ** epoch)
+            params[name] -= lr * m_hat / (np.sqrt(v_hat) + eps)
+
+        if epoch % max(epochs // 5, 1) == 0:
+            loss = -(np.log(proba[np.arange(len(y)), y] + 1e-12) * sample_weight[:, 0]).sum()
+            print(f"   epoch {epoch:5d}  loss {loss:.4f}")
+
+    return {"mean": mean, "scale": scale, **params}
+
+
+def print_report(title: str, y_true: np.ndarray, y_pred: np.ndarray, labels: list):
+    accuracy = (y_true == y_pred).mean() if len(y_true) else 0.0
+    print(f"{title}: accuracy {accuracy:.3f} on {len(y_true)} segments")
+
+    width = max(len(label) for label in labels) + 2
+    print(" " * width + "".join(f"{label[:8]:>9}" for label in labels) + "   recall")
+    for i, label in enumerate(labels):
+        row = [int(((y_true == i) & (y_pred == j)).sum()) for j in range(len(labels))]
+        recall = row[i] / max(sum(row), 1)
+        print(f"{label:<{width}}" + "".join(f"{count:>9}" for count in row) + f"   {recall:.2f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("dataset", help="Folder with one sub-folder of recordings per emotion")
+    parser.add_argument("--output", default="emotion_model.npz", help="Where to write the model")
+    parser.add_argument("--hidden", type=int, default=0, help="Hidden units (0 = logistic regression)")
+    parser.add_argument("--epochs", type=int, default=2000)
+    parser.add_argument("--lr", type=float, default=0.01)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--segment-seconds", type=float, default=3.0)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    analyzer = EmotionAnalyzer(workers=0)
+
+    print("=" * 60)
+    print("Emotion Classifier Training")
+    print("=" * 60)
+    print(f"Featurizing {args.dataset} ...")
+    X, y, labels, recordings = load_dataset(args.dataset, analyzer, args.segment_seconds)
+    train_mask, test_mask = split_by_recording(recordings, args.test_fraction, args.seed)
+    print(f"   {train_mask.sum()} training / {test_mask.sum()} test segments, {X.shape[1]} features")
+    print()
+
+    model = "MLP" if args.hidden else "logistic regression"
+    print(f"Training {model} ...")
+    params = train(X[train_mask], y[train_mask], len(labels), args.hidden,
+                   args.epochs, args.lr, args.l2, args.seed)
+    print()
+
+    predictions = forward(params, X[test_mask]).argmax(axis=1)
+    print_report("Trained model", y[test_mask], predictions, labels)
+
+    # Rule-based baseline works on the same feature dictionaries
+    label_index = {label: i for i, label in enumerate(labels)}
+    rule_predictions = []
+    for row in X[test_mask]:
+        features = dict(zip(CLASSIFIER_FEATURES, row))
+        features["pitch_variance"] = features["pitch_std"] ** 2
+        emotion, _ = analyzer._classify_with_rules(features)
+        rule_predictions.append(label_index.get(emotion, -1))
+    print_report("Rule-based baseline", y[test_mask], np.array(rule_predictions), labels)
+
+    save_model(args.output, labels, params)
+    print(f"✅ Saved {model} to {args.output} ({os.path.getsize(args.output)} bytes)")
+    print(f"   Set EMOTION_MODEL_PATH={args.output} to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+-- Lab Values Table Schema
+-- One row per numeric value of an analyzed lab report, for per-test trends
+-- Run this in your Supabase SQL Editor after lab_reports_schema.sql
+
+CREATE TABLE IF NOT EXISTS public.lab_values (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    patient_id UUID NOT NULL REFERENCES public.patients(id) ON DELETE CASCADE,
+    report_id UUID NOT NULL REFERENCES public.lab_reports(id) ON DELETE CASCADE,
+    test TEXT NOT NULL, -- Canonical test name from the reference table
+    name TEXT NOT NULL, -- Test name as printed on the report
+    value DOUBLE PRECISION NOT NULL,
+    unit TEXT,
+    canonical_value DOUBLE PRECISION, -- Value converted to the test's canonical unit
+    canonical_unit TEXT,
+    status TEXT, -- 'normal', 'high', 'low' or 'unknown'
+    normal_range TEXT,
+    measured_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(), -- Sample collection date printed on the report, else upload time
+    measured_at_source TEXT DEFAULT 'upload', -- 'report' or 'upload': where measured_at came from
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tables created before measured_at_source existed
+ALTER TABLE public.lab_values ADD COLUMN IF NOT EXISTS measured_at_source TEXT DEFAULT 'upload';
+
+-- Trend queries read one patient's values of one test in time order
+CREATE INDEX IF NOT EXISTS idx_lab_values_patient_test ON public.lab_values(patient_id, test, measured_at);
+CREATE INDEX IF NOT EXISTS idx_lab_values_report_id ON public.lab_values(report_id);
+
+-- Enable Row Level Security
+ALTER TABLE public.lab_values ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policies
+-- Patients can view their own lab values
+CREATE POLICY "Patients can view their own lab values"
+ON public.lab_values
+FOR SELECT
+USING (auth.uid() = patient_id);
+
+-- Patients can insert their own lab values
+CREATE POLICY "Patients can insert their own lab values"
+ON public.lab_values
+FOR INSERT
+WITH CHECK (auth.uid() = patient_id);
+
+-- Doctors can view lab values of their patients (through consultations)
+CREATE POLICY "Doctors can view patient lab values"
+ON public.lab_values
+FOR SELECT
+USING (
+    EXISTS (
+        SELECT 1 FROM public.consultations
+        WHERE consultations.patient_id = lab_values.patient_id
+        AND consultations.doctor_id = auth.uid()
+    )
+);
+
+-- Add comment
+COMMENT ON TABLE public.lab_values IS 'Numeric lab values extracted from lab reports, indexed by patient and test for trends';
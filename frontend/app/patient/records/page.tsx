@@ -54,6 +54,7 @@ interface LabReport {
 interface MedicalImage {
   id: string
   image_url: string
+  thumbnail_url?: string
   analysis_result: any
   uploaded_at: string
   status: string
@@ -516,7 +517,7 @@ ${report.analysis_result?.recommendations || 'No recommendations available'}
                           {image.image_url && (
                             <div className="relative aspect-video rounded-lg overflow-hidden bg-zinc-100 dark:bg-zinc-800">
                               <img 
-                                src={image.image_url} 
+                                src={image.thumbnail_url || image.image_url} 
                                 alt="Medical scan" 
                                 className="w-full h-full object-cover"
                               />
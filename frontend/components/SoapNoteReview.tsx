@@ -125,40 +125,78 @@ export default function SoapNoteReview({ consultationId }: SoapNoteReviewProps)
   }, [consultationId])
 
   // Generate SOAP notes function
+  // Streams the note so each section appears as soon as it is generated.
+  // The stream is a POST (it saves the note), read from the fetch body as
+  // Server-Sent Events; errors carry a detail both before and during the stream.
   const generateSoapNotes = async () => {
+    setIsGenerating(true)
+    setError(null)
+    setSoapNote({ subjective: '', objective: '', assessment: '', plan: '' })
+    setSuggestions([])
+    const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
+
+    const handleEvent = (type: string, data: any) => {
+      if (type === 'section') {
+        setSoapNote(prev => ({ ...prev, [data.section]: data.text }))
+        setIsLoading(false)
+      } else if (type === 'suggestions') {
+        setSuggestions(Array.isArray(data.suggestions) ? data.suggestions : [])
+      } else if (type === 'complete') {
+        setSoapNote(data.soap_note)
+        setSuggestions(Array.isArray(data.stigma_suggestions) ? data.stigma_suggestions : [])
+        toast.success('SOAP notes generated successfully!')
+        return true
+      } else if (type === 'error') {
+        throw new Error(data.detail || 'Failed to generate SOAP notes')
+      }
+      return false
+    }
+
     try {
-      setIsGenerating(true)
-      setError(null)
-      const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
-      
-      const response = await fetch(`${backendUrl}/api/consultations/${consultationId}/generate_soap`, {
+      const response = await fetch(`${backendUrl}/api/consultations/${consultationId}/generate_soap/stream`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers: { Accept: 'text/event-stream' }
       })
 
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({ detail: 'Failed to generate SOAP notes' }))
-        throw new Error(errorData.detail || `HTTP error! status: ${response.status}`)
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}))
+        throw new Error(errorData.detail || 'Failed to generate SOAP notes')
       }
 
-      const data = await response.json()
-      
-      // Update local state with generated notes
-      if (data.raw_soap_note) {
-        setSoapNote(data.raw_soap_note)
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let completed = false
+
+      while (!completed) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        // Events are separated by a blank line: "event: <type>\ndata: <json>"
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1 && !completed) {
+          const message = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+
+          let type = 'message'
+          let data = ''
+          for (const line of message.split('\n')) {
+            if (line.startsWith('event:')) type = line.slice(6).trim()
+            else if (line.startsWith('data:')) data += line.slice(5).trim()
+          }
+          if (data) completed = handleEvent(type, JSON.parse(data))
+        }
       }
-      if (data.de_stigma_suggestions) {
-        setSuggestions(Array.isArray(data.de_stigma_suggestions) 
-          ? data.de_stigma_suggestions 
-          : data.de_stigma_suggestions.suggestions || [])
+
+      if (!completed) {
+        throw new Error('Connection closed before the SOAP notes were finished')
       }
-      
-      toast.success('SOAP notes generated successfully!')
-    } catch (error) {
-      console.error('Error generating SOAP notes:', error)
-      const errorMessage = error instanceof Error ? error.message : 'Failed to generate SOAP notes'
+      reader.cancel().catch(() => {})
+    } catch (err) {
+      console.error('Error generating SOAP notes:', err)
+      const errorMessage = err instanceof Error ? err.message : 'Failed to generate SOAP notes'
       setError(errorMessage)
       toast.error(errorMessage)
     } finally {
@@ -286,7 +324,7 @@ export default function SoapNoteReview({ consultationId }: SoapNoteReviewProps)
   }
 
   // Show generate button if no SOAP note exists
-  if (!soapNote.subjective && !soapNote.objective && !isLoading && !error) {
+  if (!Object.values(soapNote).some(Boolean) && !isLoading && !error) {
     return (
       <div className="min-h-screen bg-zinc-50 dark:bg-zinc-950 flex items-center justify-center p-6">
         <Card className="max-w-md w-full">
@@ -329,7 +367,7 @@ export default function SoapNoteReview({ consultationId }: SoapNoteReviewProps)
     )
   }
 
-  if (error && !soapNote.subjective && !soapNote.objective) {
+  if (error && !Object.values(soapNote).some(Boolean)) {
     return (
       <div className="min-h-screen bg-zinc-50 dark:bg-zinc-950 flex items-center justify-center p-6">
         <Card className="max-w-md w-full">
@@ -109,12 +109,9 @@ export function RealTimeEmotionAnalyzer({
     ws.onmessage = (event) => {
       const message = JSON.parse(event.data);
       
-      if (message.type === "emotion_logged") {
-        // Update current emotion
+      if (message.type === "emotion_logged" || message.type === "emotion_update") {
+        // Update current emotion (stats arrive separately as "stats_update")
         setCurrentEmotion(message.data);
-        
-        // Refresh stats
-        fetchStats();
       } else if (message.type === "stats_update") {
         setStats(message.data);
       }